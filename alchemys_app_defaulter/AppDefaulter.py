@@ -9,9 +9,24 @@ This script reads a configuration file containing:
 Behavior:
 - If an extension has NO existing default app: Sets the specified app as default
 - If an extension ALREADY has a default app: Adds the specified app to "Open with" list
+- Extensions whose registry keys have not changed since the last run are
+  skipped (see RunJournal); pass --full to re-check everything
+- Prior values are journaled before every write (see WriteAheadJournal), so
+  an interrupted run can be finished with --resume or undone with --rollback
+- With --watch, keeps running and re-applies associations that get reset
+- Lines like `@text` or `@source` add a whole group of extensions from the
+  extension catalog (see extension_catalog.py); protected extensions
+  (executables, shell types, ...) are left out of groups, and listing one
+  explicitly prints a [SKIPPED] line unless --allow-protected is given
 
 Usage:
     python set_file_associations.py <config_file>
+    python set_file_associations.py <config_file|config_dir> [...] [--priority NAMES]
+    python set_file_associations.py <config_file> [...] --watch [--debounce SECONDS]
+    python set_file_associations.py audit [--exe NAME | --progid ID | --ext EXT | --dead]
+    python set_file_associations.py plan <config_file> [...] --out PLAN_JSON
+    python set_file_associations.py apply PLAN_JSON
+    python set_file_associations.py catalog [--rebuild] [--group NAME | --protected]
 
 Example config file (associations.txt):
     C:\\Program Files\\Notepad++\\notepad++.exe
@@ -19,17 +34,53 @@ Example config file (associations.txt):
     .log
     .ini
     .cfg
+    @source
 """
 
 import argparse
 import ctypes
+import hashlib
+import json
+import ntpath
 import os
+import subprocess
 import sys
-import winreg
-from pathlib import Path
-from dataclasses import dataclass
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path, PureWindowsPath
+from dataclasses import asdict, dataclass, field
 from typing import Optional
 
+from extension_catalog import GROUP_NAME
+
+try:
+    import winreg
+except ImportError:
+    # Not on Windows - only the in-memory and .reg backends are usable
+    winreg = None
+
+
+# Registry backend. Every registry access in this script goes through this
+# object, which must provide the subset of the winreg API used below
+# (OpenKey, CreateKeyEx, QueryValueEx, SetValueEx, EnumKey, EnumValue,
+# QueryInfoKey and the HKEY_*/KEY_*/REG_* constants). The live backend is
+# the winreg module itself; memory_registry.MemoryRegistry (in-memory) and
+# regfile.RegFileBackend (.reg writer) are drop-in alternatives.
+registry = winreg
+
+
+def set_registry_backend(backend):
+    """
+    Route all registry access through a different backend.
+    
+    Args:
+        backend: The winreg module or a compatible object
+    """
+    global registry
+    registry = backend
+
 
 @dataclass
 class AssociationInfo:
@@ -49,23 +100,300 @@ def is_admin():
         return False
 
 
-def get_existing_association(extension: str) -> AssociationInfo:
+FILE_EXTS_PATH = "Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\FileExts"
+
+
+def open_file_exts_root():
+    """
+    Open the user's Explorer\\FileExts key once so per-extension keys can be
+    resolved relative to it instead of from the hive root every time.
+    
+    Returns:
+        An open key handle (close it when done), or None if it could not be opened
+    """
+    try:
+        return registry.CreateKeyEx(registry.HKEY_CURRENT_USER, FILE_EXTS_PATH, 0,
+                                  registry.KEY_READ | registry.KEY_WRITE)
+    except OSError:
+        pass
+    try:
+        return registry.OpenKey(registry.HKEY_CURRENT_USER, FILE_EXTS_PATH, 0, registry.KEY_READ)
+    except OSError:
+        return None
+
+
+def _file_exts_key(file_exts, extension: str, subkey: str) -> tuple:
+    """Return (root, path) of a per-extension key under FileExts."""
+    if file_exts is None:
+        return registry.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\{extension}\\{subkey}"
+    return file_exts, f"{extension}\\{subkey}"
+
+
+def parse_command_executable(command: str) -> Optional[str]:
+    """
+    Extract the executable path from a shell open command.
+    
+    Commands are typically: "C:\\path\\to\\app.exe" "%1"
+    
+    Args:
+        command: The command string from shell\\open\\command
+        
+    Returns:
+        The executable path, or None if it could not be determined
+    """
+    if command.startswith('"'):
+        exe_end = command.find('"', 1)
+        if exe_end > 0:
+            return command[1:exe_end]
+        return None
+    # No quotes, take first space-delimited part
+    parts = command.split()
+    if parts:
+        return parts[0]
+    return None
+
+
+def expand_executable_path(path: str) -> str:
+    """
+    Expand %VARIABLE% references in a handler path (e.g. %SystemRoot%).
+    
+    Unknown variables are left as-is, so the result still starts with '%'
+    when the path cannot be resolved on this machine.
+    """
+    return ntpath.expandvars(path) if '%' in path else path
+
+
+class ExecutableCache:
+    """
+    Shared cache of executable path -> exists on disk.
+    
+    Many ProgIDs point at the same handful of executables, and each stat can
+    be slow on network-redirected or roaming paths, so every distinct path
+    is checked once per run. Concurrent requests for a path that is still
+    being checked wait for that check instead of repeating it. Paths are
+    expected to be expanded already (see expand_executable_path()).
+    """
+    
+    def __init__(self):
+        self.checks = 0
+        self.hits = 0
+        self._entries = {}      # lower-case path -> Future[bool]
+        self._lock = threading.Lock()
+    
+    def exists(self, path: str) -> bool:
+        key = path.lower()
+        with self._lock:
+            future = self._entries.get(key)
+            owner = future is None
+            if owner:
+                future = self._entries[key] = Future()
+                self.checks += 1
+            else:
+                self.hits += 1
+        if owner:
+            future.set_result(not path.startswith('%') and os.path.isfile(path))
+        return future.result()
+    
+    def prefetch(self, paths, jobs: int = 1):
+        """
+        Check every distinct path not yet cached, on up to `jobs` threads.
+        
+        Args:
+            paths: Expanded executable paths (duplicates and None are ignored)
+            jobs: Maximum number of concurrent checks
+        """
+        with self._lock:
+            pending = list({p.lower(): p for p in paths
+                            if p and p.lower() not in self._entries}.values())
+        if jobs <= 1 or len(pending) <= 1:
+            for path in pending:
+                self.exists(path)
+            return
+        with ThreadPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+            list(pool.map(self.exists, pending))
+    
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.checks = 0
+            self.hits = 0
+
+
+executable_cache = ExecutableCache()
+
+
+@dataclass(frozen=True)
+class ProgIdDetails:
+    """Resolved handler details for a ProgID."""
+    executable: Optional[str] = None
+    description: Optional[str] = None
+    exists: bool = False
+
+
+class ProgIdCache:
+    """
+    Bounded LRU cache of ProgID -> ProgIdDetails.
+    
+    Many extensions resolve to the same handful of ProgIDs, so caching the
+    command/description reads and the executable existence check avoids
+    repeating them for every extension. Writers must call invalidate() for
+    any ProgID they modify. Safe to use from multiple threads.
+    
+    Args:
+        maxsize: Maximum number of ProgIDs kept before the least recently
+                 used entry is evicted
+    """
+    
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, progid: str) -> Optional[ProgIdDetails]:
+        key = progid.lower()
+        with self._lock:
+            details = self._entries.get(key)
+            if details is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return details
+    
+    def put(self, progid: str, details: ProgIdDetails):
+        key = progid.lower()
+        with self._lock:
+            self._entries[key] = details
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, progid: str):
+        """Drop a ProgID so the next lookup re-reads it from the registry."""
+        with self._lock:
+            self._entries.pop(progid.lower(), None)
+    
+    def clear(self):
+        """Drop all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+progid_cache = ProgIdCache()
+
+
+def resolve_progid(progid: str) -> ProgIdDetails:
+    """
+    Read a ProgID's handler executable and description (cached).
+    
+    The executable's existence is checked through executable_cache, so
+    ProgIDs that share a handler only stat it once.
+    
+    Args:
+        progid: The programmatic identifier (e.g., 'txtfile')
+        
+    Returns:
+        ProgIdDetails for the ProgID (all empty if it is not registered)
+    """
+    details = progid_cache.get(progid)
+    if details is not None:
+        return details
+    
+    executable, description = _read_progid(progid)
+    exists = bool(executable) and executable_cache.exists(executable)
+    details = ProgIdDetails(executable=executable, description=description, exists=exists)
+    progid_cache.put(progid, details)
+    return details
+
+
+def _read_progid(progid: str) -> tuple[Optional[str], Optional[str]]:
+    """Read a ProgID's (expanded) handler executable and description from the registry."""
+    command = None
+    description = None
+    try:
+        with registry.OpenKey(registry.HKEY_CLASSES_ROOT, progid) as key:
+            # Get description if available
+            try:
+                description, _ = registry.QueryValueEx(key, "")
+            except OSError:
+                pass
+            # Check if it has a valid shell command
+            try:
+                with registry.OpenKey(key, "shell\\open\\command") as command_key:
+                    command, _ = registry.QueryValueEx(command_key, "")
+            except OSError:
+                pass
+    except OSError:
+        pass
+    
+    executable = parse_command_executable(command) if command else None
+    if executable:
+        executable = expand_executable_path(executable)
+    return executable, description
+
+
+def _apply_progid_details(info: AssociationInfo, details: ProgIdDetails):
+    """
+    Fill in executable/description for an AssociationInfo whose ProgID is known.
+    
+    Args:
+        info: Association being resolved (info.progid must be set)
+        details: The resolved ProgID
+    """
+    info.executable = details.executable
+    
+    # Verify the executable exists (or mark as valid if it's a system app)
+    if details.executable:
+        if details.exists:
+            info.has_default = True
+        elif not details.executable.startswith('%'):
+            # Could be a system handler, still count as having default
+            info.has_default = True
+    
+    if details.description is not None:
+        info.description = details.description
+
+
+def get_existing_association(extension: str, file_exts=None, index=None) -> AssociationInfo:
     """
     Check if an extension already has a default application associated.
     
     Args:
         extension: File extension (with leading dot, e.g., '.txt')
+        file_exts: Optional open FileExts key (see open_file_exts_root())
+        index: Optional AssociationIndex to answer from instead of the
+               registry (see refresh_association_index())
         
     Returns:
         AssociationInfo with details about existing association
     """
     info = AssociationInfo(extension=extension, has_default=False)
     
+    if index is not None:
+        row = index.lookup(extension)
+        if row is None or not row["progid"]:
+            # Not registered, or registered without a handler
+            return info
+        info.progid = row["progid"]
+        info.has_default = row["source"] == "UserChoice"
+        _apply_progid_details(info, ProgIdDetails(executable=row["executable"],
+                                                  description=row["description"],
+                                                  exists=bool(row["exe_exists"])))
+        return info
+    
     # First, check UserChoice (Windows 8+ preferred location) - most reliable
     try:
-        user_choice_path = f"Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\FileExts\\{extension}\\UserChoice"
-        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, user_choice_path) as key:
-            progid, _ = winreg.QueryValueEx(key, "ProgId")
+        root, user_choice_path = _file_exts_key(file_exts, extension, "UserChoice")
+        with registry.OpenKey(root, user_choice_path) as key:
+            progid, _ = registry.QueryValueEx(key, "ProgId")
             if progid:
                 info.progid = progid
                 info.has_default = True
@@ -75,9 +403,9 @@ def get_existing_association(extension: str) -> AssociationInfo:
     # If no UserChoice, check HKEY_CLASSES_ROOT for the extension
     if not info.has_default:
         try:
-            with winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, extension) as key:
+            with registry.OpenKey(registry.HKEY_CLASSES_ROOT, extension) as key:
                 try:
-                    progid, _ = winreg.QueryValueEx(key, "")
+                    progid, _ = registry.QueryValueEx(key, "")
                     if progid:
                         info.progid = progid
                 except FileNotFoundError:
@@ -88,45 +416,152 @@ def get_existing_association(extension: str) -> AssociationInfo:
     
     # If we found a ProgID, check if it has a valid shell command
     if info.progid:
+        _apply_progid_details(info, resolve_progid(info.progid))
+    
+    return info
+
+
+def _read_default(key, sub_key: str, value_name: str = "") -> Optional[str]:
+    """Read a value below an open key, returning None if the key or value is missing."""
+    try:
+        with registry.OpenKey(key, sub_key) as subkey:
+            value, _ = registry.QueryValueEx(subkey, value_name)
+            return value
+    except OSError:
+        return None
+
+
+def scan_associations(extensions: list[str], lookup=get_existing_association,
+                      jobs: int = 1) -> dict:
+    """
+    Look up the existing association of every extension.
+    
+    The lookups are independent and read-only, so with jobs > 1 they are
+    spread over a bounded thread pool. The result is always in config order.
+    
+    Args:
+        extensions: File extensions (with leading dot); duplicates are looked up once
+        lookup: Function mapping an extension to its AssociationInfo
+        jobs: Maximum number of concurrent lookups
+        
+    Returns:
+        Dict of extension -> AssociationInfo, in the order of `extensions`
+    """
+    unique = list(dict.fromkeys(extensions))
+    if jobs <= 1 or len(unique) <= 1:
+        return {ext: lookup(ext) for ext in unique}
+    
+    with ThreadPoolExecutor(max_workers=min(jobs, len(unique))) as pool:
+        # map() yields results in submission order regardless of completion order
+        return dict(zip(unique, pool.map(lookup, unique)))
+
+
+@dataclass
+class RegistryWrite:
+    """A single desired registry value."""
+    root: object          # predefined HKEY_* constant or an open key handle
+    path: str
+    name: str
+    value_type: int
+    data: object
+
+
+@dataclass
+class WriteStats:
+    """Counts of registry values written vs. already up to date."""
+    written: int = 0
+    skipped: int = 0
+    failed: int = 0
+    
+    def add(self, written: int = 0, skipped: int = 0, failed: int = 0):
+        """Add to the counts; safe to call from several threads (--all-users)."""
+        with _write_stats_lock:
+            self.written += written
+            self.skipped += skipped
+            self.failed += failed
+
+
+_write_stats_lock = threading.Lock()
+write_stats = WriteStats()
+
+# Write-ahead journal (WriteAheadJournal) that records prior values before
+# every write; None when the run is not journaled (dry run, --emit-reg)
+write_journal = None
+
+
+def _values_equal(current, current_type: int, data, value_type: int) -> bool:
+    """Compare a value read from the registry with the value we want to write."""
+    if current_type != value_type:
+        return False
+    if value_type in (registry.REG_NONE, registry.REG_BINARY):
+        # winreg returns None for zero-length binary data
+        return (current or b'') == (data or b'')
+    return current == data
+
+
+def apply_registry_writes(writes: list[RegistryWrite]):
+    """
+    Write only the values that differ from what is already in the registry.
+    
+    Writes are grouped by key; each key is read once, and opened for writing
+    only if at least one of its values needs to change. Results are added to
+    write_stats, one count per value (a key that cannot be written counts
+    each of its pending values as failed).
+    
+    Args:
+        writes: Desired values, applied in order
+        
+    Raises:
+        PermissionError/OSError from the first key that could not be written
+    """
+    by_key = {}
+    for write in writes:
+        by_key.setdefault((write.root, write.path), []).append(write)
+    
+    for (root, path), key_writes in by_key.items():
+        pending = key_writes
+        key_exists = False
+        priors = {}     # id(write) -> (data, type) of the value being replaced
         try:
-            command_path = f"{info.progid}\\shell\\open\\command"
-            with winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, command_path) as key:
-                command, _ = winreg.QueryValueEx(key, "")
-                if command:
-                    # Extract executable path from command
-                    # Commands are typically: "C:\path\to\app.exe" "%1"
-                    if command.startswith('"'):
-                        exe_end = command.find('"', 1)
-                        if exe_end > 0:
-                            info.executable = command[1:exe_end]
+            with registry.OpenKey(root, path, 0, registry.KEY_READ) as key:
+                key_exists = True
+                pending = []
+                for write in key_writes:
+                    try:
+                        current, current_type = registry.QueryValueEx(key, write.name)
+                    except FileNotFoundError:
+                        pending.append(write)
+                        continue
+                    if _values_equal(current, current_type, write.data, write.value_type):
+                        write_stats.add(skipped=1)
                     else:
-                        # No quotes, take first space-delimited part
-                        parts = command.split()
-                        if parts:
-                            info.executable = parts[0]
-                    
-                    # Verify the executable exists (or mark as valid if it's a system app)
-                    if info.executable:
-                        if os.path.isfile(info.executable):
-                            info.has_default = True
-                        elif info.progid and not info.executable.startswith('%'):
-                            # Could be a system handler, still count as having default
-                            info.has_default = True
-        except FileNotFoundError:
+                        priors[id(write)] = (current, current_type)
+                        pending.append(write)
+        except OSError:
+            # Key does not exist yet (or is unreadable) - write everything
             pass
-        except Exception:
-            pass
-    
-    # Get description if available
-    if info.progid:
+        
+        if not pending:
+            continue
+        
+        if write_journal is not None:
+            if not key_exists:
+                write_journal.record_key(root, path)
+            for write in pending:
+                write_journal.record_value(root, path, write.name, priors.get(id(write)))
+            write_journal.sync()
+        
+        written = 0
         try:
-            with winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, info.progid) as key:
-                desc, _ = winreg.QueryValueEx(key, "")
-                info.description = desc
-        except (FileNotFoundError, PermissionError, OSError):
-            pass
-    
-    return info
+            with registry.CreateKeyEx(root, path, 0, registry.KEY_WRITE) as key:
+                for write in pending:
+                    registry.SetValueEx(key, write.name, 0, write.value_type, write.data)
+                    written += 1
+        except OSError:
+            # Every value of the key that was not written counts as failed
+            write_stats.add(written=written, failed=len(pending) - written)
+            raise
+        write_stats.add(written=written)
 
 
 def create_progid(exe_path: str, progid: str, description: str = None):
@@ -138,31 +573,25 @@ def create_progid(exe_path: str, progid: str, description: str = None):
         progid: The programmatic identifier (e.g., 'MyApp.txt')
         description: Optional description for the file type
     """
-    exe_path = os.path.abspath(exe_path)
+    exe_path = ntpath.abspath(exe_path)
     
     if description is None:
-        app_name = Path(exe_path).stem
+        app_name = PureWindowsPath(exe_path).stem
         description = f"{app_name} Document"
     
     # Create the ProgID key under HKEY_CLASSES_ROOT
     try:
-        # Create main ProgID key
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, progid, 0, 
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "", 0, winreg.REG_SZ, description)
-        
-        # Create DefaultIcon subkey
-        icon_path = f'"{exe_path}",0'
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, f"{progid}\\DefaultIcon", 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "", 0, winreg.REG_SZ, icon_path)
-        
-        # Create shell\open\command subkey
-        command = f'"{exe_path}" "%1"'
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, f"{progid}\\shell\\open\\command", 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "", 0, winreg.REG_SZ, command)
-        
+        hkcr = registry.HKEY_CLASSES_ROOT
+        apply_registry_writes([
+            # Main ProgID key
+            RegistryWrite(hkcr, progid, "", registry.REG_SZ, description),
+            # DefaultIcon subkey
+            RegistryWrite(hkcr, f"{progid}\\DefaultIcon", "", registry.REG_SZ,
+                          f'"{exe_path}",0'),
+            # shell\open\command subkey
+            RegistryWrite(hkcr, f"{progid}\\shell\\open\\command", "", registry.REG_SZ,
+                          f'"{exe_path}" "%1"'),
+        ])
         return True
         
     except PermissionError:
@@ -172,6 +601,9 @@ def create_progid(exe_path: str, progid: str, description: str = None):
     except Exception as e:
         print(f"    [ERROR] Failed to create ProgID {progid}: {e}")
         return False
+    finally:
+        # Cached handler details for this ProgID are stale now
+        progid_cache.invalidate(progid)
 
 
 def set_extension_association(extension: str, progid: str):
@@ -184,10 +616,9 @@ def set_extension_association(extension: str, progid: str):
     """
     try:
         # Set the extension to point to our ProgID
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, extension, 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "", 0, winreg.REG_SZ, progid)
-        
+        apply_registry_writes([
+            RegistryWrite(registry.HKEY_CLASSES_ROOT, extension, "", registry.REG_SZ, progid),
+        ])
         return True
         
     except PermissionError:
@@ -198,83 +629,86 @@ def set_extension_association(extension: str, progid: str):
         return False
 
 
-def add_to_open_with_list(extension: str, progid: str, exe_path: str):
+def add_to_open_with_list(extension: str, progid: str, exe_path: str, file_exts=None):
     """
     Add an application to the "Open with" list for an extension.
     This does NOT change the default, just adds it as an option.
     
+    The application-level HKCR\\Applications entry (including SupportedTypes)
+    is registered once per run by register_in_applications() and
+    register_supported_types(), not here.
+    
     Args:
         extension: File extension (with leading dot)
         progid: The programmatic identifier for our app
         exe_path: Path to the executable
+        file_exts: Optional open FileExts key (see open_file_exts_root())
     """
-    exe_path = os.path.abspath(exe_path)
-    exe_name = Path(exe_path).name
-    app_name = Path(exe_path).stem
     success = False
     
     # Method 1: Add to OpenWithProgids under the extension in HKCR
     try:
-        openwith_path = f"{extension}\\OpenWithProgids"
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, openwith_path, 0,
-                                winreg.KEY_WRITE) as key:
-            # Value name is the ProgID, value is empty
-            winreg.SetValueEx(key, progid, 0, winreg.REG_NONE, b'')
+        # Value name is the ProgID, value is empty
+        apply_registry_writes([
+            RegistryWrite(registry.HKEY_CLASSES_ROOT, f"{extension}\\OpenWithProgids",
+                          progid, registry.REG_NONE, b''),
+        ])
         success = True
-    except PermissionError:
-        pass
     except Exception:
         pass
     
-    # Method 2: Add to user's FileExts OpenWithProgids
-    try:
-        user_openwith_path = f"Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\FileExts\\{extension}\\OpenWithProgids"
-        with winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER, user_openwith_path, 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, progid, 0, winreg.REG_NONE, b'')
+    if add_to_user_open_with(extension, progid, exe_path, file_exts):
         success = True
-    except Exception:
-        pass
+    return success
+
+
+def add_to_user_open_with(extension: str, progid: str, exe_path: str, file_exts=None) -> bool:
+    """
+    Add an application to one user's "Open with" lists (FileExts
+    OpenWithProgids and the MRU-based OpenWithList). These are the only
+    per-user parts of an association.
     
-    # Method 3: Register in Applications key (makes it available system-wide for "Open with")
-    try:
-        app_key_path = f"Applications\\{exe_name}"
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, app_key_path, 0,
-                                winreg.KEY_WRITE) as key:
-            # Set FriendlyAppName
-            winreg.SetValueEx(key, "FriendlyAppName", 0, winreg.REG_SZ, app_name)
-        
-        # Add shell\open\command
-        command = f'"{exe_path}" "%1"'
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, f"{app_key_path}\\shell\\open\\command", 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "", 0, winreg.REG_SZ, command)
-        
-        # Add SupportedTypes - this is key for "Open with" visibility
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, f"{app_key_path}\\SupportedTypes", 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, extension, 0, winreg.REG_SZ, "")
+    Args:
+        extension: File extension (with leading dot)
+        progid: The programmatic identifier for our app
+        exe_path: Path to the executable
+        file_exts: Open FileExts key of the user (see open_file_exts_root());
+                   None for the current user
         
+    Returns:
+        True if at least one list was updated (or already up to date)
+    """
+    exe_name = PureWindowsPath(ntpath.abspath(exe_path)).name
+    success = False
+    
+    # Method 2: Add to user's FileExts OpenWithProgids
+    try:
+        root, user_openwith_path = _file_exts_key(file_exts, extension, "OpenWithProgids")
+        apply_registry_writes([
+            RegistryWrite(root, user_openwith_path, progid, registry.REG_NONE, b''),
+        ])
         success = True
-    except PermissionError:
-        pass
     except Exception:
         pass
     
-    # Method 4: Add to user's OpenWithList (MRU-based)
+    # Method 3: Add to user's OpenWithList (MRU-based)
     try:
-        user_openwith_list = f"Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\FileExts\\{extension}\\OpenWithList"
-        with winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER, user_openwith_list, 0,
-                                winreg.KEY_READ | winreg.KEY_WRITE) as key:
+        root, user_openwith_list = _file_exts_key(file_exts, extension, "OpenWithList")
+        if write_journal is not None:
+            write_journal.record_key(root, user_openwith_list)
+        with registry.CreateKeyEx(root, user_openwith_list, 0,
+                                registry.KEY_READ | registry.KEY_WRITE) as key:
             # Find existing apps and MRU list
             existing_apps = {}
             mru_list = ""
+            mru_prior = None
             try:
                 i = 0
                 while True:
-                    name, value, _ = winreg.EnumValue(key, i)
+                    name, value, value_type = registry.EnumValue(key, i)
                     if name == "MRUList":
                         mru_list = value
+                        mru_prior = (value, value_type)
                     elif len(name) == 1 and name.isalpha():
                         existing_apps[name] = value.lower()
                     i += 1
@@ -285,7 +719,9 @@ def add_to_open_with_list(extension: str, progid: str, exe_path: str):
             exe_name_lower = exe_name.lower()
             already_exists = exe_name_lower in existing_apps.values()
             
-            if not already_exists:
+            if already_exists:
+                write_stats.add(skipped=1)
+            else:
                 # Find next available letter
                 next_letter = None
                 for letter in 'abcdefghijklmnopqrstuvwxyz':
@@ -294,11 +730,19 @@ def add_to_open_with_list(extension: str, progid: str, exe_path: str):
                         break
                 
                 if next_letter:
-                    winreg.SetValueEx(key, next_letter, 0, winreg.REG_SZ, exe_name)
+                    if write_journal is not None:
+                        write_journal.record_value(root, user_openwith_list, next_letter, None)
+                        if next_letter not in mru_list:
+                            write_journal.record_value(root, user_openwith_list, "MRUList",
+                                                       mru_prior)
+                        write_journal.sync()
+                    registry.SetValueEx(key, next_letter, 0, registry.REG_SZ, exe_name)
+                    write_stats.add(written=1)
                     # Update MRUList to include our new entry at the front
                     if next_letter not in mru_list:
                         new_mru = next_letter + mru_list
-                        winreg.SetValueEx(key, "MRUList", 0, winreg.REG_SZ, new_mru)
+                        registry.SetValueEx(key, "MRUList", 0, registry.REG_SZ, new_mru)
+                        write_stats.add(written=1)
                     success = True
     except Exception:
         pass
@@ -313,28 +757,26 @@ def register_application(exe_path: str):
     Args:
         exe_path: Full path to the executable
     """
-    exe_path = os.path.abspath(exe_path)
-    exe_name = Path(exe_path).name
+    exe_path = ntpath.abspath(exe_path)
+    exe_name = PureWindowsPath(exe_path).name
+    app_paths_key = f"Software\\Microsoft\\Windows\\CurrentVersion\\App Paths\\{exe_name}"
+    
+    def app_path_writes(root):
+        return [
+            RegistryWrite(root, app_paths_key, "", registry.REG_SZ, exe_path),
+            RegistryWrite(root, app_paths_key, "Path", registry.REG_SZ, str(PureWindowsPath(exe_path).parent)),
+        ]
     
     # Try HKLM first (system-wide, needs admin)
     try:
-        app_paths_key = f"Software\\Microsoft\\Windows\\CurrentVersion\\App Paths\\{exe_name}"
-        with winreg.CreateKeyEx(winreg.HKEY_LOCAL_MACHINE, app_paths_key, 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "", 0, winreg.REG_SZ, exe_path)
-            winreg.SetValueEx(key, "Path", 0, winreg.REG_SZ, str(Path(exe_path).parent))
-        
+        apply_registry_writes(app_path_writes(registry.HKEY_LOCAL_MACHINE))
         print(f"  [OK] Registered application in App Paths (system): {exe_name}")
         return True
         
     except PermissionError:
         # Try HKEY_CURRENT_USER instead (user-level, no admin needed)
         try:
-            app_paths_key = f"Software\\Microsoft\\Windows\\CurrentVersion\\App Paths\\{exe_name}"
-            with winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER, app_paths_key, 0,
-                                    winreg.KEY_WRITE) as key:
-                winreg.SetValueEx(key, "", 0, winreg.REG_SZ, exe_path)
-                winreg.SetValueEx(key, "Path", 0, winreg.REG_SZ, str(Path(exe_path).parent))
+            apply_registry_writes(app_path_writes(registry.HKEY_CURRENT_USER))
             print(f"  [OK] Registered application in App Paths (user): {exe_name}")
             return True
         except Exception:
@@ -352,30 +794,23 @@ def register_in_applications(exe_path: str):
     Args:
         exe_path: Full path to the executable
     """
-    exe_path = os.path.abspath(exe_path)
-    exe_name = Path(exe_path).name
-    app_name = Path(exe_path).stem
+    exe_path = ntpath.abspath(exe_path)
+    exe_name = PureWindowsPath(exe_path).name
+    app_name = PureWindowsPath(exe_path).stem
     
     try:
+        hkcr = registry.HKEY_CLASSES_ROOT
         app_key_path = f"Applications\\{exe_name}"
-        
-        # Create main application key
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, app_key_path, 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "FriendlyAppName", 0, winreg.REG_SZ, app_name)
-        
-        # Create shell\open\command
-        command = f'"{exe_path}" "%1"'
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, f"{app_key_path}\\shell\\open\\command", 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "", 0, winreg.REG_SZ, command)
-        
-        # Create DefaultIcon
-        icon_path = f'"{exe_path}",0'
-        with winreg.CreateKeyEx(winreg.HKEY_CLASSES_ROOT, f"{app_key_path}\\DefaultIcon", 0,
-                                winreg.KEY_WRITE) as key:
-            winreg.SetValueEx(key, "", 0, winreg.REG_SZ, icon_path)
-        
+        apply_registry_writes([
+            # Main application key
+            RegistryWrite(hkcr, app_key_path, "FriendlyAppName", registry.REG_SZ, app_name),
+            # shell\open\command
+            RegistryWrite(hkcr, f"{app_key_path}\\shell\\open\\command", "", registry.REG_SZ,
+                          f'"{exe_path}" "%1"'),
+            # DefaultIcon
+            RegistryWrite(hkcr, f"{app_key_path}\\DefaultIcon", "", registry.REG_SZ,
+                          f'"{exe_path}",0'),
+        ])
         print(f"  [OK] Registered in Applications: {exe_name}")
         return True
         
@@ -387,6 +822,37 @@ def register_in_applications(exe_path: str):
         return False
 
 
+def register_supported_types(exe_path: str, extensions: list[str]):
+    """
+    List all extensions under HKCR\\Applications\\<exe>\\SupportedTypes in one batch.
+    
+    SupportedTypes is what makes the app show up in "Open with" for an
+    extension; every value is written through a single open key handle.
+    
+    Args:
+        exe_path: Full path to the executable
+        extensions: File extensions (with leading dot)
+    """
+    exe_name = PureWindowsPath(ntpath.abspath(exe_path)).name
+    types_path = f"Applications\\{exe_name}\\SupportedTypes"
+    supported_types = list(dict.fromkeys(extensions))
+    
+    try:
+        apply_registry_writes([
+            RegistryWrite(registry.HKEY_CLASSES_ROOT, types_path, ext, registry.REG_SZ, "")
+            for ext in supported_types
+        ])
+        print(f"  [OK] Registered {len(supported_types)} supported types for: {exe_name}")
+        return True
+        
+    except PermissionError:
+        print(f"  [WARN] Could not register supported types (needs admin)")
+        return False
+    except Exception as e:
+        print(f"  [WARN] Failed to register supported types: {e}")
+        return False
+
+
 def notify_shell_change():
     """Notify Windows Shell that file associations have changed."""
     try:
@@ -398,64 +864,1816 @@ def notify_shell_change():
         print(f"\n[WARN] Could not notify shell: {e}")
 
 
-def parse_config_file(config_path: str) -> tuple[str, list[str]]:
+def get_state_dir() -> Path:
     """
-    Parse the configuration file.
+    Directory for caches and journals that persist between runs.
+    
+    %LOCALAPPDATA%\\AlchemysAppDefaulter on Windows, otherwise
+    $XDG_CACHE_HOME/alchemys_app_defaulter (default ~/.cache).
+    """
+    local_app_data = os.environ.get("LOCALAPPDATA")
+    if local_app_data:
+        return Path(local_app_data) / "AlchemysAppDefaulter"
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "alchemys_app_defaulter"
+
+
+def _write_json_atomic(path: Path, data):
+    """Write JSON to a temporary file and move it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class ConfigParseResult:
+    """Normalized contents of a configuration file."""
+    exe_path: Optional[str] = None
+    extensions: list[str] = field(default_factory=list)
+    # (line number, extension, line number of first occurrence)
+    duplicates: list[tuple[int, str, int]] = field(default_factory=list)
+    # (line number, line text, reason)
+    malformed: list[tuple[int, str, str]] = field(default_factory=list)
+    # (line number, group name) for `@name` lines, see expand_config_groups()
+    groups: list[tuple[int, str]] = field(default_factory=list)
+
+
+_INVALID_EXTENSION_CHARS = frozenset('\\/:*?"<>|')
+
+
+def _extension_problem(ext: str) -> Optional[str]:
+    """Return why a normalized extension is invalid, or None if it is fine."""
+    if ext == '.':
+        return "empty extension"
+    if ext.startswith('..'):
+        return "more than one leading dot"
+    if any(c.isspace() for c in ext):
+        return "contains whitespace"
+    if any(c in _INVALID_EXTENSION_CHARS for c in ext):
+        return "contains a character not allowed in file names"
+    return None
+
+
+def parse_config_lines(lines) -> ConfigParseResult:
+    """
+    Parse configuration lines one at a time.
+    
+    Extensions are normalized (leading dot, lower case) and de-duplicated
+    in insertion order. Duplicate and malformed lines are skipped and
+    reported with their line numbers. Lines starting with '@' name an
+    extension group; they are collected, not expanded.
+    
+    Args:
+        lines: Iterable of lines (e.g. an open file)
+        
+    Returns:
+        ConfigParseResult
+    """
+    result = ConfigParseResult()
+    first_seen = {}
+    groups_seen = {}
+    
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        
+        # Skip empty lines and comments
+        if not line or line.startswith('#'):
+            continue
+        
+        if result.exe_path is None:
+            result.exe_path = line
+            continue
+        
+        if line.startswith('@'):
+            name = line[1:].strip().lower()
+            if not GROUP_NAME.match(name):
+                result.malformed.append((line_no, line, "invalid group name"))
+            elif name in groups_seen:
+                result.duplicates.append((line_no, '@' + name, groups_seen[name]))
+            else:
+                groups_seen[name] = line_no
+                result.groups.append((line_no, name))
+            continue
+        
+        # Normalize extension to have leading dot
+        ext = line if line.startswith('.') else '.' + line
+        ext = ext.lower()
+        
+        problem = _extension_problem(ext)
+        if problem:
+            result.malformed.append((line_no, line, problem))
+        elif ext in first_seen:
+            result.duplicates.append((line_no, ext, first_seen[ext]))
+        else:
+            first_seen[ext] = line_no
+            result.extensions.append(ext)
+    
+    return result
+
+
+CONFIG_CACHE_VERSION = 2
+
+
+def _config_cache_path() -> Path:
+    return get_state_dir() / "config_cache.json"
+
+
+def _load_config_cache() -> dict:
+    try:
+        with open(_config_cache_path(), 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("version") == CONFIG_CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": CONFIG_CACHE_VERSION, "entries": {}}
+
+
+def _result_from_cache(data: dict) -> ConfigParseResult:
+    return ConfigParseResult(
+        exe_path=data["exe_path"],
+        extensions=data["extensions"],
+        duplicates=[tuple(d) for d in data["duplicates"]],
+        malformed=[tuple(m) for m in data["malformed"]],
+        groups=[tuple(g) for g in data["groups"]],
+    )
+
+
+def load_config(config_path: str, use_cache: bool = True) -> ConfigParseResult:
+    """
+    Parse a configuration file, reusing the cached result when it is unchanged.
+    
+    The cache is keyed on the absolute path; an entry is reused without
+    reading the file if its mtime and size match, or after reading it if
+    only the mtime changed but the content hash matches.
     
     Args:
         config_path: Path to the configuration file
+        use_cache: Read and update the on-disk parse cache
         
     Returns:
-        Tuple of (exe_path, list_of_extensions)
+        ConfigParseResult
     """
     config_path = Path(config_path)
     
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     
-    with open(config_path, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f.readlines()]
+    if not use_cache:
+        with open(config_path, 'r', encoding='utf-8-sig') as f:
+            return parse_config_lines(f)
     
-    # Filter out empty lines and comments
-    lines = [line for line in lines if line and not line.startswith('#')]
+    stat = config_path.stat()
+    key = str(config_path.resolve())
+    cache = _load_config_cache()
+    entry = cache["entries"].get(key)
     
-    if len(lines) < 2:
-        raise ValueError("Config file must contain at least an executable path and one extension")
+    if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+        return _result_from_cache(entry["result"])
     
-    exe_path = lines[0]
-    extensions = []
+    with open(config_path, 'rb') as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
     
-    for ext in lines[1:]:
-        # Normalize extension to have leading dot
-        if not ext.startswith('.'):
-            ext = '.' + ext
-        extensions.append(ext.lower())
+    if entry and entry["sha256"] == content_hash:
+        result = _result_from_cache(entry["result"])
+    else:
+        with open(config_path, 'r', encoding='utf-8-sig') as f:
+            result = parse_config_lines(f)
     
-    return exe_path, extensions
+    cache["entries"][key] = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": content_hash,
+        "result": asdict(result),
+    }
+    try:
+        _write_json_atomic(_config_cache_path(), cache)
+    except OSError:
+        # Caching is an optimization only
+        pass
+    return result
+
+
+def parse_config_file(config_path: str, use_cache: bool = True) -> tuple[str, list[str]]:
+    """
+    Parse the configuration file.
+    
+    Args:
+        config_path: Path to the configuration file
+        use_cache: Reuse/update the on-disk parse cache (see load_config())
+        
+    Returns:
+        Tuple of (exe_path, list_of_extensions)
+    """
+    result = load_config(config_path, use_cache)
+    
+    if not result.extensions:
+        raise ValueError("Config file must contain at least an executable path and one extension")
+    
+    return result.exe_path, result.extensions
+
+
+def generate_progid(exe_path: str, extension: str) -> str:
+    """
+    Generate a ProgID for an extension based on the application.
+    
+    Args:
+        exe_path: Path to the executable
+        extension: File extension (with dot)
+        
+    Returns:
+        A ProgID string like 'NotepadPlusPlus.txt'
+    """
+    app_name = PureWindowsPath(exe_path).stem
+    # Remove dot and create ProgID
+    ext_clean = extension.lstrip('.')
+    # Sanitize app name (remove spaces and special chars, keep alphanumeric)
+    app_name_clean = ''.join(c for c in app_name if c.isalnum())
+    return f"{app_name_clean}.{ext_clean}"
+
+
+@dataclass
+class AppConfig:
+    """A parsed configuration file: one application and its extensions."""
+    config_path: str
+    exe_path: str
+    extensions: list[str]
+    duplicates: list[tuple[int, str, int]] = field(default_factory=list)
+    malformed: list[tuple[int, str, str]] = field(default_factory=list)
+    groups: list[tuple[int, str]] = field(default_factory=list)
+    # (extension, reason) listed explicitly but protected, and left out
+    # (see expand_config_groups())
+    protected: list[tuple[str, str]] = field(default_factory=list)
+    # (extension, reason) of `@group` members left out as protected
+    protected_members: list[tuple[str, str]] = field(default_factory=list)
+    
+    @property
+    def app_name(self) -> str:
+        return PureWindowsPath(self.exe_path).stem
+    
+    @property
+    def exe_name(self) -> str:
+        return PureWindowsPath(self.exe_path).name
+
+
+def expand_config_paths(paths: list[str]) -> list[str]:
+    """
+    Expand directories into the .apps files they contain.
+    
+    Args:
+        paths: Config files and/or directories, in priority order
+        
+    Returns:
+        Config file paths; files found in a directory are sorted by name
+    """
+    expanded = []
+    for path in paths:
+        if Path(path).is_dir():
+            found = sorted(str(p) for p in Path(path).glob("*.apps") if p.is_file())
+            if not found:
+                raise FileNotFoundError(f"No .apps files found in directory: {path}")
+            expanded.extend(found)
+        else:
+            expanded.append(path)
+    # The same file given twice (e.g. explicitly and via its directory) counts once
+    return list(dict.fromkeys(expanded))
+
+
+def load_app_config(config_path: str, use_cache: bool = True) -> AppConfig:
+    """Parse a configuration file into an AppConfig."""
+    result = load_config(config_path, use_cache)
+    if not result.extensions and not result.groups:
+        raise ValueError(f"{config_path}: Config file must contain at least an "
+                         f"executable path and one extension")
+    return AppConfig(config_path=config_path, exe_path=result.exe_path,
+                     extensions=list(result.extensions), duplicates=result.duplicates,
+                     malformed=list(result.malformed), groups=result.groups)
+
+
+def expand_config_groups(configs: list[AppConfig], catalog, allow_protected: bool = False):
+    """
+    Expand `@group` lines and drop protected extensions, in place.
+    
+    Group members are appended after the explicitly listed extensions
+    (extensions already listed are not repeated), without the protected
+    ones (config.protected_members). Protected extensions listed explicitly
+    are dropped too, unless allow_protected is set; they are recorded in
+    config.protected so the caller can say so. Unknown groups are reported
+    in config.malformed.
+    
+    Args:
+        configs: Parsed AppConfigs
+        catalog: An open extension_catalog.ExtensionCatalog
+        allow_protected: Keep protected extensions that are listed explicitly
+        
+    Raises:
+        ValueError: If a config is left without any extension
+    """
+    protected = catalog.protected()
+    for config in configs:
+        explicit = set(config.extensions)
+        if allow_protected:
+            config.protected = []
+        else:
+            config.protected = [(ext, protected[ext]) for ext in config.extensions
+                                if ext in protected]
+        extensions = dict.fromkeys(ext for ext in config.extensions
+                                   if allow_protected or ext not in protected)
+        left_out = {}
+        for line_no, name in config.groups:
+            members = catalog.group(name)
+            if members is None:
+                config.malformed.append((line_no, '@' + name, "unknown extension group"))
+                continue
+            for ext in members:
+                if ext in explicit:
+                    continue
+                if ext in protected:
+                    left_out[ext] = protected[ext]
+                else:
+                    extensions[ext] = None
+        config.extensions = list(extensions)
+        config.protected_members = list(left_out.items())
+        if not config.extensions:
+            raise ValueError(f"{config.config_path}: No extensions left to associate "
+                             f"(after expanding groups and removing protected extensions)")
+
+
+def print_protected(config: AppConfig, indent: str = ""):
+    """Print the protected extensions expand_config_groups() left out of a config."""
+    for ext, reason in config.protected:
+        print(f"{indent}[SKIPPED] {ext}: protected ({reason}); "
+              f"pass --allow-protected to associate it anyway")
+    if config.protected_members:
+        skipped = ', '.join(f"{ext} ({reason})" for ext, reason in config.protected_members)
+        print(f"{indent}[INFO] Left {len(config.protected_members)} protected extension(s) "
+              f"out of groups: {skipped}")
+
+
+def order_by_priority(configs: list[AppConfig], priority: list[str]) -> list[AppConfig]:
+    """
+    Reorder configs so the ones named in `priority` come first, in that order.
+    
+    Names match a config file's stem (e.g. 'sublimetext') or its app name
+    (e.g. 'sublime_text'), case-insensitively. Unnamed configs keep their
+    relative order after the named ones.
+    """
+    rank = {name.strip().lower(): i for i, name in enumerate(priority) if name.strip()}
+    
+    def config_rank(indexed):
+        index, config = indexed
+        names = (Path(config.config_path).stem.lower(), config.app_name.lower())
+        return min((rank[n] for n in names if n in rank), default=len(rank)), index
+    
+    return [config for _, config in sorted(enumerate(configs), key=config_rank)]
+
+
+def assign_extension_owners(configs: list[AppConfig]) -> dict:
+    """
+    Decide which config may become the default handler for each extension.
+    
+    The first config (in priority order) that lists an extension owns it;
+    every other config listing it is only added to "Open with".
+    
+    Returns:
+        Dict of extension -> owning AppConfig
+    """
+    owners = {}
+    for config in configs:
+        for ext in config.extensions:
+            owners.setdefault(ext, config)
+    return owners
+
+
+ACTION_SET_DEFAULT = "set_default"
+ACTION_OPEN_WITH = "open_with"
+
+
+def plan_action(info: AssociationInfo, owns_extension: bool, force: bool) -> str:
+    """
+    Decide what to do for one extension of one application.
+    
+    Returns:
+        ACTION_SET_DEFAULT or ACTION_OPEN_WITH
+    """
+    if not owns_extension:
+        return ACTION_OPEN_WITH
+    if info.has_default and not force:
+        return ACTION_OPEN_WITH
+    return ACTION_SET_DEFAULT
+
+
+def describe_existing(info: AssociationInfo) -> str:
+    """Short name of the current default handler, for display."""
+    if info.executable:
+        return PureWindowsPath(info.executable).stem
+    return info.progid or "Unknown"
+
+
+def apply_extension(config, ext: str, info: AssociationInfo, action: str, owner,
+                    file_exts=None, verbose: bool = False) -> str:
+    """
+    Create the ProgID for one extension of one application and apply the
+    planned action, printing the per-extension lines.
+    
+    Args:
+        config: AppConfig being applied
+        ext: File extension (with leading dot)
+        info: Existing association of the extension
+        action: ACTION_SET_DEFAULT or ACTION_OPEN_WITH (see plan_action())
+        owner: AppConfig that may claim the extension's default
+        file_exts: Optional open FileExts key (see open_file_exts_root())
+        verbose: Print the ProgID that was created
+        
+    Returns:
+        "ok", "partial" (ProgID created, "Open with" failed) or "failed"
+    """
+    exe_path = config.exe_path
+    app_name = config.app_name
+    progid = generate_progid(exe_path, ext)
+    description = f"{app_name} {ext.upper()} File"
+    
+    print(f"\n{ext}:")
+    
+    # Always create our ProgID first
+    if not create_progid(exe_path, progid, description):
+        print(f"    [FAILED] Could not create ProgID")
+        return "failed"
+    if verbose:
+        print(f"    [OK] Created ProgID: {progid}")
+    
+    if action == ACTION_OPEN_WITH:
+        # Extension already has a default (or belongs to a higher-priority
+        # config) - add to "Open with" only
+        if owner is not config:
+            print(f"    [INFO] Default claimed by higher-priority config: {owner.app_name}")
+        else:
+            print(f"    [INFO] Keeping existing default: {describe_existing(info)}")
+        
+        if add_to_open_with_list(ext, progid, exe_path, file_exts):
+            print(f"    [OK] Added '{app_name}' to 'Open with' list")
+            return "ok"
+        print(f"    [WARN] Could not add to 'Open with' list (partial success)")
+        return "partial"
+    
+    # No default exists (or --force) - set as default
+    if info.has_default:
+        print(f"    [INFO] Overriding existing default: {describe_existing(info)}")
+    
+    if set_extension_association(ext, progid):
+        print(f"    [OK] Set '{app_name}' as DEFAULT for {ext}")
+        # Also add to Open with for good measure
+        add_to_open_with_list(ext, progid, exe_path, file_exts)
+        return "ok"
+    print(f"    [FAILED] Could not set as default")
+    return "failed"
+
+
+def _key_last_write(root, path: str) -> Optional[int]:
+    """Last-write timestamp of a key (QueryInfoKey), or None if it does not exist."""
+    try:
+        with registry.OpenKey(root, path) as key:
+            return registry.QueryInfoKey(key)[2]
+    except OSError:
+        return None
+
+
+def extension_stamps(extension: str, file_exts=None) -> list:
+    """
+    Last-write times of the per-extension keys of association_fingerprint().
+    
+    These are HKCR\\<ext> and FileExts\\<ext> (the keys we write, whose
+    last-write time also moves when a subkey such as OpenWithProgids or
+    OpenWithList is created or deleted) and the UserChoice below FileExts
+    (read relative to the open FileExts\\<ext> handle, and only if that
+    exists). They are the same for every application listing the
+    extension, so callers fingerprinting several ProgIDs read them once.
+    
+    Args:
+        extension: File extension (with leading dot)
+        file_exts: Optional open FileExts key (see open_file_exts_root())
+        
+    Returns:
+        List of timestamps (None for keys that do not exist)
+    """
+    if file_exts is None:
+        user_root, user_path = registry.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\{extension}"
+    else:
+        user_root, user_path = file_exts, extension
+    stamps = [_key_last_write(registry.HKEY_CLASSES_ROOT, extension), None, None]
+    try:
+        with registry.OpenKey(user_root, user_path) as key:
+            stamps[1] = registry.QueryInfoKey(key)[2]
+            stamps[2] = _key_last_write(key, "UserChoice")
+    except OSError:
+        pass
+    return stamps
+
+
+def association_fingerprint(extension: str, progid: str, file_exts=None,
+                            stamps: Optional[list] = None) -> list:
+    """
+    Last-write times of the keys that decide or hold an extension's association.
+    
+    These are the extension_stamps() and our ProgID's command.
+    
+    Args:
+        extension: File extension (with leading dot)
+        progid: Our ProgID for the extension
+        file_exts: Optional open FileExts key (see open_file_exts_root())
+        stamps: extension_stamps() already read for the extension
+        
+    Returns:
+        List of timestamps (None for keys that do not exist)
+    """
+    if stamps is None:
+        stamps = extension_stamps(extension, file_exts)
+    return [*stamps, _key_last_write(registry.HKEY_CLASSES_ROOT,
+                                     f"{progid}\\shell\\open\\command")]
+
+
+RUN_JOURNAL_VERSION = 2
+
+
+class RunJournal:
+    """
+    Per-extension record of what the last run applied.
+    
+    Each entry stores the ProgID and decision inputs for one application and
+    extension, plus the association_fingerprint() left behind after the
+    writes. If the fingerprint still matches on the next run, nothing has
+    touched the extension since and it can be skipped.
+    
+    Args:
+        path: JSON file the journal is loaded from and saved to
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == RUN_JOURNAL_VERSION:
+                self.entries = data["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    @staticmethod
+    def _key(exe_path: str, extension: str) -> str:
+        return f"{exe_path.lower()}|{extension}"
+    
+    def is_current(self, exe_path: str, extension: str, progid: str, owner: bool,
+                   force: bool, file_exts=None) -> bool:
+        """
+        True if the journal entry matches the current decision inputs and key state.
+        
+        The registry is only read (association_fingerprint()) for extensions
+        that have an entry with matching inputs.
+        """
+        entry = self.entries.get(self._key(exe_path, extension))
+        return (entry is not None
+                and entry["progid"] == progid
+                and entry["owner"] == owner
+                and entry["force"] == force
+                and entry["fingerprint"] == association_fingerprint(extension, progid, file_exts))
+    
+    def record(self, exe_path: str, extension: str, progid: str, owner: bool,
+               force: bool, fingerprint: list):
+        self.entries[self._key(exe_path, extension)] = {
+            "progid": progid,
+            "owner": owner,
+            "force": force,
+            "fingerprint": fingerprint,
+        }
+    
+    def forget(self, exe_path: str, extension: str):
+        """Drop an entry, so the next run processes the extension again."""
+        self.entries.pop(self._key(exe_path, extension), None)
+    
+    def save(self):
+        _write_json_atomic(self.path, {"version": RUN_JOURNAL_VERSION, "entries": self.entries})
+
+
+def association_index_path() -> Path:
+    """Location of the persistent association index (see refresh_association_index())."""
+    return get_state_dir() / "association_index.sqlite3"
+
+
+def _enum_all_subkeys(key) -> list[str]:
+    names = []
+    try:
+        count = registry.QueryInfoKey(key)[0]
+    except OSError:
+        return names
+    for i in range(count):
+        try:
+            names.append(registry.EnumKey(key, i))
+        except OSError:
+            break
+    return names
+
+
+def _subkey_stamp(key) -> str:
+    """Subkey count and last-write time of a key, to tell if its children changed."""
+    try:
+        subkeys, _, last_write = registry.QueryInfoKey(key)
+        return f"{subkeys}:{last_write}"
+    except OSError:
+        return ""
+
+
+def refresh_association_index(index, file_exts=None, jobs: int = 1) -> dict:
+    """
+    Bring an AssociationIndex up to date with HKCR and HKCU FileExts.
+    
+    Every indexed key stores its last-write time (QueryInfoKey); a key is
+    only re-read when that time changed. HKCR and FileExts themselves are
+    only re-enumerated when their subkey count or last-write time changed.
+    Each FileExts\\<ext> key's own time is kept too, since creating or
+    deleting its UserChoice only touches that key, not FileExts.
+    Handler executables are re-checked on every refresh (files can vanish
+    without a registry change), each distinct path once.
+    
+    Args:
+        index: The AssociationIndex to update
+        file_exts: Optional open FileExts key (see open_file_exts_root())
+        jobs: Maximum number of concurrent executable existence checks
+        
+    Returns:
+        Dict of counts: extensions, extensions_read, progids, progids_read
+    """
+    hkcr = registry.HKEY_CLASSES_ROOT
+    rows = index.extension_rows()
+    changed = {}
+    
+    # HKCR\.ext defaults
+    hkcr_stamp = _subkey_stamp(hkcr)
+    if hkcr_stamp and hkcr_stamp == index.get_meta("hkcr_stamp"):
+        class_exts = [ext for ext, row in rows.items() if row[1] is not None]
+    else:
+        class_exts = [name.lower() for name in _enum_all_subkeys(hkcr) if name.startswith(".")]
+    seen = set(class_exts)
+    for ext in class_exts:
+        row = rows.setdefault(ext, [None, None, None, None, None])
+        stamp = _key_last_write(hkcr, ext)
+        if stamp != row[1]:
+            row[0] = (_read_default(hkcr, ext) or None) if stamp is not None else None
+            row[1] = stamp
+            changed[ext] = row
+    
+    # FileExts\.ext\UserChoice
+    owns_handle = file_exts is None
+    if owns_handle:
+        try:
+            file_exts = registry.OpenKey(registry.HKEY_CURRENT_USER, FILE_EXTS_PATH)
+        except OSError:
+            file_exts = None
+    file_exts_stamp = ""
+    user_exts = []
+    if file_exts is not None:
+        try:
+            file_exts_stamp = _subkey_stamp(file_exts)
+            if file_exts_stamp and file_exts_stamp == index.get_meta("file_exts_stamp"):
+                user_exts = [ext for ext, row in rows.items() if row[4] is not None]
+            else:
+                user_exts = [name.lower() for name in _enum_all_subkeys(file_exts)
+                             if name.startswith(".")]
+            for ext in user_exts:
+                row = rows.setdefault(ext, [None, None, None, None, None])
+                key_stamp = _key_last_write(file_exts, ext)
+                # An existing UserChoice can change without touching its parent
+                if key_stamp == row[4] and row[3] is None:
+                    continue
+                if key_stamp != row[4]:
+                    row[4] = key_stamp
+                    changed[ext] = row
+                root, path = _file_exts_key(file_exts, ext, "UserChoice")
+                stamp = _key_last_write(root, path) if key_stamp is not None else None
+                if stamp != row[3]:
+                    row[2] = (_read_default(root, path, "ProgId") or None) if stamp is not None else None
+                    row[3] = stamp
+                    changed[ext] = row
+        finally:
+            if owns_handle:
+                file_exts.Close()
+    seen.update(user_exts)
+    
+    # Drop extensions that disappeared from both places
+    removed = [ext for ext, row in rows.items()
+               if ext not in seen or (row[1] is None and row[4] is None)]
+    for ext in removed:
+        rows.pop(ext)
+        changed.pop(ext, None)
+    index.replace_extensions(changed, removed)
+    
+    # ProgIDs referenced by any extension
+    progids = {}
+    for class_progid, _, user_progid, *_ in rows.values():
+        for progid in (class_progid, user_progid):
+            if progid:
+                progids.setdefault(progid.lower(), progid)
+    stamps = index.progid_stamps()
+    progid_rows = []
+    for key, progid in progids.items():
+        key_stamp = _key_last_write(hkcr, progid)
+        command_stamp = _key_last_write(hkcr, f"{progid}\\shell\\open\\command")
+        if stamps.get(key) != (key_stamp, command_stamp):
+            progid_rows.append((progid, key_stamp, command_stamp, *_read_progid(progid)))
+    index.replace_progids(progid_rows, [key for key in stamps if key not in progids])
+    
+    # Handler existence, each distinct executable once
+    executables = index.executables()
+    executable_cache.prefetch(executables, jobs)
+    index.set_executable_status({exe: executable_cache.exists(exe) for exe in executables})
+    
+    index.set_meta("hkcr_stamp", hkcr_stamp)
+    index.set_meta("file_exts_stamp", file_exts_stamp)
+    index.commit()
+    return {"extensions": sum(row[1] is not None or row[3] is not None for row in rows.values()),
+            "extensions_read": len(changed),
+            "progids": len(progids), "progids_read": len(progid_rows)}
+
+
+def audit_main(argv: list[str]):
+    """Entry point for `AppDefaulter.py audit ...`: query the association index."""
+    parser = argparse.ArgumentParser(
+        prog="AppDefaulter.py audit",
+        description="Query the persistent association index (refreshed incrementally first).")
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument('--exe', metavar='NAME_OR_PATH',
+                       help='Extensions whose handler is this executable (file name or full path)')
+    query.add_argument('--progid', metavar='PROGID',
+                       help='Extensions that use this ProgID')
+    query.add_argument('--ext', metavar='EXT',
+                       help='Show the ProgID and handler of one extension')
+    query.add_argument('--dead', action='store_true',
+                       help='ProgIDs whose handler executable no longer exists')
+    parser.add_argument('--no-refresh', action='store_true',
+                        help='Answer from the index as it is, without reading the registry')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='Check handler executables on up to N threads (default: 1)')
+    parser.add_argument('--json', action='store_true',
+                        help='Print one JSON Lines record per result')
+    args = parser.parse_args(argv)
+    
+    if registry is None and not args.no_refresh:
+        print("Error: This script only works on Windows (use --no-refresh to query")
+        print("       an existing index).")
+        sys.exit(1)
+    
+    from association_index import AssociationIndex
+    path = association_index_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with AssociationIndex(path) as index:
+        if not args.no_refresh:
+            stats = refresh_association_index(index, jobs=args.jobs)
+            if not args.json:
+                print(f"Index refreshed: {stats['extensions_read']} of {stats['extensions']} "
+                      f"extension(s) and {stats['progids_read']} of {stats['progids']} "
+                      f"ProgID(s) re-read")
+                print()
+        
+        if args.dead:
+            rows = index.dead_handlers()
+            columns = ("progid", "executable", "extensions")
+        elif args.exe or args.progid or args.ext:
+            if args.exe:
+                rows = index.extensions_for_executable(args.exe)
+            elif args.progid:
+                rows = index.extensions_for_progid(args.progid)
+            else:
+                ext = args.ext if args.ext.startswith('.') else '.' + args.ext
+                row = index.lookup(ext)
+                rows = [row] if row is not None else []
+            columns = ("extension", "progid", "source", "executable")
+        else:
+            counts = index.counts()
+            if args.json:
+                print(json.dumps({"type": "counts", **counts}))
+            else:
+                print(f"Extensions:        {counts['extensions']} "
+                      f"({counts['user_choices']} with a UserChoice)")
+                print(f"ProgIDs:           {counts['progids']}")
+                print(f"Missing handlers:  {counts['missing_handlers']}")
+            return
+        
+        for row in rows:
+            if args.json:
+                print(json.dumps({column: row[column] for column in columns}))
+            else:
+                print("  ".join(f"{row[column] or '-'}" for column in columns))
+        if not args.json:
+            print()
+            print(f"{len(rows)} result(s)")
+
+
+def extension_catalog_path() -> Path:
+    """Location of the extension catalog (see build_extension_catalog())."""
+    return get_state_dir() / "extension_catalog.sqlite3"
+
+
+def _has_value(key, sub_key: str, value_name: str) -> bool:
+    try:
+        with registry.OpenKey(key, sub_key) as subkey:
+            registry.QueryValueEx(subkey, value_name)
+            return True
+    except OSError:
+        return False
+
+
+def build_extension_catalog(catalog) -> int:
+    """
+    Rebuild an ExtensionCatalog from every HKCR\\.ext key.
+    
+    Reads each extension's ProgID, PerceivedType and Content Type, and
+    whether the extension or its ProgID is marked NoOpenWith.
+    
+    Args:
+        catalog: The extension_catalog.ExtensionCatalog to fill
+        
+    Returns:
+        Number of extensions cataloged
+    """
+    hkcr = registry.HKEY_CLASSES_ROOT
+    rows = {}
+    for name in _enum_all_subkeys(hkcr):
+        ext = name.lower()
+        if not name.startswith(".") or ext in rows:
+            continue
+        progid = _read_default(hkcr, name) or None
+        no_open_with = (_has_value(hkcr, name, "NoOpenWith")
+                        or bool(progid and _has_value(hkcr, progid, "NoOpenWith")))
+        rows[ext] = (ext, _read_default(hkcr, name, "PerceivedType") or None,
+                     _read_default(hkcr, name, "Content Type") or None, progid, no_open_with)
+    catalog.replace(list(rows.values()), time.strftime("%Y-%m-%d %H:%M:%S"))
+    return len(rows)
+
+
+def open_extension_catalog(build: bool = True, rebuild: bool = False):
+    """
+    Open the extension catalog, building it from the registry the first time.
+    
+    Args:
+        build: Build the catalog if it has never been built (otherwise an
+               empty catalog only knows the built-in protected extensions)
+        rebuild: Rebuild it even if it exists
+        
+    Returns:
+        An open ExtensionCatalog (close it when done)
+    """
+    from extension_catalog import ExtensionCatalog
+    path = extension_catalog_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    catalog = ExtensionCatalog(path)
+    if rebuild or (build and catalog.built_at is None):
+        count = build_extension_catalog(catalog)
+        print(f"[INFO] Built extension catalog: {count} extension(s), "
+              f"{len(catalog.group_names())} group(s)")
+    return catalog
+
+
+def catalog_main(argv: list[str]):
+    """Entry point for `AppDefaulter.py catalog ...`: show or rebuild the extension catalog."""
+    parser = argparse.ArgumentParser(
+        prog="AppDefaulter.py catalog",
+        description="Show the extension groups configs can name with `@group`, and the "
+                    "protected extensions that are never associated.")
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Rebuild the catalog from HKEY_CLASSES_ROOT (e.g. after '
+                             'installing applications)')
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument('--group', metavar='NAME',
+                       help='List the extensions of one group')
+    query.add_argument('--protected', action='store_true',
+                       help='List the protected extensions and why')
+    args = parser.parse_args(argv)
+    
+    if registry is None:
+        print("Error: This script only works on Windows.")
+        sys.exit(1)
+    
+    with open_extension_catalog(rebuild=args.rebuild) as catalog:
+        if args.group:
+            members = catalog.group(args.group)
+            if members is None:
+                print(f"Error: Unknown group: @{args.group.lstrip('@')}")
+                sys.exit(1)
+            for ext in members:
+                row = catalog.lookup(ext)
+                print(f"  {ext:12} {(row['content_type'] if row else None) or '-'}")
+            print()
+            print(f"{len(members)} extension(s)")
+        elif args.protected:
+            protected = catalog.protected()
+            for ext, reason in sorted(protected.items()):
+                print(f"  {ext:12} {reason}")
+            print()
+            print(f"{len(protected)} protected extension(s)")
+        else:
+            print(f"Extension catalog: {catalog.path} (built {catalog.built_at})")
+            for name, count in sorted(catalog.group_names().items()):
+                print(f"  @{name:20} {count} extension(s)")
+            print()
+            print(f"Protected extensions: {len(catalog.protected())} (list with --protected)")
+
+
+PLAN_VERSION = 2
+
+
+def build_plan(configs: list[AppConfig], owners: dict, force: bool, file_exts=None,
+               jobs: int = 1) -> dict:
+    """
+    Scan the existing associations once and serialize the decisions.
+    
+    Each entry stores the action and target ProgID for one application and
+    extension, the association it expects to replace and the
+    association_fingerprint() of the keys that decided it. apply_plan()
+    compares the fingerprints instead of scanning again. The per-extension
+    keys are read once for all applications listing the extension.
+    
+    Args:
+        configs: Parsed AppConfigs, in priority order
+        owners: Result of assign_extension_owners()
+        force: Override existing defaults
+        file_exts: Optional open FileExts key (see open_file_exts_root())
+        jobs: Maximum number of concurrent lookups
+        
+    Returns:
+        JSON-serializable plan
+    """
+    associations = scan_associations(list(owners),
+                                     lambda ext: get_existing_association(ext, file_exts), jobs)
+    # Owners are AppConfigs; equal configs (e.g. the same file given twice)
+    # must still map to their own index
+    indices = {id(config): index for index, config in enumerate(configs)}
+    stamps = {}
+    entries = []
+    for index, config in enumerate(configs):
+        for ext in config.extensions:
+            info = associations[ext]
+            progid = generate_progid(config.exe_path, ext)
+            if ext not in stamps:
+                stamps[ext] = extension_stamps(ext, file_exts)
+            entries.append({
+                "app": index,
+                "extension": ext,
+                "action": plan_action(info, owners[ext] is config, force),
+                "progid": progid,
+                "owner": indices[id(owners[ext])],
+                "prior": asdict(info),
+                "fingerprint": association_fingerprint(ext, progid, stamps=stamps[ext]),
+            })
+    return {
+        "version": PLAN_VERSION,
+        "force": force,
+        "apps": [{"config_path": c.config_path, "exe_path": c.exe_path,
+                  "extensions": c.extensions} for c in configs],
+        "entries": entries,
+    }
+
+
+def apply_plan(plan: dict, file_exts=None, verbose: bool = False,
+               run_journal: Optional[RunJournal] = None) -> dict:
+    """
+    Execute a plan written by build_plan().
+    
+    Every entry's keys are checked against the recorded fingerprint before
+    anything is written; only the entries whose keys changed since the plan
+    are looked up and decided again.
+    
+    Args:
+        plan: Loaded plan
+        file_exts: Optional open FileExts key (see open_file_exts_root())
+        verbose: Print ProgID details
+        run_journal: Optional RunJournal to record the applied entries in
+        
+    Returns:
+        Dict of counts: set_default, open_with, failed, replanned
+    """
+    configs = [AppConfig(app["config_path"], app["exe_path"], app["extensions"])
+               for app in plan["apps"]]
+    force = plan["force"]
+    counts = {"set_default": 0, "open_with": 0, "failed": 0, "replanned": 0}
+    
+    # Check every entry first: the writes below move the fingerprints of
+    # extensions shared by several applications
+    stamps = {}
+    work = []
+    for entry in plan["entries"]:
+        config = configs[entry["app"]]
+        owner = configs[entry["owner"]]
+        ext = entry["extension"]
+        if ext not in stamps:
+            stamps[ext] = extension_stamps(ext, file_exts)
+        if association_fingerprint(ext, entry["progid"], stamps=stamps[ext]) == entry["fingerprint"]:
+            info = AssociationInfo(**entry["prior"])
+            action = entry["action"]
+        else:
+            info = get_existing_association(ext, file_exts)
+            action = plan_action(info, owner is config, force)
+            counts["replanned"] += 1
+            print(f"  [INFO] {ext} ({config.app_name}) changed since the plan; "
+                  f"re-planned: {action} (was {entry['action']})")
+        work.append((config, ext, info, action, owner))
+    if counts["replanned"]:
+        print()
+    
+    print(f"Registering application{'s' if len(configs) > 1 else ''}...")
+    for config in configs:
+        register_application(config.exe_path)
+        register_in_applications(config.exe_path)
+        register_supported_types(config.exe_path, config.extensions)
+    print()
+    
+    print("Processing file associations...")
+    print("=" * 70)
+    applied = []
+    for config, ext, info, action, owner in work:
+        status = apply_extension(config, ext, info, action, owner, file_exts, verbose)
+        if status == "failed":
+            counts["failed"] += 1
+            continue
+        counts["set_default" if action == ACTION_SET_DEFAULT else "open_with"] += 1
+        if status == "ok":
+            applied.append((config, ext, owner))
+            if write_journal is not None:
+                write_journal.mark_done(config.exe_path, ext)
+    
+    if run_journal is not None:
+        stamps.clear()
+        for config, ext, owner in applied:
+            progid = generate_progid(config.exe_path, ext)
+            if ext not in stamps:
+                stamps[ext] = extension_stamps(ext, file_exts)
+            run_journal.record(config.exe_path, ext, progid, owner is config, force,
+                               association_fingerprint(ext, progid, stamps=stamps[ext]))
+    return counts
+
+
+def plan_main(argv: list[str]):
+    """Entry point for `AppDefaulter.py plan ...`: scan once and write a plan file."""
+    parser = argparse.ArgumentParser(
+        prog="AppDefaulter.py plan",
+        description="Scan the existing associations and write the planned actions to a file "
+                    "for `AppDefaulter.py apply`.")
+    parser.add_argument('config_files', nargs='+', metavar='config_file',
+                        help='Path to a configuration file, or a directory of .apps files')
+    parser.add_argument('--out', '-o', required=True, metavar='PLAN_JSON',
+                        help='Plan file to write')
+    parser.add_argument('--force', '-f', action='store_true',
+                        help='Plan to override existing defaults')
+    parser.add_argument('--allow-protected', action='store_true',
+                        help='Associate protected extensions that are listed explicitly')
+    parser.add_argument('--priority', metavar='NAMES',
+                        help='Comma-separated config or app names that win when several '
+                             'configs list the same extension')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='Check existing associations with up to N concurrent lookups')
+    args = parser.parse_args(argv)
+    
+    if registry is None:
+        print("Error: This script only works on Windows.")
+        sys.exit(1)
+    
+    try:
+        configs = [load_app_config(path)
+                   for path in expand_config_paths(args.config_files)]
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    configs = order_by_priority(configs, (args.priority or "").split(","))
+    try:
+        with open_extension_catalog() as catalog:
+            expand_config_groups(configs, catalog, args.allow_protected)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    for config in configs:
+        if not os.path.isfile(config.exe_path):
+            print(f"Error: Executable not found: {config.exe_path}")
+            sys.exit(1)
+        config.exe_path = ntpath.abspath(config.exe_path)
+        for line_no, text, reason in config.malformed:
+            print(f"[WARN] {config.config_path}:{line_no}: skipped '{text}' ({reason})")
+        print_protected(config)
+    
+    file_exts = open_file_exts_root()
+    plan = build_plan(configs, assign_extension_owners(configs), args.force, file_exts, args.jobs)
+    if file_exts is not None:
+        file_exts.Close()
+    
+    for entry in plan["entries"]:
+        config = configs[entry["app"]]
+        prior = entry["prior"]
+        current = describe_existing(AssociationInfo(**prior)) if prior["has_default"] else "none"
+        print(f"  {entry['extension']:10} {config.app_name:20} {entry['action']:12} "
+              f"(current default: {current})")
+    try:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(plan, f, indent=1)
+    except OSError as e:
+        print(f"Error: Could not write {args.out}: {e}")
+        sys.exit(1)
+    print()
+    print(f"[OK] Wrote {len(plan['entries'])} planned action(s) to {args.out}")
+    print(f"Apply with: AppDefaulter.py apply \"{args.out}\"")
+
+
+def apply_main(argv: list[str], resume: bool = False):
+    """
+    Entry point for `AppDefaulter.py apply <plan>`: execute a plan file.
+    
+    With resume (from --resume), the interrupted apply's journal is
+    continued; the entries it already wrote no longer match their
+    fingerprints and are re-planned, which makes their writes no-ops.
+    """
+    parser = argparse.ArgumentParser(
+        prog="AppDefaulter.py apply",
+        description="Apply a plan written by `AppDefaulter.py plan`, re-planning only "
+                    "the extensions whose registry keys changed since.")
+    parser.add_argument('plan_file', help='Plan file written by `AppDefaulter.py plan`')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Show verbose output')
+    args = parser.parse_args(argv)
+    
+    if registry is None:
+        print("Error: This script only works on Windows.")
+        sys.exit(1)
+    try:
+        with open(args.plan_file, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not read plan {args.plan_file}: {e}")
+        sys.exit(1)
+    if plan.get("version") != PLAN_VERSION:
+        print(f"Error: {args.plan_file} is not a plan file of this version")
+        sys.exit(1)
+    for app in plan["apps"]:
+        if not os.path.isfile(app["exe_path"]):
+            print(f"Error: Executable not found: {app['exe_path']}")
+            sys.exit(1)
+    
+    global write_journal
+    journal_path = get_state_dir() / "write_journal.jsonl"
+    records = WriteAheadJournal(journal_path).read()
+    if records and records[-1]["op"] != "end" and not resume:
+        print("Error: The previous run was interrupted before it finished.")
+        print("       Use --resume to complete it or --rollback to undo it.")
+        sys.exit(1)
+    
+    print(f"Applying {len(plan['entries'])} planned action(s) from {args.plan_file}...")
+    print()
+    file_exts = open_file_exts_root()
+    write_journal = WriteAheadJournal(journal_path)
+    write_journal.alias(file_exts, registry.HKEY_CURRENT_USER, FILE_EXTS_PATH)
+    if resume:
+        write_journal.reopen()
+    else:
+        write_journal.start(["apply", *argv])
+    run_journal = RunJournal(get_state_dir() / "run_journal.json")
+    counts = apply_plan(plan, file_exts, args.verbose, run_journal)
+    write_journal.finish()
+    try:
+        run_journal.save()
+    except OSError as e:
+        print(f"\n[WARN] Could not save run journal: {e}")
+    if file_exts is not None:
+        file_exts.Close()
+    notify_shell_change()
+    
+    print()
+    print("=" * 70)
+    print("Summary:")
+    print(f"  Set as default:           {counts['set_default']}")
+    print(f"  Added to 'Open with':     {counts['open_with']}")
+    print(f"  Failed:                   {counts['failed']}")
+    print(f"  Re-planned (drifted):     {counts['replanned']}")
+    print(f"  Registry values written:  {write_stats.written}")
+    print(f"  Already up to date:       {write_stats.skipped}")
+    print("=" * 70)
+    if counts["failed"]:
+        sys.exit(1)
 
 
-def generate_progid(exe_path: str, extension: str) -> str:
+def _encode_reg_data(data):
+    return {"hex": data.hex()} if isinstance(data, bytes) else data
+
+
+def _decode_reg_data(data):
+    return bytes.fromhex(data["hex"]) if isinstance(data, dict) else data
+
+
+class WriteAheadJournal:
     """
-    Generate a ProgID for an extension based on the application.
+    Crash-safe log of the prior state of every registry value a run changes.
+    
+    Records are appended as JSON lines and fsync'ed before the write they
+    describe, so the journal always covers everything that reached the
+    registry. Extensions are marked done as they complete; an "end" record
+    marks a finished run. The file is only replaced once a run records its
+    first write, so a run that changes nothing leaves the journal of the
+    last run that did (and --rollback can still undo it).
+    
+    Record types:
+        begin   command line of the run (for --resume)
+        key     a key that did not exist before (topmost missing ancestor)
+        value   prior data/type of a value, or no prior value
+        done    an application/extension pair that was fully applied
+        end     the run completed
     
     Args:
-        exe_path: Path to the executable
-        extension: File extension (with dot)
+        path: Journal file (JSON lines)
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+        self._argv = None       # command line for the "begin" record
+        # True once this run has written the journal file
+        self.written = False
+        # (open handle, predefined root, path prefix) for handles used as a root
+        self._aliases = []
+        # Records may come from several threads (--all-users)
+        self._lock = threading.Lock()
+    
+    def alias(self, handle, root, prefix: str):
+        """Record writes under an open handle as root\\prefix\\... (e.g. FileExts)."""
+        if handle is not None:
+            with self._lock:
+                self._aliases = [*self._aliases, (handle, root, prefix)]
+    
+    def read(self) -> list[dict]:
+        """Return all records; a torn last line from a crash is ignored."""
+        records = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+        except FileNotFoundError:
+            pass
+        return records
+    
+    def start(self, argv: list[str]):
+        """
+        Begin a new journal for a run with the given command-line arguments.
+        
+        The previous journal is replaced when the first key or value is
+        recorded, not here.
+        """
+        self._argv = argv
+    
+    def reopen(self):
+        """Continue appending to an existing journal (--resume)."""
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self.written = True
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def _append(self, record: dict):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._file is None and self.written:
+                # More writes after finish() (--watch): extend this run's journal
+                self._file = open(self.path, 'a', encoding='utf-8')
+            elif self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'w', encoding='utf-8')
+                self._file.write(json.dumps({"op": "begin", "argv": self._argv}) + "\n")
+                self.written = True
+            self._file.write(line)
+    
+    def sync(self):
+        """Flush pending records to disk; call before the writes they describe."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+    
+    def _absolute(self, root, path: str) -> tuple:
+        for handle, alias_root, prefix in self._aliases:
+            if root is handle:
+                return alias_root, f"{prefix}\\{path}" if path else prefix
+        return root, path
+    
+    def record_key(self, root, path: str):
+        """Record the topmost missing ancestor of a key that is about to be created."""
+        missing = None
+        while path:
+            try:
+                registry.OpenKey(root, path, 0, registry.KEY_READ).Close()
+                break
+            except OSError:
+                missing = path
+                path = path.rpartition("\\")[0]
+        if missing is not None:
+            root, missing = self._absolute(root, missing)
+            self._append({"op": "key", "root": root, "path": missing})
+    
+    def record_value(self, root, path: str, name: str, prior: Optional[tuple]):
+        """Record the value a write replaces (prior is (data, type), or None if absent)."""
+        root, path = self._absolute(root, path)
+        record = {"op": "value", "root": root, "path": path, "name": name}
+        if prior is not None:
+            record["data"] = _encode_reg_data(prior[0])
+            record["type"] = prior[1]
+        self._append(record)
+    
+    def mark_done(self, exe_path: str, extension: str):
+        if self._file is None:
+            # No write recorded since start()/finish(); nothing to resume here
+            return
+        self._append({"op": "done", "exe": exe_path.lower(), "ext": extension})
+        self.sync()
+    
+    def finish(self):
+        if self._file is None:
+            # Nothing was written since the last finish(); keep the journal as it is
+            return
+        self._append({"op": "end"})
+        self.sync()
+        self.close()
+
+
+def delete_key_tree(root, path: str) -> bool:
+    """Delete a key and all of its subkeys; False if it could not be removed."""
+    try:
+        with registry.OpenKey(root, path, 0, registry.KEY_READ) as key:
+            children = []
+            try:
+                i = 0
+                while True:
+                    children.append(registry.EnumKey(key, i))
+                    i += 1
+            except OSError:
+                pass
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+    for child in children:
+        delete_key_tree(root, f"{path}\\{child}")
+    try:
+        registry.DeleteKey(root, path)
+        return True
+    except OSError:
+        return False
+
+
+def rollback_journal(records: list[dict]) -> tuple[int, int]:
+    """
+    Undo the writes recorded in a write-ahead journal.
+    
+    Records are replayed newest first, so a value touched several times ends
+    up with the state from before its first write. Only journaled keys are
+    touched.
+    
+    Args:
+        records: Records from WriteAheadJournal.read()
         
     Returns:
-        A ProgID string like 'NotepadPlusPlus.txt'
+        Tuple of (restored count, failed count)
     """
-    app_name = Path(exe_path).stem
-    # Remove dot and create ProgID
-    ext_clean = extension.lstrip('.')
-    # Sanitize app name (remove spaces and special chars, keep alphanumeric)
-    app_name_clean = ''.join(c for c in app_name if c.isalnum())
-    return f"{app_name_clean}.{ext_clean}"
+    restored = 0
+    failed = 0
+    for record in reversed(records):
+        try:
+            if record["op"] == "value":
+                if "type" in record:
+                    with registry.CreateKeyEx(record["root"], record["path"], 0,
+                                              registry.KEY_WRITE) as key:
+                        registry.SetValueEx(key, record["name"], 0, record["type"],
+                                            _decode_reg_data(record["data"]))
+                else:
+                    try:
+                        with registry.OpenKey(record["root"], record["path"], 0,
+                                              registry.KEY_ALL_ACCESS) as key:
+                            registry.DeleteValue(key, record["name"])
+                    except FileNotFoundError:
+                        pass
+                restored += 1
+            elif record["op"] == "key":
+                if not delete_key_tree(record["root"], record["path"]):
+                    raise OSError(f"could not delete {record['path']}")
+                restored += 1
+        except OSError as e:
+            print(f"  [FAILED] {record.get('path')}: {e}")
+            failed += 1
+    return restored, failed
+
+
+OUTPUT_TEXT = "text"
+OUTPUT_QUIET = "quiet"
+OUTPUT_JSON = "json"
+
+
+def watch_associations(configs: list, owners: dict, force: bool, watcher,
+                       debounce: float = 2.0, verbose: bool = False,
+                       run_journal: Optional[RunJournal] = None,
+                       wal: Optional["WriteAheadJournal"] = None,
+                       max_bursts: Optional[int] = None):
+    """
+    Re-apply associations whenever something resets them (--watch).
+    
+    The watcher reports coarse subtree changes (HKCR, HKCU FileExts); each
+    burst of changes is narrowed to the extensions whose
+    association_fingerprint() moved, and only those are re-read and
+    re-applied. Extensions that already point at our ProgID are left
+    alone, and our own writes are folded into the fingerprints before the
+    next wait, so they never trigger another pass.
+    
+    A default taken over through the user's UserChoice (the Default apps
+    settings, or Windows resetting them) cannot be taken back by writing
+    the registry; it is reported instead of re-applied.
+    
+    Args:
+        configs: Parsed AppConfigs, in priority order
+        owners: Result of assign_extension_owners()
+        force: Override defaults set by other applications
+        watcher: Object with watch(root, path), wait(timeout) and close()
+                 (see registry_watch)
+        debounce: Seconds without changes that end a burst
+        verbose: Print ProgID details
+        run_journal: Optional RunJournal to keep in step with the re-applied state
+        wal: Optional WriteAheadJournal of the run that started watching;
+             each burst's writes are appended to it (for --rollback)
+        max_bursts: Stop after this many bursts (None: until interrupted)
+    """
+    from registry_watch import wait_for_burst
+    global write_journal
+    
+    file_exts = open_file_exts_root()
+    watcher.watch(registry.HKEY_CURRENT_USER, FILE_EXTS_PATH)
+    watcher.watch(registry.HKEY_CLASSES_ROOT, "")
+    write_journal = wal
+    if wal is not None:
+        wal.alias(file_exts, registry.HKEY_CURRENT_USER, FILE_EXTS_PATH)
+    
+    pairs = [(config, ext) for config in configs for ext in config.extensions]
+    fingerprints = {}
+    claimed = set()     # pairs whose default is ours now; a reset is taken back
+    for config, ext in pairs:
+        progid = generate_progid(config.exe_path, ext)
+        fingerprints[(config.exe_path, ext)] = association_fingerprint(ext, progid, file_exts)
+        if get_existing_association(ext, file_exts).progid == progid:
+            claimed.add((config.exe_path, ext))
+    
+    print(f"Watching {len(pairs)} association(s) for changes (Ctrl+C to stop)...")
+    sys.stdout.flush()
+    bursts = 0
+    try:
+        while max_bursts is None or bursts < max_bursts:
+            wait_for_burst(watcher, debounce)
+            bursts += 1
+            
+            changed = []
+            for config, ext in pairs:
+                progid = generate_progid(config.exe_path, ext)
+                key = (config.exe_path, ext)
+                if association_fingerprint(ext, progid, file_exts) != fingerprints[key]:
+                    changed.append((config, ext))
+            if not changed:
+                continue
+            
+            # Cached ProgID and executable details may describe the old state
+            progid_cache.clear()
+            executable_cache.clear()
+            
+            attempted = 0
+            applied = []
+            failed = []
+            overridden = []     # (config, extension, UserChoice ProgID) we cannot take back
+            written = write_stats.written
+            for config, ext in changed:
+                progid = generate_progid(config.exe_path, ext)
+                info = get_existing_association(ext, file_exts)
+                if info.progid == progid:
+                    continue
+                if (config.exe_path, ext) in claimed:
+                    user_choice = _read_default(*_file_exts_key(file_exts, ext, "UserChoice"),
+                                                "ProgId")
+                    if user_choice and user_choice != progid:
+                        overridden.append((config, ext, user_choice))
+                        continue
+                    action = ACTION_SET_DEFAULT
+                else:
+                    action = plan_action(info, owners[ext] is config, force)
+                if not attempted:
+                    print()
+                    print(f"[INFO] Change detected; re-applying {time.strftime('%H:%M:%S')}")
+                    print("=" * 70)
+                attempted += 1
+                status = apply_extension(config, ext, info, action, owners[ext], file_exts, verbose)
+                if status == "failed":
+                    failed.append((config, ext))
+                    continue
+                if status == "ok" and write_journal is not None:
+                    write_journal.mark_done(config.exe_path, ext)
+                applied.append((config, ext))
+            
+            if attempted and write_journal is not None:
+                write_journal.finish()
+            for config, ext, user_choice in overridden:
+                print()
+                print(f"[WARN] {ext}: the default was changed to {user_choice} through "
+                      f"UserChoice; this cannot be reverted from here. Choose the app again "
+                      f"in Settings > Apps > Default apps.")
+            
+            # Fingerprint after all writes, so our own changes do not count as drift.
+            # Pairs left unfixed are dropped from the run journal, so the next
+            # run does not take them for up to date.
+            unfixed = {(config.exe_path, ext) for config, ext, _ in overridden}
+            unfixed.update((config.exe_path, ext) for config, ext in failed)
+            for config, ext in changed:
+                progid = generate_progid(config.exe_path, ext)
+                fingerprint = association_fingerprint(ext, progid, file_exts)
+                fingerprints[(config.exe_path, ext)] = fingerprint
+                if run_journal is None:
+                    continue
+                if (config.exe_path, ext) in unfixed:
+                    run_journal.forget(config.exe_path, ext)
+                else:
+                    run_journal.record(config.exe_path, ext, progid, owners[ext] is config,
+                                       force, fingerprint)
+            if run_journal is not None:
+                try:
+                    run_journal.save()
+                except OSError as e:
+                    print(f"\n[WARN] Could not save run journal: {e}")
+            if not attempted:
+                sys.stdout.flush()
+                continue
+            if write_stats.written > written:
+                notify_shell_change()
+            print(f"[OK] Re-applied {len(applied)} association(s)")
+            if failed:
+                print(f"[WARN] Could not re-apply {len(failed)} association(s): "
+                      f"{', '.join(ext for _, ext in failed)}")
+            sys.stdout.flush()
+    finally:
+        watcher.close()
+        if file_exts is not None:
+            file_exts.Close()
+
+
+# Mount point under HKEY_USERS for the Default profile's NTUSER.DAT
+DEFAULT_PROFILE_MOUNT = "AlchemysDefaultProfile"
+PROFILE_LIST_PATH = "SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\ProfileList"
+
+
+def current_user_sid() -> Optional[str]:
+    """
+    SID of the running user, found in ProfileList by %USERPROFILE%.
+    
+    Returns:
+        The SID, or None if no profile matches
+    """
+    profile = os.environ.get("USERPROFILE")
+    if not profile:
+        return None
+    profile = ntpath.normcase(ntpath.normpath(profile))
+    try:
+        with registry.OpenKey(registry.HKEY_LOCAL_MACHINE, PROFILE_LIST_PATH) as key:
+            sids = _enum_all_subkeys(key)
+    except OSError:
+        return None
+    for sid in sids:
+        path = _read_default(registry.HKEY_LOCAL_MACHINE, f"{PROFILE_LIST_PATH}\\{sid}",
+                             "ProfileImagePath")
+        if path and ntpath.normcase(ntpath.normpath(ntpath.expandvars(path))) == profile:
+            return sid
+    return None
+
+
+def list_user_hives() -> list[str]:
+    """
+    SIDs of the user profiles whose hives are loaded under HKEY_USERS.
+    
+    Service accounts (S-1-5-18/19/20), .DEFAULT and the *_Classes hives are
+    left out; the Default profile mount is included if it is loaded. The
+    running user's hive is left out too: it is HKEY_CURRENT_USER, which the
+    normal run already writes.
+    """
+    hives = []
+    try:
+        with registry.OpenKey(registry.HKEY_USERS, "") as key:
+            names = _enum_all_subkeys(key)
+    except OSError:
+        return hives
+    current = (current_user_sid() or "").upper()
+    for name in names:
+        if name.lower().endswith("_classes") or name.upper() == current:
+            continue
+        if name.upper().startswith("S-1-5-21-") or name == DEFAULT_PROFILE_MOUNT:
+            hives.append(name)
+    return hives
+
+
+def load_default_profile() -> Optional[str]:
+    """
+    Load the Default profile's NTUSER.DAT (the template for new users)
+    under HKEY_USERS\\DEFAULT_PROFILE_MOUNT.
+    
+    Returns:
+        The mount name, or None if the hive could not be loaded
+    """
+    try:
+        registry.OpenKey(registry.HKEY_USERS, DEFAULT_PROFILE_MOUNT).Close()
+        return DEFAULT_PROFILE_MOUNT     # already mounted
+    except OSError:
+        pass
+    if registry is not winreg:
+        return None
+    try:
+        with registry.OpenKey(registry.HKEY_LOCAL_MACHINE, PROFILE_LIST_PATH) as key:
+            profile_dir, _ = registry.QueryValueEx(key, "Default")
+    except OSError:
+        return None
+    hive_path = os.path.join(os.path.expandvars(profile_dir), "NTUSER.DAT")
+    # reg.exe enables the backup/restore privileges RegLoadKey needs
+    result = subprocess.run(["reg", "load", f"HKU\\{DEFAULT_PROFILE_MOUNT}", hive_path],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"  [WARN] Could not load the Default profile ({hive_path}): "
+              f"{result.stderr.strip() or result.stdout.strip()}")
+        return None
+    return DEFAULT_PROFILE_MOUNT
+
+
+def unload_default_profile():
+    if registry is winreg:
+        subprocess.run(["reg", "unload", f"HKU\\{DEFAULT_PROFILE_MOUNT}"], capture_output=True)
+
+
+def apply_user_hive(sid: str, work: list[tuple[str, str, str]]) -> dict:
+    """
+    Apply the per-user parts of an association run to one loaded user hive.
+    
+    Args:
+        sid: Subkey of HKEY_USERS (a SID or DEFAULT_PROFILE_MOUNT)
+        work: (extension, ProgID, executable) for each association
+        
+    Returns:
+        Dict of counts: open_with, failed
+    """
+    result = {"open_with": 0, "failed": 0}
+    prefix = f"{sid}\\{FILE_EXTS_PATH}"
+    try:
+        file_exts = registry.CreateKeyEx(registry.HKEY_USERS, prefix, 0,
+                                         registry.KEY_READ | registry.KEY_WRITE)
+    except OSError:
+        result["failed"] = len(work)
+        return result
+    if write_journal is not None:
+        write_journal.alias(file_exts, registry.HKEY_USERS, prefix)
+    with file_exts:
+        for ext, progid, exe_path in work:
+            if add_to_user_open_with(ext, progid, exe_path, file_exts):
+                result["open_with"] += 1
+            else:
+                result["failed"] += 1
+    return result
+
+
+def apply_user_hives(configs: list, hives: list[str], jobs: int = 1) -> dict:
+    """
+    Apply the per-user parts of the associations to several user hives.
+    
+    Machine-wide registration (ProgIDs, HKCR, App Paths) is not repeated
+    here; it is done once by the normal run. Hives are independent, so
+    they are processed on a bounded thread pool.
+    
+    Args:
+        configs: Parsed AppConfigs
+        hives: Subkeys of HKEY_USERS (see list_user_hives())
+        jobs: Maximum number of hives processed at once
+        
+    Returns:
+        Dict of hive -> counts (see apply_user_hive()), in the order of `hives`
+    """
+    work = [(ext, generate_progid(config.exe_path, ext), config.exe_path)
+            for config in configs for ext in config.extensions]
+    if jobs <= 1 or len(hives) <= 1:
+        return {sid: apply_user_hive(sid, work) for sid in hives}
+    with ThreadPoolExecutor(max_workers=min(jobs, len(hives))) as pool:
+        return dict(zip(hives, pool.map(lambda sid: apply_user_hive(sid, work), hives)))
+
+
+class _DetailSink:
+    """
+    Stand-in for stdout while details are hidden (--quiet/--json).
+    
+    Per-extension progress is dropped; error lines are still passed on to
+    stderr so failures never disappear silently.
+    """
+    
+    _ERROR_MARKERS = ("Error:", "[ERROR]", "[FAILED]")
+    
+    def __init__(self, errors):
+        self.errors = errors
+        self._partial = ""
+    
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            if line.lstrip().startswith(self._ERROR_MARKERS):
+                self.errors.write(line.strip() + "\n")
+        return len(text)
+    
+    def flush(self):
+        self.errors.flush()
+
+
+class Reporter:
+    """
+    Routes run output in one of three modes.
+    
+    text:  the normal human-readable progress (default)
+    quiet: the summary only (plus errors on stderr)
+    json:  one JSON Lines record per extension and one for the summary
+    
+    Every run (dry runs included) ends with a summary, in every mode. In
+    quiet and json mode stdout is block-buffered instead of line-buffered,
+    so a large run does not pay for one console write per line; text mode
+    keeps its live progress.
+    
+    Args:
+        mode: OUTPUT_TEXT, OUTPUT_QUIET or OUTPUT_JSON
+    """
+    
+    def __init__(self, mode: str = OUTPUT_TEXT):
+        self.mode = mode
+        self.stream = sys.stdout
+        if mode != OUTPUT_TEXT:
+            try:
+                self.stream.reconfigure(line_buffering=False)
+            except (AttributeError, ValueError):
+                pass
+            sys.stdout = _DetailSink(sys.stderr)
+    
+    def show_summary(self):
+        """Make the summary visible (quiet mode)."""
+        if self.mode == OUTPUT_QUIET:
+            sys.stdout = self.stream
+    
+    def record(self, kind: str, **fields):
+        """Write a JSON Lines record (json mode only)."""
+        if self.mode == OUTPUT_JSON:
+            self.stream.write(json.dumps({"type": kind, **fields}) + "\n")
+    
+    def extension(self, config: "AppConfig", extension: str, info: Optional[AssociationInfo],
+                  action: Optional[str], status: str):
+        """
+        Record the outcome for one application/extension pair.
+        
+        Pairs skipped as unchanged are not scanned (info is None); their
+        previous_default and previous_executable are null.
+        """
+        self.record("extension", app=config.app_name, extension=extension,
+                    action=action, progid=generate_progid(config.exe_path, extension),
+                    previous_default=info.progid if info is not None and info.has_default else None,
+                    previous_executable=info.executable if info is not None else None,
+                    status=status)
+    
+    def summary(self, dry_run: bool, set_as_default: int, added_to_open_with: int,
+                failed: int, unchanged: int):
+        """Record the summary (json mode) and make it visible (quiet mode)."""
+        self.record("summary", dry_run=dry_run, set_as_default=set_as_default,
+                    added_to_open_with=added_to_open_with, failed=failed, unchanged=unchanged,
+                    values_written=write_stats.written, values_up_to_date=write_stats.skipped)
+        self.show_summary()
+    
+    def close(self):
+        if self.mode != OUTPUT_TEXT:
+            sys.stdout = self.stream
+        self.stream.flush()
 
 
 def main():
+    if sys.argv[1:2] == ["audit"]:
+        audit_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["plan"]:
+        plan_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["apply"]:
+        apply_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["catalog"]:
+        catalog_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
-        description="Set Windows default file associations from a configuration file.",
+        description="Set Windows default file associations from configuration files.",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Configuration file format:
@@ -463,6 +2681,8 @@ Configuration file format:
   Line 2+: File extensions (one per line, with or without leading dot)
   
   Lines starting with # are treated as comments.
+  Lines starting with @ add a group of extensions from the extension
+  catalog, e.g. @text or @source (list the groups with `catalog`).
 
 Example config file:
   C:\\Program Files\\Notepad++\\notepad++.exe
@@ -471,32 +2691,217 @@ Example config file:
   .ini
   # This is a comment
   .cfg
+  @source
   
 Behavior:
   - If an extension has NO default app: Sets the specified app as default
   - If an extension ALREADY has a default: Adds app to "Open with" list only
   - Use --force to override existing defaults
+  - Protected extensions (executables, shell links, installer packages,
+    NoOpenWith and packaged-app types) are skipped, even if listed
+
+Multiple configs:
+  Several config files (or directories of .apps files) can be processed in
+  one run. If more than one config lists the same extension, the first one
+  (command-line order, or --priority) may become the default; the others
+  are only added to "Open with".
+
+Recovery:
+  Every change is journaled with the value it replaced before it is made.
+  --resume finishes an interrupted run; --rollback restores exactly the
+  values the last (or interrupted) run changed.
+
+Plan and apply:
+  `plan <config_file> ... --out PLAN_JSON` scans once and writes the
+  actions; `apply PLAN_JSON` executes them without scanning again, and
+  only re-plans extensions whose registry keys changed in between.
+
+All users:
+  --all-users also adds the application to the "Open with" lists of every
+  user profile loaded under HKEY_USERS (--default-profile adds the Default
+  profile, so new users get them too). Machine-wide registration is done
+  once; profiles are updated up to --jobs at a time.
+
+Watch mode:
+  --watch keeps running after the associations are applied and re-applies
+  any that Windows, an update or an installer resets. Changes are batched
+  until the registry has been quiet for --debounce seconds.
 
 Note: This script works best with Administrator privileges.
         """
     )
-    parser.add_argument('config_file', help='Path to the configuration file')
+    parser.add_argument('config_files', nargs='*', metavar='config_file',
+                        help='Path to a configuration file, or a directory of .apps files')
     parser.add_argument('--dry-run', '-n', action='store_true',
                         help='Show what would be done without making changes')
     parser.add_argument('--force', '-f', action='store_true',
                         help='Force set as default even if one already exists')
+    parser.add_argument('--allow-protected', action='store_true',
+                        help='Associate protected extensions (executables, packaged app '
+                             'types, ...) that are listed explicitly')
+    parser.add_argument('--priority', metavar='NAMES',
+                        help='Comma-separated config or app names that win when several '
+                             'configs list the same extension (default: command-line order)')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Show verbose output')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always re-parse config files instead of using the parse cache')
+    parser.add_argument('--full', action='store_true',
+                        help='Re-check every extension, even those the run journal shows '
+                             'as unchanged since the last run')
+    parser.add_argument('--index', action='store_true',
+                        help='Check existing associations against the persistent association '
+                             'index, refreshing only keys changed since it was last built')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='Check existing associations with up to N concurrent '
+                             'lookups (default: 1)')
+    parser.add_argument('--emit-reg', metavar='OUT_REG',
+                        help='Write all planned changes to a .reg file instead of '
+                             'applying them (apply later with: reg import OUT_REG)')
+    parser.add_argument('--offline', action='store_true',
+                        help='With --emit-reg: plan against an empty registry instead '
+                             'of this machine (emits every value, e.g. for images)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run with its original arguments, '
+                             'skipping extensions it already finished')
+    parser.add_argument('--rollback', action='store_true',
+                        help='Restore every registry value changed by the last run '
+                             '(or the interrupted one) and exit')
+    parser.add_argument('--all-users', action='store_true',
+                        help='Also add the application to the "Open with" lists of every '
+                             'loaded user profile (HKEY_USERS), up to --jobs at once')
+    parser.add_argument('--default-profile', action='store_true',
+                        help='With --all-users: also load and update the Default profile '
+                             '(the template for new users)')
+    parser.add_argument('--watch', action='store_true',
+                        help='After applying, keep watching the registry and re-apply '
+                             'associations that get reset (until Ctrl+C)')
+    parser.add_argument('--debounce', type=float, default=2.0, metavar='SECONDS',
+                        help='With --watch: wait until the registry has been quiet this '
+                             'long before re-applying (default: 2)')
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument('--quiet', '-q', action='store_true',
+                              help='Print only the summary (errors still go to stderr)')
+    output_group.add_argument('--json', action='store_true',
+                              help='Print one JSON Lines record per extension (action, ProgID, '
+                                   'previous default, status) and a summary record')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='OUT_JSON',
+                        help='Count registry calls per root and function and time each '
+                             'phase; print the results as JSON after the summary '
+                             '(or write them to OUT_JSON)')
     
     args = parser.parse_args()
     
+    # Write-ahead journal of the last run (--resume / --rollback)
+    journal_path = get_state_dir() / "write_journal.jsonl"
+    records = []
+    if not (args.dry_run or args.emit_reg):
+        records = WriteAheadJournal(journal_path).read()
+    interrupted = bool(records) and records[-1]["op"] != "end"
+    
+    if (args.rollback or args.resume) and registry is None:
+        print("Error: This script only works on Windows.")
+        sys.exit(1)
+    
+    if args.rollback:
+        if not records:
+            print(f"Error: No write journal found at {journal_path}")
+            sys.exit(1)
+        print(f"Rolling back {'interrupted' if interrupted else 'last'} run from {journal_path}...")
+        restored, failed = rollback_journal(records)
+        print(f"  Restored: {restored}  Failed: {failed}")
+        if failed:
+            sys.exit(1)
+        journal_path.unlink()
+        notify_shell_change()
+        sys.exit(0)
+    
+    resume_done = set()     # (exe_path lower, extension) finished before the interruption
+    if args.resume:
+        if not interrupted:
+            print("No interrupted run to resume.")
+            sys.exit(0)
+        if records[0]["argv"][:1] == ["apply"]:
+            apply_main(records[0]["argv"][1:], resume=True)
+            return
+        args = parser.parse_args(records[0]["argv"])
+        args.resume = True
+        resume_done = {(r["exe"], r["ext"]) for r in records if r["op"] == "done"}
+        print(f"Resuming interrupted run ({len(resume_done)} extension(s) already done)")
+        print()
+    elif not args.config_files:
+        parser.error("at least one config_file is required")
+    elif interrupted:
+        print("Error: The previous run was interrupted before it finished.")
+        print("       Use --resume to complete it or --rollback to undo it.")
+        sys.exit(1)
+    
+    # Route output (--quiet / --json buffer stdout; text mode keeps live progress)
+    reporter = Reporter(OUTPUT_JSON if args.json else OUTPUT_QUIET if args.quiet else OUTPUT_TEXT)
+    
+    # Select the registry backend
+    reg_writer = None
+    if args.emit_reg:
+        from regfile import RegFileBackend
+        reg_writer = RegFileBackend(base=None if args.offline else winreg)
+        set_registry_backend(reg_writer)
+    elif args.offline:
+        parser.error("--offline requires --emit-reg")
+    if args.default_profile and not args.all_users:
+        parser.error("--default-profile requires --all-users")
+    if args.all_users and args.emit_reg:
+        parser.error("--all-users cannot be combined with --emit-reg")
+    if args.watch and (args.dry_run or args.emit_reg):
+        parser.error("--watch cannot be combined with --dry-run or --emit-reg")
+    
     # Check platform
-    if sys.platform != 'win32':
+    if registry is None:
         print("Error: This script only works on Windows.")
+        print("       Use --emit-reg to produce a .reg file on other systems.")
         sys.exit(1)
     
+    # Instrument the run (--profile); without the flag nothing is wrapped
+    profiler = None
+    timed_stream = None
+    if args.profile:
+        from profiling import Profiler, ProfilingRegistry
+        profiler = Profiler()
+        set_registry_backend(ProfilingRegistry(registry, profiler))
+        timed_stream = profiler.timed_stream(sys.stdout)
+        sys.stdout = timed_stream
+    
+    def enter_phase(name):
+        if profiler is not None:
+            profiler.enter(name)
+    
+    def emit_profile():
+        if profiler is None:
+            return
+        profiler.stop()
+        profiler.counters["progid_cache"] = {"hits": progid_cache.hits,
+                                             "misses": progid_cache.misses}
+        profiler.counters["executable_checks"] = {"checks": executable_cache.checks,
+                                                  "hits": executable_cache.hits}
+        # The reporter may already have put its own stream back (--quiet)
+        if sys.stdout is timed_stream:
+            sys.stdout = timed_stream.stream
+        if args.profile == '-' and reporter.mode == OUTPUT_JSON:
+            reporter.record("profile", **profiler.to_dict())
+        elif args.profile == '-':
+            reporter.show_summary()
+            print()
+            print("Profile:")
+            print(profiler.to_json())
+        else:
+            try:
+                with open(args.profile, 'w', encoding='utf-8') as f:
+                    f.write(profiler.to_json())
+                print(f"\n[OK] Wrote profile to {args.profile}")
+            except OSError as e:
+                print(f"\n[WARN] Could not write profile: {e}")
+    
     # Check admin privileges
-    admin_mode = is_admin()
+    admin_mode = reg_writer is not None or is_admin()
     if not admin_mode:
         print("=" * 70)
         print("WARNING: Not running as Administrator!")
@@ -505,158 +2910,340 @@ Note: This script works best with Administrator privileges.
         print("=" * 70)
         print()
     
-    # Parse configuration
+    # Parse configuration(s)
+    enter_phase("parse")
     try:
-        exe_path, extensions = parse_config_file(args.config_file)
+        configs = [load_app_config(path, not args.no_cache)
+                   for path in expand_config_paths(args.config_files)]
     except (FileNotFoundError, ValueError) as e:
         print(f"Error: {e}")
         sys.exit(1)
+    configs = order_by_priority(configs, (args.priority or "").split(","))
+    multi = len(configs) > 1
     
-    # Validate executable path
-    exe_path = os.path.abspath(exe_path)
-    if not os.path.isfile(exe_path):
-        print(f"Error: Executable not found: {exe_path}")
+    # Expand @groups and drop protected extensions before anything is scanned
+    # (an --offline plan has no registry to build the catalog from)
+    enter_phase("catalog")
+    try:
+        with open_extension_catalog(build=not args.offline) as catalog:
+            expand_config_groups(configs, catalog, args.allow_protected)
+    except ValueError as e:
+        print(f"Error: {e}")
         sys.exit(1)
     
-    app_name = Path(exe_path).stem
+    # Validate executable path(s)
+    for config in configs:
+        exe_found = os.path.isfile(config.exe_path)
+        config.exe_path = ntpath.abspath(config.exe_path)
+        if not exe_found:
+            if reg_writer is None:
+                print(f"Error: Executable not found: {config.exe_path}")
+                sys.exit(1)
+            # The .reg file is usually applied on another machine
+            print(f"Warning: Executable not found on this machine: {config.exe_path}")
+    
+    owners = assign_extension_owners(configs)
+    extensions = list(owners)
     
-    print(f"Configuration loaded:")
-    print(f"  Executable: {exe_path}")
-    print(f"  App Name:   {app_name}")
-    print(f"  Extensions: {', '.join(extensions)}")
+    print(f"Configuration{'s' if multi else ''} loaded:")
+    for config in configs:
+        if multi:
+            print(f"  Config:     {config.config_path}")
+        print(f"  Executable: {config.exe_path}")
+        print(f"  App Name:   {config.app_name}")
+        print(f"  Extensions: {', '.join(config.extensions)}")
+        for line_no, text, reason in config.malformed:
+            print(f"  [WARN] {config.config_path}:{line_no}: skipped '{text}' ({reason})")
+        if config.duplicates:
+            skipped = ', '.join(f"{ext} (line {line_no}, first on {first})"
+                                for line_no, ext, first in config.duplicates)
+            print(f"  [INFO] Skipped {len(config.duplicates)} duplicate extension(s): {skipped}")
+        print_protected(config, "  ")
+        if multi:
+            print()
     if args.force:
         print(f"  Mode:       FORCE (will override existing defaults)")
     else:
         print(f"  Mode:       Respect existing defaults")
+    if multi:
+        shared = {}
+        for config in configs:
+            for ext in dict.fromkeys(config.extensions):
+                shared.setdefault(ext, []).append(config.app_name)
+        shared = {ext: apps for ext, apps in shared.items() if len(apps) > 1}
+        if shared:
+            print(f"  Shared:     {len(shared)} extension(s) listed by several configs "
+                  f"(first config may set the default)")
+            if args.verbose:
+                for ext, apps in shared.items():
+                    print(f"              {ext:10} {apps[0]} (also: {', '.join(apps[1:])})")
     print()
     
+    # Resolve per-extension user keys relative to one open FileExts handle
+    file_exts = open_file_exts_root()
+    
+    # Skip extensions whose keys have not changed since the last run (and,
+    # with --resume, those the interrupted run already finished)
+    enter_phase("journal")
+    journal = None
+    unchanged = {(config.exe_path, ext) for config in configs for ext in config.extensions
+                 if (config.exe_path.lower(), ext) in resume_done}
+    if reg_writer is None:
+        journal = RunJournal(get_state_dir() / "run_journal.json")
+        if not args.full:
+            for config in configs:
+                for ext in config.extensions:
+                    if journal.is_current(config.exe_path, ext,
+                                          generate_progid(config.exe_path, ext),
+                                          owners[ext] is config, args.force, file_exts):
+                        unchanged.add((config.exe_path, ext))
+    
+    scan_extensions = [ext for ext in extensions
+                       if any((config.exe_path, ext) not in unchanged
+                              for config in configs if ext in config.extensions)]
+    if unchanged:
+        print(f"Run journal: {len(extensions) - len(scan_extensions)} of {len(extensions)} "
+              f"extension(s) unchanged since the last run (use --full to re-check)")
+        print()
+    
     # Check existing associations
+    enter_phase("scan")
     print("Checking existing associations...")
     print("-" * 70)
     
-    associations = {}
-    for ext in extensions:
-        info = get_existing_association(ext)
-        associations[ext] = info
+    association_index = None
+    if args.index and reg_writer is None:
+        from association_index import AssociationIndex
+        index_path = association_index_path()
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        association_index = AssociationIndex(index_path)
+        stats = refresh_association_index(association_index, file_exts, args.jobs)
+        print(f"Association index: re-read {stats['extensions_read']} of "
+              f"{stats['extensions']} extension(s), {stats['progids_read']} of "
+              f"{stats['progids']} ProgID(s)")
+        
+        def lookup_association(ext):
+            return get_existing_association(ext, index=association_index)
+    else:
+        def lookup_association(ext):
+            return get_existing_association(ext, file_exts)
+    
+    associations = scan_associations(scan_extensions, lookup_association, args.jobs)
+    if association_index is not None:
+        association_index.close()
+    for ext in scan_extensions:
+        info = associations[ext]
         
         if info.has_default:
-            if info.executable:
-                existing_app = Path(info.executable).stem
-            else:
-                existing_app = info.progid or "Unknown"
-            print(f"  {ext:10} -> Default: {existing_app}")
+            print(f"  {ext:10} -> Default: {describe_existing(info)}")
             if args.verbose and info.executable:
                 print(f"             Path: {info.executable}")
         else:
             print(f"  {ext:10} -> No default application")
     
     print("-" * 70)
+    if args.verbose:
+        print(f"  ProgID cache: {progid_cache.hits} hits, {progid_cache.misses} misses")
     print()
     
     if args.dry_run:
         print("[DRY RUN] Would perform the following actions:")
         print()
-        print(f"1. Register application: {Path(exe_path).name}")
+        print(f"1. Register application{'s' if multi else ''}: "
+              f"{', '.join(config.exe_name for config in configs)}")
         print()
-        for ext in extensions:
-            info = associations[ext]
-            progid = generate_progid(exe_path, ext)
-            if info.has_default and not args.force:
-                if info.executable:
-                    existing_app = Path(info.executable).stem
-                else:
-                    existing_app = info.progid or "Unknown"
-                print(f"  {ext}: Add to 'Open with' list (keeping default: {existing_app})")
-            else:
-                if args.force and info.has_default:
-                    print(f"  {ext}: OVERRIDE existing default -> Set {app_name} as default")
+        planned = {ACTION_SET_DEFAULT: 0, ACTION_OPEN_WITH: 0}
+        for config in configs:
+            if multi:
+                print(f"  [{config.app_name}]")
+            for ext in config.extensions:
+                if (config.exe_path, ext) in unchanged:
+                    reporter.extension(config, ext, None, None, "unchanged")
+                    continue
+                info = associations[ext]
+                owner = owners[ext]
+                action = plan_action(info, owner is config, args.force)
+                reporter.extension(config, ext, info, action, "planned")
+                planned[action] += 1
+                if action == ACTION_OPEN_WITH:
+                    if owner is not config:
+                        print(f"  {ext}: Add to 'Open with' list (default claimed by {owner.app_name})")
+                    else:
+                        print(f"  {ext}: Add to 'Open with' list (keeping default: {describe_existing(info)})")
+                elif args.force and info.has_default:
+                    print(f"  {ext}: OVERRIDE existing default -> Set {config.app_name} as default")
                 else:
-                    print(f"  {ext}: Set {app_name} as DEFAULT (no existing default)")
+                    print(f"  {ext}: Set {config.app_name} as DEFAULT (no existing default)")
+            if multi:
+                print()
+        print()
+        if args.all_users:
+            hives = list_user_hives()
+            print(f"2. Add to 'Open with' for {len(hives)} loaded user profile(s)"
+                  f"{' and the Default profile' if args.default_profile else ''}")
+            for sid in hives:
+                print(f"  {sid}")
+            print()
+        print(f"{3 if args.all_users else 2}. Notify Windows Shell of changes")
+        if file_exts is not None:
+            file_exts.Close()
+        
+        reporter.summary(True, planned[ACTION_SET_DEFAULT], planned[ACTION_OPEN_WITH], 0,
+                         len(unchanged))
         print()
-        print("2. Notify Windows Shell of changes")
+        print("=" * 70)
+        print("Summary (dry run, nothing changed):")
+        print(f"  Would set as default:     {planned[ACTION_SET_DEFAULT]}")
+        print(f"  Would add to 'Open with': {planned[ACTION_OPEN_WITH]}")
+        if unchanged:
+            print(f"  Unchanged since last run: {len(unchanged)}")
+        print("=" * 70)
+        emit_profile()
+        reporter.close()
         sys.exit(0)
     
-    # Register the application globally
-    print("Registering application...")
-    register_application(exe_path)
-    register_in_applications(exe_path)
+    # Journal prior values so the run can be resumed or rolled back
+    global write_journal
+    if reg_writer is None:
+        write_journal = WriteAheadJournal(journal_path)
+        write_journal.alias(file_exts, registry.HKEY_CURRENT_USER, FILE_EXTS_PATH)
+        if args.resume:
+            write_journal.reopen()
+        else:
+            write_journal.start(sys.argv[1:])
+    
+    # Register the application(s) globally
+    enter_phase("register")
+    print(f"Registering application{'s' if multi else ''}...")
+    for config in configs:
+        register_application(config.exe_path)
+        register_in_applications(config.exe_path)
+        register_supported_types(config.exe_path, config.extensions)
     print()
     
     # Process each extension
+    enter_phase("apply")
     print("Processing file associations...")
     print("=" * 70)
     
     set_as_default_count = 0
     added_to_openwith_count = 0
     fail_count = 0
+    processed = []      # (config, extension) applied successfully, for the run journal
     
-    for ext in extensions:
-        info = associations[ext]
-        progid = generate_progid(exe_path, ext)
-        description = f"{app_name} {ext.upper()} File"
-        
-        print(f"\n{ext}:")
-        
-        # Always create our ProgID first
-        if not create_progid(exe_path, progid, description):
-            print(f"    [FAILED] Could not create ProgID")
-            fail_count += 1
-            continue
-        else:
-            if args.verbose:
-                print(f"    [OK] Created ProgID: {progid}")
+    for config in configs:
+        exe_path = config.exe_path
+        app_name = config.app_name
+        if multi:
+            print(f"\n[{app_name}] {config.config_path}")
         
-        if info.has_default and not args.force:
-            # Extension already has a default - add to "Open with" only
-            if info.executable:
-                existing_app = Path(info.executable).stem
-            else:
-                existing_app = info.progid or "Unknown"
-            print(f"    [INFO] Keeping existing default: {existing_app}")
-            
-            if add_to_open_with_list(ext, progid, exe_path):
-                print(f"    [OK] Added '{app_name}' to 'Open with' list")
+        for ext in config.extensions:
+            if (exe_path, ext) in unchanged:
+                reporter.extension(config, ext, None, None, "unchanged")
+                continue
+            info = associations[ext]
+            owner = owners[ext]
+            action = plan_action(info, owner is config, args.force)
+            status = apply_extension(config, ext, info, action, owner, file_exts, args.verbose)
+            reporter.extension(config, ext, info, action, status)
+            if status == "failed":
+                fail_count += 1
+                continue
+            # A partial success still counts, since the ProgID was created
+            if action == ACTION_OPEN_WITH:
                 added_to_openwith_count += 1
             else:
-                print(f"    [WARN] Could not add to 'Open with' list (partial success)")
-                # Still count as partial success since ProgID was created
-                added_to_openwith_count += 1
-        else:
-            # No default exists (or --force) - set as default
-            if args.force and info.has_default:
-                if info.executable:
-                    existing_app = Path(info.executable).stem
-                else:
-                    existing_app = info.progid or "Unknown"
-                print(f"    [INFO] Overriding existing default: {existing_app}")
-            
-            if set_extension_association(ext, progid):
-                print(f"    [OK] Set '{app_name}' as DEFAULT for {ext}")
                 set_as_default_count += 1
-                
-                # Also add to Open with for good measure
-                add_to_open_with_list(ext, progid, exe_path)
-            else:
-                print(f"    [FAILED] Could not set as default")
-                fail_count += 1
+            if status == "ok":
+                processed.append((config, ext))
+                if write_journal is not None:
+                    write_journal.mark_done(exe_path, ext)
     
-    # Notify shell of changes
-    notify_shell_change()
+    # Per-user parts for every other profile (--all-users); the machine-wide
+    # registration above is shared and not repeated
+    hive_results = {}
+    if args.all_users:
+        enter_phase("users")
+        hives = list_user_hives()
+        loaded_default = False
+        if args.default_profile and DEFAULT_PROFILE_MOUNT not in hives:
+            if load_default_profile() is not None:
+                hives.append(DEFAULT_PROFILE_MOUNT)
+                loaded_default = True
+        print()
+        print(f"Updating {len(hives)} user profile(s)...")
+        try:
+            hive_results = apply_user_hives(configs, hives, args.jobs)
+        finally:
+            if loaded_default:
+                unload_default_profile()
+        for sid, result in hive_results.items():
+            status = "[OK]" if not result["failed"] else "[WARN]"
+            print(f"  {status} {sid}: {result['open_with']} 'Open with' entries, "
+                  f"{result['failed']} failed")
+            reporter.record("user_profile", sid=sid, **result)
+    
+    enter_phase("journal")
+    if write_journal is not None:
+        write_journal.finish()
+    
+    if journal is not None:
+        # Fingerprint after all writes, so our own changes do not count as drift
+        stamps = {}
+        for config, ext in processed:
+            progid = generate_progid(config.exe_path, ext)
+            if ext not in stamps:
+                stamps[ext] = extension_stamps(ext, file_exts)
+            journal.record(config.exe_path, ext, progid, owners[ext] is config, args.force,
+                           association_fingerprint(ext, progid, stamps=stamps[ext]))
+        try:
+            journal.save()
+        except OSError as e:
+            print(f"\n[WARN] Could not save run journal: {e}")
+    
+    if file_exts is not None:
+        file_exts.Close()
+    
+    enter_phase("notify")
+    if reg_writer is not None:
+        # Nothing was changed on this machine - write the .reg file instead
+        try:
+            reg_writer.write(args.emit_reg)
+            print(f"\n[OK] Wrote {reg_writer.value_count} registry values to {args.emit_reg}")
+        except OSError as e:
+            print(f"\nError: Could not write {args.emit_reg}: {e}")
+            sys.exit(1)
+    else:
+        # Notify shell of changes (once, for all configs)
+        notify_shell_change()
     
     # Summary
+    enter_phase("summary")
+    reporter.summary(False, set_as_default_count, added_to_openwith_count, fail_count,
+                     len(unchanged))
     print()
     print("=" * 70)
     print("Summary:")
     print(f"  Set as default:           {set_as_default_count}")
     print(f"  Added to 'Open with':     {added_to_openwith_count}")
     print(f"  Failed:                   {fail_count}")
+    if unchanged:
+        print(f"  Unchanged since last run: {len(unchanged)}")
+    if args.all_users:
+        print(f"  User profiles updated:    {len(hive_results)} "
+              f"({sum(r['failed'] for r in hive_results.values())} failed entries)")
+    print(f"  Registry values written:  {write_stats.written}")
+    print(f"  Already up to date:       {write_stats.skipped}")
     print("=" * 70)
     
     if fail_count > 0 and not admin_mode:
         print()
         print("Tip: Run as Administrator for better results.")
     
-    if set_as_default_count > 0 or added_to_openwith_count > 0:
+    if reg_writer is not None:
+        print()
+        print(f"Apply on the target machine with: reg import \"{args.emit_reg}\"")
+    elif set_as_default_count > 0 or added_to_openwith_count > 0:
         print()
         print("Changes applied successfully!")
         print()
@@ -664,9 +3251,23 @@ Note: This script works best with Administrator privileges.
         print("to take effect.")
         print()
         if added_to_openwith_count > 0:
-            print(f"To open files with {app_name}:")
+            app_names = ", ".join(f"'{config.app_name}'" for config in configs)
+            print(f"To open files with {' or '.join(config.app_name for config in configs)}:")
             print("  - Right-click a file -> 'Open with' -> Choose another app")
-            print(f"  - Select '{app_name}' from the list")
+            print(f"  - Select {app_names} from the list")
+    
+    emit_profile()
+    reporter.close()
+    
+    if args.watch:
+        from registry_watch import RegistryChangeWatcher
+        print()
+        try:
+            watch_associations(configs, owners, args.force, RegistryChangeWatcher(),
+                               args.debounce, args.verbose, journal, write_journal)
+        except KeyboardInterrupt:
+            print()
+            print("Stopped watching.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Group Policy DIFF Writer
+
+Builds a GPO_DIFF_* folder (the layout gpexporter.bat produces) from a
+policy export and a baseline, keeping only what differs:
+
+- security_policy.inf: the settings of the secedit export that are new or
+  changed compared to the baseline template (see security_inf.py)
+- policies_*.reg: the values of each registry policy export that are new
+  or changed, plus deletions for values and keys the baseline has
+- gpresult.html (copied), IMPORT_GPO_DIFF.bat and README.txt
+
+The export directory holds what gpexporter.bat collects: secedit.inf (or
+security_policy.inf), the policies_*.reg exports and gpresult.html. The
+baseline is a directory with the same layout, or just a security template
+such as %windir%\\inf\\defltbase.inf. Without a baseline everything in the
+export is treated as a change.
+
+Usage:
+    python GpoDiff.py <export_dir> [--baseline DIR|FILE.inf] [--out GPO_DIFF_DIR]
+
+Example:
+    python GpoDiff.py %TEMP%\\gpo_current --baseline %windir%\\inf\\defltbase.inf
+"""
+
+import argparse
+import getpass
+import os
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from regfile import (OP_CREATE_KEY, OP_DELETE_KEY, OP_DELETE_VALUE, OP_SET_VALUE,
+                     RegFileError, RegModel, RegOp, parse_reg_file)
+from security_inf import InfError, InfFile, diff_inf, parse_inf_file, write_inf
+
+
+SECURITY_POLICY = "security_policy.inf"
+SECEDIT_EXPORT_NAMES = ("secedit.inf", SECURITY_POLICY)
+GPRESULT = "gpresult.html"
+
+# Registry policy exports, in import order, with their README descriptions
+POLICY_EXPORTS = {
+    "policies_hklm.reg": "HKLM Software Policies",
+    "policies_hkcu.reg": "HKCU Software Policies",
+    "policies_cv_hklm.reg": "HKLM CurrentVersion Policies",
+    "policies_cv_hkcu.reg": "HKCU CurrentVersion Policies",
+    "policies_ms_hklm.reg": "HKLM Microsoft Policies",
+    "policies_ms_hkcu.reg": "HKCU Microsoft Policies",
+}
+
+
+def find_security_export(directory: Path) -> Optional[Path]:
+    """The secedit export in a directory, if there is one."""
+    for name in SECEDIT_EXPORT_NAMES:
+        if (directory / name).is_file():
+            return directory / name
+    return None
+
+
+def diff_reg_exports(baseline: Optional[RegModel], current: RegModel) -> RegModel:
+    """
+    Registry operations that turn `baseline` into `current`.
+
+    Args:
+        baseline: Parsed baseline export, or None (treated as empty)
+        current: Parsed current export
+
+    Returns:
+        RegModel with new/changed values, deleted values and deleted keys
+    """
+    delta = RegModel()
+    for value_key, op in current.values.items():
+        if op.kind != OP_SET_VALUE:
+            continue
+        old = baseline.values.get(value_key) if baseline is not None else None
+        if old is None or (old.kind, old.value_type, old.data) != (op.kind, op.value_type, op.data):
+            delta.add(op)
+    if baseline is None:
+        return delta
+
+    # Keys the baseline has and the export does not: delete the topmost one
+    deleted = []
+    for key in sorted(baseline.keys, key=lambda k: k[1].count("\\")):
+        if key in current.keys or any(k[0] == key[0] and key[1].startswith(k[1] + "\\") for k in deleted):
+            continue
+        deleted.append(key)
+        op = baseline.keys[key]
+        delta.add(RegOp(OP_DELETE_KEY, op.root, op.path, source=op.source, line=op.line))
+
+    for value_key, op in baseline.values.items():
+        if (op.kind == OP_SET_VALUE and value_key not in current.values
+                and value_key[:2] in current.keys):
+            delta.add(RegOp(OP_DELETE_VALUE, op.root, op.path, op.name,
+                            source=op.source, line=op.line))
+
+    # Keys that exist (empty) only in the export
+    for key, op in current.keys.items():
+        if key not in delta.keys and (baseline is None or key not in baseline.keys):
+            delta.add(RegOp(OP_CREATE_KEY, op.root, op.path, source=op.source, line=op.line))
+    return delta
+
+
+def _load_reg(path: Path) -> RegModel:
+    model = RegModel()
+    model.add_all(parse_reg_file(str(path)))
+    return model
+
+
+def import_script_text(generated: datetime) -> str:
+    """IMPORT_GPO_DIFF.bat, as gpexporter.bat writes it."""
+    lines = [
+        "@echo off",
+        ":: Auto-generated Group Policy DIFF Import Script",
+        f":: Generated: {generated:%a %m/%d/%Y %H:%M:%S}",
+        "",
+        "net session >nul 2>&1",
+        "if %errorLevel% neq 0 (",
+        "    echo ERROR: Administrator privileges required.",
+        "    pause",
+        "    exit /b 1",
+        ")",
+        "",
+        "echo Importing Group Policy settings...",
+        "",
+        "echo [1/4] Importing registry policies...",
+    ]
+    for name in POLICY_EXPORTS:
+        suffix = " /reg:64" if name.endswith("_hklm.reg") else ""
+        lines.append(f'if exist "{name}" reg import "{name}"{suffix}')
+    lines.extend([
+        "",
+        "echo [2/4] Importing security policy...",
+        f'if exist "{SECURITY_POLICY}" secedit /configure /db secedit.sdb /cfg "{SECURITY_POLICY}" /overwrite /quiet',
+        "",
+        "echo [3/4] Refreshing Group Policy...",
+        "gpupdate /force",
+        "",
+        "echo [4/4] Complete",
+        "echo.",
+        "echo Group Policy settings have been imported.",
+        "echo A system restart is recommended for all settings to take effect.",
+        "echo.",
+        "pause",
+    ])
+    return "\r\n".join(lines) + "\r\n"
+
+
+def readme_text(generated: datetime, files: list[str], baseline: Optional[str]) -> str:
+    """README.txt listing the files that were written."""
+    descriptions = dict(POLICY_EXPORTS)
+    descriptions[SECURITY_POLICY] = "Local Security Policy"
+    descriptions[GPRESULT] = "Full Group Policy Results Report"
+    descriptions["IMPORT_GPO_DIFF.bat"] = "Import script"
+    lines = [
+        "GROUP POLICY DIFF EXPORT",
+        "========================",
+        "",
+        f"Export Date: {generated:%a %m/%d/%Y %H:%M:%S}",
+        f"Computer: {os.environ.get('COMPUTERNAME') or platform.node()}",
+        f"User: {os.environ.get('USERNAME') or getpass.getuser()}",
+        f"Baseline: {baseline or '(none - fresh install)'}",
+        "",
+        "CONTENTS:",
+        "---------",
+        *(f"- {name}: {descriptions[name]}" for name in files),
+        "",
+        "IMPORT INSTRUCTIONS:",
+        "--------------------",
+        "1. Copy this entire folder to the target system",
+        "2. Run IMPORT_GPO_DIFF.bat as Administrator",
+        "3. Restart the system for all changes to take effect",
+        "",
+        "NOTES:",
+        "------",
+        "- This export contains only settings that differ from the baseline",
+        "- Import on a fresh Windows install will apply these policies",
+        "- Domain GPOs will override local policies",
+        "- Review gpresult.html for complete applied policy details",
+    ]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def write_gpo_diff(export_dir: Path, baseline: Optional[Path], out_dir: Path) -> int:
+    """
+    Compare an export with a baseline and write the GPO_DIFF folder.
+
+    Args:
+        export_dir: Directory with the current exports
+        baseline: Baseline directory or security template, or None
+        out_dir: GPO_DIFF folder to create
+
+    Returns:
+        Number of changed settings written
+
+    Raises:
+        OSError, InfError, RegFileError
+    """
+    baseline_dir = baseline if baseline is not None and baseline.is_dir() else None
+    start = time.perf_counter()
+    compared = 0
+    changed = 0
+    outputs = []        # (file name, writer)
+
+    current_inf = find_security_export(export_dir)
+    if current_inf is not None:
+        current = parse_inf_file(str(current_inf))
+        if baseline_dir is not None:
+            baseline_inf = find_security_export(baseline_dir)
+        else:
+            baseline_inf = baseline
+        base = parse_inf_file(str(baseline_inf)) if baseline_inf is not None else InfFile()
+        changes = diff_inf(base, current)
+        compared += current.setting_count + base.setting_count
+        if changes:
+            outputs.append((SECURITY_POLICY, lambda path, c=changes, h=current: write_inf(path, c, h)))
+        changed += len(changes)
+        print(f"  [OK] {current_inf.name}: {current.setting_count} setting(s), "
+              f"{len(changes)} differ from the baseline")
+        if baseline is not None:
+            for change in changes:
+                print(f"      {change.describe()}")
+    else:
+        print("  [WARN] No secedit export (secedit.inf) found; security policy skipped")
+
+    for name in POLICY_EXPORTS:
+        if not (export_dir / name).is_file():
+            continue
+        current = _load_reg(export_dir / name)
+        base = None
+        if baseline_dir is not None and (baseline_dir / name).is_file():
+            base = _load_reg(baseline_dir / name)
+        delta = diff_reg_exports(base, current)
+        compared += len(current.values) + (len(base.values) if base is not None else 0)
+        count = len(delta.values) + len(delta.deleted_keys)
+        changed += count
+        print(f"  [OK] {name}: {current.value_count} value(s), {count} change(s)")
+        if count:
+            outputs.append((name, lambda path, d=delta: d.write(path)))
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  [INFO] Compared {compared} setting(s) in {elapsed:.1f} ms")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files = []
+    for name, writer in outputs:
+        skipped = writer(str(out_dir / name))
+        if skipped:
+            print(f"  [WARN] {len(skipped)} setting(s) only in the baseline cannot be unset "
+                  f"with a security template:")
+            for change in skipped:
+                print(f"      {change.describe()}")
+        files.append(name)
+    if (export_dir / GPRESULT).is_file():
+        shutil.copyfile(export_dir / GPRESULT, out_dir / GPRESULT)
+        files.append(GPRESULT)
+
+    generated = datetime.now()
+    with open(out_dir / "IMPORT_GPO_DIFF.bat", "w", encoding="ascii", newline="") as f:
+        f.write(import_script_text(generated))
+    files.append("IMPORT_GPO_DIFF.bat")
+    with open(out_dir / "README.txt", "w", encoding="utf-8", newline="") as f:
+        f.write(readme_text(generated, files, str(baseline) if baseline is not None else None))
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a GPO_DIFF folder with only the policy settings that differ from a baseline.")
+    parser.add_argument('export_dir',
+                        help='Directory with secedit.inf and the policies_*.reg exports')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='Baseline directory (same layout) or security template (.inf)')
+    parser.add_argument('--out', metavar='DIR',
+                        help='GPO_DIFF folder to write (default: GPO_DIFF_<timestamp> in the current directory)')
+    args = parser.parse_args()
+
+    export_dir = Path(args.export_dir)
+    baseline = Path(args.baseline) if args.baseline else None
+    if not export_dir.is_dir():
+        print(f"Error: Export directory not found: {export_dir}")
+        sys.exit(1)
+    if baseline is not None and not baseline.exists():
+        print(f"Error: Baseline not found: {baseline}")
+        sys.exit(1)
+    out_dir = Path(args.out or f"GPO_DIFF_{datetime.now():%Y%m%d_%H%M%S}")
+
+    print(f"Comparing {export_dir} with {baseline or 'an empty baseline'}...")
+    try:
+        changed = write_gpo_diff(export_dir, baseline, out_dir)
+    except (OSError, InfError, RegFileError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print()
+    print(f"[OK] Wrote {out_dir} ({changed} changed setting(s))")
+
+
+if __name__ == "__main__":
+    main()
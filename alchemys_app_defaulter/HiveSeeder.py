@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Offline Image Association Seeder
+
+Writes the associations from AppDefaulter configs straight into the
+registry hive files of Windows images, without booting them or loading
+the hives (see regf_hive.py), so it also runs on Linux build hosts.
+
+Machine-wide parts (ProgIDs, HKCR, App Paths) go to the SOFTWARE hive;
+the per-user "Open with" lists go to NTUSER.DAT, normally the Default
+profile's, so every account created on the image inherits them. Each
+image is planned and applied independently (AppDefaulter's build_plan()
+and apply_plan()), and images are processed in a pool of worker processes.
+`@group` lines and protected extensions are resolved against each image's
+own HKEY_CLASSES_ROOT, through an in-memory extension catalog; explicitly
+listed extensions that are protected in an image are reported (and kept
+with --allow-protected).
+
+An image is a mounted or extracted Windows root containing
+Windows\\System32\\config\\SOFTWARE and Users\\Default\\NTUSER.DAT.
+
+Usage:
+    python HiveSeeder.py <config_file|config_dir> [...] --image ROOT [...] [--jobs N]
+    python HiveSeeder.py <config_file|config_dir> [...] --images-file LIST [--jobs N]
+    python HiveSeeder.py <config_file|config_dir> [...] --software SOFTWARE [--ntuser NTUSER.DAT]
+
+Example:
+    python HiveSeeder.py sublimetext.apps --images-file images.txt --jobs 8
+"""
+
+import argparse
+import contextlib
+import io
+import ntpath
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import AppDefaulter
+from extension_catalog import ExtensionCatalog
+from regf_hive import HiveRegistry
+
+
+SOFTWARE_HIVE = ("Windows", "System32", "config", "SOFTWARE")
+DEFAULT_NTUSER = ("Users", "Default", "NTUSER.DAT")
+
+
+def find_path(root: Path, parts: tuple) -> Optional[Path]:
+    """Resolve a path under root, ignoring case (images extracted on Linux keep Windows casing)."""
+    path = root
+    for part in parts:
+        exact = path / part
+        if exact.exists():
+            path = exact
+            continue
+        try:
+            matches = [entry for entry in path.iterdir() if entry.name.lower() == part.lower()]
+        except OSError:
+            return None
+        if not matches:
+            return None
+        path = matches[0]
+    return path
+
+
+def image_hives(root: str) -> tuple[Optional[str], Optional[str]]:
+    """(SOFTWARE, Default profile NTUSER.DAT) of a Windows root; None for missing files."""
+    software = find_path(Path(root), SOFTWARE_HIVE)
+    ntuser = find_path(Path(root), DEFAULT_NTUSER)
+    return (str(software) if software else None, str(ntuser) if ntuser else None)
+
+
+def seed_hives(name: str, software: Optional[str], ntuser: Optional[str], configs: list,
+               force: bool, allow_protected: bool = False) -> dict:
+    """
+    Plan and apply the associations to one pair of hive files.
+
+    Runs in a worker process; all output is captured into the result.
+
+    Args:
+        name: Image name, for messages
+        software: SOFTWARE hive file, or None
+        ntuser: NTUSER.DAT hive file, or None
+        configs: Parsed AppConfigs, in priority order
+        force: Override existing defaults
+        allow_protected: Keep protected extensions that are listed explicitly
+
+    Returns:
+        Dict with name, ok, error, counts, values_written, seconds, log and
+        protected ((extension, reason) left out although listed explicitly)
+    """
+    start = time.perf_counter()
+    log = io.StringIO()
+    result = {"name": name, "ok": False, "error": None, "counts": {}, "values_written": 0,
+              "protected": []}
+    # Worker processes are reused between images: reset the per-run state
+    AppDefaulter.write_stats = AppDefaulter.WriteStats()
+    AppDefaulter.progid_cache.clear()
+    AppDefaulter.executable_cache.clear()
+    try:
+        with contextlib.redirect_stdout(log), HiveRegistry(software, ntuser) as backend:
+            AppDefaulter.set_registry_backend(backend)
+            with ExtensionCatalog(":memory:") as catalog:
+                AppDefaulter.build_extension_catalog(catalog)
+                AppDefaulter.expand_config_groups(configs, catalog, allow_protected)
+            for config in configs:
+                result["protected"].extend(config.protected)
+                AppDefaulter.print_protected(config)
+            file_exts = AppDefaulter.open_file_exts_root() if ntuser else None
+            plan = AppDefaulter.build_plan(configs, AppDefaulter.assign_extension_owners(configs),
+                                           force, file_exts)
+            result["counts"] = AppDefaulter.apply_plan(plan, file_exts)
+            result["ok"] = result["counts"]["failed"] == 0
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+    result["values_written"] = AppDefaulter.write_stats.written
+    result["seconds"] = time.perf_counter() - start
+    result["log"] = log.getvalue()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write file associations into offline Windows image hives.")
+    parser.add_argument('config_files', nargs='+', metavar='config_file',
+                        help='AppDefaulter configuration file, or a directory of .apps files')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--image', nargs='+', metavar='ROOT',
+                        help='Windows root(s) of the images to seed')
+    target.add_argument('--images-file', metavar='LIST',
+                        help='Text file with one image root per line')
+    target.add_argument('--software', metavar='HIVE',
+                        help='A single SOFTWARE hive file (use with --ntuser)')
+    parser.add_argument('--ntuser', metavar='HIVE',
+                        help='With --software: the NTUSER.DAT hive file')
+    parser.add_argument('--force', '-f', action='store_true',
+                        help='Override defaults already set in the image')
+    parser.add_argument('--allow-protected', action='store_true',
+                        help='Associate protected extensions that are listed explicitly')
+    parser.add_argument('--priority', metavar='NAMES',
+                        help='Comma-separated config or app names that win when several '
+                             'configs list the same extension')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, metavar='N',
+                        help='Images processed at once (default: number of CPUs)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Print the full log of every image')
+    args = parser.parse_args()
+
+    if args.ntuser and not args.software:
+        parser.error("--ntuser requires --software")
+
+    # Parse the configs once; workers receive the parsed result
+    try:
+        configs = [AppDefaulter.load_app_config(path)
+                   for path in AppDefaulter.expand_config_paths(args.config_files)]
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    configs = AppDefaulter.order_by_priority(configs, (args.priority or "").split(","))
+    for config in configs:
+        config.exe_path = ntpath.abspath(config.exe_path)
+
+    tasks = []      # (name, software, ntuser)
+    if args.software:
+        tasks.append((args.software, args.software, args.ntuser))
+    else:
+        roots = args.image or []
+        if args.images_file:
+            try:
+                with open(args.images_file, 'r', encoding='utf-8') as f:
+                    roots = [line.strip() for line in f
+                             if line.strip() and not line.lstrip().startswith('#')]
+            except OSError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+        for root in roots:
+            software, ntuser = image_hives(root)
+            if software is None:
+                print(f"[WARN] {root}: no Windows\\System32\\config\\SOFTWARE; skipped")
+                continue
+            if ntuser is None:
+                print(f"[WARN] {root}: no Users\\Default\\NTUSER.DAT; seeding SOFTWARE only")
+            tasks.append((root, software, ntuser))
+    if not tasks:
+        print("Error: No images to seed.")
+        sys.exit(1)
+
+    print(f"Seeding {len(tasks)} image(s) with {len(configs)} config(s) "
+          f"on up to {min(args.jobs, len(tasks))} process(es)...")
+    start = time.perf_counter()
+    failed = 0
+    values = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(tasks)))) as pool:
+        futures = [pool.submit(seed_hives, name, software, ntuser, configs, args.force,
+                               args.allow_protected)
+                   for name, software, ntuser in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            values += result["values_written"]
+            if args.verbose:
+                print(result["log"])
+            else:
+                for ext, reason in result["protected"]:
+                    print(f"  [SKIPPED] {result['name']}: {ext}: protected ({reason}); "
+                          f"pass --allow-protected to associate it anyway")
+            counts = result["counts"]
+            if result["error"]:
+                failed += 1
+                print(f"  [FAILED] {result['name']}: {result['error']}")
+            elif not result["ok"]:
+                failed += 1
+                print(f"  [WARN] {result['name']}: {counts['failed']} association(s) failed")
+            else:
+                print(f"  [OK] {result['name']}: {counts['set_default']} default(s), "
+                      f"{counts['open_with']} 'Open with', {result['values_written']} value(s) "
+                      f"written ({result['seconds']:.2f}s)")
+    elapsed = time.perf_counter() - start
+
+    print()
+    print("=" * 70)
+    print("Summary:")
+    print(f"  Images seeded:            {len(tasks) - failed}")
+    print(f"  Failed:                   {failed}")
+    print(f"  Registry values written:  {values}")
+    print(f"  Elapsed:                  {elapsed:.2f}s")
+    print("=" * 70)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
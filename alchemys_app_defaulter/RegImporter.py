@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Batched .reg Importer
+
+Imports a set of .reg files in one process instead of one `reg import` per
+file. All files are parsed (REGEDIT5 or REGEDIT4) and merged into a single
+model first, so values that two files set differently are reported before
+anything is written. The merged set is then applied in one pass through the
+same registry layer AppDefaulter.py uses: each key is read once, and only
+values that actually differ are written.
+
+Files are applied in order (command line order; files from a directory are
+sorted by name), and later files win conflicts, just like running
+`reg import` on each file in turn.
+
+ScriptScheduler.py runs it for the .reg files of alchemys_custom_scripts
+(see @@@@run_all_scripts_in_current_folder.bat there); it lives here, next
+to AppDefaulter.py, whose registry layer it shares.
+
+Usage:
+    python RegImporter.py <file.reg|directory> [...] [--dry-run] [--strict]
+    python RegImporter.py <file.reg|directory> [...] --emit-reg merged.reg
+    python RegImporter.py <file.reg|directory> [...] --check
+
+Example:
+    python RegImporter.py ..\\alchemys_custom_scripts
+"""
+
+import argparse
+import sys
+from collections import OrderedDict
+from pathlib import Path
+
+import AppDefaulter
+from AppDefaulter import RegistryWrite, apply_registry_writes, delete_key_tree, write_stats
+from regfile import (OP_DELETE_VALUE, OP_SET_VALUE, RegFileError, RegModel,
+                     parse_reg_file)
+
+
+def expand_reg_paths(paths: list[str]) -> list[str]:
+    """
+    Expand directories into the .reg files they contain.
+
+    Args:
+        paths: .reg files and/or directories, in apply order
+
+    Returns:
+        .reg file paths; files found in a directory are sorted by name
+    """
+    expanded = []
+    for path in paths:
+        if Path(path).is_dir():
+            found = sorted(str(p) for p in Path(path).glob("*.reg") if p.is_file())
+            if not found:
+                raise FileNotFoundError(f"No .reg files found in directory: {path}")
+            expanded.extend(found)
+        else:
+            if not Path(path).is_file():
+                raise FileNotFoundError(f"Registry file not found: {path}")
+            expanded.append(path)
+    return list(dict.fromkeys(expanded))
+
+
+def load_reg_files(paths: list[str]) -> RegModel:
+    """
+    Parse and merge .reg files.
+
+    Args:
+        paths: .reg files, in apply order
+
+    Returns:
+        RegModel with every file merged (see RegModel.conflicts)
+
+    Raises:
+        RegFileError: If a file cannot be parsed
+    """
+    model = RegModel()
+    for path in paths:
+        ops = parse_reg_file(path)
+        model.add_all(ops)
+        values = sum(1 for op in ops if op.kind == OP_SET_VALUE)
+        print(f"  [OK] {Path(path).name}: {values} value(s), {len(ops) - values} other operation(s)")
+    return model
+
+
+def apply_reg_model(model: RegModel) -> tuple[int, int, int]:
+    """
+    Apply a merged model through AppDefaulter's registry layer.
+
+    Key deletions run first, then each key's values are applied as one
+    batch with apply_registry_writes() (values already in place are not
+    rewritten), then value deletions.
+
+    Args:
+        model: The merged .reg files
+
+    Returns:
+        Tuple of (keys deleted, values deleted, failures); a key that cannot
+        be written counts one failure per value it would have received
+    """
+    registry = AppDefaulter.registry
+    keys_deleted = 0
+    values_deleted = 0
+    failed = 0
+
+    for op in model.deleted_keys.values():
+        if delete_key_tree(op.root, op.path):
+            keys_deleted += 1
+        else:
+            print(f"  [FAILED] Could not delete {op.key_name} ({op.location})")
+            failed += 1
+
+    by_key = OrderedDict((key, []) for key in model.keys)
+    deletions = []
+    for value_key, op in model.values.items():
+        if op.kind == OP_DELETE_VALUE:
+            deletions.append(op)
+        else:
+            by_key[value_key[:2]].append(op)
+
+    for key, ops in by_key.items():
+        key_op = model.keys[key]
+        failed_before = write_stats.failed
+        try:
+            if ops:
+                apply_registry_writes([RegistryWrite(op.root, op.path, op.name, op.value_type, op.data)
+                                       for op in ops])
+            else:
+                # Empty key section - only make sure the key exists
+                try:
+                    registry.OpenKey(key_op.root, key_op.path, 0, registry.KEY_READ).Close()
+                except FileNotFoundError:
+                    registry.CreateKeyEx(key_op.root, key_op.path, 0, registry.KEY_WRITE).Close()
+        except OSError as e:
+            print(f"  [FAILED] {key_op.key_name} ({key_op.location}): {e}")
+            failed += max(1, write_stats.failed - failed_before)
+
+    for op in deletions:
+        try:
+            with registry.OpenKey(op.root, op.path, 0, registry.KEY_ALL_ACCESS) as key:
+                registry.DeleteValue(key, op.name)
+            values_deleted += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"  [FAILED] Could not delete {op.key_name} [{op.name or '@'}] ({op.location}): {e}")
+            failed += 1
+
+    return keys_deleted, values_deleted, failed
+
+
+def _key_exists(root, path: str) -> bool:
+    registry = AppDefaulter.registry
+    try:
+        registry.OpenKey(root, path, 0, registry.KEY_READ).Close()
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def pending_operations(model: RegModel) -> list:
+    """
+    Operations of a merged model that are not reflected in the registry yet.
+
+    Only reads the registry. A key deletion the files follow by re-creating
+    the key (the "replace this key" idiom) counts as done when the key
+    exists; its new values are checked like any others.
+
+    Args:
+        model: The merged .reg files
+
+    Returns:
+        The RegOps that importing the files would still change (empty if
+        everything is already in place)
+
+    Raises:
+        OSError: If a key or value cannot be read
+    """
+    registry = AppDefaulter.registry
+    pending = []
+    for key, op in model.deleted_keys.items():
+        recreated = any(created[0] == key[0] and (created[1] == key[1]
+                                                  or created[1].startswith(key[1] + "\\"))
+                        for created in model.keys)
+        if not recreated and _key_exists(op.root, op.path):
+            pending.append(op)
+    for key, op in model.keys.items():
+        if not _key_exists(op.root, op.path):
+            pending.append(op)
+    for op in model.values.values():
+        try:
+            with registry.OpenKey(op.root, op.path, 0, registry.KEY_READ) as key:
+                current, current_type = registry.QueryValueEx(key, op.name)
+        except FileNotFoundError:
+            if op.kind == OP_SET_VALUE:
+                pending.append(op)
+            continue
+        if op.kind == OP_DELETE_VALUE or not AppDefaulter._values_equal(
+                current, current_type, op.data, op.value_type):
+            pending.append(op)
+    return pending
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import several .reg files in one merged, conflict-checked pass.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Files are applied in command-line order (files from a directory sorted by
+name). If two files set the same value differently, the conflict is
+reported and the later file wins, as with consecutive `reg import` runs.
+        """
+    )
+    parser.add_argument('paths', nargs='+', metavar='reg_file',
+                        help='A .reg file, or a directory of .reg files')
+    parser.add_argument('--dry-run', '-n', action='store_true',
+                        help='Parse, merge and report conflicts without changing the registry')
+    parser.add_argument('--strict', action='store_true',
+                        help='Do not apply anything if the files conflict')
+    parser.add_argument('--emit-reg', metavar='OUT_REG',
+                        help='Write the merged files to a single .reg file instead of applying')
+    parser.add_argument('--check', action='store_true',
+                        help='Only report whether the files are already in place '
+                             '(exit code 0) or would change something (exit code 2)')
+    args = parser.parse_args()
+
+    try:
+        paths = expand_reg_paths(args.paths)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Parsing {len(paths)} registry file(s)...")
+    try:
+        model = load_reg_files(paths)
+    except (OSError, RegFileError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print()
+
+    print(f"Merged: {model.value_count} value(s), {len(model.deleted_keys)} key deletion(s), "
+          f"{len(model.values) - model.value_count} value deletion(s)")
+    if model.conflicts:
+        print()
+        print(f"[WARN] {len(model.conflicts)} conflict(s):")
+        for conflict in model.conflicts:
+            print(f"  {conflict.describe()}")
+        if args.strict:
+            print()
+            print("Error: Conflicting files (--strict); nothing was applied.")
+            sys.exit(1)
+    print()
+
+    if args.emit_reg:
+        try:
+            model.write(args.emit_reg)
+        except OSError as e:
+            print(f"Error: Could not write {args.emit_reg}: {e}")
+            sys.exit(1)
+        print(f"[OK] Wrote merged registry file to {args.emit_reg}")
+        return
+
+    if args.dry_run:
+        print("[DRY RUN] No changes made.")
+        return
+
+    if AppDefaulter.registry is None:
+        print("Error: This script only works on Windows.")
+        print("       Use --dry-run or --emit-reg on other systems.")
+        sys.exit(1)
+
+    if args.check:
+        try:
+            pending = pending_operations(model)
+        except OSError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        for op in pending:
+            print(f"  [PENDING] {op.key_name} [{op.name or '@'}] ({op.location})"
+                  if op.name is not None else f"  [PENDING] {op.key_name} ({op.location})")
+        print(f"{len(pending)} operation(s) not in place")
+        sys.exit(2 if pending else 0)
+
+    if not AppDefaulter.is_admin():
+        print("[WARN] Not running as Administrator; HKEY_LOCAL_MACHINE and")
+        print("       HKEY_CLASSES_ROOT changes may fail.")
+        print()
+
+    print("Applying...")
+    keys_deleted, values_deleted, failed = apply_reg_model(model)
+
+    print()
+    print("=" * 70)
+    print("Summary:")
+    print(f"  Registry values written:  {write_stats.written}")
+    print(f"  Already up to date:       {write_stats.skipped}")
+    print(f"  Keys deleted:             {keys_deleted}")
+    print(f"  Values deleted:           {values_deleted}")
+    print(f"  Failed:                   {failed}")
+    print("=" * 70)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
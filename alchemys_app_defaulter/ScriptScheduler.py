@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Concurrent Script Runner
+
+Runs the tweak scripts of a folder (.reg, .bat and .ps1, by default
+..\\alchemys_custom_scripts) as a dependency graph instead of one after
+another: independent scripts run at the same time on a bounded pool, and
+each script's wall time is reported (see task_scheduler.py).
+
+The order of the old launcher is kept between types: every .bat starts
+after all .reg files finished and every .ps1 after all .bat files, whether
+they succeeded or not. Only scripts of the same type run concurrently.
+
+The .reg files are not separate tasks: they are imported together as one
+task, REG_TASK, by RegImporter.py in name order, so values that two files
+set differently are reported and the later file wins, as with the old
+launcher's one-by-one `reg import`.
+
+Per-script metadata comes from the folder's scripts.ini, one section per
+file name:
+
+    [set_power_plan_to_ultimate_performance.bat]
+    admin = yes
+    depends = disable_hibernation.bat
+    conflicts = remove_office_apps_new_file.bat
+    check = powercfg /getactivescheme | findstr /i e9a42b02-d5df-448d-aa00-03f14749eb61
+    timeout = 120
+
+- admin: only run when elevated (default: no; .reg files that write
+  HKEY_LOCAL_MACHINE, HKEY_CLASSES_ROOT or HKEY_USERS always need it)
+- depends / conflicts: comma-separated names of other tasks (naming a
+  .reg file means REG_TASK)
+- check: command line that exits with 0 when the script's result is
+  already in place, so the script is skipped (not for .reg files, which
+  are checked against the registry directly, see
+  RegImporter.pending_operations())
+- timeout: wall-time limit in seconds (default: --timeout)
+- command: command line to run instead of a file; a section with a
+  command does not need a file of its name (e.g. stub tasks for testing)
+
+Scripts run with the folder as working directory and no console input,
+so a trailing `pause` does not hold up the run.
+
+Usage:
+    python ScriptScheduler.py [folder] [--jobs N] [--dry-run] [--verbose]
+
+Example:
+    python ScriptScheduler.py ..\\alchemys_custom_scripts --jobs 4
+"""
+
+import argparse
+import configparser
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import AppDefaulter
+from RegImporter import pending_operations
+from regfile import RegFileError, RegModel, parse_reg_file
+from task_scheduler import (STATUS_BLOCKED, STATUS_FAILED, STATUS_IN_PLACE, STATUS_NO_ADMIN,
+                            STATUS_OK, STATUS_TIMEOUT, Task, TaskGraphError,
+                            dependency_levels, run_tasks)
+
+
+MANIFEST_NAME = "scripts.ini"
+SCRIPT_SUFFIXES = (".reg", ".bat", ".ps1")
+DEFAULT_FOLDER = Path(__file__).resolve().parent.parent / "alchemys_custom_scripts"
+REG_IMPORTER = Path(__file__).resolve().parent / "RegImporter.py"
+CHECK_TIMEOUT = 60
+
+# The one task that imports every .reg file of the folder
+REG_TASK = "*.reg"
+
+# .reg roots that need an elevated `reg import`
+_ADMIN_ROOTS = frozenset(("HKEY_LOCAL_MACHINE", "HKEY_CLASSES_ROOT", "HKEY_USERS"))
+
+# Result status -> output tag
+STATUS_TAGS = {
+    STATUS_OK: "[OK]",
+    STATUS_IN_PLACE: "[SKIPPED]",
+    STATUS_NO_ADMIN: "[SKIPPED]",
+    STATUS_FAILED: "[FAILED]",
+    STATUS_TIMEOUT: "[FAILED]",
+    STATUS_BLOCKED: "[BLOCKED]",
+}
+
+
+class ManifestError(ValueError):
+    """scripts.ini names something that cannot be scheduled."""
+
+
+def find_scripts(folder: Path) -> list[Path]:
+    """
+    The scripts of a folder, sorted by name.
+
+    Names starting with '@' (the launcher batch file) are not tasks.
+    """
+    return sorted((p for p in folder.iterdir()
+                   if p.is_file() and p.suffix.lower() in SCRIPT_SUFFIXES
+                   and not p.name.startswith("@")),
+                  key=lambda p: p.name.lower())
+
+
+def _split_names(value: str) -> list[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def _command_check(command: str, cwd: Path):
+    """A Task.check that runs a command line and reports exit code 0 as in place."""
+    def check() -> bool:
+        return subprocess.run(command, shell=True, cwd=cwd, stdin=subprocess.DEVNULL,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              timeout=CHECK_TIMEOUT).returncode == 0
+    return check
+
+
+def _reg_check(model: RegModel):
+    """A Task.check that reports a .reg file as in place when importing it would change nothing."""
+    def check() -> bool:
+        return not pending_operations(model)
+    return check
+
+
+def _reg_needs_admin(model: RegModel) -> bool:
+    return any(op.key_name.split("\\", 1)[0] in _ADMIN_ROOTS for op in model.operations())
+
+
+def merge_reg_files(paths: list) -> RegModel:
+    """Parse .reg files into one model, in the order given (see RegModel.conflicts)."""
+    model = RegModel()
+    for path in paths:
+        model.add_all(parse_reg_file(str(path)))
+    return model
+
+
+def script_command(path: Path) -> list[str]:
+    """The command that runs one script, by its extension."""
+    suffix = path.suffix.lower()
+    if suffix == ".reg":
+        return [sys.executable, str(REG_IMPORTER), str(path)]
+    if suffix == ".ps1":
+        return ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", str(path)]
+    return ["cmd", "/c", str(path)]
+
+
+def load_tasks(folder: Path, manifest_path: Optional[Path], timeout: float,
+               check: bool = True) -> list[Task]:
+    """
+    Build the tasks for a folder's scripts and its manifest.
+
+    Args:
+        folder: Folder with the scripts
+        manifest_path: scripts.ini (None or missing: no metadata)
+        timeout: Default per-task wall-time limit in seconds
+        check: Attach the "already in place" checks
+
+    Returns:
+        Tasks: the folder's scripts sorted by name, with all .reg files
+        folded into REG_TASK, then command-only manifest sections in file
+        order; each runs after the tasks of the previous type in
+        SCRIPT_SUFFIXES (see script_phases())
+
+    Raises:
+        ManifestError: For a section without a file or command, or a bad value
+        RegFileError: If a .reg file cannot be parsed
+    """
+    manifest = configparser.ConfigParser(interpolation=None)
+    manifest.optionxform = str
+    if manifest_path is not None and manifest_path.is_file():
+        manifest.read(manifest_path, encoding="utf-8-sig")
+
+    scripts = {path.name.lower(): path for path in find_scripts(folder)}
+    sections = {name.lower(): name for name in manifest.sections()}
+    names = [path.name for path in scripts.values()]
+    for key, name in sections.items():
+        if key not in scripts:
+            if not manifest.get(name, "command", fallback=""):
+                raise ManifestError(f"{MANIFEST_NAME}: [{name}]: no such script in {folder} "
+                                    f"and no command")
+            names.append(name)
+
+    tasks = []
+    reg_task = None
+    reg_paths = []
+    for name in names:
+        section = manifest[sections[name.lower()]] if name.lower() in sections else {}
+        path = scripts.get(name.lower())
+        try:
+            task_timeout = float(section.get("timeout", timeout))
+            needs_admin = (configparser.ConfigParser.BOOLEAN_STATES[
+                section.get("admin", "no").strip().lower()])
+        except (ValueError, KeyError):
+            raise ManifestError(f"{MANIFEST_NAME}: [{name}]: invalid admin or timeout value")
+        depends = _split_names(section.get("depends", ""))
+        conflicts = _split_names(section.get("conflicts", ""))
+        if path is not None and path.suffix.lower() == ".reg" and "command" not in section:
+            if section.get("check"):
+                raise ManifestError(f"{MANIFEST_NAME}: [{name}]: .reg files are checked "
+                                    f"against the registry; remove the check")
+            if reg_task is None:
+                reg_task = Task(name=REG_TASK, command=[], timeout=timeout, cwd=str(folder))
+                tasks.append(reg_task)
+            reg_paths.append(path)
+            reg_task.depends += depends
+            reg_task.conflicts += conflicts
+            reg_task.needs_admin = reg_task.needs_admin or needs_admin
+            reg_task.timeout = max(reg_task.timeout, task_timeout)
+            continue
+        task = Task(name=name, command=section.get("command") or script_command(path),
+                    depends=depends, conflicts=conflicts,
+                    needs_admin=needs_admin, timeout=task_timeout, cwd=str(folder))
+        if check and section.get("check"):
+            task.check = _command_check(section["check"], folder)
+        tasks.append(task)
+
+    if reg_task is not None:
+        model = merge_reg_files(reg_paths)
+        reg_task.command = [sys.executable, str(REG_IMPORTER), *map(str, reg_paths)]
+        reg_task.needs_admin = reg_task.needs_admin or _reg_needs_admin(model)
+        if check and AppDefaulter.registry is not None:
+            reg_task.check = _reg_check(model)
+        # Names of the merged files now mean the import task
+        merged = {path.name.lower() for path in reg_paths}
+        for task in tasks:
+            for names_attr in ("depends", "conflicts"):
+                resolved = [REG_TASK if n.lower() in merged else n for n in getattr(task, names_attr)]
+                setattr(task, names_attr, [n for n in dict.fromkeys(resolved) if n != task.name])
+    script_phases(tasks)
+    return tasks
+
+
+def script_phases(tasks: list[Task]):
+    """
+    Order the tasks by type, in place: .reg, then .bat, then .ps1.
+
+    Each task gets the tasks of the previous non-empty type as `after`
+    (ordering only, so a failed import does not block the batch files).
+    Tasks with another suffix (command-only sections) are not ordered.
+    """
+    previous = []
+    for suffix in SCRIPT_SUFFIXES:
+        phase = [task for task in tasks if Path(task.name).suffix.lower() == suffix]
+        if not phase:
+            continue
+        for task in phase:
+            task.after = [t.name for t in previous if t.name not in task.depends]
+        previous = phase
+
+
+def describe_result(result) -> str:
+    tag = STATUS_TAGS[result.status]
+    if result.status == STATUS_OK:
+        text = f"{result.name} ({result.seconds:.2f}s)"
+    elif result.status == STATUS_IN_PLACE:
+        text = f"{result.name}: already in place ({result.seconds:.2f}s)"
+    elif result.status == STATUS_NO_ADMIN:
+        text = f"{result.name}: needs Administrator"
+    elif result.status == STATUS_BLOCKED:
+        text = f"{result.name}: {result.detail}"
+    elif result.status == STATUS_TIMEOUT:
+        text = f"{result.name}: {result.detail}"
+    elif result.returncode is not None:
+        text = f"{result.name}: exit code {result.returncode} ({result.seconds:.2f}s)"
+    else:
+        text = f"{result.name}: {result.detail}"
+    return f"  {tag} {text}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the tweak scripts of a folder concurrently, in dependency order.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+Metadata (admin, depends, conflicts, check, timeout, command) is read from
+{MANIFEST_NAME} in the folder; see the header of ScriptScheduler.py.
+Scripts whose check reports them as already in place are skipped; use
+--no-check to run everything.
+        """
+    )
+    parser.add_argument('folder', nargs='?', default=str(DEFAULT_FOLDER),
+                        help='Folder with the scripts (default: alchemys_custom_scripts)')
+    parser.add_argument('--manifest', metavar='INI',
+                        help=f'Metadata file (default: {MANIFEST_NAME} in the folder)')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, metavar='N',
+                        help='Scripts run at once (default: number of CPUs)')
+    parser.add_argument('--timeout', type=float, default=300, metavar='SECONDS',
+                        help='Default wall-time limit per script (default: 300)')
+    parser.add_argument('--no-check', action='store_true',
+                        help='Run every script, even if its result is already in place')
+    parser.add_argument('--dry-run', '-n', action='store_true',
+                        help='Show the schedule without running anything')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help="Print each script's output")
+    args = parser.parse_args()
+
+    folder = Path(args.folder).resolve()
+    if not folder.is_dir():
+        print(f"Error: Folder not found: {folder}")
+        sys.exit(1)
+    manifest_path = Path(args.manifest) if args.manifest else folder / MANIFEST_NAME
+    if args.manifest and not manifest_path.is_file():
+        print(f"Error: Manifest not found: {manifest_path}")
+        sys.exit(1)
+
+    try:
+        tasks = load_tasks(folder, manifest_path, args.timeout, check=not args.no_check)
+        levels = dependency_levels(tasks)
+    except (ManifestError, TaskGraphError, RegFileError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not tasks:
+        print(f"Error: No scripts found in {folder}")
+        sys.exit(1)
+
+    admin = AppDefaulter.is_admin()
+    by_name = {task.name: task for task in tasks}
+    print(f"Scheduling {len(tasks)} task(s) from {folder} on up to {args.jobs} worker(s), "
+          f"{len(levels)} stage(s)")
+    if REG_TASK in by_name:
+        reg_paths = by_name[REG_TASK].command[2:]
+        print(f"  {REG_TASK}: {len(reg_paths)} registry file(s), imported together by "
+              f"{REG_IMPORTER.name}")
+        conflicts = merge_reg_files(reg_paths).conflicts
+        if conflicts:
+            print(f"[WARN] {len(conflicts)} registry value(s) set differently by two files "
+                  f"(the later file wins):")
+            for conflict in conflicts:
+                print(f"  {conflict.describe()}")
+    if not admin:
+        print("[WARN] Not running as Administrator; scripts marked admin will be skipped.")
+    print()
+
+    if args.dry_run:
+        print("[DRY RUN] Schedule:")
+        for depth, names in enumerate(levels):
+            print(f"  Stage {depth + 1}:")
+            for name in names:
+                task = by_name[name]
+                notes = []
+                if task.needs_admin:
+                    notes.append("admin")
+                if task.depends:
+                    notes.append(f"needs {', '.join(task.depends)}")
+                if task.conflicts:
+                    notes.append(f"not with {', '.join(task.conflicts)}")
+                if task.check is not None:
+                    notes.append("checked")
+                print(f"    {name}" + (f" ({'; '.join(notes)})" if notes else ""))
+        return
+
+    def on_result(result):
+        print(describe_result(result))
+        if args.verbose and result.output.strip():
+            for line in result.output.rstrip().splitlines():
+                print(f"      {line}")
+
+    print("Running...")
+    start = time.perf_counter()
+    results = run_tasks(tasks, jobs=args.jobs, admin=admin, on_result=on_result)
+    elapsed = time.perf_counter() - start
+
+    counts = {status: sum(1 for r in results if r.status == status) for status in STATUS_TAGS}
+    print()
+    print("=" * 70)
+    print("Summary:")
+    print(f"  Completed:                {counts[STATUS_OK]}")
+    print(f"  Already in place:         {counts[STATUS_IN_PLACE]}")
+    print(f"  Skipped (not admin):      {counts[STATUS_NO_ADMIN]}")
+    print(f"  Failed:                   {counts[STATUS_FAILED] + counts[STATUS_TIMEOUT]}")
+    print(f"  Blocked:                  {counts[STATUS_BLOCKED]}")
+    print(f"  Script time:              {sum(r.seconds for r in results):.2f}s")
+    print(f"  Elapsed:                  {elapsed:.2f}s")
+    print("=" * 70)
+    if counts[STATUS_FAILED] or counts[STATUS_TIMEOUT] or counts[STATUS_BLOCKED]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Tweak Profile Diff
+
+Compares the O&O ShutUp10++, Winaero Tweaker and visual effects profiles
+with the machine's current state and applies (or writes out) only the
+settings that differ, instead of re-applying every profile in full.
+
+The current state comes from snapshots given with --current: an export
+from the same tool (O&O ShutUp10++ "Export settings", Winaero Tweaker
+"Export", export_visual_effects.ps1) or a .reg dump of HKEY_CURRENT_USER.
+Visual effects are read straight from the registry when no snapshot is
+given. A profile without a snapshot is treated as entirely out of date.
+
+Usage:
+    python TweakDiff.py <profile> [...] [--current SNAPSHOT [...]] [--out-dir DIR]
+    python TweakDiff.py <profile> [...] [--current SNAPSHOT [...]] --apply [--oosu-exe PATH]
+
+Example:
+    python TweakDiff.py ..\\oosu_10_alchemy\\ooshutup10.cfg ..\\alchemys_custom_scripts\\visual_effects_importer_and_exporter\\visual_effects.ini ^
+        --current ooshutup10_current.cfg --apply --oosu-exe ..\\oosu_10_alchemy\\OOSU10.exe
+"""
+
+import argparse
+import ctypes
+import subprocess
+import sys
+from pathlib import Path
+
+import AppDefaulter
+import memory_registry as _mr
+from AppDefaulter import RegistryWrite, apply_registry_writes, write_stats
+from regfile import OP_SET_VALUE, RegModel, RegOp
+from tweak_profiles import (KIND_NAMES, KIND_OOSU, KIND_VISUAL, KIND_WINAERO,
+                            VISUAL_FX_SETTING, TweakProfileError, delta_profile,
+                            diff_profile, load_profile, read_visual_effects,
+                            visual_effects_values, write_profile)
+
+
+# Delta file names, by profile kind
+DELTA_FILES = {
+    KIND_OOSU: "ooshutup10_delta.cfg",
+    KIND_WINAERO: "winaero_tweaker_delta.ini",
+    KIND_VISUAL: "visual_effects_delta.reg",
+}
+
+
+def load_snapshots(paths: list[str]) -> dict:
+    """
+    Load current-state snapshots.
+
+    Args:
+        paths: Snapshot files; at most one per profile kind
+
+    Returns:
+        Dict of kind -> TweakProfile
+    """
+    snapshots = {}
+    for path in paths:
+        snapshot = load_profile(path)
+        if snapshot.kind in snapshots:
+            raise TweakProfileError(f"{path}: more than one {KIND_NAMES[snapshot.kind]} snapshot")
+        snapshots[snapshot.kind] = snapshot
+    return snapshots
+
+
+def _visual_effects_writes(delta, registry) -> list[RegistryWrite]:
+    """Registry writes for a visual effects delta (plus the "Custom" Performance Options mode)."""
+    hkcu = registry.HKEY_CURRENT_USER
+    return [RegistryWrite(hkcu, path, name, value_type, data)
+            for path, name, value_type, data in [VISUAL_FX_SETTING, *visual_effects_values(delta)]]
+
+
+def write_delta(delta, path: str):
+    """
+    Write a delta file: the tool's own format for O&O ShutUp10++ and
+    Winaero Tweaker, a .reg file for visual effects (import_visual_effects.ps1
+    needs every value, so a partial visual_effects.ini cannot be imported).
+    """
+    if delta.kind != KIND_VISUAL:
+        write_profile(delta, path)
+        return
+    model = RegModel()
+    model.add_all([RegOp(OP_SET_VALUE, write.root, write.path, write.name, write.value_type,
+                         write.data, Path(path).name)
+                   for write in _visual_effects_writes(delta, _mr)])
+    model.write(path)
+
+
+def broadcast_setting_change():
+    """Tell running applications that user settings changed (WM_SETTINGCHANGE)."""
+    try:
+        HWND_BROADCAST = 0xFFFF
+        WM_SETTINGCHANGE = 0x001A
+        SMTO_ABORTIFHUNG = 0x0002
+        result = ctypes.c_size_t()
+        ctypes.windll.user32.SendMessageTimeoutW(HWND_BROADCAST, WM_SETTINGCHANGE, 0, None,
+                                                 SMTO_ABORTIFHUNG, 5000, ctypes.byref(result))
+    except Exception as e:
+        print(f"  [WARN] Could not broadcast the settings change: {e}")
+
+
+def apply_visual_effects(delta) -> bool:
+    """
+    Write a visual effects delta through AppDefaulter's registry layer.
+
+    Returns:
+        True if every value was written
+    """
+    try:
+        apply_registry_writes(_visual_effects_writes(delta, AppDefaulter.registry))
+    except OSError as e:
+        print(f"  [FAILED] Could not write visual effects: {e}")
+        return False
+    broadcast_setting_change()
+    print(f"  [OK] Visual effects: {len(delta)} value(s) applied; some effects "
+          f"only show after signing out")
+    return True
+
+
+def run_oosu(exe: str, cfg_path: str) -> bool:
+    """Import a configuration with O&O ShutUp10++ (no UI)."""
+    try:
+        result = subprocess.run([exe, cfg_path, "/quiet"])
+    except OSError as e:
+        print(f"  [FAILED] Could not run {exe}: {e}")
+        return False
+    if result.returncode != 0:
+        print(f"  [FAILED] {Path(exe).name} exited with code {result.returncode}")
+        return False
+    print(f"  [OK] O&O ShutUp10++: imported {Path(cfg_path).name}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply only the parts of the tweak profiles that differ from the current state.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Applying:
+  Visual effects are written to the registry directly (only changed values).
+  O&O ShutUp10++ imports the delta .cfg when --oosu-exe is given.
+  Winaero Tweaker has no unattended import; import the delta .ini from
+  File > Import and export.
+        """
+    )
+    parser.add_argument('profiles', nargs='+', metavar='profile',
+                        help='ooshutup10.cfg, a Winaero Tweaker .ini, or visual_effects.ini')
+    parser.add_argument('--current', nargs='+', default=[], metavar='SNAPSHOT',
+                        help='Export of the current state (same formats, or a .reg dump)')
+    parser.add_argument('--out-dir', metavar='DIR',
+                        help='Write delta files here (default with --apply: current directory)')
+    parser.add_argument('--apply', action='store_true',
+                        help='Apply the delta')
+    parser.add_argument('--oosu-exe', metavar='PATH',
+                        help='OOSU10.exe, used by --apply to import the O&O ShutUp10++ delta')
+    args = parser.parse_args()
+
+    try:
+        desired = [load_profile(path) for path in args.profiles]
+        snapshots = load_snapshots(args.current)
+    except (OSError, TweakProfileError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if KIND_VISUAL not in snapshots and AppDefaulter.registry is not None:
+        if any(profile.kind == KIND_VISUAL for profile in desired):
+            snapshots[KIND_VISUAL] = read_visual_effects(AppDefaulter.registry)
+
+    out_dir = Path(args.out_dir or ".") if (args.out_dir or args.apply) else None
+    deltas = []
+    for profile in desired:
+        snapshot = snapshots.get(profile.kind)
+        changes = diff_profile(profile, snapshot)
+        name = f"{profile.source} ({KIND_NAMES[profile.kind]})"
+        if snapshot is None:
+            print(f"[WARN] {name}: no current-state snapshot; all {len(profile)} setting(s) "
+                  f"will be applied")
+        elif not changes:
+            print(f"[OK] {name}: all {len(profile)} setting(s) already in place")
+        else:
+            print(f"[INFO] {name}: {len(changes)} of {len(profile)} setting(s) differ "
+                  f"from {snapshot.source}")
+            for change in changes:
+                print(f"    {change.describe()}")
+        if changes:
+            deltas.append(delta_profile(profile, changes))
+
+    if not deltas:
+        print()
+        print("Nothing to apply.")
+        return
+
+    print()
+    written = {}
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for delta in deltas:
+            path = out_dir / DELTA_FILES[delta.kind]
+            try:
+                write_delta(delta, str(path))
+            except OSError as e:
+                print(f"Error: Could not write {path}: {e}")
+                sys.exit(1)
+            written[delta.kind] = str(path)
+            print(f"[OK] Wrote {path} ({len(delta)} setting(s))")
+
+    if not args.apply:
+        if out_dir is None:
+            print("[DRY RUN] No changes made (use --out-dir to write the delta, --apply to apply it).")
+        return
+
+    print()
+    print("Applying...")
+    failed = 0
+    for delta in deltas:
+        if delta.kind == KIND_VISUAL:
+            if AppDefaulter.registry is None:
+                print("  [WARN] Visual effects: the registry is only available on Windows; "
+                      f"import {written[KIND_VISUAL]} with reg import or RegImporter.py")
+            elif not apply_visual_effects(delta):
+                failed += 1
+        elif delta.kind == KIND_OOSU:
+            if args.oosu_exe:
+                if not run_oosu(args.oosu_exe, written[KIND_OOSU]):
+                    failed += 1
+            else:
+                print(f"  [INFO] O&O ShutUp10++: import {written[KIND_OOSU]} "
+                      f"(or pass --oosu-exe to import it automatically)")
+        else:
+            print(f"  [INFO] Winaero Tweaker: import {written[KIND_WINAERO]} "
+                  f"from File > Import and export")
+
+    print()
+    print("=" * 70)
+    print("Summary:")
+    print(f"  Profiles with changes:    {len(deltas)} of {len(desired)}")
+    print(f"  Registry values written:  {write_stats.written}")
+    print(f"  Already up to date:       {write_stats.skipped}")
+    print(f"  Failed:                   {failed}")
+    print("=" * 70)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
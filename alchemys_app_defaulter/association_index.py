@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Association Index
+
+On-disk (SQLite) index of the file associations on a machine:
+extension -> ProgID -> handler executable, and the reverse. It is filled
+and refreshed by AppDefaulter.py (refresh_association_index()), which
+stores each key's last-write time (QueryInfoKey) next to the data so a
+refresh only re-reads keys that changed since the previous one.
+
+This module only stores and queries the index; it does not touch the
+registry itself.
+
+Usage:
+    from association_index import AssociationIndex
+
+    with AssociationIndex("associations.sqlite3") as index:
+        for row in index.extensions_for_executable("sublime_text.exe"):
+            print(row["extension"], row["progid"])
+"""
+
+import sqlite3
+import threading
+from typing import Optional
+
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS extensions (
+    extension TEXT PRIMARY KEY,     -- lower-case, with leading dot
+    class_progid TEXT,              -- HKCR\\<ext> default value
+    class_stamp INTEGER,            -- last write of HKCR\\<ext> (NULL: key missing)
+    user_progid TEXT,               -- FileExts\\<ext>\\UserChoice ProgId
+    user_stamp INTEGER,             -- last write of UserChoice (NULL: key missing)
+    key_stamp INTEGER               -- last write of FileExts\\<ext> (NULL: key missing)
+);
+CREATE TABLE IF NOT EXISTS progids (
+    key TEXT PRIMARY KEY,           -- lower-case ProgID
+    progid TEXT NOT NULL,
+    key_stamp INTEGER,              -- last write of HKCR\\<progid>
+    command_stamp INTEGER,          -- last write of HKCR\\<progid>\\shell\\open\\command
+    executable TEXT,
+    exe_name TEXT,                  -- lower-case file name of the executable
+    description TEXT,
+    exe_exists INTEGER
+);
+CREATE INDEX IF NOT EXISTS progids_exe_name ON progids (exe_name);
+CREATE INDEX IF NOT EXISTS progids_executable ON progids (executable COLLATE NOCASE);
+"""
+
+# Extension rows joined with their effective ProgID (UserChoice wins over HKCR)
+_RESOLVED = """
+SELECT e.extension AS extension,
+       COALESCE(e.user_progid, e.class_progid) AS progid,
+       CASE WHEN e.user_progid IS NOT NULL THEN 'UserChoice' ELSE 'HKCR' END AS source,
+       e.class_stamp IS NOT NULL AS registered,
+       p.executable AS executable,
+       p.description AS description,
+       p.exe_exists AS exe_exists
+FROM extensions e
+LEFT JOIN progids p ON p.key = lower(COALESCE(e.user_progid, e.class_progid))
+"""
+
+# Rows kept only for a FileExts\<ext> key stamp (no HKCR key, no UserChoice) are not
+# extensions as far as queries go
+_INDEXED = "(e.class_stamp IS NOT NULL OR e.user_stamp IS NOT NULL)"
+
+
+class AssociationIndex:
+    """
+    SQLite-backed association index.
+
+    Safe to query from several threads (one connection behind a lock), so it
+    can back the thread-pooled association scan.
+
+    Args:
+        path: Database file (created if missing; rebuilt if its schema is
+              from another version)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._db.executescript(
+                "DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS extensions; "
+                "DROP TABLE IF EXISTS progids;")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # Refresh support
+    # ------------------------------------------------------------------
+
+    def get_meta(self, name: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM meta WHERE name = ?", (name,))
+        return rows[0]["value"] if rows else None
+
+    def set_meta(self, name: str, value: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                             (name, value))
+
+    def extension_rows(self) -> dict:
+        """extension -> [class_progid, class_stamp, user_progid, user_stamp, key_stamp]"""
+        return {row["extension"]: [row["class_progid"], row["class_stamp"],
+                                   row["user_progid"], row["user_stamp"], row["key_stamp"]]
+                for row in self._query("SELECT * FROM extensions")}
+
+    def replace_extensions(self, rows: dict, removed):
+        """Write changed extension rows (as returned by extension_rows()) and drop removed ones."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO extensions VALUES (?, ?, ?, ?, ?, ?)",
+                [(ext, *row) for ext, row in rows.items()])
+            self._db.executemany("DELETE FROM extensions WHERE extension = ?",
+                                 [(ext,) for ext in removed])
+
+    def progid_stamps(self) -> dict:
+        """lower-case ProgID -> (key_stamp, command_stamp)"""
+        return {row["key"]: (row["key_stamp"], row["command_stamp"])
+                for row in self._query("SELECT key, key_stamp, command_stamp FROM progids")}
+
+    def replace_progids(self, rows: list, removed):
+        """
+        Write changed ProgIDs and drop unreferenced ones.
+
+        Args:
+            rows: (progid, key_stamp, command_stamp, executable, description) tuples
+            removed: lower-case ProgIDs to delete
+        """
+        def exe_name(executable):
+            return executable.replace("/", "\\").rsplit("\\", 1)[-1].lower() if executable else None
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO progids "
+                "(key, progid, key_stamp, command_stamp, executable, exe_name, description, exe_exists) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, NULL)",
+                [(progid.lower(), progid, key_stamp, command_stamp, executable,
+                  exe_name(executable), description)
+                 for progid, key_stamp, command_stamp, executable, description in rows])
+            self._db.executemany("DELETE FROM progids WHERE key = ?", [(key,) for key in removed])
+
+    def executables(self) -> list[str]:
+        return [row["executable"] for row in
+                self._query("SELECT DISTINCT executable FROM progids WHERE executable IS NOT NULL")]
+
+    def set_executable_status(self, exists: dict):
+        """Record whether each executable (path -> bool) exists."""
+        with self._lock:
+            self._db.executemany("UPDATE progids SET exe_exists = ? WHERE executable = ?",
+                                 [(int(found), path) for path, found in exists.items()])
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def lookup(self, extension: str) -> Optional[sqlite3.Row]:
+        """The extension's row joined with its effective ProgID, or None if not indexed."""
+        rows = self._query(_RESOLVED + " WHERE e.extension = ? AND " + _INDEXED,
+                           (extension.lower(),))
+        return rows[0] if rows else None
+
+    def progid(self, progid: str) -> Optional[sqlite3.Row]:
+        rows = self._query("SELECT * FROM progids WHERE key = ?", (progid.lower(),))
+        return rows[0] if rows else None
+
+    def extensions_for_executable(self, executable: str) -> list:
+        """Extensions whose effective handler is `executable` (a full path or a file name)."""
+        if "\\" in executable or "/" in executable:
+            where, param = "p.executable = ? COLLATE NOCASE", executable
+        else:
+            where, param = "p.exe_name = ?", executable.lower()
+        return self._query(_RESOLVED + f" WHERE {where} ORDER BY e.extension", (param,))
+
+    def extensions_for_progid(self, progid: str) -> list:
+        return self._query(_RESOLVED + " WHERE lower(COALESCE(e.user_progid, e.class_progid)) = ?"
+                           " ORDER BY e.extension", (progid.lower(),))
+
+    def dead_handlers(self) -> list:
+        """ProgIDs whose handler executable is missing, with the extensions using them."""
+        return self._query(
+            "SELECT p.progid AS progid, p.executable AS executable, "
+            "       group_concat(e.extension, ' ') AS extensions "
+            "FROM progids p LEFT JOIN extensions e "
+            "  ON lower(COALESCE(e.user_progid, e.class_progid)) = p.key "
+            "WHERE p.exe_exists = 0 AND p.executable NOT LIKE '\\%%' ESCAPE '\\' "
+            "GROUP BY p.key ORDER BY p.progid")
+
+    def counts(self) -> dict:
+        row = self._query(
+            "SELECT (SELECT count(*) FROM extensions e WHERE " + _INDEXED + ") AS extensions, "
+            "       (SELECT count(*) FROM extensions WHERE user_progid IS NOT NULL) AS user_choices, "
+            "       (SELECT count(*) FROM progids) AS progids, "
+            "       (SELECT count(*) FROM progids WHERE exe_exists = 0) AS missing_handlers")[0]
+        return dict(row)
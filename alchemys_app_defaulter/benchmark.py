@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+AppDefaulter Benchmark
+
+Measures AppDefaulter.py against a synthetic in-memory registry so the
+numbers can be reproduced on any OS (no Windows or winreg required).
+
+Benchmarks:
+- scan:   per-extension get_existing_association() vs. lookups in the
+          persistent association index (refresh_association_index())
+- progid: ProgID resolution with and without the shared LRU cache
+- jobs:   serial scan_associations() vs. a thread-pooled scan (uses the
+          injected per-call latency, 50 us if none is given)
+- main:   a full AppDefaulter main() run (first run, then an unchanged
+          re-run and a --full re-run), broken down by phase: parse,
+          journal, scan, register, apply, notify
+
+Usage:
+    python benchmark.py [config_file] [options]
+
+Examples:
+    python benchmark.py sublimetext.apps
+    python benchmark.py --scale 10000 --existing-share 0.8 --latency-us 20
+    python benchmark.py --latency-us 100 --jobs 16
+    python benchmark.py --scale 1000,10000,100000 --bench main
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from association_index import AssociationIndex
+from memory_registry import MemoryRegistry
+
+import AppDefaulter
+
+REGISTRY = MemoryRegistry()
+AppDefaulter.set_registry_backend(REGISTRY)
+
+
+# ProgIDs that many extensions share on a typical machine
+SHARED_PROGIDS = [
+    ("txtfile", '%SystemRoot%\\system32\\NOTEPAD.EXE %1', "Text Document"),
+    ("VSCode.txt", '"C:\\Program Files\\Microsoft VS Code\\Code.exe" "%1"', "VS Code Document"),
+    ("VSCode.source", '"C:\\Program Files\\Microsoft VS Code\\Code.exe" "%1"', "VS Code Source"),
+    ("Notepad++_file", '"C:\\Program Files\\Notepad++\\notepad++.exe" "%1"', "Notepad++ Document"),
+    ("SublimeText.file", '"C:\\Program Files\\Sublime Text\\sublime_text.exe" "%1"', "Sublime Text"),
+    ("inifile", '%SystemRoot%\\System32\\NOTEPAD.EXE %1', "Configuration Settings"),
+    ("AppX4hxtad77fbk3jkkeerkrm0ze94wjf3s9", None, "Photos"),
+    ("Word.Document.12", '"C:\\Program Files\\Microsoft Office\\root\\Office16\\WINWORD.EXE" /n "%1"',
+     "Microsoft Word Document"),
+]
+
+
+def load_extensions(config_file: str = None, scale: int = None) -> list[str]:
+    """Return the extension list to benchmark: from a config file or synthetic."""
+    if scale:
+        return [f".x{i:06d}" for i in range(scale)]
+    _, extensions = AppDefaulter.parse_config_file(config_file, use_cache=False)
+    return extensions
+
+
+def populate_registry(reg: MemoryRegistry, extensions: list[str],
+                      existing_share: float, seed: int = 1):
+    """
+    Fill the registry with a plausible association layout.
+
+    Args:
+        reg: Registry to populate
+        extensions: Extensions the run will look up
+        existing_share: Fraction of extensions that already have a default
+        seed: Random seed (keeps runs comparable)
+    """
+    rng = random.Random(seed)
+    hkcr = reg.HKEY_CLASSES_ROOT
+    hkcu = reg.HKEY_CURRENT_USER
+
+    def put(root, path, name, value):
+        with reg.CreateKeyEx(root, path) as key:
+            reg.SetValueEx(key, name, 0, reg.REG_SZ, value)
+
+    for progid, command, description in SHARED_PROGIDS:
+        put(hkcr, progid, "", description)
+        if command:
+            put(hkcr, f"{progid}\\shell\\open\\command", "", command)
+
+    # Unrelated noise so enumerations have a realistic amount to walk
+    for i in range(len(extensions)):
+        put(hkcr, f".noise{i}", "", rng.choice(SHARED_PROGIDS)[0])
+        put(hkcu, f"{AppDefaulter.FILE_EXTS_PATH}\\.noise{i}\\OpenWithList", "a", "app.exe")
+
+    for ext in extensions:
+        roll = rng.random()
+        if roll >= existing_share:
+            # Either unregistered or registered without a handler
+            if rng.random() < 0.5:
+                put(hkcr, ext, "Content Type", "text/plain")
+            continue
+        progid = rng.choice(SHARED_PROGIDS)[0]
+        put(hkcr, ext, "", progid)
+        if roll < existing_share * 0.4:
+            put(hkcu, f"{AppDefaulter.FILE_EXTS_PATH}\\{ext}\\UserChoice", "ProgId", progid)
+        else:
+            put(hkcu, f"{AppDefaulter.FILE_EXTS_PATH}\\{ext}\\OpenWithList", "a", "app.exe")
+
+    reg.reset_counters()
+
+
+def measure(func, repeat: int) -> tuple[float, int, object]:
+    """
+    Run func `repeat` times from a cold ProgID cache.
+
+    Returns:
+        Tuple of (best wall time, registry calls per run, last result)
+    """
+    best = None
+    result = None
+    calls = 0
+    for _ in range(repeat):
+        REGISTRY.reset_counters()
+        AppDefaulter.progid_cache.clear()
+        AppDefaulter.executable_cache.clear()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        calls = sum(REGISTRY.calls.values())
+        best = elapsed if best is None else min(best, elapsed)
+    return best, calls, result
+
+
+def report(label: str, elapsed: float, calls: int, baseline: float = None):
+    line = f"  {label:28} {elapsed * 1000:10.2f} ms  {calls:9} registry calls"
+    if baseline:
+        line += f"  ({baseline / elapsed:5.1f}x)"
+    print(line)
+
+
+def bench_scan(extensions: list[str], repeat: int):
+    """Per-extension lookups vs. the persistent association index."""
+    def per_extension():
+        return [AppDefaulter.get_existing_association(ext) for ext in extensions]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = AssociationIndex(os.path.join(tmp, "index.sqlite3"))
+        try:
+            def indexed():
+                AppDefaulter.refresh_association_index(index)
+                return [AppDefaulter.get_existing_association(ext, index=index)
+                        for ext in extensions]
+
+            base_time, base_calls, base_result = measure(per_extension, repeat)
+            build_time, build_calls, _ = measure(indexed, 1)
+            index_time, index_calls, index_result = measure(indexed, repeat)
+        finally:
+            index.close()
+
+    if base_result != index_result:
+        mismatches = [a.extension for a, b in zip(base_result, index_result) if a != b]
+        print(f"Error: index results differ for: {', '.join(mismatches[:10])}")
+        sys.exit(1)
+
+    print("Association scan:")
+    report("get_existing_association", base_time, base_calls)
+    report("index (first build)", build_time, build_calls, base_time)
+    report("index (unchanged refresh)", index_time, index_calls, base_time)
+    print()
+
+
+def bench_progid_cache(extensions: list[str], repeat: int):
+    """Per-extension lookups with the ProgID cache vs. a cache too small to hit."""
+    cache = AppDefaulter.progid_cache
+
+    def scan():
+        return [AppDefaulter.get_existing_association(ext) for ext in extensions]
+
+    saved_maxsize = cache.maxsize
+    cache.maxsize = 0
+    try:
+        cold_time, cold_calls, cold_result = measure(scan, repeat)
+    finally:
+        cache.maxsize = saved_maxsize
+    warm_time, warm_calls, warm_result = measure(scan, repeat)
+
+    if cold_result != warm_result:
+        print("Error: cached ProgID results differ from uncached results")
+        sys.exit(1)
+
+    print("ProgID resolution:")
+    report("uncached", cold_time, cold_calls)
+    report(f"LRU cache (maxsize {cache.maxsize})", warm_time, warm_calls, cold_time)
+    print(f"  {'':28} {cache.hits} hits, {cache.misses} misses")
+    print()
+
+
+def bench_jobs(extensions: list[str], repeat: int, jobs: int, latency: float):
+    """Serial vs. thread-pooled association scan against a slow registry."""
+    def scan(n):
+        return lambda: AppDefaulter.scan_associations(
+            extensions, AppDefaulter.get_existing_association, n)
+
+    saved_latency = REGISTRY.latency
+    REGISTRY.latency = latency
+    try:
+        serial_time, serial_calls, serial_result = measure(scan(1), repeat)
+        pooled_time, pooled_calls, pooled_result = measure(scan(jobs), repeat)
+    finally:
+        REGISTRY.latency = saved_latency
+
+    if list(serial_result.items()) != list(pooled_result.items()):
+        print("Error: pooled scan results or order differ from the serial scan")
+        sys.exit(1)
+
+    print(f"Pooled scan ({latency * 1_000_000:g} us/call):")
+    report("serial", serial_time, serial_calls)
+    report(f"{jobs} threads", pooled_time, pooled_calls, serial_time)
+    print()
+
+
+# AppDefaulter functions that make up each phase of main()
+PHASES = OrderedDict([
+    ("parse", ["load_app_config"]),
+    ("journal", ["association_fingerprint"]),
+    ("scan", ["refresh_association_index", "scan_associations"]),
+    ("register", ["register_application", "register_in_applications",
+                  "register_supported_types"]),
+    ("apply", ["create_progid", "set_extension_association", "add_to_open_with_list"]),
+    ("notify", ["notify_shell_change"]),
+])
+
+
+@contextlib.contextmanager
+def phase_timer(totals: dict):
+    """
+    Attribute wall time and registry calls of main() to its phases.
+
+    Wraps the PHASES functions in the AppDefaulter module (main() looks them
+    up at call time) and accumulates totals[phase] = [seconds, calls].
+    Calls nested inside an already-timed phase are not counted twice.
+    """
+    active = []
+    saved = {}
+
+    def wrap(phase, func):
+        def timed(*args, **kwargs):
+            if active:
+                return func(*args, **kwargs)
+            active.append(phase)
+            calls = sum(REGISTRY.calls.values())
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry = totals.setdefault(phase, [0.0, 0])
+                entry[0] += time.perf_counter() - start
+                entry[1] += sum(REGISTRY.calls.values()) - calls
+                active.pop()
+        return timed
+
+    for phase, names in PHASES.items():
+        for name in names:
+            saved[name] = getattr(AppDefaulter, name)
+            setattr(AppDefaulter, name, wrap(phase, saved[name]))
+    try:
+        yield totals
+    finally:
+        for name, func in saved.items():
+            setattr(AppDefaulter, name, func)
+
+
+def run_main(argv: list[str]) -> dict:
+    """Run AppDefaulter.main() with output suppressed; return per-phase totals."""
+    totals = OrderedDict()
+    REGISTRY.reset_counters()
+    AppDefaulter.progid_cache.clear()
+    AppDefaulter.executable_cache.clear()
+    saved_argv = sys.argv
+    sys.argv = ["AppDefaulter.py", *argv]
+    start = time.perf_counter()
+    try:
+        with phase_timer(totals), open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull):
+            try:
+                AppDefaulter.main()
+            except SystemExit as e:
+                if e.code:
+                    raise RuntimeError(f"main() exited with status {e.code}") from None
+    finally:
+        sys.argv = saved_argv
+    total = [time.perf_counter() - start, sum(REGISTRY.calls.values())]
+    totals["other"] = [total[0] - sum(t for t, _ in totals.values()),
+                       total[1] - sum(c for _, c in totals.values())]
+    totals["total"] = total
+    return totals
+
+
+def bench_main(extensions: list[str], existing_share: float, index: bool):
+    """End-to-end main() runs against a freshly populated registry, by phase."""
+    with tempfile.TemporaryDirectory() as tmp:
+        exe_path = os.path.join(tmp, "bench_app.exe")
+        open(exe_path, "w").close()
+        config_path = os.path.join(tmp, "bench.apps")
+        with open(config_path, "w", encoding="utf-8") as f:
+            f.write(exe_path + "\n")
+            f.write("\n".join(extensions) + "\n")
+
+        # Keep the run/write journals out of the real state directory
+        saved_env = os.environ.get("LOCALAPPDATA")
+        os.environ["LOCALAPPDATA"] = tmp
+        saved_stats = AppDefaulter.write_stats
+        try:
+            AppDefaulter.write_stats = AppDefaulter.WriteStats()
+            REGISTRY.__init__(REGISTRY.latency)
+            populate_registry(REGISTRY, extensions, existing_share)
+            argv = [config_path, "--no-cache"] + (["--index"] if index else [])
+            runs = [
+                ("first run", run_main(argv)),
+                ("unchanged re-run", run_main(argv)),
+                ("--full re-run", run_main(argv + ["--full"])),
+            ]
+        finally:
+            AppDefaulter.write_stats = saved_stats
+            AppDefaulter.write_journal = None
+            if saved_env is None:
+                del os.environ["LOCALAPPDATA"]
+            else:
+                os.environ["LOCALAPPDATA"] = saved_env
+
+    print(f"main(){' --index' if index else ''}:")
+    for label, totals in runs:
+        print(f"  {label}")
+        for phase in [*PHASES, "other", "total"]:
+            elapsed, calls = totals.get(phase, (0.0, 0))
+            report(f"  {phase}", elapsed, calls)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark AppDefaulter.py against an in-memory registry.")
+    parser.add_argument('config_file', nargs='?',
+                        default=str(Path(__file__).with_name('sublimetext.apps')),
+                        help='Config file whose extensions are benchmarked '
+                             '(default: sublimetext.apps)')
+    parser.add_argument('--scale', default=None, metavar='N[,N...]',
+                        help='Use N synthetic extensions instead of a config file; '
+                             'a comma-separated list runs each scale in turn')
+    parser.add_argument('--existing-share', type=float, default=0.6,
+                        help='Fraction of extensions that already have a default (default: 0.6)')
+    parser.add_argument('--latency-us', type=float, default=0.0,
+                        help='Simulated latency per registry call in microseconds')
+    parser.add_argument('--jobs', type=int, default=8,
+                        help='Thread pool size for the pooled scan benchmark (default: 8)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Repetitions per measurement; the best is reported (default: 3)')
+    parser.add_argument('--bench', default='scan,progid,jobs,main', metavar='NAMES',
+                        help='Comma-separated benchmarks to run '
+                             '(default: scan,progid,jobs,main)')
+    parser.add_argument('--index', action='store_true',
+                        help='Run the main() benchmark with --index')
+    args = parser.parse_args()
+
+    benches = {name.strip() for name in args.bench.split(",") if name.strip()}
+    unknown = benches - {"scan", "progid", "jobs", "main"}
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    try:
+        scales = [int(n) for n in args.scale.split(",")] if args.scale else [None]
+    except ValueError:
+        parser.error(f"invalid --scale: {args.scale}")
+
+    for scale in scales:
+        extensions = load_extensions(args.config_file, scale)
+        latency = args.latency_us / 1_000_000
+
+        print(f"Extensions: {len(extensions)}  existing share: {args.existing_share:.0%}  "
+              f"latency: {args.latency_us:g} us/call")
+        print()
+        if benches & {"scan", "progid", "jobs"}:
+            REGISTRY.__init__(latency)
+            populate_registry(REGISTRY, extensions, args.existing_share)
+        if "scan" in benches:
+            bench_scan(extensions, args.repeat)
+        if "progid" in benches:
+            bench_progid_cache(extensions, args.repeat)
+        if "jobs" in benches:
+            bench_jobs(extensions, args.repeat, args.jobs, latency or 50 / 1_000_000)
+        if "main" in benches:
+            REGISTRY.latency = latency
+            bench_main(extensions, args.existing_share, args.index)
+
+
+if __name__ == "__main__":
+    main()
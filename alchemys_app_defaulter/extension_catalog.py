@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Extension Catalog
+
+Precompiled (SQLite) catalog of the file extensions a machine knows about,
+grouped by what they contain, plus the extensions that must not be
+re-associated. It is built once from HKEY_CLASSES_ROOT by AppDefaulter.py
+(build_extension_catalog()) and then lets configs name groups such as
+`@text` or `@source` instead of listing hundreds of extensions.
+
+Groups:
+- @<perceived type> for every PerceivedType value (@text, @image, @audio,
+  @video, @compressed, @document, @system, ...)
+- @text also takes every extension with a text/* Content Type
+- @source: programming and markup languages, by Content Type
+  (text/x-*, application/javascript, ...) and SOURCE_EXTENSIONS
+
+Protected extensions are executables and shell types (PROTECTED_EXTENSIONS),
+types marked NoOpenWith or PerceivedType=system, and types owned by a
+packaged (AppX) app, which Windows resets to their app anyway. Groups never
+add them; an explicitly listed one is reported and left out unless the user
+asks for it (AppDefaulter's --allow-protected).
+
+This module only stores and queries the catalog; it does not touch the
+registry itself.
+
+Usage:
+    from extension_catalog import ExtensionCatalog
+
+    with ExtensionCatalog("extension_catalog.sqlite3") as catalog:
+        extensions = catalog.group("source")
+"""
+
+import re
+import sqlite3
+from typing import Optional
+
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS extensions (
+    extension TEXT PRIMARY KEY,     -- lower-case, with leading dot
+    perceived_type TEXT,
+    content_type TEXT,
+    progid TEXT,
+    protected TEXT                  -- reason, or NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    name TEXT NOT NULL,             -- group name, lower-case, without '@'
+    extension TEXT NOT NULL,
+    PRIMARY KEY (name, extension)
+) WITHOUT ROWID;
+"""
+
+GROUP_NAME = re.compile(r"^[a-z0-9_-]+$")
+
+# Extensions that are never re-associated, with the reason shown to the user
+PROTECTED_EXTENSIONS = {
+    **dict.fromkeys((".exe", ".com", ".scr", ".pif", ".bat", ".cmd"), "executable"),
+    **dict.fromkeys((".dll", ".sys", ".drv", ".ocx", ".cpl", ".msc"), "system component"),
+    **dict.fromkeys((".lnk", ".url", ".library-ms", ".search-ms"), "shell link"),
+    **dict.fromkeys((".msi", ".msp", ".msu", ".appx", ".appxbundle", ".msix",
+                     ".msixbundle"), "installer package"),
+    **dict.fromkeys((".accdb", ".accde", ".mdb"), "Access database"),
+    ".3mf": "packaged app (3D Builder)",
+}
+
+# Source and markup languages Windows registers without a telling Content Type
+SOURCE_EXTENSIONS = frozenset((
+    ".c", ".h", ".cc", ".cpp", ".cxx", ".hh", ".hpp", ".hxx", ".cs", ".csx",
+    ".fs", ".fsx", ".vb", ".java", ".kt", ".kts", ".scala", ".go", ".rs",
+    ".swift", ".m", ".mm", ".py", ".pyw", ".pyi", ".rb", ".pl", ".pm", ".php",
+    ".lua", ".r", ".jl", ".dart", ".js", ".mjs", ".cjs", ".jsx", ".ts", ".tsx",
+    ".sh", ".bash", ".zsh", ".ps1", ".psm1", ".psd1", ".sql", ".asm", ".s",
+    ".html", ".htm", ".xhtml", ".css", ".scss", ".less", ".xml", ".xsd", ".xsl",
+    ".json", ".yaml", ".yml", ".toml", ".ini", ".cmake", ".mk", ".gradle",
+    ".vue", ".svelte", ".md", ".rst", ".tex",
+))
+
+# Content Types that mean source code (besides text/x-*)
+_SOURCE_CONTENT_TYPES = re.compile(
+    r"^(text/x-.*|text/(html|css|xml|javascript|markdown)|application/(javascript|json|"
+    r"xml|xhtml\+xml|typescript|x-javascript|x-python.*|x-sh|x-perl|x-ruby|x-php|x-tex))$")
+
+
+def classify(extension: str, perceived_type: Optional[str], content_type: Optional[str],
+             progid: Optional[str], no_open_with: bool = False) -> tuple[list[str], Optional[str]]:
+    """
+    Groups and protection of one extension.
+
+    Args:
+        extension: Lower-case extension with leading dot
+        perceived_type: HKCR\\<ext> PerceivedType value, or None
+        content_type: HKCR\\<ext> Content Type value, or None
+        progid: HKCR\\<ext> default value, or None
+        no_open_with: HKCR\\<ext> (or its ProgID) has a NoOpenWith value
+
+    Returns:
+        Tuple of (group names, protection reason or None)
+    """
+    groups = []
+    perceived = (perceived_type or "").strip().lower()
+    content = (content_type or "").strip().lower()
+    if perceived and GROUP_NAME.match(perceived):
+        groups.append(perceived)
+    if content.startswith("text/") and "text" not in groups:
+        groups.append("text")
+    if extension in SOURCE_EXTENSIONS or _SOURCE_CONTENT_TYPES.match(content):
+        groups.append("source")
+
+    reason = PROTECTED_EXTENSIONS.get(extension)
+    if reason is None:
+        if no_open_with:
+            reason = "NoOpenWith"
+        elif perceived == "system":
+            reason = "system type"
+        elif progid and progid.lower().startswith("appx"):
+            reason = "packaged app"
+    return groups, reason
+
+
+class ExtensionCatalog:
+    """
+    SQLite-backed extension catalog.
+
+    Group and protection lookups are answered from in-memory sets loaded on
+    first use, so checking every extension of a config is one dictionary
+    hit each.
+
+    Args:
+        path: Database file (created if missing; rebuilt if its schema is
+              from another version)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(str(path))
+        self._conn.row_factory = sqlite3.Row
+        version = self._meta("schema_version")
+        if version is not None and version != str(SCHEMA_VERSION):
+            self._conn.executescript("DROP TABLE IF EXISTS extensions; DROP TABLE IF EXISTS members;")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)",
+                           (str(SCHEMA_VERSION),))
+        self._conn.commit()
+        self._groups = None
+        self._protected = None
+
+    def _meta(self, name: str) -> Optional[str]:
+        try:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def replace(self, rows: list[tuple], built_at: str):
+        """
+        Replace the whole catalog.
+
+        Args:
+            rows: (extension, perceived_type, content_type, progid, no_open_with)
+                  for every extension in HKEY_CLASSES_ROOT
+            built_at: Timestamp stored with the catalog
+        """
+        extensions = []
+        members = []
+        for extension, perceived_type, content_type, progid, no_open_with in rows:
+            groups, reason = classify(extension, perceived_type, content_type, progid, no_open_with)
+            extensions.append((extension, perceived_type, content_type, progid, reason))
+            members.extend((name, extension) for name in groups)
+        with self._conn:
+            self._conn.execute("DELETE FROM extensions")
+            self._conn.execute("DELETE FROM members")
+            self._conn.executemany("INSERT OR REPLACE INTO extensions VALUES (?, ?, ?, ?, ?)",
+                                   extensions)
+            self._conn.executemany("INSERT OR IGNORE INTO members VALUES (?, ?)", members)
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('built_at', ?)", (built_at,))
+        self._groups = None
+        self._protected = None
+
+    @property
+    def built_at(self) -> Optional[str]:
+        """When the catalog was built, or None if it never was."""
+        return self._meta("built_at")
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _load_groups(self) -> dict:
+        if self._groups is None:
+            groups = {}
+            for row in self._conn.execute("SELECT name, extension FROM members ORDER BY name, extension"):
+                groups.setdefault(row["name"], []).append(row["extension"])
+            self._groups = groups
+        return self._groups
+
+    def group_names(self) -> dict:
+        """Group name -> number of extensions."""
+        return {name: len(members) for name, members in self._load_groups().items()}
+
+    def group(self, name: str) -> Optional[list[str]]:
+        """Extensions of a group (name without '@'), sorted; None for an unknown group."""
+        return self._load_groups().get(name.lower().lstrip("@"))
+
+    def protected(self) -> dict:
+        """Extension -> reason for every protected extension (built-in ones included)."""
+        if self._protected is None:
+            protected = dict(PROTECTED_EXTENSIONS)
+            for row in self._conn.execute(
+                    "SELECT extension, protected FROM extensions WHERE protected IS NOT NULL"):
+                protected[row["extension"]] = row["protected"]
+            self._protected = protected
+        return self._protected
+
+    def lookup(self, extension: str) -> Optional[sqlite3.Row]:
+        return self._conn.execute("SELECT * FROM extensions WHERE extension = ?",
+                                  (extension.lower(),)).fetchone()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+In-Memory Registry
+
+A small stand-in for the subset of the `winreg` module that AppDefaulter.py
+uses. Keys and value names are case-insensitive (like the real registry) and
+every API call is counted, so scripts can measure how many registry round
+trips a code path makes. An optional per-call latency can be injected to
+approximate the cost of a real registry call.
+
+Usage:
+    from memory_registry import MemoryRegistry
+
+    reg = MemoryRegistry()
+    with reg.CreateKeyEx(reg.HKEY_CLASSES_ROOT, ".txt", 0, reg.KEY_WRITE) as key:
+        reg.SetValueEx(key, "", 0, reg.REG_SZ, "txtfile")
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+# Predefined root handles (same values as winreg)
+HKEY_CLASSES_ROOT = 0x80000000
+HKEY_CURRENT_USER = 0x80000001
+HKEY_LOCAL_MACHINE = 0x80000002
+HKEY_USERS = 0x80000003
+HKEY_CURRENT_CONFIG = 0x80000005
+
+# Access rights
+KEY_READ = 0x20019
+KEY_WRITE = 0x20006
+KEY_ALL_ACCESS = 0xF003F
+
+# Value types
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+ROOT_NAMES = {
+    HKEY_CLASSES_ROOT: "HKEY_CLASSES_ROOT",
+    HKEY_CURRENT_USER: "HKEY_CURRENT_USER",
+    HKEY_LOCAL_MACHINE: "HKEY_LOCAL_MACHINE",
+    HKEY_USERS: "HKEY_USERS",
+    HKEY_CURRENT_CONFIG: "HKEY_CURRENT_CONFIG",
+}
+
+
+class _Node:
+    """A single registry key."""
+
+    __slots__ = ("name", "subkeys", "values", "last_write", "_key_list", "_value_list")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.subkeys = {}      # lower-case name -> _Node
+        self.values = {}       # lower-case name -> (name, data, type)
+        self.last_write = 0
+        self._key_list = None
+        self._value_list = None
+
+    def key_list(self) -> list:
+        # Cached so enumerating a key with N subkeys stays O(N), not O(N^2)
+        if self._key_list is None:
+            self._key_list = list(self.subkeys.values())
+        return self._key_list
+
+    def value_list(self) -> list:
+        if self._value_list is None:
+            self._value_list = list(self.values.values())
+        return self._value_list
+
+
+class MemoryKey:
+    """An open key handle, usable as a context manager like winreg.HKEYType."""
+
+    __slots__ = ("node", "root", "path")
+
+    def __init__(self, node: _Node, root: int, path: str):
+        self.node = node
+        self.root = root
+        self.path = path
+
+    def Close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class MemoryRegistry:
+    """
+    In-memory registry exposing the winreg functions used by AppDefaulter.py.
+
+    Args:
+        latency: Optional delay in seconds added to every API call
+    """
+
+    HKEY_CLASSES_ROOT = HKEY_CLASSES_ROOT
+    HKEY_CURRENT_USER = HKEY_CURRENT_USER
+    HKEY_LOCAL_MACHINE = HKEY_LOCAL_MACHINE
+    HKEY_USERS = HKEY_USERS
+    HKEY_CURRENT_CONFIG = HKEY_CURRENT_CONFIG
+    KEY_READ = KEY_READ
+    KEY_WRITE = KEY_WRITE
+    KEY_ALL_ACCESS = KEY_ALL_ACCESS
+    REG_NONE = REG_NONE
+    REG_SZ = REG_SZ
+    REG_EXPAND_SZ = REG_EXPAND_SZ
+    REG_BINARY = REG_BINARY
+    REG_DWORD = REG_DWORD
+    REG_MULTI_SZ = REG_MULTI_SZ
+    REG_QWORD = REG_QWORD
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+        self._clock = 0
+        self._roots = {root: _Node(name) for root, name in ROOT_NAMES.items()}
+        self._listeners = []
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _count(self, name: str):
+        with self._calls_lock:
+            self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def _resolve(self, key) -> MemoryKey:
+        if isinstance(key, MemoryKey):
+            return key
+        try:
+            return MemoryKey(self._roots[key], key, "")
+        except KeyError:
+            raise OSError(f"[WinError 6] The handle is invalid: {key!r}") from None
+
+    def _walk(self, key, sub_key: str, create: bool) -> MemoryKey:
+        handle = self._resolve(key)
+        node = handle.node
+        parts = [p for p in (sub_key or "").split("\\") if p]
+        created = False
+        for part in parts:
+            child = node.subkeys.get(part.lower())
+            if child is None:
+                if not create:
+                    raise FileNotFoundError(
+                        2, "The system cannot find the file specified")
+                child = _Node(part)
+                child.last_write = self._tick()
+                node.subkeys[part.lower()] = child
+                node._key_list = None
+                node.last_write = child.last_write
+                created = True
+            node = child
+        path = "\\".join(p for p in (handle.path, *parts) if p)
+        if created:
+            self._changed(handle.root, path)
+        return MemoryKey(node, handle.root, path)
+
+    def _changed(self, root: int, path: str):
+        for listener in self._listeners:
+            listener(root, path)
+
+    def add_listener(self, callback):
+        """Call callback(root, path) after every change to a key (see registry_watch)."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def reset_counters(self):
+        """Reset the per-function call counters."""
+        self.calls.clear()
+
+    # ------------------------------------------------------------------
+    # winreg API
+    # ------------------------------------------------------------------
+
+    def OpenKey(self, key, sub_key: str, reserved: int = 0, access: int = KEY_READ) -> MemoryKey:
+        self._count("OpenKey")
+        return self._walk(key, sub_key, create=False)
+
+    OpenKeyEx = OpenKey
+
+    def CreateKeyEx(self, key, sub_key: str, reserved: int = 0, access: int = KEY_WRITE) -> MemoryKey:
+        self._count("CreateKeyEx")
+        return self._walk(key, sub_key, create=True)
+
+    def CreateKey(self, key, sub_key: str) -> MemoryKey:
+        return self.CreateKeyEx(key, sub_key)
+
+    def CloseKey(self, key):
+        pass
+
+    def QueryValueEx(self, key, value_name: Optional[str]):
+        self._count("QueryValueEx")
+        node = self._resolve(key).node
+        entry = node.values.get((value_name or "").lower())
+        if entry is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        return entry[1], entry[2]
+
+    def SetValueEx(self, key, value_name: Optional[str], reserved: int, type: int, value):
+        self._count("SetValueEx")
+        handle = self._resolve(key)
+        node = handle.node
+        name = value_name or ""
+        node.values[name.lower()] = (name, value, type)
+        node._value_list = None
+        node.last_write = self._tick()
+        self._changed(handle.root, handle.path)
+
+    def DeleteValue(self, key, value_name: Optional[str]):
+        self._count("DeleteValue")
+        handle = self._resolve(key)
+        node = handle.node
+        if node.values.pop((value_name or "").lower(), None) is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        node._value_list = None
+        node.last_write = self._tick()
+        self._changed(handle.root, handle.path)
+
+    def DeleteKey(self, key, sub_key: str):
+        self._count("DeleteKey")
+        parent_path, _, leaf = (sub_key or "").rstrip("\\").rpartition("\\")
+        parent_key = self._walk(key, parent_path, create=False)
+        parent = parent_key.node
+        child = parent.subkeys.get(leaf.lower())
+        if child is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        if child.subkeys:
+            raise PermissionError(5, "Access is denied")
+        del parent.subkeys[leaf.lower()]
+        parent._key_list = None
+        parent.last_write = self._tick()
+        self._changed(parent_key.root, "\\".join(p for p in (parent_key.path, leaf) if p))
+
+    def EnumKey(self, key, index: int) -> str:
+        self._count("EnumKey")
+        node = self._resolve(key).node
+        if index >= len(node.subkeys):
+            raise OSError(259, "No more data is available")
+        return node.key_list()[index].name
+
+    def EnumValue(self, key, index: int):
+        self._count("EnumValue")
+        node = self._resolve(key).node
+        if index >= len(node.values):
+            raise OSError(259, "No more data is available")
+        return node.value_list()[index]
+
+    def QueryInfoKey(self, key):
+        self._count("QueryInfoKey")
+        node = self._resolve(key).node
+        return len(node.subkeys), len(node.values), node.last_write
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Run Profiling
+
+Instrumentation for AppDefaulter.py's --profile flag. Nothing here is
+imported unless the flag is given, so a normal run pays no cost.
+
+- ProfilingRegistry wraps a registry backend (winreg or a stand-in) and
+  counts opens, queries, sets, enumerations and failures per registry root
+  and per calling function.
+- Profiler times the phases of a run and the time spent writing console
+  output, and renders everything as JSON.
+
+Usage:
+    from profiling import Profiler, ProfilingRegistry
+
+    profiler = Profiler()
+    backend = ProfilingRegistry(winreg, profiler)
+    profiler.enter("scan")
+    ...
+    print(profiler.to_json())
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import memory_registry as _mr
+
+
+# winreg function -> counter category
+CATEGORIES = {
+    "OpenKey": "opens",
+    "OpenKeyEx": "opens",
+    "CreateKey": "opens",
+    "CreateKeyEx": "opens",
+    "QueryValueEx": "queries",
+    "QueryInfoKey": "queries",
+    "SetValueEx": "sets",
+    "DeleteValue": "sets",
+    "DeleteKey": "sets",
+    "EnumKey": "enums",
+    "EnumValue": "enums",
+}
+
+COUNTER_NAMES = ("opens", "queries", "sets", "enums", "failures")
+
+
+class Profiler:
+    """Collects registry call counts, phase timings and output time for one run."""
+
+    def __init__(self):
+        self.by_root = {}           # root name -> Counter
+        self.by_function = {}       # calling function -> Counter
+        self.phases = OrderedDict() # phase -> seconds
+        self.output_seconds = 0.0
+        self.output_writes = 0
+        self.counters = {}          # name -> dict of extra counters (e.g. caches)
+        self._lock = threading.Lock()
+        self._phase = None
+        self._phase_start = 0.0
+        self._start = time.perf_counter()
+
+    def count(self, root: str, function: str, category: str, failed: bool):
+        with self._lock:
+            for table, name in ((self.by_root, root), (self.by_function, function)):
+                counter = table.get(name)
+                if counter is None:
+                    counter = table[name] = Counter()
+                counter[category] += 1
+                if failed:
+                    counter["failures"] += 1
+
+    def enter(self, phase: str):
+        """End the current phase (if any) and start timing `phase`."""
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + now - self._phase_start
+        self._phase = phase
+        self._phase_start = now
+
+    def stop(self):
+        """End the current phase."""
+        self.enter(None)
+        self.phases.pop(None, None)
+
+    def timed_stream(self, stream) -> "TimedStream":
+        """Wrap an output stream (e.g. sys.stdout) so writes to it are timed."""
+        return TimedStream(stream, self)
+
+    def to_dict(self) -> dict:
+        def table(counters):
+            return {name: {key: counter[key] for key in COUNTER_NAMES}
+                    for name, counter in sorted(counters.items(),
+                                                key=lambda item: -sum(item[1].values()))}
+
+        totals = Counter()
+        for counter in self.by_root.values():
+            totals.update(counter)
+        return {
+            "wall_seconds": round(time.perf_counter() - self._start, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "output": {"seconds": round(self.output_seconds, 6), "writes": self.output_writes},
+            "counters": self.counters,
+            "registry": {
+                "totals": {key: totals[key] for key in COUNTER_NAMES},
+                "by_root": table(self.by_root),
+                "by_function": table(self.by_function),
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+
+class TimedStream:
+    """Text stream proxy that adds the time spent in write() to a Profiler."""
+
+    def __init__(self, stream, profiler: Profiler):
+        self.stream = stream
+        self._profiler = profiler
+
+    def write(self, text: str) -> int:
+        start = time.perf_counter()
+        try:
+            return self.stream.write(text)
+        finally:
+            self._profiler.output_seconds += time.perf_counter() - start
+            self._profiler.output_writes += 1
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class _ProfiledKey:
+    """Key handle returned by ProfilingRegistry; remembers which root it is under."""
+
+    __slots__ = ("handle", "root")
+
+    def __init__(self, handle, root: str):
+        self.handle = handle
+        self.root = root
+
+    def Close(self):
+        self.handle.Close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+        return False
+
+
+class ProfilingRegistry:
+    """
+    Registry backend that forwards to another backend and counts every call.
+
+    Args:
+        inner: The backend to forward to (e.g. the winreg module)
+        profiler: Profiler that receives the counts
+    """
+
+    def __init__(self, inner, profiler: Profiler):
+        self.inner = inner
+        self.profiler = profiler
+
+    def __getattr__(self, name):
+        # HKEY_*, KEY_* and REG_* constants come from the wrapped backend
+        return getattr(self.inner, name)
+
+    def _call(self, api: str, key, *args):
+        if isinstance(key, _ProfiledKey):
+            root, handle = key.root, key.handle
+        else:
+            root, handle = _mr.ROOT_NAMES.get(key, "handle"), key
+        # Attribute the call to the AppDefaulter function that made it
+        caller = sys._getframe(2).f_code.co_name
+        try:
+            result = getattr(self.inner, api)(handle, *args)
+        except OSError:
+            self.profiler.count(root, caller, CATEGORIES[api], True)
+            raise
+        self.profiler.count(root, caller, CATEGORIES[api], False)
+        return result, root
+
+    def OpenKey(self, key, sub_key, reserved=0, access=_mr.KEY_READ):
+        handle, root = self._call("OpenKey", key, sub_key, reserved, access)
+        return _ProfiledKey(handle, root)
+
+    def OpenKeyEx(self, key, sub_key, reserved=0, access=_mr.KEY_READ):
+        handle, root = self._call("OpenKeyEx", key, sub_key, reserved, access)
+        return _ProfiledKey(handle, root)
+
+    def CreateKeyEx(self, key, sub_key, reserved=0, access=_mr.KEY_WRITE):
+        handle, root = self._call("CreateKeyEx", key, sub_key, reserved, access)
+        return _ProfiledKey(handle, root)
+
+    def CreateKey(self, key, sub_key):
+        handle, root = self._call("CreateKey", key, sub_key)
+        return _ProfiledKey(handle, root)
+
+    def CloseKey(self, key):
+        key.Close()
+
+    def QueryValueEx(self, key, value_name):
+        return self._call("QueryValueEx", key, value_name)[0]
+
+    def QueryInfoKey(self, key):
+        return self._call("QueryInfoKey", key)[0]
+
+    def SetValueEx(self, key, value_name, reserved, type, value):
+        return self._call("SetValueEx", key, value_name, reserved, type, value)[0]
+
+    def DeleteValue(self, key, value_name):
+        return self._call("DeleteValue", key, value_name)[0]
+
+    def DeleteKey(self, key, sub_key):
+        return self._call("DeleteKey", key, sub_key)[0]
+
+    def EnumKey(self, key, index):
+        return self._call("EnumKey", key, index)[0]
+
+    def EnumValue(self, key, index):
+        return self._call("EnumValue", key, index)[0]
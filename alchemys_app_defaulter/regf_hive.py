@@ -0,0 +1,890 @@
+#!/usr/bin/env python3
+"""
+Offline Registry Hive Files
+
+Reads and writes registry hive files (the regf format of NTUSER.DAT,
+SOFTWARE, ...) without loading them into a running Windows, so images can
+be prepared on any system.
+
+- RegfHive maps a hive file with mmap. Cells are read in place with
+  struct.unpack_from, and subkeys are found by binary search over the
+  sorted lf/lh/li/ri subkey lists instead of by enumeration.
+- Writes never move existing data: new and resized cells are allocated
+  from hive bins appended to the end of the file, replaced cells are
+  marked free, and flush() updates the sequence numbers, hive size and
+  header checksum.
+- HiveRegistry exposes the winreg subset AppDefaulter.py uses, over a
+  SOFTWARE hive (HKLM\\SOFTWARE, and HKEY_CLASSES_ROOT as its Classes key)
+  and an NTUSER.DAT hive (HKEY_CURRENT_USER).
+
+Hives with pending transaction log data (a dirty base block) are refused;
+load and unload them once on Windows, or use a cleanly unloaded copy.
+
+Usage:
+    from regf_hive import HiveRegistry
+
+    with HiveRegistry(software="SOFTWARE", ntuser="NTUSER.DAT") as reg:
+        with reg.CreateKeyEx(reg.HKEY_CLASSES_ROOT, ".txt") as key:
+            reg.SetValueEx(key, "", 0, reg.REG_SZ, "txtfile")
+"""
+
+import mmap
+import struct
+import time
+from pathlib import Path
+from typing import Optional
+
+import memory_registry as _mr
+
+
+BASE_BLOCK_SIZE = 4096
+HBIN_SIZE = 4096
+HBIN_HEADER_SIZE = 32
+NO_CELL = 0xFFFFFFFF
+
+# Largest value data stored in a single cell; bigger data needs a "db" record
+MAX_CELL_DATA = 16344
+# Entries per leaf list before a subkey list is split under an "ri" index
+MAX_LEAF_ENTRIES = 512
+
+KEY_HIVE_ENTRY = 0x0004
+KEY_NO_DELETE = 0x0008
+KEY_COMP_NAME = 0x0020
+VALUE_COMP_NAME = 0x0001
+
+_BASE = struct.Struct("<4sII Q IIII II")         # signature .. hive bins size
+_HBIN = struct.Struct("<4sII 8x Q 4x")
+_NK = struct.Struct("<2sHQ IIIIIIIIIIIIIII HH")  # name follows at 76
+_VK = struct.Struct("<2sHIIIHH")                  # name follows at 20
+_NK_SIZE = 76
+_VK_SIZE = 20
+_INT = struct.Struct("<i")
+_UINT = struct.Struct("<I")
+
+# Field offsets inside an nk record
+_NK_FLAGS = 2
+_NK_TIMESTAMP = 4
+_NK_SUBKEY_COUNT = 20
+_NK_SUBKEY_LIST = 28
+_NK_VALUE_COUNT = 36
+_NK_VALUE_LIST = 40
+_NK_SECURITY = 44
+_NK_MAX_NAME = 52
+_NK_MAX_VALUE_NAME = 60
+_NK_MAX_VALUE_DATA = 64
+
+# Seconds between 1601-01-01 (FILETIME epoch) and 1970-01-01
+_FILETIME_EPOCH = 11644473600
+
+
+class HiveError(OSError):
+    """A hive file is malformed or cannot be used."""
+
+
+def filetime_now() -> int:
+    return int((time.time() + _FILETIME_EPOCH) * 10_000_000)
+
+
+def _name_hash(name: str) -> int:
+    """Hash stored in "lh" subkey lists."""
+    value = 0
+    for char in name.upper():
+        value = (value * 37 + ord(char)) & 0xFFFFFFFF
+    return value
+
+
+def _name_hint(name: str) -> int:
+    """First four characters of a name, stored in "lf" subkey lists."""
+    hint = name[:4].encode("latin-1", "replace").ljust(4, b"\0")
+    return _UINT.unpack(hint)[0]
+
+
+def _encode_name(name: str) -> tuple[bytes, bool]:
+    """Name bytes and whether they are compressed (Latin-1) rather than UTF-16."""
+    try:
+        return name.encode("latin-1"), True
+    except UnicodeEncodeError:
+        return name.encode("utf-16-le"), False
+
+
+def encode_value(value, value_type: int) -> bytes:
+    """Raw data of a value, as the registry stores it."""
+    if value_type in (_mr.REG_SZ, _mr.REG_EXPAND_SZ):
+        return (str(value) + "\0").encode("utf-16-le")
+    if value_type == _mr.REG_MULTI_SZ:
+        return "".join(f"{item}\0" for item in value or []).encode("utf-16-le") + b"\0\0"
+    if value_type == _mr.REG_DWORD:
+        return struct.pack("<I", value & 0xFFFFFFFF)
+    if value_type == _mr.REG_QWORD:
+        return struct.pack("<Q", value & 0xFFFFFFFFFFFFFFFF)
+    return bytes(value or b"")
+
+
+def decode_value(data: bytes, value_type: int):
+    """Python value of raw data, the way winreg returns it."""
+    if value_type in (_mr.REG_SZ, _mr.REG_EXPAND_SZ):
+        text = data[:len(data) & ~1].decode("utf-16-le", "replace")
+        return text.split("\0", 1)[0]
+    if value_type == _mr.REG_MULTI_SZ:
+        text = data[:len(data) & ~1].decode("utf-16-le", "replace")
+        items = text.split("\0")
+        while items and not items[-1]:
+            items.pop()
+        return items
+    if value_type == _mr.REG_DWORD and len(data) >= 4:
+        return _UINT.unpack_from(data)[0]
+    if value_type == _mr.REG_QWORD and len(data) >= 8:
+        return struct.unpack_from("<Q", data)[0]
+    return data or None
+
+
+def _default_security_descriptor() -> bytes:
+    """Self-relative descriptor for new hives: Administrators and SYSTEM full, Users read."""
+    administrators = bytes.fromhex("01020000000000052000000020020000")
+    system = bytes.fromhex("010100000000000512000000")
+    users = bytes.fromhex("01020000000000052000000021020000")
+    aces = b""
+    for mask, sid in ((0xF003F, administrators), (0xF003F, system), (0x20019, users)):
+        # ACCESS_ALLOWED_ACE, inherited by subkeys
+        aces += struct.pack("<BBHI", 0, 0x02, 8 + len(sid), mask) + sid
+    acl = struct.pack("<BBHHH", 2, 0, 8 + len(aces), 3, 0) + aces
+    header = 20
+    owner = header
+    group = owner + len(administrators)
+    dacl = group + len(system)
+    return (struct.pack("<BBHIIII", 1, 0, 0x8004, owner, group, 0, dacl)
+            + administrators + system + acl)
+
+
+class RegfHive:
+    """
+    A registry hive file, mapped into memory.
+
+    Args:
+        path: Hive file
+        writable: Open for writing (changes reach the file on flush()/close())
+    """
+
+    def __init__(self, path, writable: bool = False):
+        self.path = Path(path)
+        self.writable = writable
+        self._file = open(self.path, "r+b" if writable else "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise HiveError(f"{self.path}: empty file") from None
+        self._dirty = False
+        # Free space left in the last appended bin: (cell offset, size)
+        self._tail = None
+        # nk offset -> {lower-case value name: vk offset}, built on first lookup
+        self._value_index = {}
+        try:
+            self._check_header()
+        except HiveError:
+            self.close()
+            raise
+
+    # ------------------------------------------------------------------
+    # Creation and file level
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def create(cls, path, root_name: str = "ROOT") -> "RegfHive":
+        """Write a new, empty hive file and open it for writing."""
+        now = filetime_now()
+        descriptor = _default_security_descriptor()
+        sk_size = (4 + 20 + len(descriptor) + 7) & ~7
+        sk_offset = HBIN_HEADER_SIZE
+        nk_offset = sk_offset + sk_size
+        name, compressed = _encode_name(root_name)
+        nk_size = (4 + _NK_SIZE + len(name) + 7) & ~7
+
+        hbin = bytearray(HBIN_SIZE)
+        _HBIN.pack_into(hbin, 0, b"hbin", 0, HBIN_SIZE, now)
+        _INT.pack_into(hbin, sk_offset, -sk_size)
+        struct.pack_into("<2sHIIII", hbin, sk_offset + 4, b"sk", 0,
+                         sk_offset, sk_offset, 1, len(descriptor))
+        hbin[sk_offset + 24:sk_offset + 24 + len(descriptor)] = descriptor
+        _INT.pack_into(hbin, nk_offset, -nk_size)
+        _NK.pack_into(hbin, nk_offset + 4, b"nk",
+                      KEY_HIVE_ENTRY | KEY_NO_DELETE | (KEY_COMP_NAME if compressed else 0),
+                      now, 0, NO_CELL, 0, 0, NO_CELL, NO_CELL, 0, NO_CELL, sk_offset, NO_CELL,
+                      0, 0, 0, 0, 0, len(name), 0)
+        hbin[nk_offset + 4 + _NK_SIZE:nk_offset + 4 + _NK_SIZE + len(name)] = name
+        free_offset = nk_offset + nk_size
+        _INT.pack_into(hbin, free_offset, HBIN_SIZE - free_offset)
+
+        base = bytearray(BASE_BLOCK_SIZE)
+        _BASE.pack_into(base, 0, b"regf", 1, 1, now, 1, 5, 0, 1, nk_offset, HBIN_SIZE)
+        _UINT.pack_into(base, 44, 1)    # clustering factor
+        file_name = Path(path).name[-31:].encode("utf-16-le")
+        base[48:48 + len(file_name)] = file_name
+        _UINT.pack_into(base, 508, _checksum(base))
+        with open(path, "wb") as f:
+            f.write(base)
+            f.write(hbin)
+        return cls(path, writable=True)
+
+    def _check_header(self):
+        if len(self._map) < BASE_BLOCK_SIZE + HBIN_SIZE:
+            raise HiveError(f"{self.path}: too small to be a registry hive")
+        (signature, seq1, seq2, _, major, minor, _, _,
+         self.root_offset, bins_size) = _BASE.unpack_from(self._map, 0)
+        if signature != b"regf":
+            raise HiveError(f"{self.path}: not a registry hive (no regf signature)")
+        if major != 1 or minor < 3:
+            raise HiveError(f"{self.path}: unsupported hive version {major}.{minor}")
+        if _checksum(self._map) != _UINT.unpack_from(self._map, 508)[0]:
+            raise HiveError(f"{self.path}: base block checksum mismatch")
+        if seq1 != seq2:
+            raise HiveError(f"{self.path}: hive has unapplied transaction log data; "
+                            f"load and unload it on Windows first")
+        self.minor_version = minor
+        self.bins_size = bins_size
+
+    def flush(self):
+        """Finish the pending changes: sequence numbers, size, checksum, then sync to disk."""
+        if not self._dirty:
+            return
+        seq1 = _UINT.unpack_from(self._map, 4)[0]
+        _UINT.pack_into(self._map, 8, seq1)
+        struct.pack_into("<Q", self._map, 12, filetime_now())
+        _UINT.pack_into(self._map, 40, self.bins_size)
+        _UINT.pack_into(self._map, 508, _checksum(self._map))
+        self._map.flush()
+        self._dirty = False
+
+    def close(self):
+        if self._map is not None:
+            if self.writable:
+                self.flush()
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _begin_write(self):
+        if not self.writable:
+            raise PermissionError(5, "Access is denied (hive opened read-only)")
+        if not self._dirty:
+            # Primary sequence number first: an interrupted write leaves the
+            # base block marked dirty instead of silently inconsistent
+            seq1 = _UINT.unpack_from(self._map, 4)[0]
+            _UINT.pack_into(self._map, 4, (seq1 + 1) & 0xFFFFFFFF)
+            _UINT.pack_into(self._map, 508, _checksum(self._map))
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Cells
+    # ------------------------------------------------------------------
+
+    def _pos(self, cell: int) -> int:
+        """File position of a cell's data (after its size field)."""
+        if cell == NO_CELL or not 0 <= cell < self.bins_size:
+            raise HiveError(f"{self.path}: cell offset {cell:#x} out of range")
+        return BASE_BLOCK_SIZE + cell + 4
+
+    def _cell_size(self, cell: int) -> int:
+        return -_INT.unpack_from(self._map, BASE_BLOCK_SIZE + cell)[0] - 4
+
+    def _cell_bytes(self, cell: int, length: int) -> bytes:
+        pos = self._pos(cell)
+        return self._map[pos:pos + length]
+
+    def _u32(self, cell: int, field: int) -> int:
+        return _UINT.unpack_from(self._map, self._pos(cell) + field)[0]
+
+    def _set_u32(self, cell: int, field: int, value: int):
+        _UINT.pack_into(self._map, self._pos(cell) + field, value)
+
+    def _allocate(self, length: int) -> int:
+        """Allocate a cell for `length` bytes of data at the end of the hive."""
+        size = (length + 4 + 7) & ~7
+        if self._tail is None or self._tail[1] < size:
+            self._append_bin(size)
+        offset, free = self._tail
+        if free - size < 8:
+            size = free     # too little left to be a cell of its own
+        _INT.pack_into(self._map, BASE_BLOCK_SIZE + offset, -size)
+        if free > size:
+            _INT.pack_into(self._map, BASE_BLOCK_SIZE + offset + size, free - size)
+            self._tail = (offset + size, free - size)
+        else:
+            self._tail = None
+        return offset
+
+    def _append_bin(self, size: int):
+        bin_size = (size + HBIN_HEADER_SIZE + HBIN_SIZE - 1) // HBIN_SIZE * HBIN_SIZE
+        bin_offset = self.bins_size
+        self._map.resize(BASE_BLOCK_SIZE + bin_offset + bin_size)
+        _HBIN.pack_into(self._map, BASE_BLOCK_SIZE + bin_offset, b"hbin", bin_offset,
+                        bin_size, filetime_now())
+        self.bins_size += bin_size
+        cell = bin_offset + HBIN_HEADER_SIZE
+        _INT.pack_into(self._map, BASE_BLOCK_SIZE + cell, bin_size - HBIN_HEADER_SIZE)
+        self._tail = (cell, bin_size - HBIN_HEADER_SIZE)
+
+    def _free(self, cell: int):
+        if cell == NO_CELL:
+            return
+        raw = _INT.unpack_from(self._map, BASE_BLOCK_SIZE + cell)[0]
+        if raw < 0:
+            _INT.pack_into(self._map, BASE_BLOCK_SIZE + cell, -raw)
+
+    def _new_cell(self, data: bytes) -> int:
+        cell = self._allocate(len(data))
+        pos = self._pos(cell)
+        self._map[pos:pos + len(data)] = data
+        return cell
+
+    # ------------------------------------------------------------------
+    # Keys (nk records)
+    # ------------------------------------------------------------------
+
+    def key_name(self, nk: int) -> str:
+        pos = self._pos(nk)
+        flags = struct.unpack_from("<H", self._map, pos + _NK_FLAGS)[0]
+        length = struct.unpack_from("<H", self._map, pos + 72)[0]
+        raw = self._map[pos + _NK_SIZE:pos + _NK_SIZE + length]
+        return raw.decode("latin-1") if flags & KEY_COMP_NAME else raw.decode("utf-16-le", "replace")
+
+    def key_info(self, nk: int) -> tuple[int, int, int]:
+        """(subkey count, value count, last-write FILETIME), like winreg.QueryInfoKey."""
+        pos = self._pos(nk)
+        if self._map[pos:pos + 2] != b"nk":
+            raise HiveError(f"{self.path}: cell {nk:#x} is not a key")
+        return (self._u32(nk, _NK_SUBKEY_COUNT), self._u32(nk, _NK_VALUE_COUNT),
+                struct.unpack_from("<Q", self._map, pos + _NK_TIMESTAMP)[0])
+
+    def _touch(self, nk: int):
+        struct.pack_into("<Q", self._map, self._pos(nk) + _NK_TIMESTAMP, filetime_now())
+
+    def _leaf_lists(self, list_cell: int) -> list[int]:
+        """The leaf lists (lf/lh/li) of a subkey list, in order."""
+        if list_cell == NO_CELL:
+            return []
+        pos = self._pos(list_cell)
+        if self._map[pos:pos + 2] == b"ri":
+            count = struct.unpack_from("<H", self._map, pos + 2)[0]
+            return list(struct.unpack_from(f"<{count}I", self._map, pos + 4))
+        return [list_cell]
+
+    def _leaf(self, leaf: int) -> tuple[int, int, int]:
+        """(data position, entry count, stride) of a leaf list."""
+        pos = self._pos(leaf)
+        signature = self._map[pos:pos + 2]
+        count = struct.unpack_from("<H", self._map, pos + 2)[0]
+        if signature in (b"lf", b"lh"):
+            return pos + 4, count, 8
+        if signature == b"li":
+            return pos + 4, count, 4
+        raise HiveError(f"{self.path}: cell {leaf:#x} is not a subkey list")
+
+    def subkey_offsets(self, nk: int) -> list[int]:
+        """nk offsets of all subkeys, in stored (sorted) order."""
+        offsets = []
+        for leaf in self._leaf_lists(self._u32(nk, _NK_SUBKEY_LIST)):
+            pos, count, stride = self._leaf(leaf)
+            offsets.extend(_UINT.unpack_from(self._map, pos + i * stride)[0] for i in range(count))
+        return offsets
+
+    def subkey_at(self, nk: int, index: int) -> Optional[int]:
+        """nk offset of the index-th subkey, without building the whole list."""
+        for leaf in self._leaf_lists(self._u32(nk, _NK_SUBKEY_LIST)):
+            pos, count, stride = self._leaf(leaf)
+            if index < count:
+                return _UINT.unpack_from(self._map, pos + index * stride)[0]
+            index -= count
+        return None
+
+    def _leaf_signature(self) -> bytes:
+        return b"lh" if self.minor_version >= 5 else b"lf"
+
+    def _list_tag(self, child: int, signature: bytes) -> int:
+        name = self.key_name(child)
+        return _name_hash(name) if signature == b"lh" else _name_hint(name)
+
+    def _leaf_entries(self, leaf: int) -> list[tuple[int, int]]:
+        """(nk offset, hash/hint) pairs of a leaf list, as written by _new_leaf()."""
+        pos, count, stride = self._leaf(leaf)
+        signature = self._leaf_signature()
+        if stride == 8 and self._map[pos - 4:pos - 2] == signature:
+            # Same list type: the stored hashes can be reused as they are
+            return [struct.unpack_from("<II", self._map, pos + i * 8) for i in range(count)]
+        children = struct.unpack_from(f"<{count}{'II' if stride == 8 else 'I'}", self._map, pos)
+        children = children[::2] if stride == 8 else children
+        return [(child, self._list_tag(child, signature)) for child in children]
+
+    def _new_leaf(self, entries: list[tuple[int, int]]) -> int:
+        data = bytearray(self._leaf_signature() + struct.pack("<H", len(entries)))
+        for child, tag in entries:
+            data += struct.pack("<II", child, tag)
+        # Leave room to insert more subkeys in place
+        cell = self._allocate(len(data) + len(entries) // 2 * 8)
+        pos = self._pos(cell)
+        self._map[pos:pos + len(data)] = data
+        return cell
+
+    def _set_leaves(self, nk: int, leaves: list[int], count: int):
+        """Point a key at its (possibly new) leaf lists, adding or dropping the "ri" index."""
+        old = self._u32(nk, _NK_SUBKEY_LIST)
+        if old != NO_CELL and self._map[self._pos(old):self._pos(old) + 2] == b"ri":
+            self._free(old)
+        if not leaves:
+            list_cell = NO_CELL
+        elif len(leaves) == 1:
+            list_cell = leaves[0]
+        else:
+            list_cell = self._new_cell(b"ri" + struct.pack(f"<H{len(leaves)}I", len(leaves), *leaves))
+        self._set_u32(nk, _NK_SUBKEY_LIST, list_cell)
+        self._set_u32(nk, _NK_SUBKEY_COUNT, count)
+
+    def _find_leaf(self, leaves: list[int], wanted: str) -> int:
+        """Index of the leaf list an upper-cased name belongs in (by each leaf's last entry)."""
+        low, high = 0, len(leaves) - 1
+        while low < high:
+            middle = (low + high) // 2
+            pos, count, stride = self._leaf(leaves[middle])
+            last = _UINT.unpack_from(self._map, pos + (count - 1) * stride)[0] if count else None
+            if last is not None and self.key_name(last).upper() < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _search_leaf(self, leaf: int, wanted: str) -> tuple[int, Optional[int]]:
+        """(insert position, nk offset or None) of an upper-cased name within one leaf."""
+        pos, count, stride = self._leaf(leaf)
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            child = _UINT.unpack_from(self._map, pos + middle * stride)[0]
+            child_name = self.key_name(child).upper()
+            if child_name == wanted:
+                return middle, child
+            if child_name < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return low, None
+
+    def find_subkey(self, nk: int, name: str) -> Optional[int]:
+        """
+        nk offset of a subkey (case-insensitive), or None.
+
+        Subkey lists are sorted by upper-cased name, so this is a binary
+        search: first over the leaf lists of an "ri" index (by their last
+        entry), then within one leaf.
+        """
+        if self._u32(nk, _NK_SUBKEY_COUNT) == 0:
+            return None
+        wanted = name.upper()
+        leaves = self._leaf_lists(self._u32(nk, _NK_SUBKEY_LIST))
+        _, child = self._search_leaf(leaves[self._find_leaf(leaves, wanted)], wanted)
+        if child is None and not wanted.isascii():
+            # Windows orders non-ASCII names by its own upcase table; fall back to a scan
+            for candidate in self.subkey_offsets(nk):
+                if self.key_name(candidate).upper() == wanted:
+                    return candidate
+        return child
+
+    def create_subkey(self, parent: int, name: str) -> int:
+        """Create a subkey (which must not exist) and return its nk offset."""
+        self._begin_write()
+        encoded, compressed = _encode_name(name)
+        security = self._u32(parent, _NK_SECURITY)
+        now = filetime_now()
+        data = bytearray(_NK_SIZE + len(encoded))
+        _NK.pack_into(data, 0, b"nk", KEY_COMP_NAME if compressed else 0, now, 0,
+                      parent, 0, 0, NO_CELL, NO_CELL, 0, NO_CELL, security, NO_CELL,
+                      0, 0, 0, 0, 0, len(encoded), 0)
+        data[_NK_SIZE:] = encoded
+        child = self._new_cell(bytes(data))
+        if security != NO_CELL:
+            # The new key shares its parent's security descriptor
+            self._set_u32(security, 12, self._u32(security, 12) + 1)
+        tag = self._list_tag(child, self._leaf_signature())
+        count = self._u32(parent, _NK_SUBKEY_COUNT)
+
+        # Only the leaf list the name sorts into is touched: in place if its
+        # cell has room, otherwise rewritten (and split once it is full)
+        leaves = self._leaf_lists(self._u32(parent, _NK_SUBKEY_LIST))
+        if not leaves:
+            self._set_leaves(parent, [self._new_leaf([(child, tag)])], 1)
+        else:
+            wanted = name.upper()
+            index = self._find_leaf(leaves, wanted)
+            leaf = leaves[index]
+            position, _ = self._search_leaf(leaf, wanted)
+            pos, leaf_count, stride = self._leaf(leaf)
+            if (stride == 8 and self._map[pos - 4:pos - 2] == self._leaf_signature()
+                    and leaf_count < MAX_LEAF_ENTRIES
+                    and 4 + (leaf_count + 1) * 8 <= self._cell_size(leaf)):
+                start = pos + position * 8
+                self._map.move(start + 8, start, (leaf_count - position) * 8)
+                struct.pack_into("<II", self._map, start, child, tag)
+                struct.pack_into("<H", self._map, pos - 2, leaf_count + 1)
+                self._set_u32(parent, _NK_SUBKEY_COUNT, count + 1)
+            else:
+                entries = self._leaf_entries(leaf)
+                entries.insert(position, (child, tag))
+                if len(entries) > MAX_LEAF_ENTRIES:
+                    half = len(entries) // 2
+                    replacement = [self._new_leaf(entries[:half]), self._new_leaf(entries[half:])]
+                else:
+                    replacement = [self._new_leaf(entries)]
+                self._free(leaf)
+                self._set_leaves(parent, leaves[:index] + replacement + leaves[index + 1:],
+                                 count + 1)
+
+        # The low 16 bits hold the longest subkey name (UTF-16 bytes); the rest are flags
+        max_name = self._u32(parent, _NK_MAX_NAME)
+        self._set_u32(parent, _NK_MAX_NAME,
+                      (max_name & ~0xFFFF) | max(max_name & 0xFFFF, len(name) * 2))
+        self._touch(parent)
+        return child
+
+    def delete_subkey(self, parent: int, child: int):
+        """Delete a subkey that has no subkeys of its own."""
+        if self._u32(child, _NK_SUBKEY_COUNT):
+            raise PermissionError(5, "Access is denied")
+        self._begin_write()
+        for name, _, _ in list(self.values(child)):
+            self.delete_value(child, name)
+
+        leaves = self._leaf_lists(self._u32(parent, _NK_SUBKEY_LIST))
+        for index, leaf in enumerate(leaves):
+            pos, count, stride = self._leaf(leaf)
+            children = [_UINT.unpack_from(self._map, pos + i * stride)[0] for i in range(count)]
+            if child not in children:
+                continue
+            position = children.index(child)
+            if count == 1:
+                self._free(leaf)
+                self._set_leaves(parent, leaves[:index] + leaves[index + 1:],
+                                 self._u32(parent, _NK_SUBKEY_COUNT) - 1)
+            else:
+                start = pos + position * stride
+                self._map.move(start, start + stride, (count - position - 1) * stride)
+                struct.pack_into("<H", self._map, pos - 2, count - 1)
+                self._set_u32(parent, _NK_SUBKEY_COUNT, self._u32(parent, _NK_SUBKEY_COUNT) - 1)
+            break
+
+        security = self._u32(child, _NK_SECURITY)
+        if security != NO_CELL and self._u32(security, 12) > 1:
+            self._set_u32(security, 12, self._u32(security, 12) - 1)
+        self._free(self._u32(child, 48))    # class name
+        self._free(child)
+        self._value_index.pop(child, None)
+        self._touch(parent)
+
+    # ------------------------------------------------------------------
+    # Values (vk records)
+    # ------------------------------------------------------------------
+
+    def _value_cells(self, nk: int) -> list[int]:
+        count = self._u32(nk, _NK_VALUE_COUNT)
+        if not count:
+            return []
+        return list(struct.unpack_from(f"<{count}I", self._map, self._pos(self._u32(nk, _NK_VALUE_LIST))))
+
+    def _value_name(self, vk: int) -> str:
+        pos = self._pos(vk)
+        _, length, _, _, _, flags, _ = _VK.unpack_from(self._map, pos)
+        raw = self._map[pos + _VK_SIZE:pos + _VK_SIZE + length]
+        return raw.decode("latin-1") if flags & VALUE_COMP_NAME else raw.decode("utf-16-le", "replace")
+
+    def _value_data(self, vk: int) -> tuple[bytes, int]:
+        _, _, size, data_cell, value_type, _, _ = _VK.unpack_from(self._map, self._pos(vk))
+        if size & 0x80000000:
+            # Up to four bytes are stored in the data offset field itself
+            return struct.pack("<I", data_cell)[:size & 0x7FFFFFFF], value_type
+        if size == 0:
+            return b"", value_type
+        pos = self._pos(data_cell)
+        if size > MAX_CELL_DATA and self._map[pos:pos + 2] == b"db":
+            count, segment_list = struct.unpack_from("<HI", self._map, pos + 2)
+            segments = struct.unpack_from(f"<{count}I", self._map, self._pos(segment_list))
+            data = b"".join(self._cell_bytes(s, min(self._cell_size(s), MAX_CELL_DATA))
+                            for s in segments)
+            return data[:size], value_type
+        return self._map[pos:pos + size], value_type
+
+    def _find_value(self, nk: int, name: str) -> Optional[int]:
+        """vk offset of a value, or None."""
+        index = self._value_index.get(nk)
+        if index is None:
+            # Value lists are unsorted; keys such as SupportedTypes hold
+            # hundreds of values, so index the names instead of rescanning
+            index = {self._value_name(vk).lower(): vk for vk in self._value_cells(nk)}
+            self._value_index[nk] = index
+        return index.get(name.lower())
+
+    def values(self, nk: int):
+        """Yield (name, raw data, type) for each value of a key, in stored order."""
+        for vk in self._value_cells(nk):
+            data, value_type = self._value_data(vk)
+            yield self._value_name(vk), data, value_type
+
+    def value_at(self, nk: int, index: int) -> Optional[tuple[str, bytes, int]]:
+        cells = self._value_cells(nk)
+        if index >= len(cells):
+            return None
+        data, value_type = self._value_data(cells[index])
+        return self._value_name(cells[index]), data, value_type
+
+    def query_value(self, nk: int, name: str) -> Optional[tuple[bytes, int]]:
+        vk = self._find_value(nk, name)
+        return self._value_data(vk) if vk is not None else None
+
+    def _free_value_data(self, vk: int):
+        _, _, size, data_cell, _, _, _ = _VK.unpack_from(self._map, self._pos(vk))
+        if size & 0x80000000 or size == 0:
+            return
+        if size > MAX_CELL_DATA and self._map[self._pos(data_cell):self._pos(data_cell) + 2] == b"db":
+            count, segment_list = struct.unpack_from("<HI", self._map, self._pos(data_cell) + 2)
+            for segment in struct.unpack_from(f"<{count}I", self._map, self._pos(segment_list)):
+                self._free(segment)
+            self._free(segment_list)
+        self._free(data_cell)
+
+    def set_value(self, nk: int, name: str, data: bytes, value_type: int):
+        """Create or replace a value with raw data."""
+        if len(data) > MAX_CELL_DATA:
+            raise HiveError(f"{self.path}: values over {MAX_CELL_DATA} bytes are not supported")
+        self._begin_write()
+        if len(data) <= 4:
+            size = len(data) | 0x80000000
+            data_cell = _UINT.unpack(data.ljust(4, b"\0"))[0]
+        else:
+            size = len(data)
+            data_cell = self._new_cell(data)
+
+        vk = self._find_value(nk, name)
+        if vk is not None:
+            self._free_value_data(vk)
+            struct.pack_into("<II I", self._map, self._pos(vk) + 4, size, data_cell, value_type)
+        else:
+            encoded, compressed = _encode_name(name)
+            vk = self._new_cell(_VK.pack(b"vk", len(encoded), size, data_cell, value_type,
+                                         VALUE_COMP_NAME if compressed else 0, 0) + encoded)
+            self._value_index[nk][name.lower()] = vk
+            cells = self._value_cells(nk) + [vk]
+            self._free(self._u32(nk, _NK_VALUE_LIST))
+            self._set_u32(nk, _NK_VALUE_LIST, self._new_cell(struct.pack(f"<{len(cells)}I", *cells)))
+            self._set_u32(nk, _NK_VALUE_COUNT, len(cells))
+            self._set_u32(nk, _NK_MAX_VALUE_NAME, max(self._u32(nk, _NK_MAX_VALUE_NAME), len(name) * 2))
+        self._set_u32(nk, _NK_MAX_VALUE_DATA, max(self._u32(nk, _NK_MAX_VALUE_DATA), len(data)))
+        self._touch(nk)
+
+    def delete_value(self, nk: int, name: str) -> bool:
+        """Delete a value; False if it does not exist."""
+        vk = self._find_value(nk, name)
+        if vk is None:
+            return False
+        self._begin_write()
+        del self._value_index[nk][name.lower()]
+        cells = self._value_cells(nk)
+        cells.remove(vk)
+        self._free(self._u32(nk, _NK_VALUE_LIST))
+        self._set_u32(nk, _NK_VALUE_LIST,
+                      self._new_cell(struct.pack(f"<{len(cells)}I", *cells)) if cells else NO_CELL)
+        self._set_u32(nk, _NK_VALUE_COUNT, len(cells))
+        self._free_value_data(vk)
+        self._free(vk)
+        self._touch(nk)
+        return True
+
+
+def _checksum(block) -> int:
+    """XOR of the first 127 dwords of the base block, as Windows computes it."""
+    value = 0
+    for dword in struct.unpack_from("<127I", block, 0):
+        value ^= dword
+    if value == 0xFFFFFFFF:
+        return 0xFFFFFFFE
+    if value == 0:
+        return 1
+    return value
+
+
+class HiveKey:
+    """An open key handle, usable as a context manager like winreg.HKEYType."""
+
+    __slots__ = ("hive", "nk", "root", "path")
+
+    def __init__(self, hive: RegfHive, nk: int, root: int, path: str):
+        self.hive = hive
+        self.nk = nk
+        self.root = root
+        self.path = path
+
+    def Close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class HiveRegistry:
+    """
+    Registry backend over offline hive files (see the module docstring).
+
+    Args:
+        software: SOFTWARE hive file (HKLM\\SOFTWARE and HKEY_CLASSES_ROOT)
+        ntuser: NTUSER.DAT hive file (HKEY_CURRENT_USER)
+        writable: Open the hives for writing
+    """
+
+    HKEY_CLASSES_ROOT = _mr.HKEY_CLASSES_ROOT
+    HKEY_CURRENT_USER = _mr.HKEY_CURRENT_USER
+    HKEY_LOCAL_MACHINE = _mr.HKEY_LOCAL_MACHINE
+    HKEY_USERS = _mr.HKEY_USERS
+    HKEY_CURRENT_CONFIG = _mr.HKEY_CURRENT_CONFIG
+    KEY_READ = _mr.KEY_READ
+    KEY_WRITE = _mr.KEY_WRITE
+    KEY_ALL_ACCESS = _mr.KEY_ALL_ACCESS
+    REG_NONE = _mr.REG_NONE
+    REG_SZ = _mr.REG_SZ
+    REG_EXPAND_SZ = _mr.REG_EXPAND_SZ
+    REG_BINARY = _mr.REG_BINARY
+    REG_DWORD = _mr.REG_DWORD
+    REG_MULTI_SZ = _mr.REG_MULTI_SZ
+    REG_QWORD = _mr.REG_QWORD
+
+    def __init__(self, software=None, ntuser=None, writable: bool = True):
+        self.software = RegfHive(software, writable) if software else None
+        try:
+            self.ntuser = RegfHive(ntuser, writable) if ntuser else None
+        except OSError:
+            if self.software is not None:
+                self.software.close()
+            raise
+
+    def close(self):
+        for hive in (self.software, self.ntuser):
+            if hive is not None:
+                hive.close()
+
+    def flush(self):
+        for hive in (self.software, self.ntuser):
+            if hive is not None:
+                hive.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _mount(self, root: int, parts: list[str]) -> tuple[Optional[RegfHive], list[str]]:
+        """The hive a root path lives in, and the path inside that hive."""
+        if root == _mr.HKEY_CURRENT_USER:
+            return self.ntuser, parts
+        if root == _mr.HKEY_CLASSES_ROOT:
+            return self.software, ["Classes", *parts]
+        if root == _mr.HKEY_LOCAL_MACHINE and parts and parts[0].lower() == "software":
+            return self.software, parts[1:]
+        return None, parts
+
+    def _walk(self, key, sub_key: str, create: bool) -> HiveKey:
+        parts = [p for p in (sub_key or "").split("\\") if p]
+        if isinstance(key, HiveKey):
+            hive, nk, root, prefix = key.hive, key.nk, key.root, key.path
+            inner = parts
+        else:
+            if key not in _mr.ROOT_NAMES:
+                raise OSError(f"[WinError 6] The handle is invalid: {key!r}")
+            hive, inner = self._mount(key, parts)
+            if hive is None:
+                raise FileNotFoundError(2, "The system cannot find the file specified")
+            nk, root, prefix = hive.root_offset, key, ""
+        for part in inner:
+            child = hive.find_subkey(nk, part)
+            if child is None:
+                if not create:
+                    raise FileNotFoundError(2, "The system cannot find the file specified")
+                child = hive.create_subkey(nk, part)
+            nk = child
+        return HiveKey(hive, nk, root, "\\".join(p for p in (prefix, *parts) if p))
+
+    def _resolve(self, key) -> HiveKey:
+        return key if isinstance(key, HiveKey) else self._walk(key, "", create=False)
+
+    # ------------------------------------------------------------------
+    # winreg API
+    # ------------------------------------------------------------------
+
+    def OpenKey(self, key, sub_key: str, reserved: int = 0, access: int = KEY_READ) -> HiveKey:
+        return self._walk(key, sub_key, create=False)
+
+    OpenKeyEx = OpenKey
+
+    def CreateKeyEx(self, key, sub_key: str, reserved: int = 0, access: int = KEY_WRITE) -> HiveKey:
+        return self._walk(key, sub_key, create=True)
+
+    def CreateKey(self, key, sub_key: str) -> HiveKey:
+        return self.CreateKeyEx(key, sub_key)
+
+    def CloseKey(self, key):
+        pass
+
+    def QueryValueEx(self, key, value_name: Optional[str]):
+        handle = self._resolve(key)
+        found = handle.hive.query_value(handle.nk, value_name or "")
+        if found is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        data, value_type = found
+        return decode_value(data, value_type), value_type
+
+    def SetValueEx(self, key, value_name: Optional[str], reserved: int, type: int, value):
+        handle = self._resolve(key)
+        handle.hive.set_value(handle.nk, value_name or "", encode_value(value, type), type)
+
+    def DeleteValue(self, key, value_name: Optional[str]):
+        handle = self._resolve(key)
+        if not handle.hive.delete_value(handle.nk, value_name or ""):
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+
+    def DeleteKey(self, key, sub_key: str):
+        parent_path, _, leaf = (sub_key or "").rstrip("\\").rpartition("\\")
+        parent = self._walk(key, parent_path, create=False)
+        child = parent.hive.find_subkey(parent.nk, leaf)
+        if child is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        parent.hive.delete_subkey(parent.nk, child)
+
+    def EnumKey(self, key, index: int) -> str:
+        handle = self._resolve(key)
+        child = handle.hive.subkey_at(handle.nk, index)
+        if child is None:
+            raise OSError(259, "No more data is available")
+        return handle.hive.key_name(child)
+
+    def EnumValue(self, key, index: int):
+        handle = self._resolve(key)
+        found = handle.hive.value_at(handle.nk, index)
+        if found is None:
+            raise OSError(259, "No more data is available")
+        name, data, value_type = found
+        return name, decode_value(data, value_type), value_type
+
+    def QueryInfoKey(self, key):
+        handle = self._resolve(key)
+        return handle.hive.key_info(handle.nk)
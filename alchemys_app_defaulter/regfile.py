@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+"""
+.reg File Support
+
+Serializes registry writes to REGEDIT5 (.reg) files that can be applied in a
+single `reg import`.
+
+RegFileBackend is a registry backend for AppDefaulter.py: it exposes the
+same subset of the winreg API, answers reads from an optional base registry
+(plus everything written so far), and records every write instead of
+performing it. Call write() at the end to produce the .reg file.
+
+The parser reads REGEDIT5 and REGEDIT4 files (strings, dword, hex/hex(n)
+values, and `[-KEY]` / `"name"=-` deletions) into RegOp records, and
+RegModel merges several files into one normalized set of operations,
+reporting values that different files disagree on.
+
+Usage:
+    from regfile import RegFileBackend
+
+    backend = RegFileBackend(base=winreg)
+    ... run the normal AppDefaulter logic against `backend` ...
+    backend.write("out.reg")
+
+    from regfile import RegModel, parse_reg_file
+
+    model = RegModel()
+    for path in paths:
+        model.add_all(parse_reg_file(path))
+    for conflict in model.conflicts:
+        print(conflict.describe())
+"""
+
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import memory_registry as _mr
+
+
+REGEDIT5_HEADER = "Windows Registry Editor Version 5.00"
+
+# Maximum line length used by regedit when wrapping hex values
+_HEX_LINE_WIDTH = 80
+
+
+def _escape_string(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _format_name(name: str) -> str:
+    return "@" if not name else f'"{_escape_string(name)}"'
+
+
+def _format_hex(prefix: str, data: bytes, indent: int) -> str:
+    """Format binary data as regedit does: comma-separated hex, wrapped with '\\'."""
+    if not data:
+        return prefix
+    lines = []
+    line = prefix
+    width = indent + len(prefix)
+    octets = [f"{b:02x}" for b in data]
+    for i, octet in enumerate(octets):
+        piece = octet + ("," if i < len(octets) - 1 else "")
+        if width + len(piece) > _HEX_LINE_WIDTH - 2 and line.strip():
+            lines.append(line + "\\")
+            line = "  "
+            width = 2
+        line += piece
+        width += len(piece)
+    lines.append(line)
+    return "\r\n".join(lines)
+
+
+def format_value(name: str, value_type: int, data) -> str:
+    """
+    Format a single value line (or wrapped lines) in .reg syntax.
+
+    Args:
+        name: Value name ('' for the default value)
+        value_type: One of the REG_* constants
+        data: The value data, as returned/accepted by winreg
+
+    Returns:
+        The formatted value, e.g. '"Path"="C:\\\\Program Files"'
+    """
+    key = _format_name(name)
+    if value_type == _mr.REG_SZ:
+        return f'{key}="{_escape_string(data or "")}"'
+    if value_type == _mr.REG_DWORD:
+        return f"{key}=dword:{int(data or 0) & 0xFFFFFFFF:08x}"
+    if value_type == _mr.REG_EXPAND_SZ:
+        raw = ((data or "") + "\0").encode("utf-16-le")
+        return _format_hex(f"{key}=hex(2):", raw, 0)
+    if value_type == _mr.REG_MULTI_SZ:
+        raw = "".join(s + "\0" for s in (data or [])) + "\0"
+        return _format_hex(f"{key}=hex(7):", raw.encode("utf-16-le"), 0)
+    if value_type == _mr.REG_QWORD:
+        raw = int(data or 0).to_bytes(8, "little")
+        return _format_hex(f"{key}=hex(b):", raw, 0)
+    if value_type == _mr.REG_BINARY:
+        return _format_hex(f"{key}=hex:", bytes(data or b""), 0)
+    return _format_hex(f"{key}=hex({value_type:x}):", bytes(data or b""), 0)
+
+
+class _PlannedKey:
+    """Handle returned by RegFileBackend; identifies a key by root and path."""
+
+    __slots__ = ("root", "path")
+
+    def __init__(self, root: int, path: str):
+        self.root = root
+        self.path = path
+
+    def Close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class RegFileBackend:
+    """
+    Registry backend that records writes for a .reg file instead of applying them.
+
+    Args:
+        base: Optional registry (e.g. the winreg module) used to answer reads
+              for keys and values that have not been written in this run.
+              With no base, the registry is treated as empty.
+    """
+
+    HKEY_CLASSES_ROOT = _mr.HKEY_CLASSES_ROOT
+    HKEY_CURRENT_USER = _mr.HKEY_CURRENT_USER
+    HKEY_LOCAL_MACHINE = _mr.HKEY_LOCAL_MACHINE
+    HKEY_USERS = _mr.HKEY_USERS
+    HKEY_CURRENT_CONFIG = _mr.HKEY_CURRENT_CONFIG
+    KEY_READ = _mr.KEY_READ
+    KEY_WRITE = _mr.KEY_WRITE
+    KEY_ALL_ACCESS = _mr.KEY_ALL_ACCESS
+    REG_NONE = _mr.REG_NONE
+    REG_SZ = _mr.REG_SZ
+    REG_EXPAND_SZ = _mr.REG_EXPAND_SZ
+    REG_BINARY = _mr.REG_BINARY
+    REG_DWORD = _mr.REG_DWORD
+    REG_MULTI_SZ = _mr.REG_MULTI_SZ
+    REG_QWORD = _mr.REG_QWORD
+
+    def __init__(self, base=None):
+        self.base = base
+        self.calls = Counter()
+        # (root, lower path) -> (display path, OrderedDict(lower name -> (name, data, type)))
+        self._keys = OrderedDict()
+        # (root, lower path) of every planned key and its ancestors
+        self._created = set()
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _join(self, key, sub_key: str) -> tuple[int, str]:
+        if isinstance(key, _PlannedKey):
+            root, prefix = key.root, key.path
+        else:
+            if key not in _mr.ROOT_NAMES:
+                raise OSError(f"[WinError 6] The handle is invalid: {key!r}")
+            root, prefix = key, ""
+        parts = [p for p in (prefix.split("\\") + (sub_key or "").split("\\")) if p]
+        return root, "\\".join(parts)
+
+    def _base_open(self, root: int, path: str):
+        if self.base is None:
+            return None
+        try:
+            return self.base.OpenKey(root, path, 0, self.base.KEY_READ)
+        except OSError:
+            return None
+
+    def _planned_values(self, root: int, path: str) -> Optional[OrderedDict]:
+        entry = self._keys.get((root, path.lower()))
+        return entry[1] if entry else None
+
+    def _base_values(self, root: int, path: str) -> list:
+        key = self._base_open(root, path)
+        if key is None:
+            return []
+        values = []
+        with key:
+            i = 0
+            while True:
+                try:
+                    values.append(self.base.EnumValue(key, i))
+                except OSError:
+                    break
+                i += 1
+        return values
+
+    def _base_subkeys(self, root: int, path: str) -> list:
+        key = self._base_open(root, path)
+        if key is None:
+            return []
+        names = []
+        with key:
+            i = 0
+            while True:
+                try:
+                    names.append(self.base.EnumKey(key, i))
+                except OSError:
+                    break
+                i += 1
+        return names
+
+    def _merged_values(self, root: int, path: str) -> list:
+        planned = self._planned_values(root, path) or {}
+        merged = [v for v in self._base_values(root, path) if v[0].lower() not in planned]
+        merged.extend(planned.values())
+        return merged
+
+    def _merged_subkeys(self, root: int, path: str) -> list:
+        names = OrderedDict((n.lower(), n) for n in self._base_subkeys(root, path))
+        prefix = path.lower() + "\\" if path else ""
+        for created_root, created in self._created:
+            if created_root == root and created.startswith(prefix):
+                child = created[len(prefix):]
+                if child and "\\" not in child:
+                    display = self._keys.get((root, created), (created,))[0]
+                    names.setdefault(child, display.rsplit("\\", 1)[-1])
+        return list(names.values())
+
+    # ------------------------------------------------------------------
+    # winreg API
+    # ------------------------------------------------------------------
+
+    def OpenKey(self, key, sub_key: str, reserved: int = 0, access: int = KEY_READ) -> _PlannedKey:
+        self.calls["OpenKey"] += 1
+        root, path = self._join(key, sub_key)
+        if (root, path.lower()) not in self._created and path:
+            base_key = self._base_open(root, path)
+            if base_key is None:
+                raise FileNotFoundError(2, "The system cannot find the file specified")
+            base_key.Close()
+        return _PlannedKey(root, path)
+
+    OpenKeyEx = OpenKey
+
+    def CreateKeyEx(self, key, sub_key: str, reserved: int = 0, access: int = KEY_WRITE) -> _PlannedKey:
+        self.calls["CreateKeyEx"] += 1
+        root, path = self._join(key, sub_key)
+        if (root, path.lower()) not in self._keys:
+            self._keys[(root, path.lower())] = (path, OrderedDict())
+        parts = path.split("\\")
+        for i in range(1, len(parts) + 1):
+            self._created.add((root, "\\".join(parts[:i]).lower()))
+        return _PlannedKey(root, path)
+
+    def CloseKey(self, key):
+        pass
+
+    def QueryValueEx(self, key, value_name: Optional[str]):
+        self.calls["QueryValueEx"] += 1
+        root, path = self._join(key, "")
+        planned = self._planned_values(root, path)
+        name = (value_name or "").lower()
+        if planned and name in planned:
+            _, data, value_type = planned[name]
+            return data, value_type
+        base_key = self._base_open(root, path)
+        if base_key is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        with base_key:
+            return self.base.QueryValueEx(base_key, value_name)
+
+    def SetValueEx(self, key, value_name: Optional[str], reserved: int, type: int, value):
+        self.calls["SetValueEx"] += 1
+        root, path = self._join(key, "")
+        if (root, path.lower()) not in self._keys:
+            self.CreateKeyEx(root, path)
+        name = value_name or ""
+        self._keys[(root, path.lower())][1][name.lower()] = (name, value, type)
+
+    def EnumKey(self, key, index: int) -> str:
+        self.calls["EnumKey"] += 1
+        names = self._merged_subkeys(*self._join(key, ""))
+        if index >= len(names):
+            raise OSError(259, "No more data is available")
+        return names[index]
+
+    def EnumValue(self, key, index: int):
+        self.calls["EnumValue"] += 1
+        values = self._merged_values(*self._join(key, ""))
+        if index >= len(values):
+            raise OSError(259, "No more data is available")
+        return values[index]
+
+    def QueryInfoKey(self, key):
+        self.calls["QueryInfoKey"] += 1
+        root, path = self._join(key, "")
+        last_write = 0
+        base_key = self._base_open(root, path)
+        if base_key is not None:
+            with base_key:
+                last_write = self.base.QueryInfoKey(base_key)[2]
+        return (len(self._merged_subkeys(root, path)),
+                len(self._merged_values(root, path)),
+                last_write)
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    @property
+    def value_count(self) -> int:
+        """Number of values recorded so far."""
+        return sum(len(values) for _, values in self._keys.values())
+
+    def render(self) -> str:
+        """Return the recorded writes as REGEDIT5 text."""
+        lines = [REGEDIT5_HEADER, ""]
+        for (root, _), (path, values) in self._keys.items():
+            if not values:
+                continue
+            lines.append(f"[{_mr.ROOT_NAMES[root]}\\{path}]" if path else f"[{_mr.ROOT_NAMES[root]}]")
+            for name, data, value_type in values.values():
+                lines.append(format_value(name, value_type, data))
+            lines.append("")
+        return "\r\n".join(lines) + "\r\n"
+
+    def write(self, path: str):
+        """Write the recorded writes to a .reg file (UTF-16 LE with BOM, like regedit)."""
+        with open(path, "w", encoding="utf-16", newline="") as f:
+            f.write(self.render())
+
+
+# ----------------------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------------------
+
+REGEDIT4_HEADER = "REGEDIT4"
+
+ROOT_ALIASES = {
+    "HKEY_CLASSES_ROOT": _mr.HKEY_CLASSES_ROOT,
+    "HKCR": _mr.HKEY_CLASSES_ROOT,
+    "HKEY_CURRENT_USER": _mr.HKEY_CURRENT_USER,
+    "HKCU": _mr.HKEY_CURRENT_USER,
+    "HKEY_LOCAL_MACHINE": _mr.HKEY_LOCAL_MACHINE,
+    "HKLM": _mr.HKEY_LOCAL_MACHINE,
+    "HKEY_USERS": _mr.HKEY_USERS,
+    "HKU": _mr.HKEY_USERS,
+    "HKEY_CURRENT_CONFIG": _mr.HKEY_CURRENT_CONFIG,
+    "HKCC": _mr.HKEY_CURRENT_CONFIG,
+}
+
+OP_DELETE_KEY = "delete_key"
+OP_CREATE_KEY = "create_key"
+OP_SET_VALUE = "set_value"
+OP_DELETE_VALUE = "delete_value"
+
+
+class RegFileError(ValueError):
+    """A .reg file could not be parsed."""
+
+    def __init__(self, source: str, line: int, message: str):
+        super().__init__(f"{source}:{line}: {message}")
+        self.source = source
+        self.line = line
+
+
+@dataclass
+class RegOp:
+    """One operation from a .reg file."""
+    kind: str                       # OP_* constant
+    root: int
+    path: str
+    name: Optional[str] = None      # value name ('' for the default value)
+    value_type: Optional[int] = None
+    data: object = None
+    source: str = ""
+    line: int = 0
+
+    @property
+    def key_name(self) -> str:
+        root = _mr.ROOT_NAMES[self.root]
+        return f"{root}\\{self.path}" if self.path else root
+
+    @property
+    def location(self) -> str:
+        return f"{self.source}:{self.line}"
+
+
+def decode_reg_bytes(raw: bytes) -> str:
+    """Decode a .reg file: UTF-16 with BOM (regedit), UTF-8, or the ANSI code page."""
+    if raw[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return raw.decode("utf-16")
+    try:
+        return raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return raw.decode("cp1252", errors="replace")
+
+
+def _parse_key_path(text: str, source: str, line: int) -> tuple[int, str]:
+    root_name, _, path = text.partition("\\")
+    root = ROOT_ALIASES.get(root_name.upper())
+    if root is None:
+        raise RegFileError(source, line, f"unknown root key: {root_name}")
+    return root, "\\".join(part for part in path.split("\\") if part)
+
+
+def _parse_quoted(text: str, start: int, source: str, line: int) -> tuple[str, int]:
+    """Parse a "..." string starting at text[start]; return (value, index after it)."""
+    chars = []
+    i = start + 1
+    while i < len(text):
+        c = text[i]
+        if c == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            # regedit only escapes backslashes and quotes; keep anything else as-is
+            chars.append(nxt if nxt in "\\\"" else c + nxt)
+            i += 2
+            continue
+        if c == '"':
+            return "".join(chars), i + 1
+        chars.append(c)
+        i += 1
+    raise RegFileError(source, line, "unterminated string")
+
+
+def _decode_string(raw: bytes, unicode: bool) -> str:
+    return raw.decode("utf-16-le" if unicode else "cp1252", errors="replace")
+
+
+def _convert_hex(value_type: int, raw: bytes, unicode: bool):
+    """Convert hex(n) data to what winreg returns for that value type."""
+    if value_type in (_mr.REG_SZ, _mr.REG_EXPAND_SZ):
+        return _decode_string(raw, unicode).split("\0", 1)[0]
+    if value_type == _mr.REG_MULTI_SZ:
+        text = _decode_string(raw, unicode)
+        if text.endswith("\0"):
+            text = text[:-1]
+        items = text.split("\0")
+        if items and items[-1] == "":
+            items.pop()
+        return items
+    if value_type == _mr.REG_DWORD and len(raw) == 4:
+        return int.from_bytes(raw, "little")
+    if value_type == _mr.REG_QWORD and len(raw) == 8:
+        return int.from_bytes(raw, "little")
+    return raw
+
+
+def _parse_data(text: str, source: str, line: int, unicode: bool) -> tuple[Optional[int], object]:
+    """Parse the right-hand side of a value line; (None, None) means delete."""
+    if text == "-":
+        return None, None
+    if text.startswith('"'):
+        value, end = _parse_quoted(text, 0, source, line)
+        if text[end:].strip():
+            raise RegFileError(source, line, f"unexpected text after string: {text[end:]}")
+        return _mr.REG_SZ, value
+    lower = text.lower()
+    if lower.startswith("dword:"):
+        try:
+            return _mr.REG_DWORD, int(text[6:].strip(), 16)
+        except ValueError:
+            raise RegFileError(source, line, f"invalid dword: {text}") from None
+    if lower.startswith("hex"):
+        prefix, sep, octets = text.partition(":")
+        if not sep:
+            raise RegFileError(source, line, f"invalid hex value: {text}")
+        value_type = _mr.REG_BINARY
+        if prefix.lower() != "hex":
+            try:
+                value_type = int(prefix[prefix.index("(") + 1:prefix.rindex(")")], 16)
+            except ValueError:
+                raise RegFileError(source, line, f"invalid hex type: {prefix}") from None
+        try:
+            raw = bytes(int(octet, 16) for octet in octets.replace(" ", "").split(",") if octet)
+        except ValueError:
+            raise RegFileError(source, line, f"invalid hex data: {text}") from None
+        return value_type, _convert_hex(value_type, raw, unicode)
+    raise RegFileError(source, line, f"unrecognized value data: {text}")
+
+
+def _logical_lines(text: str):
+    """Yield (line number, text) with '\\'-continued hex lines joined."""
+    pending = None
+    start = 0
+    for number, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if pending is not None:
+            pending += stripped
+            if pending.endswith("\\"):
+                pending = pending[:-1]
+                continue
+            yield start, pending
+            pending = None
+            continue
+        if stripped.endswith("\\") and "=hex" in stripped.replace(" ", "").lower():
+            pending = stripped[:-1]
+            start = number
+            continue
+        yield number, stripped
+    if pending is not None:
+        yield start, pending
+
+
+def parse_reg_text(text: str, source: str = "<string>") -> list[RegOp]:
+    """
+    Parse the contents of a .reg file.
+
+    Args:
+        text: Decoded file contents
+        source: Name used in RegOp.source and error messages
+
+    Returns:
+        The file's operations, in file order
+
+    Raises:
+        RegFileError: If the header or a line is invalid
+    """
+    ops = []
+    unicode = None
+    root = path = None
+    for number, line in _logical_lines(text):
+        if not line or line.startswith(";"):
+            continue
+        if unicode is None:
+            if line == REGEDIT5_HEADER:
+                unicode = True
+            elif line == REGEDIT4_HEADER:
+                unicode = False
+            else:
+                raise RegFileError(source, number, "missing 'Windows Registry Editor' header")
+            continue
+
+        if line.startswith("["):
+            if not line.endswith("]"):
+                raise RegFileError(source, number, f"invalid key line: {line}")
+            delete = line.startswith("[-")
+            root, path = _parse_key_path(line[2 if delete else 1:-1].strip(), source, number)
+            if delete:
+                ops.append(RegOp(OP_DELETE_KEY, root, path, source=source, line=number))
+                root = path = None
+            else:
+                ops.append(RegOp(OP_CREATE_KEY, root, path, source=source, line=number))
+            continue
+
+        if root is None:
+            raise RegFileError(source, number, "value outside of a key section")
+        if line.startswith("@"):
+            name, end = "", 1
+        elif line.startswith('"'):
+            name, end = _parse_quoted(line, 0, source, number)
+        else:
+            raise RegFileError(source, number, f"invalid value line: {line}")
+        rest = line[end:].lstrip()
+        if not rest.startswith("="):
+            raise RegFileError(source, number, f"expected '=' in: {line}")
+        value_type, data = _parse_data(rest[1:].strip(), source, number, unicode)
+        kind = OP_DELETE_VALUE if value_type is None else OP_SET_VALUE
+        ops.append(RegOp(kind, root, path, name, value_type, data, source, number))
+
+    if unicode is None:
+        raise RegFileError(source, 1, "empty file")
+    return ops
+
+
+def parse_reg_file(path: str) -> list[RegOp]:
+    """Read and parse a .reg file (see parse_reg_text())."""
+    with open(path, "rb") as f:
+        return parse_reg_text(decode_reg_bytes(f.read()), str(path))
+
+
+# ----------------------------------------------------------------------
+# Merging
+# ----------------------------------------------------------------------
+
+@dataclass
+class RegConflict:
+    """Two files that leave the same key or value in different states."""
+    earlier: RegOp
+    later: RegOp
+
+    def describe(self) -> str:
+        target = self.later if self.later.kind != OP_DELETE_KEY else self.earlier
+        name = target.key_name
+        if target.name is not None:
+            name += f" [{target.name or '@'}]"
+        return (f"{name}: {_describe_op(self.earlier)} ({self.earlier.location}) vs. "
+                f"{_describe_op(self.later)} ({self.later.location}); later file wins")
+
+
+def _describe_op(op: RegOp) -> str:
+    if op.kind == OP_SET_VALUE:
+        return f"set to {op.data!r}"
+    if op.kind == OP_DELETE_VALUE:
+        return "value deleted"
+    if op.kind == OP_DELETE_KEY:
+        return f"key {op.key_name} deleted"
+    return "key created"
+
+
+def _under(key: tuple, prefix: tuple) -> bool:
+    """True if (root, lower path) `key` is `prefix` or one of its subkeys."""
+    return key[0] == prefix[0] and (key[1] == prefix[1] or key[1].startswith(prefix[1] + "\\"))
+
+
+class RegModel:
+    """
+    Several .reg files merged into one normalized set of operations.
+
+    Operations are applied in file order, like consecutive `reg import`
+    runs: a later value replaces an earlier one, and a key deletion drops
+    everything earlier files wrote below it. Where two different files
+    disagree, a RegConflict is recorded (the later file still wins).
+
+    operations() returns key deletions first, then key creations and value
+    writes/deletions, which is equivalent to replaying every file in order.
+    """
+
+    def __init__(self):
+        self.deleted_keys = OrderedDict()   # (root, lower path) -> RegOp
+        self.keys = OrderedDict()           # (root, lower path) -> RegOp
+        self.values = OrderedDict()         # (root, lower path, lower name) -> RegOp
+        self.conflicts = []
+        self.sources = []
+
+    def add_all(self, ops: list[RegOp]):
+        for op in ops:
+            self.add(op)
+        if ops and ops[0].source not in self.sources:
+            self.sources.append(ops[0].source)
+
+    def add(self, op: RegOp):
+        key = (op.root, op.path.lower())
+        if op.kind == OP_DELETE_KEY:
+            self._delete_key(key, op)
+        elif op.kind == OP_CREATE_KEY:
+            self.keys.setdefault(key, op)
+        else:
+            self._note_deleted_parent(key, op)
+            value_key = key + (op.name.lower(),)
+            earlier = self.values.pop(value_key, None)
+            if (earlier is not None and earlier.source != op.source
+                    and (earlier.kind, earlier.value_type, earlier.data)
+                    != (op.kind, op.value_type, op.data)):
+                self.conflicts.append(RegConflict(earlier, op))
+            self.keys.setdefault(key, RegOp(OP_CREATE_KEY, op.root, op.path,
+                                            source=op.source, line=op.line))
+            self.values[value_key] = op
+
+    def _delete_key(self, key: tuple, op: RegOp):
+        for value_key, earlier in list(self.values.items()):
+            if _under(value_key[:2], key):
+                if earlier.source != op.source and earlier.kind == OP_SET_VALUE:
+                    self.conflicts.append(RegConflict(earlier, op))
+                del self.values[value_key]
+        for created in [k for k in self.keys if _under(k, key)]:
+            del self.keys[created]
+        for nested in [k for k in self.deleted_keys if _under(k, key)]:
+            del self.deleted_keys[nested]
+        self.deleted_keys[key] = op
+
+    def _note_deleted_parent(self, key: tuple, op: RegOp):
+        if op.kind != OP_SET_VALUE:
+            return
+        for deleted_key, deletion in self.deleted_keys.items():
+            if deletion.source != op.source and _under(key, deleted_key):
+                self.conflicts.append(RegConflict(deletion, op))
+                return
+
+    def operations(self) -> list[RegOp]:
+        """All operations in apply order (deletions first)."""
+        return [*self.deleted_keys.values(), *self.keys.values(), *self.values.values()]
+
+    @property
+    def value_count(self) -> int:
+        return sum(1 for op in self.values.values() if op.kind == OP_SET_VALUE)
+
+    def render(self) -> str:
+        """Return the merged model as a single REGEDIT5 file."""
+        lines = [REGEDIT5_HEADER, ""]
+        for op in self.deleted_keys.values():
+            lines.extend([f"[-{op.key_name}]", ""])
+        by_key = OrderedDict((key, []) for key in self.keys)
+        for value_key, op in self.values.items():
+            by_key.setdefault(value_key[:2], []).append(op)
+        for key, ops in by_key.items():
+            lines.append(f"[{self.keys[key].key_name}]")
+            for op in ops:
+                if op.kind == OP_DELETE_VALUE:
+                    lines.append(f"{_format_name(op.name)}=-")
+                else:
+                    lines.append(format_value(op.name, op.value_type, op.data))
+            lines.append("")
+        return "\r\n".join(lines) + "\r\n"
+
+    def write(self, path: str):
+        """Write the merged model to a .reg file (UTF-16 LE with BOM, like regedit)."""
+        with open(path, "w", encoding="utf-16", newline="") as f:
+            f.write(self.render())
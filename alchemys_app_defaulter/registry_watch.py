@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Registry Change Notifications
+
+Watchers for AppDefaulter.py's --watch mode. A watcher is told which keys
+to watch (each with its whole subtree) and blocks in wait() until one of
+them changes.
+
+- RegistryChangeWatcher uses RegNotifyChangeKeyValue on Windows.
+  HKEY_CLASSES_ROOT is a merged view, so watching it watches both
+  HKLM\\Software\\Classes and HKCU\\Software\\Classes.
+- MemoryRegistryWatcher receives the writes made to a
+  memory_registry.MemoryRegistry, and inject() fakes a change, so the
+  watch loop can be exercised on any system.
+
+Usage:
+    from registry_watch import RegistryChangeWatcher, wait_for_burst
+
+    watcher = RegistryChangeWatcher()
+    watcher.watch(winreg.HKEY_CURRENT_USER, r"Software\\Microsoft\\Windows")
+    while True:
+        changes = wait_for_burst(watcher, debounce=2.0)
+"""
+
+import ctypes
+import queue
+import time
+from typing import Optional
+
+import memory_registry as _mr
+
+
+REG_NOTIFY_CHANGE_NAME = 0x00000001
+REG_NOTIFY_CHANGE_LAST_SET = 0x00000004
+KEY_NOTIFY = 0x0010
+
+_WAIT_OBJECT_0 = 0x00000000
+_WAIT_TIMEOUT = 0x00000102
+
+# An indefinite wait is done in slices so Ctrl+C is still handled
+_WAIT_SLICE_MS = 500
+
+# HKEY_CLASSES_ROOT merges these two keys
+_CLASSES_SOURCES = ((_mr.HKEY_LOCAL_MACHINE, r"Software\Classes"),
+                    (_mr.HKEY_CURRENT_USER, r"Software\Classes"))
+
+
+class RegistryChangeWatcher:
+    """Watches registry subtrees with RegNotifyChangeKeyValue (Windows only)."""
+
+    def __init__(self):
+        import winreg
+        self._winreg = winreg
+        # Private DLL instances, so setting prototypes does not affect other ctypes users
+        self._advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+        self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._advapi32.RegNotifyChangeKeyValue.argtypes = [
+            ctypes.c_void_p, ctypes.c_bool, ctypes.c_uint32, ctypes.c_void_p, ctypes.c_bool]
+        self._advapi32.RegNotifyChangeKeyValue.restype = ctypes.c_long
+        self._kernel32.CreateEventW.argtypes = [
+            ctypes.c_void_p, ctypes.c_bool, ctypes.c_bool, ctypes.c_wchar_p]
+        self._kernel32.CreateEventW.restype = ctypes.c_void_p
+        self._kernel32.WaitForMultipleObjects.argtypes = [
+            ctypes.c_uint32, ctypes.c_void_p, ctypes.c_bool, ctypes.c_uint32]
+        self._kernel32.WaitForMultipleObjects.restype = ctypes.c_uint32
+        self._kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+        self._watches = []      # [reported (root, path), open key, event handle]
+
+    def watch(self, root, path: str):
+        """Watch a key and all of its subkeys."""
+        if root == _mr.HKEY_CLASSES_ROOT:
+            sources = [(source_root, f"{prefix}\\{path}" if path else prefix)
+                       for source_root, prefix in _CLASSES_SOURCES]
+        else:
+            sources = [(root, path)]
+        for source_root, source_path in sources:
+            key = self._winreg.OpenKey(source_root, source_path, 0, KEY_NOTIFY)
+            event = self._kernel32.CreateEventW(None, False, False, None)
+            if not event:
+                key.Close()
+                raise ctypes.WinError(ctypes.get_last_error())
+            self._watches.append(((root, path), key, event))
+            self._arm(len(self._watches) - 1)
+
+    def _arm(self, index: int):
+        _, key, event = self._watches[index]
+        status = self._advapi32.RegNotifyChangeKeyValue(
+            int(key), True,
+            REG_NOTIFY_CHANGE_NAME | REG_NOTIFY_CHANGE_LAST_SET, event, True)
+        if status != 0:
+            raise ctypes.WinError(status)
+
+    def wait(self, timeout: Optional[float] = None) -> list[tuple]:
+        """
+        Wait for changes.
+
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+
+        Returns:
+            (root, path) of each watched key that changed; empty on timeout
+        """
+        handles = (ctypes.c_void_p * len(self._watches))(*(event for _, _, event in self._watches))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = []
+        while True:
+            if changed:
+                # Collect any other watch that is already signalled
+                milliseconds = 0
+            elif deadline is None:
+                milliseconds = _WAIT_SLICE_MS
+            else:
+                milliseconds = max(0, min(_WAIT_SLICE_MS, int((deadline - time.monotonic()) * 1000)))
+            result = self._kernel32.WaitForMultipleObjects(len(handles), handles, False, milliseconds)
+            if result == _WAIT_TIMEOUT:
+                if changed or (deadline is not None and time.monotonic() >= deadline):
+                    return changed
+                continue
+            index = result - _WAIT_OBJECT_0
+            if not 0 <= index < len(self._watches):
+                raise ctypes.WinError(ctypes.get_last_error())
+            # Notifications are one-shot; re-arm before reading the changes
+            self._arm(index)
+            if self._watches[index][0] not in changed:
+                changed.append(self._watches[index][0])
+
+    def close(self):
+        for _, key, event in self._watches:
+            key.Close()
+            self._kernel32.CloseHandle(event)
+        self._watches = []
+
+
+class MemoryRegistryWatcher:
+    """
+    Watcher for a MemoryRegistry (or for injected events only).
+
+    Args:
+        registry: Optional MemoryRegistry whose writes are reported
+    """
+
+    def __init__(self, registry: Optional[_mr.MemoryRegistry] = None):
+        self._events = queue.Queue()
+        self._watches = []      # (root, path)
+        self.registry = registry
+        if registry is not None:
+            registry.add_listener(self.inject)
+
+    def watch(self, root, path: str):
+        self._watches.append((root, path))
+
+    def inject(self, root, path: str):
+        """Report a change to the key root\\path (from any thread)."""
+        path = path.lower()
+        for watch_root, watch_path in self._watches:
+            prefix = watch_path.lower()
+            if root == watch_root and (not prefix or path == prefix
+                                       or path.startswith(prefix + "\\")):
+                self._events.put((watch_root, watch_path))
+                return
+
+    def wait(self, timeout: Optional[float] = None) -> list[tuple]:
+        """Same contract as RegistryChangeWatcher.wait()."""
+        changed = []
+        try:
+            changed.append(self._events.get(timeout=timeout))
+            while True:
+                event = self._events.get_nowait()
+                if event not in changed:
+                    changed.append(event)
+        except queue.Empty:
+            pass
+        return changed
+
+    def close(self):
+        if self.registry is not None:
+            self.registry.remove_listener(self.inject)
+            self.registry = None
+
+
+def wait_for_burst(watcher, debounce: float, max_delay: float = 30.0) -> list[tuple]:
+    """
+    Wait for a change, then keep collecting until nothing has changed for
+    `debounce` seconds (or `max_delay` seconds have passed since the first
+    change, so a constantly busy key still gets handled).
+
+    Returns:
+        The watched (root, path) keys that changed during the burst
+    """
+    changed = watcher.wait(None)
+    deadline = time.monotonic() + max_delay
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return changed
+        more = watcher.wait(min(debounce, remaining))
+        if not more:
+            return changed
+        changed.extend(key for key in more if key not in changed)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Security Template (.inf) Support
+
+Parses the security templates written by `secedit /export` (and templates
+such as %windir%\\inf\\defltbase.inf) into section -> key indexes, and
+computes the difference between two of them in one pass over each file.
+
+Values are compared in normalized form, so exports that only differ in
+formatting are equal:
+- [Privilege Rights] account lists are compared as sets, and well-known
+  account names ("Administrators", "Everyone") match their SIDs
+- [Registry Values] are compared by type and data ("4,00" == "4,0")
+- numbers, quoting and whitespace around commas are ignored elsewhere
+
+Usage:
+    from security_inf import diff_inf, parse_inf_file, write_inf
+
+    changes = diff_inf(parse_inf_file("baseline.inf"), parse_inf_file("secedit.inf"))
+    write_inf("security_policy.inf", changes)
+"""
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from regfile import decode_reg_bytes
+
+
+# Sections that describe the file itself rather than policy
+HEADER_SECTIONS = ("Unicode", "Version")
+_HEADER_KEYS = {name.lower() for name in HEADER_SECTIONS}
+
+PRIVILEGE_RIGHTS = "Privilege Rights"
+REGISTRY_VALUES = "Registry Values"
+
+DEFAULT_HEADER = OrderedDict([
+    ("Unicode", [("Unicode", "yes")]),
+    ("Version", [("signature", '"$CHICAGO$"'), ("Revision", "1")]),
+])
+
+# Well-known accounts that secedit may write by name or by SID
+WELL_KNOWN_ACCOUNTS = {
+    "everyone": "*S-1-1-0",
+    "creator owner": "*S-1-3-0",
+    "local": "*S-1-2-0",
+    "network": "*S-1-5-2",
+    "interactive": "*S-1-5-4",
+    "service": "*S-1-5-6",
+    "anonymous logon": "*S-1-5-7",
+    "authenticated users": "*S-1-5-11",
+    "system": "*S-1-5-18",
+    "local service": "*S-1-5-19",
+    "network service": "*S-1-5-20",
+    "administrators": "*S-1-5-32-544",
+    "users": "*S-1-5-32-545",
+    "guests": "*S-1-5-32-546",
+    "power users": "*S-1-5-32-547",
+    "backup operators": "*S-1-5-32-551",
+    "remote desktop users": "*S-1-5-32-555",
+    "performance log users": "*S-1-5-32-559",
+    "window manager\\window manager group": "*S-1-5-90-0",
+    "nt service\\all services": "*S-1-5-80-0",
+}
+
+_INTEGER = re.compile(r"^[+-]?\d+$")
+
+
+class InfError(ValueError):
+    """A security template could not be parsed."""
+
+
+@dataclass
+class InfEntry:
+    """One `key = value` line (or `"path",mode,"sddl"` line) of a section."""
+    key: str
+    value: str
+    separator: str = " = "      # "=" in [Registry Values], "," for quoted-path lines
+
+    @property
+    def text(self) -> str:
+        return f"{self.key}{self.separator}{self.value}"
+
+
+class InfSection:
+    def __init__(self, name: str):
+        self.name = name
+        self.entries = OrderedDict()    # lower-case key -> InfEntry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class InfFile:
+    """
+    A parsed security template.
+
+    Args:
+        source: File name, for messages
+    """
+
+    def __init__(self, source: str = "<string>"):
+        self.source = source
+        self.sections = OrderedDict()   # lower-case name -> InfSection
+
+    def section(self, name: str) -> InfSection:
+        """The named section, created if missing."""
+        key = name.lower()
+        if key not in self.sections:
+            self.sections[key] = InfSection(name)
+        return self.sections[key]
+
+    def get(self, section: str, key: str) -> Optional[InfEntry]:
+        found = self.sections.get(section.lower())
+        return found.entries.get(key.lower()) if found else None
+
+    @property
+    def setting_count(self) -> int:
+        return sum(len(section) for name, section in self.sections.items()
+                   if name not in _HEADER_KEYS)
+
+
+@dataclass
+class InfChange:
+    """A setting that differs between two templates."""
+    section: str
+    entry: InfEntry             # the current entry (for removals: the baseline entry)
+    baseline: Optional[str]     # baseline value; None if the setting is new
+    removed: bool = False       # present in the baseline only
+
+    def describe(self) -> str:
+        if self.removed:
+            return f"[{self.section}] {self.entry.key}: {self.baseline} -> (not set)"
+        if self.baseline is None:
+            return f"[{self.section}] {self.entry.key}: (not set) -> {self.entry.value}"
+        return f"[{self.section}] {self.entry.key}: {self.baseline} -> {self.entry.value}"
+
+
+def _split_line(line: str) -> tuple[str, str, str]:
+    """Split an entry line into (key, separator, value)."""
+    if line.startswith('"'):
+        # "path",mode,"sddl" lines of [Registry Keys], [File Security], [Service General Setting]
+        end = line.find('"', 1)
+        if end != -1:
+            rest = line[end + 1:]
+            if rest.startswith(","):
+                return line[:end + 1], ",", rest[1:]
+    key, sep, value = line.partition("=")
+    if not sep:
+        raise ValueError(line)
+    key = key.strip()
+    value = value.strip()
+    if line[len(key):].startswith(" ="):
+        return key, " = ", value
+    return key, "=", value
+
+
+def parse_inf_text(text: str, source: str = "<string>") -> InfFile:
+    """
+    Parse a security template.
+
+    Raises:
+        InfError: On a line outside any section, or a line that is not an entry
+    """
+    inf = InfFile(source)
+    section = None
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith(";"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            section = inf.section(line[1:-1].strip())
+            continue
+        if section is None:
+            raise InfError(f"{source}:{number}: entry outside of a section")
+        try:
+            key, separator, value = _split_line(line)
+        except ValueError:
+            raise InfError(f"{source}:{number}: not a `key = value` line: {line}") from None
+        section.entries[key.lower()] = InfEntry(key, value, separator)
+    return inf
+
+
+def parse_inf_file(path: str) -> InfFile:
+    """Read a security template (UTF-16 from secedit, or UTF-8/ANSI)."""
+    return parse_inf_text(decode_reg_bytes(Path(path).read_bytes()), Path(path).name)
+
+
+def _normalize_scalar(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    if _INTEGER.match(value):
+        return str(int(value))
+    return value
+
+
+def _normalize_account(account: str) -> str:
+    account = account.strip()
+    if account.startswith("*"):
+        return account.upper()
+    return WELL_KNOWN_ACCOUNTS.get(account.lower(), account.lower())
+
+
+def normalize_inf_value(section: str, value: str):
+    """
+    Comparable form of a value.
+
+    Args:
+        section: Section name (selects the rules)
+        value: Value text
+
+    Returns:
+        A hashable value; equal for equivalent settings
+    """
+    section = section.lower()
+    if section == PRIVILEGE_RIGHTS.lower():
+        return frozenset(_normalize_account(a) for a in value.split(",") if a.strip())
+    if section == REGISTRY_VALUES.lower():
+        value_type, _, data = value.partition(",")
+        value_type = _normalize_scalar(value_type)
+        if value_type == "7":
+            # REG_MULTI_SZ: order is significant, empty entries are not
+            return (value_type, tuple(part.strip() for part in data.split(",") if part.strip()))
+        return (value_type, _normalize_scalar(data))
+    return tuple(_normalize_scalar(part) for part in value.split(","))
+
+
+def diff_inf(baseline: InfFile, current: InfFile) -> list[InfChange]:
+    """
+    Settings of `current` that are new or different from `baseline`,
+    followed by settings that only `baseline` has.
+
+    Each file is walked once and every lookup is a dictionary hit, so the
+    cost is linear in the size of the two templates.
+    """
+    changes = []
+    for section_key, section in current.sections.items():
+        if section_key in _HEADER_KEYS:
+            continue
+        base = baseline.sections.get(section_key)
+        for key, entry in section.entries.items():
+            old = base.entries.get(key) if base is not None else None
+            if old is None:
+                changes.append(InfChange(section.name, entry, None))
+            elif (old.value != entry.value and normalize_inf_value(section.name, old.value)
+                  != normalize_inf_value(section.name, entry.value)):
+                changes.append(InfChange(section.name, entry, old.value))
+
+    for section_key, base in baseline.sections.items():
+        if section_key in _HEADER_KEYS:
+            continue
+        section = current.sections.get(section_key)
+        for key, entry in base.entries.items():
+            if section is None or key not in section.entries:
+                changes.append(InfChange(base.name, entry, entry.value, removed=True))
+    return changes
+
+
+def render_inf(changes: list[InfChange], header: Optional[InfFile] = None) -> tuple[str, list[InfChange]]:
+    """
+    Render changes as a security template that secedit can apply.
+
+    A privilege that the baseline assigns but the current policy does not
+    is written with an empty account list (nobody holds it). Other
+    settings that only the baseline has cannot be unset with a template
+    and are returned as skipped.
+
+    Args:
+        changes: Result of diff_inf()
+        header: Template whose [Unicode] and [Version] sections are copied
+                (defaults to what secedit writes)
+
+    Returns:
+        Tuple of (template text, skipped changes)
+    """
+    sections = OrderedDict()
+    skipped = []
+    for change in changes:
+        if change.removed:
+            if change.section.lower() != PRIVILEGE_RIGHTS.lower():
+                skipped.append(change)
+                continue
+            entry = InfEntry(change.entry.key, "", change.entry.separator)
+        else:
+            entry = change.entry
+        sections.setdefault(change.section, []).append(entry.text.rstrip())
+
+    def header_lines(name):
+        section = header.sections.get(name.lower()) if header is not None else None
+        if section is not None:
+            return [f"[{section.name}]", *(entry.text for entry in section.entries.values())]
+        return [f"[{name}]", *(f"{key}={value}" for key, value in DEFAULT_HEADER[name])]
+
+    lines = header_lines("Unicode")
+    for name, entries in sections.items():
+        lines.append(f"[{name}]")
+        lines.extend(entries)
+    lines.extend(header_lines("Version"))
+    return "\r\n".join(lines) + "\r\n", skipped
+
+
+def write_inf(path: str, changes: list[InfChange], header: Optional[InfFile] = None) -> list[InfChange]:
+    """
+    Write changes as a UTF-16 LE security template (the encoding secedit uses).
+
+    Returns:
+        Changes that could not be expressed (see render_inf())
+    """
+    text, skipped = render_inf(changes, header)
+    with open(path, "w", encoding="utf-16", newline="") as f:
+        f.write(text)
+    return skipped
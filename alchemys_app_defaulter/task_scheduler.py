@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Task Scheduler
+
+Runs a set of commands as a dependency graph: every task starts as soon as
+the tasks it depends on have finished, up to a fixed number at a time.
+ScriptScheduler.py uses it to run the tweak scripts in
+alchemys_custom_scripts, but tasks are plain commands, so the scheduler
+runs anywhere (e.g. with stub `python -c ...` tasks on Linux).
+
+Per task:
+- depends: tasks that must finish successfully first (a failed, timed-out
+  or skipped dependency blocks its dependents)
+- after: tasks that must have finished first, whatever their outcome
+  (ordering only, e.g. one phase of scripts before the next)
+- conflicts: tasks that must not run at the same time as this one, in
+  either order (e.g. two scripts rewriting the same registry key)
+- needs_admin: skipped unless the scheduler runs elevated
+- check: called before the command; if it returns True the result is
+  already in place and the command is not run
+- timeout: wall-time limit; the command is killed when it is exceeded
+
+Usage:
+    from task_scheduler import Task, run_tasks
+
+    results = run_tasks([Task("a", ["cmd", "/c", "a.bat"]),
+                         Task("b", ["cmd", "/c", "b.bat"], depends=["a"])], jobs=4)
+"""
+
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Union
+
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_IN_PLACE = "in place"        # check() said the result is already there
+STATUS_NO_ADMIN = "needs admin"     # needs_admin and not elevated
+STATUS_BLOCKED = "blocked"          # a dependency did not succeed
+
+# Statuses that let dependents run
+SUCCEEDED = frozenset((STATUS_OK, STATUS_IN_PLACE))
+
+
+class TaskGraphError(ValueError):
+    """The tasks do not form a valid graph (unknown names, duplicates or a cycle)."""
+
+
+@dataclass
+class Task:
+    """One command in the graph."""
+    name: str
+    # argv list, or a command line run through the shell
+    command: Union[list[str], str]
+    depends: list[str] = field(default_factory=list)
+    # Ordering only: start after these finished, even if they failed
+    after: list[str] = field(default_factory=list)
+    conflicts: list[str] = field(default_factory=list)
+    needs_admin: bool = False
+    # Returns True if the command's result is already in place
+    check: Optional[Callable[[], bool]] = None
+    timeout: Optional[float] = None
+    cwd: Optional[str] = None
+
+
+@dataclass
+class TaskResult:
+    """Outcome of one task."""
+    name: str
+    status: str
+    returncode: Optional[int] = None
+    # Wall time of check + command; 0 for tasks that never started
+    seconds: float = 0.0
+    output: str = ""
+    # Why it was blocked or why the check failed
+    detail: str = ""
+
+
+def order_tasks(tasks: list[Task]) -> list[Task]:
+    """
+    Validate the graph and return the tasks in a dependency-respecting order.
+
+    Among tasks that are ready at the same time, the given order is kept.
+
+    Raises:
+        TaskGraphError: For duplicate names, unknown dependencies, conflicts
+                        or after tasks, or a dependency cycle
+    """
+    by_name = {}
+    for task in tasks:
+        if task.name in by_name:
+            raise TaskGraphError(f"Duplicate task: {task.name}")
+        by_name[task.name] = task
+    for task in tasks:
+        for name in (*task.depends, *task.after, *task.conflicts):
+            if name not in by_name:
+                raise TaskGraphError(f"{task.name}: unknown task '{name}'")
+
+    ordered = []
+    state = {}      # name -> 1 while visiting, 2 when done
+
+    def visit(task, path):
+        if state.get(task.name) == 2:
+            return
+        if state.get(task.name) == 1:
+            cycle = path[path.index(task.name):] + [task.name]
+            raise TaskGraphError(f"Dependency cycle: {' -> '.join(cycle)}")
+        state[task.name] = 1
+        for name in (*task.depends, *task.after):
+            visit(by_name[name], path + [task.name])
+        state[task.name] = 2
+        ordered.append(task)
+
+    for task in tasks:
+        visit(task, [])
+    return ordered
+
+
+def dependency_levels(tasks: list[Task]) -> list[list[str]]:
+    """
+    Group task names by dependency depth (level 0 depends on nothing;
+    after counts like depends).
+
+    Tasks on the same level can run concurrently unless they conflict.
+    """
+    depth = {}
+    for task in order_tasks(tasks):
+        depth[task.name] = 1 + max((depth[name] for name in (*task.depends, *task.after)),
+                                   default=-1)
+    levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for task in tasks:
+        levels[depth[task.name]].append(task.name)
+    return levels
+
+
+def run_task(task: Task) -> TaskResult:
+    """Run one task's check and command (no dependency handling)."""
+    start = time.perf_counter()
+    detail = ""
+    if task.check is not None:
+        try:
+            if task.check():
+                return TaskResult(task.name, STATUS_IN_PLACE,
+                                  seconds=time.perf_counter() - start)
+        except Exception as e:
+            # A broken check must not hide the task; run it
+            detail = f"check failed: {e}"
+    try:
+        completed = subprocess.run(task.command, shell=isinstance(task.command, str),
+                                   cwd=task.cwd, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   timeout=task.timeout)
+    except subprocess.TimeoutExpired as e:
+        output = e.output.decode(errors='replace') if e.output else ""
+        return TaskResult(task.name, STATUS_TIMEOUT, seconds=time.perf_counter() - start,
+                          output=output, detail=f"killed after {task.timeout:g}s")
+    except OSError as e:
+        return TaskResult(task.name, STATUS_FAILED, seconds=time.perf_counter() - start,
+                          detail=str(e))
+    return TaskResult(task.name, STATUS_OK if completed.returncode == 0 else STATUS_FAILED,
+                      returncode=completed.returncode, seconds=time.perf_counter() - start,
+                      output=completed.stdout.decode(errors='replace'), detail=detail)
+
+
+def run_tasks(tasks: list[Task], jobs: int = 1, admin: bool = False,
+              on_result: Optional[Callable[[TaskResult], None]] = None,
+              runner: Callable[[Task], TaskResult] = run_task) -> list[TaskResult]:
+    """
+    Run a task graph on a bounded pool.
+
+    A task starts once all of its dependencies succeeded, all of its after
+    tasks finished, a worker is free and none of its conflicting tasks is
+    running. Ready tasks start in the given order.
+
+    Args:
+        tasks: The tasks (see order_tasks() for validation)
+        jobs: Maximum number of tasks running at once
+        admin: Whether the scheduler runs elevated (needs_admin tasks are
+               skipped otherwise)
+        on_result: Called with each result as soon as it is known
+        runner: Runs one task (run_task(); replaceable for tests)
+
+    Returns:
+        One TaskResult per task, in the given order
+
+    Raises:
+        TaskGraphError: If the graph is invalid (nothing is run)
+    """
+    order_tasks(tasks)
+    by_name = {task.name: task for task in tasks}
+    conflicts = {task.name: set(task.conflicts) for task in tasks}
+    for task in tasks:
+        for name in task.conflicts:
+            conflicts[name].add(task.name)
+
+    results = {}
+    lock = threading.Lock()
+
+    def finish(result):
+        with lock:
+            results[result.name] = result
+        if on_result is not None:
+            on_result(result)
+
+    waiting = list(tasks)
+    running = {}    # Future -> task name
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while waiting or running:
+            progressed = False
+            for task in list(waiting):
+                failed_deps = [name for name in task.depends
+                               if name in results and results[name].status not in SUCCEEDED]
+                if failed_deps:
+                    waiting.remove(task)
+                    finish(TaskResult(task.name, STATUS_BLOCKED,
+                                      detail=f"{', '.join(failed_deps)} did not succeed"))
+                    progressed = True
+                    continue
+                if any(name not in results for name in (*task.depends, *task.after)):
+                    continue
+                if task.needs_admin and not admin:
+                    waiting.remove(task)
+                    finish(TaskResult(task.name, STATUS_NO_ADMIN))
+                    progressed = True
+                    continue
+                if len(running) >= max(1, jobs):
+                    continue
+                if conflicts[task.name] & set(running.values()):
+                    continue
+                waiting.remove(task)
+                running[pool.submit(runner, task)] = task.name
+            if progressed:
+                # Blocked/skipped tasks can unblock or block others right away
+                continue
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    finish(future.result())
+                except Exception as e:
+                    finish(TaskResult(name, STATUS_FAILED, detail=str(e)))
+    return [results[task.name] for task in tasks]
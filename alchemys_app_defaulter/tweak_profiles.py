@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Tweak Profiles
+
+One desired-state model for the three tweak profiles in this repository:
+
+- O&O ShutUp10++ configurations (ooshutup10.cfg): one "ID<TAB>+/-" line per
+  setting
+- Winaero Tweaker exports (Winaero Tweaker_*.ini): a [User] section listing
+  the enabled pages, plus one section of options per page
+- Visual effects settings (visual_effects.ini, written by
+  export_visual_effects.ps1): registry values grouped by key
+
+Each file parses into a TweakProfile of TweakSettings. diff_profile()
+compares a profile with a snapshot of the machine's current state (an
+export in the same format, a .reg dump, or - for visual effects - the live
+registry) and delta_profile() keeps only what differs, so a profile that is
+already in place costs nothing to re-apply. render_profile() writes a delta
+back out in the tool's own format.
+
+Usage:
+    from tweak_profiles import diff_profile, delta_profile, load_profile
+
+    desired = load_profile("ooshutup10.cfg")
+    current = load_profile("ooshutup10_current.cfg")
+    changes = diff_profile(desired, current)
+    delta = delta_profile(desired, changes)
+"""
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import memory_registry as _mr
+from regfile import OP_SET_VALUE, RegOp, decode_reg_bytes, parse_reg_text
+
+
+KIND_OOSU = "oosu"
+KIND_WINAERO = "winaero"
+KIND_VISUAL = "visual"
+
+KIND_NAMES = {
+    KIND_OOSU: "O&O ShutUp10++",
+    KIND_WINAERO: "Winaero Tweaker",
+    KIND_VISUAL: "Visual effects",
+}
+
+# Winaero Tweaker: section listing the enabled pages, and the file header section
+WINAERO_PAGES = "User"
+WINAERO_FORMAT = "Format"
+
+
+@dataclass(frozen=True)
+class VisualEffectValue:
+    """Where a visual_effects.ini setting lives in the registry."""
+    section: str
+    name: str
+    path: str               # under HKEY_CURRENT_USER
+    value_type: int
+
+
+_DESKTOP = r"Control Panel\Desktop"
+_ADVANCED = r"Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced"
+_DWM = r"Software\Microsoft\Windows\DWM"
+
+# Same values, paths and types as import_visual_effects.ps1
+VISUAL_EFFECTS = [
+    VisualEffectValue("Desktop", "UserPreferencesMask", _DESKTOP, _mr.REG_BINARY),
+    VisualEffectValue("Desktop", "FontSmoothing", _DESKTOP, _mr.REG_SZ),
+    VisualEffectValue("Desktop", "FontSmoothingType", _DESKTOP, _mr.REG_DWORD),
+    VisualEffectValue("Desktop", "DragFullWindows", _DESKTOP, _mr.REG_SZ),
+    VisualEffectValue("WindowMetrics", "MinAnimate", _DESKTOP + r"\WindowMetrics", _mr.REG_SZ),
+    VisualEffectValue("Advanced", "TaskbarAnimations", _ADVANCED, _mr.REG_DWORD),
+    VisualEffectValue("Advanced", "ListviewAlphaSelect", _ADVANCED, _mr.REG_DWORD),
+    VisualEffectValue("Advanced", "ListviewShadow", _ADVANCED, _mr.REG_DWORD),
+    VisualEffectValue("Advanced", "IconsOnly", _ADVANCED, _mr.REG_DWORD),
+    VisualEffectValue("DWM", "EnableAeroPeek", _DWM, _mr.REG_DWORD),
+    VisualEffectValue("DWM", "AlwaysHibernateThumbnails", _DWM, _mr.REG_DWORD),
+]
+
+_VISUAL_BY_KEY = {(v.section.lower(), v.name.lower()): v for v in VISUAL_EFFECTS}
+_VISUAL_BY_VALUE = {(v.path.lower(), v.name.lower()): v for v in VISUAL_EFFECTS}
+
+# import_visual_effects.ps1 also switches Performance Options to "Custom"
+VISUAL_FX_SETTING = (r"Software\Microsoft\Windows\CurrentVersion\Explorer\VisualEffects",
+                     "VisualFXSetting", _mr.REG_DWORD, 3)
+
+_OOSU_LINE = re.compile(r"^([A-Za-z]+\d+)\s+([+-])\s*(?:#\s*(.*))?$")
+_INI_SECTION = re.compile(r"^\[(.+)\]$")
+_INI_VALUE = re.compile(r"^([^;#=]+)=(.*)$")
+_INTEGER = re.compile(r"^[+-]?\d+$")
+
+
+class TweakProfileError(ValueError):
+    """A profile or snapshot file could not be understood."""
+
+
+@dataclass(frozen=True)
+class TweakSetting:
+    """One setting of a profile."""
+    kind: str           # KIND_* constant
+    section: str        # ini section ('' for O&O ShutUp10++)
+    name: str           # setting ID or value name
+    value: str
+    comment: str = ""   # O&O ShutUp10++ setting description
+
+    @property
+    def key(self) -> tuple:
+        return (self.section.lower(), self.name.lower())
+
+    @property
+    def label(self) -> str:
+        return f"[{self.section}] {self.name}" if self.section else self.name
+
+
+class TweakProfile:
+    """
+    The settings of one profile file, in file order.
+
+    Args:
+        kind: KIND_* constant
+        source: File the profile was read from
+        header: Lines kept verbatim when the profile is rendered (the
+                O&O comment block, the Winaero [Format] section)
+    """
+
+    def __init__(self, kind: str, source: str = "", header: Optional[list[str]] = None):
+        self.kind = kind
+        self.source = source
+        self.header = header or []
+        self.settings = OrderedDict()   # (lower section, lower name) -> TweakSetting
+
+    def add(self, setting: TweakSetting):
+        self.settings[setting.key] = setting
+
+    def get(self, key: tuple) -> Optional[TweakSetting]:
+        return self.settings.get(key)
+
+    def __len__(self) -> int:
+        return len(self.settings)
+
+    def __iter__(self):
+        return iter(self.settings.values())
+
+
+@dataclass
+class TweakChange:
+    """A desired setting that the current state does not match."""
+    desired: TweakSetting
+    current: Optional[str]      # None: not present in the snapshot
+
+    def describe(self) -> str:
+        current = "(not set)" if self.current is None else self.current
+        text = f"{self.desired.label}: {current} -> {self.desired.value}"
+        return f"{text}  # {self.desired.comment}" if self.desired.comment else text
+
+
+def normalize_value(value: str) -> str:
+    """Canonical text of a value, so "01", "1" and " 1" compare equal."""
+    value = value.strip()
+    if _INTEGER.match(value):
+        return str(int(value))
+    if "," in value and all(_INTEGER.match(part.strip()) for part in value.split(",")):
+        return ",".join(str(int(part)) for part in value.split(","))
+    return value
+
+
+# ----------------------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------------------
+
+def _ini_sections(text: str):
+    """Yield (section, name, value) from ini text, like import_visual_effects.ps1 reads it."""
+    section = ""
+    for line in text.splitlines():
+        line = line.strip()
+        match = _INI_SECTION.match(line)
+        if match:
+            section = match.group(1).strip()
+            yield section, None, None
+            continue
+        match = _INI_VALUE.match(line)
+        if match:
+            yield section, match.group(1).strip(), match.group(2).strip()
+
+
+def parse_oosu_cfg(text: str, source: str = "<string>") -> TweakProfile:
+    """Parse an O&O ShutUp10++ configuration."""
+    profile = TweakProfile(KIND_OOSU, source)
+    for number, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            if not profile.settings:
+                profile.header.append(line.rstrip())
+            continue
+        match = _OOSU_LINE.match(stripped)
+        if not match:
+            raise TweakProfileError(f"{source}:{number}: not an O&O ShutUp10++ setting: {stripped}")
+        setting_id, state, comment = match.groups()
+        profile.add(TweakSetting(KIND_OOSU, "", setting_id.upper(), state, (comment or "").strip()))
+    while profile.header and not profile.header[-1]:
+        profile.header.pop()
+    return profile
+
+
+def parse_winaero_ini(text: str, source: str = "<string>") -> TweakProfile:
+    """Parse a Winaero Tweaker export."""
+    profile = TweakProfile(KIND_WINAERO, source)
+    for section, name, value in _ini_sections(text):
+        if section.lower() == WINAERO_FORMAT.lower():
+            profile.header.append(f"[{section}]" if name is None else f"{name}={value}")
+        elif name is not None:
+            profile.add(TweakSetting(KIND_WINAERO, section, name, value))
+    return profile
+
+
+def parse_visual_effects_ini(text: str, source: str = "<string>") -> TweakProfile:
+    """Parse visual_effects.ini (as written by export_visual_effects.ps1)."""
+    profile = TweakProfile(KIND_VISUAL, source)
+    for section, name, value in _ini_sections(text):
+        if name is None:
+            continue
+        spec = _VISUAL_BY_KEY.get((section.lower(), name.lower()))
+        if spec is None:
+            raise TweakProfileError(f"{source}: unknown visual effects setting [{section}] {name}")
+        if value:
+            # export_visual_effects.ps1 writes an empty value for a missing registry value
+            profile.add(TweakSetting(KIND_VISUAL, spec.section, spec.name, value))
+    return profile
+
+
+def _registry_text(data, value_type: int) -> str:
+    """A registry value as visual_effects.ini text."""
+    if value_type in (_mr.REG_BINARY, _mr.REG_NONE):
+        return ",".join(str(b) for b in (data or b""))
+    return str(data)
+
+
+def visual_effects_from_reg(ops: list[RegOp], source: str = "<string>") -> TweakProfile:
+    """
+    Build a visual effects snapshot from a .reg dump of HKEY_CURRENT_USER.
+
+    Values outside the visual effects keys are ignored.
+    """
+    profile = TweakProfile(KIND_VISUAL, source)
+    found = {}
+    for op in ops:
+        if op.kind != OP_SET_VALUE or op.root != _mr.HKEY_CURRENT_USER:
+            continue
+        spec = _VISUAL_BY_VALUE.get((op.path.lower(), op.name.lower()))
+        if spec is not None:
+            found[spec] = _registry_text(op.data, op.value_type)
+    for spec in VISUAL_EFFECTS:
+        if spec in found:
+            profile.add(TweakSetting(KIND_VISUAL, spec.section, spec.name, found[spec]))
+    return profile
+
+
+def read_visual_effects(registry) -> TweakProfile:
+    """
+    Snapshot the current visual effects settings from a registry backend.
+
+    Args:
+        registry: The winreg module or a compatible backend
+
+    Returns:
+        TweakProfile with every value that exists
+    """
+    profile = TweakProfile(KIND_VISUAL, "registry")
+    keys = {}
+    for spec in VISUAL_EFFECTS:
+        if spec.path not in keys:
+            try:
+                keys[spec.path] = registry.OpenKey(registry.HKEY_CURRENT_USER, spec.path,
+                                                   0, registry.KEY_READ)
+            except OSError:
+                keys[spec.path] = None
+        key = keys[spec.path]
+        if key is None:
+            continue
+        try:
+            data, value_type = registry.QueryValueEx(key, spec.name)
+        except OSError:
+            continue
+        profile.add(TweakSetting(KIND_VISUAL, spec.section, spec.name,
+                                 _registry_text(data, value_type)))
+    for key in keys.values():
+        if key is not None:
+            key.Close()
+    return profile
+
+
+def parse_profile_text(text: str, source: str = "<string>") -> TweakProfile:
+    """
+    Parse a profile or snapshot, detecting its format from the contents.
+
+    Raises:
+        TweakProfileError: If the format is not recognized
+    """
+    stripped = text.lstrip()
+    if stripped.startswith(("Windows Registry Editor", "REGEDIT4")):
+        return visual_effects_from_reg(parse_reg_text(text, source), source)
+
+    sections = {section.lower() for section, name, _ in _ini_sections(text) if name is None}
+    if WINAERO_FORMAT.lower() in sections or WINAERO_PAGES.lower() in sections:
+        return parse_winaero_ini(text, source)
+    if sections and sections <= {spec.section.lower() for spec in VISUAL_EFFECTS}:
+        return parse_visual_effects_ini(text, source)
+    if any(_OOSU_LINE.match(line.strip()) for line in text.splitlines()):
+        return parse_oosu_cfg(text, source)
+    raise TweakProfileError(f"{source}: not an O&O ShutUp10++, Winaero Tweaker, "
+                            f"visual effects or .reg file")
+
+
+def load_profile(path: str) -> TweakProfile:
+    """Read and parse a profile or snapshot file (UTF-8, UTF-16 or ANSI)."""
+    return parse_profile_text(decode_reg_bytes(Path(path).read_bytes()), Path(path).name)
+
+
+# ----------------------------------------------------------------------
+# Diffing
+# ----------------------------------------------------------------------
+
+def diff_profile(desired: TweakProfile, current: Optional[TweakProfile]) -> list[TweakChange]:
+    """
+    Settings of `desired` that `current` does not match.
+
+    Args:
+        desired: The profile to apply
+        current: Snapshot of the same kind, or None if the current state is
+                 unknown (everything is then reported as a change)
+
+    Returns:
+        TweakChanges in profile order
+    """
+    changes = []
+    for setting in desired:
+        found = current.get(setting.key) if current is not None else None
+        if found is None:
+            changes.append(TweakChange(setting, None))
+        elif normalize_value(found.value) != normalize_value(setting.value):
+            changes.append(TweakChange(setting, found.value))
+    return changes
+
+
+def _winaero_page(setting: TweakSetting) -> str:
+    """The page a Winaero setting belongs to (lower case)."""
+    if setting.section.lower() == WINAERO_PAGES.lower():
+        return setting.name.lower()
+    return setting.section.lower()
+
+
+def delta_profile(desired: TweakProfile, changes: list[TweakChange]) -> TweakProfile:
+    """
+    The part of `desired` that needs to be applied.
+
+    Winaero Tweaker applies a page as a whole, so a change to any option of
+    a page keeps the page's [User] entry and all of its options.
+
+    Args:
+        desired: The full profile
+        changes: Result of diff_profile(desired, ...)
+
+    Returns:
+        TweakProfile with only the settings to apply (same kind and header)
+    """
+    delta = TweakProfile(desired.kind, desired.source, list(desired.header))
+    if desired.kind == KIND_WINAERO:
+        pages = {_winaero_page(change.desired) for change in changes}
+        for setting in desired:
+            if _winaero_page(setting) in pages:
+                delta.add(setting)
+    else:
+        for change in changes:
+            delta.add(change.desired)
+    return delta
+
+
+# ----------------------------------------------------------------------
+# Output
+# ----------------------------------------------------------------------
+
+def render_profile(profile: TweakProfile) -> str:
+    """Return the profile in its tool's own file format (CRLF line endings)."""
+    lines = list(profile.header)
+    if profile.kind == KIND_OOSU:
+        if lines:
+            lines.append("")
+        for setting in profile:
+            line = f"{setting.name}\t{setting.value}"
+            lines.append(f"{line}\t# {setting.comment}" if setting.comment else line)
+    else:
+        section = None
+        for setting in profile:
+            if setting.section != section:
+                if section is not None and profile.kind == KIND_VISUAL:
+                    lines.append("")
+                section = setting.section
+                lines.append(f"[{section}]")
+            lines.append(f"{setting.name}={setting.value}")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def write_profile(profile: TweakProfile, path: str):
+    """Write a profile; ini files get a UTF-8 BOM like the tools' own exports."""
+    encoding = "utf-8" if profile.kind == KIND_OOSU else "utf-8-sig"
+    with open(path, "w", encoding=encoding, newline="") as f:
+        f.write(render_profile(profile))
+
+
+def visual_effects_values(profile: TweakProfile) -> list[tuple[str, str, int, object]]:
+    """
+    Registry values for a visual effects profile.
+
+    Returns:
+        (path under HKEY_CURRENT_USER, value name, type, data) tuples
+    """
+    values = []
+    for setting in profile:
+        spec = _VISUAL_BY_KEY[setting.key]
+        text = setting.value.strip()
+        if spec.value_type == _mr.REG_BINARY:
+            data = bytes(int(part) for part in text.split(","))
+        elif spec.value_type == _mr.REG_DWORD:
+            data = int(text)
+        else:
+            data = text
+        values.append((spec.path, spec.name, spec.value_type, data))
+    return values
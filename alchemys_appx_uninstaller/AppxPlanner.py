@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+AppX Removal Planner
+
+Plans the removals for list.txt against a single inventory snapshot instead
+of running Get-AppxPackage once per line (each call enumerates the whole
+package store). The inventory is indexed by Name / PackageFullName (and
+DisplayName / PackageName for provisioned packages), every line of
+list.txt is matched in one pass, and the result is written as one
+PowerShell script that removes all matched packages.
+
+Lines match a package's Name or PackageFullName exactly (case-insensitive),
+like Appx-Uninstaller.ps1. Lines containing * or ? are wildcards
+(PowerShell -like semantics), e.g. Microsoft.Xbox*. Blank lines and lines
+starting with # are ignored.
+
+Export the inventory on the target machine (PowerShell):
+    Get-AppxPackage -AllUsers | Select Name, PackageFullName, NonRemovable |
+        ConvertTo-Json | Out-File -Encoding utf8 appx_inventory.json
+    Get-AppxProvisionedPackage -Online | Select DisplayName, PackageName |
+        ConvertTo-Json | Out-File -Encoding utf8 appx_provisioned.json
+
+Usage:
+    python AppxPlanner.py <inventory.json> [...] [--list list.txt] [--out remove_appx.ps1]
+                          [--include-provisioned] [--all-users]
+
+Example:
+    python AppxPlanner.py appx_inventory.json appx_provisioned.json --include-provisioned
+"""
+
+import argparse
+import bisect
+import fnmatch
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+KIND_INSTALLED = "installed"
+KIND_PROVISIONED = "provisioned"
+
+WILDCARD_CHARS = "*?["
+
+
+@dataclass(frozen=True)
+class Package:
+    """One package from the inventory."""
+    kind: str               # KIND_INSTALLED or KIND_PROVISIONED
+    name: str               # Name (installed) or DisplayName (provisioned)
+    full_name: str          # PackageFullName (installed) or PackageName (provisioned)
+    removable: bool = True
+
+
+@dataclass
+class RemovalPlan:
+    """Result of matching list.txt against an inventory."""
+    installed: list = field(default_factory=list)       # Packages to remove, in list order
+    provisioned: list = field(default_factory=list)
+    not_found: list = field(default_factory=list)       # list.txt entries with no match
+    non_removable: list = field(default_factory=list)   # (entry, Package) pairs skipped
+
+
+def _read_json(path: str):
+    """Read JSON written by PowerShell (UTF-16 from '>' redirection, or UTF-8 with/without BOM)."""
+    raw = Path(path).read_bytes()
+    if raw[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        text = raw.decode("utf-16")
+    else:
+        text = raw.decode("utf-8-sig")
+    return json.loads(text) if text.strip() else []
+
+
+def load_inventory(paths: list[str]) -> list[Package]:
+    """
+    Load one or more exported inventories.
+
+    Each file holds the ConvertTo-Json output of Get-AppxPackage or
+    Get-AppxProvisionedPackage (a list, or a single object for one
+    package). The kind of each record is detected from its fields.
+
+    Args:
+        paths: JSON files
+
+    Returns:
+        All packages found
+
+    Raises:
+        ValueError: If a file is not valid JSON or has unknown records
+    """
+    packages = []
+    for path in paths:
+        try:
+            data = _read_json(path)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"{path}: not a JSON inventory ({e})") from None
+        if isinstance(data, dict):
+            data = [data]
+        for record in data:
+            if "PackageFullName" in record:
+                packages.append(Package(KIND_INSTALLED, record.get("Name") or "",
+                                        record["PackageFullName"],
+                                        not record.get("NonRemovable", False)))
+            elif "PackageName" in record:
+                packages.append(Package(KIND_PROVISIONED, record.get("DisplayName") or "",
+                                        record["PackageName"]))
+            else:
+                raise ValueError(f"{path}: unrecognized inventory record: {sorted(record)}")
+    return packages
+
+
+class PackageIndex:
+    """
+    Name index over an inventory.
+
+    Exact lookups are dictionary hits on the lower-cased Name and full
+    name. Wildcards are answered from a sorted list of names: the literal
+    prefix before the first wildcard character narrows the candidates with
+    a binary search, and only those are matched against the pattern.
+    """
+
+    def __init__(self, packages: list[Package]):
+        self._exact = {}        # lower-case name or full name -> [Package]
+        for package in packages:
+            for key in {package.name.lower(), package.full_name.lower()}:
+                if key:
+                    self._exact.setdefault(key, []).append(package)
+        self._sorted = sorted(self._exact)
+
+    def find(self, entry: str) -> list[Package]:
+        """Packages whose Name or full name matches `entry` (exact or wildcard)."""
+        key = entry.lower()
+        if not any(c in key for c in WILDCARD_CHARS):
+            return list(self._exact.get(key, ()))
+
+        prefix_end = min((key.index(c) for c in WILDCARD_CHARS if c in key))
+        prefix = key[:prefix_end]
+        start = bisect.bisect_left(self._sorted, prefix)
+        found = {}
+        for name in self._sorted[start:]:
+            if not name.startswith(prefix):
+                break
+            if fnmatch.fnmatchcase(name, key):
+                for package in self._exact[name]:
+                    found[package.full_name.lower(), package.kind] = package
+        return list(found.values())
+
+
+def read_list(path: str) -> list[str]:
+    """Read list.txt: one name, full name or wildcard per line."""
+    entries = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                entries.append(line)
+    return list(dict.fromkeys(entries))
+
+
+def plan_removals(entries: list[str], index: PackageIndex) -> RemovalPlan:
+    """
+    Match every list entry against the index in one pass.
+
+    Args:
+        entries: Lines from list.txt
+        index: PackageIndex of the inventory
+
+    Returns:
+        RemovalPlan with each package listed once, in list order
+    """
+    plan = RemovalPlan()
+    seen = set()
+    for entry in entries:
+        matches = index.find(entry)
+        if not matches:
+            plan.not_found.append(entry)
+            continue
+        for package in matches:
+            key = (package.kind, package.full_name.lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            if not package.removable:
+                plan.non_removable.append((entry, package))
+            elif package.kind == KIND_INSTALLED:
+                plan.installed.append(package)
+            else:
+                plan.provisioned.append(package)
+    return plan
+
+
+def _ps_quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _ps_array(name: str, values: list[str]) -> list[str]:
+    if not values:
+        return [f"${name} = @()"]
+    lines = [f"${name} = @("]
+    lines.extend(f"    {_ps_quote(value)}," for value in values[:-1])
+    lines.append(f"    {_ps_quote(values[-1])}")
+    lines.append(")")
+    return lines
+
+
+def render_script(plan: RemovalPlan, include_provisioned: bool, all_users: bool,
+                  sources: Optional[list[str]] = None) -> str:
+    """
+    Render the plan as a single PowerShell removal script.
+
+    Args:
+        plan: The removal plan
+        include_provisioned: Also remove matched provisioned packages (so
+                             they are not reinstalled for new users)
+        all_users: Remove installed packages for all users (-AllUsers)
+        sources: Inventory file names, for the header comment
+
+    Returns:
+        The script text
+    """
+    remove = "Remove-AppxPackage -AllUsers" if all_users else "Remove-AppxPackage"
+    lines = [
+        "# Generated by AppxPlanner.py - removes every package matched from list.txt",
+        f"# Inventory: {', '.join(sources or [])}",
+        f"# Created:   {datetime.now():%Y-%m-%d %H:%M:%S}",
+        "",
+        *_ps_array("packages", [p.full_name for p in plan.installed]),
+        *_ps_array("provisioned", [p.full_name for p in plan.provisioned]
+                   if include_provisioned else []),
+        "$failed = @()",
+        "",
+        "foreach ($package in $packages) {",
+        "    try {",
+        f"        {remove} -Package $package -ErrorAction Stop",
+        "    }",
+        "    catch {",
+        "        Write-Host \"Error while trying to uninstall $($package): $_\"",
+        "        $failed += $package",
+        "    }",
+        "}",
+        "",
+        "foreach ($package in $provisioned) {",
+        "    try {",
+        "        Remove-AppxProvisionedPackage -Online -PackageName $package -ErrorAction Stop | Out-Null",
+        "    }",
+        "    catch {",
+        "        Write-Host \"Error while trying to deprovision $($package): $_\"",
+        "        $failed += $package",
+        "    }",
+        "}",
+        "",
+        "$removed = $packages.Count + $provisioned.Count - $failed.Count",
+        "Write-Host \"Removed $removed package(s).\"",
+        "if ($failed) {",
+        "    Write-Host \"[!!!] WARNING: The following packages could not be removed:\"",
+        "    foreach ($package in $failed) {",
+        "        Write-Host \"`t$package\"",
+        "    }",
+        "}",
+    ]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def main():
+    script_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(
+        description="Plan AppX removals for list.txt against an exported package inventory.")
+    parser.add_argument('inventory', nargs='+',
+                        help='JSON export of Get-AppxPackage and/or Get-AppxProvisionedPackage')
+    parser.add_argument('--list', default=str(script_dir / 'list.txt'),
+                        help='Packages to remove, one per line (default: list.txt next to this script)')
+    parser.add_argument('--out', default='remove_appx.ps1',
+                        help='Removal script to write (default: remove_appx.ps1)')
+    parser.add_argument('--include-provisioned', action='store_true',
+                        help='Also deprovision matched packages so new users do not get them')
+    parser.add_argument('--all-users', action='store_true',
+                        help='Remove installed packages for all users (Remove-AppxPackage -AllUsers)')
+    args = parser.parse_args()
+
+    try:
+        packages = load_inventory(args.inventory)
+        entries = read_list(args.list)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    index = PackageIndex(packages)
+    plan = plan_removals(entries, index)
+    provisioned = plan.provisioned if args.include_provisioned else []
+
+    print(f"Inventory: {len(packages)} package(s) from {len(args.inventory)} file(s)")
+    print(f"List:      {len(entries)} entr{'y' if len(entries) == 1 else 'ies'}")
+    print()
+    print(f"  [OK] {len(plan.installed)} installed package(s) to remove")
+    if args.include_provisioned:
+        print(f"  [OK] {len(provisioned)} provisioned package(s) to remove")
+    elif plan.provisioned:
+        print(f"  [INFO] {len(plan.provisioned)} provisioned package(s) matched "
+              f"(use --include-provisioned to remove them too)")
+    for entry, package in plan.non_removable:
+        print(f"  [WARN] Skipping non-removable package {package.full_name} (from '{entry}')")
+
+    if plan.not_found:
+        print()
+        print("[!!!] WARNING: The following packages were not found in the inventory:")
+        print()
+        for entry in plan.not_found:
+            print(f"\t{entry}")
+        print()
+        print("Please re-check the names to ensure they exactly match a package's 'Name' or 'PackageFullName'.")
+
+    try:
+        with open(args.out, "w", encoding="utf-8-sig", newline="") as f:
+            f.write(render_script(plan, args.include_provisioned, args.all_users,
+                                  [Path(p).name for p in args.inventory]))
+    except OSError as e:
+        print(f"Error: Could not write {args.out}: {e}")
+        sys.exit(1)
+    print()
+    print(f"[OK] Wrote {args.out} ({len(plan.installed) + len(provisioned)} removal(s))")
+    print(f"Run it from an elevated PowerShell: powershell -ExecutionPolicy Bypass -File {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,22 @@ echo Running All Scripts in Current Directory
 echo ========================================
 echo.
 
+REM Run everything as one concurrent, dependency-ordered batch when Python
+REM is available (metadata in scripts.ini); it imports the .reg files in one
+REM merged pass with RegImporter.py. ScriptScheduler.py lives in
+REM ..\alchemys_app_defaulter because it uses AppDefaulter.py's registry layer;
+REM keep both folders together
+set "SCHEDULER=%~dp0..\alchemys_app_defaulter\ScriptScheduler.py"
+where python >nul 2>&1
+if not errorlevel 1 if exist "%SCHEDULER%" (
+    python "%SCHEDULER%" "%~dp0."
+    if errorlevel 1 (
+        echo ERROR: One or more scripts failed
+    )
+    goto :all_done
+)
+
+REM Otherwise run them one type after another
 REM Run all .reg files
 echo [1/3] Importing Registry Files (.reg)...
 echo.
@@ -51,6 +67,7 @@ for %%f in (*.ps1) do (
     echo.
 )
 
+:all_done
 echo.
 echo ========================================
 echo All Scripts Completed
@@ -10,6 +10,7 @@ set "TIMESTAMP=%TIMESTAMP: =0%"
 set "EXPORT_DIR=%SCRIPT_DIR%GPO_DIFF_%TIMESTAMP%"
 set "TEMP_CURRENT=%TEMP%\gpo_current_%RANDOM%"
 set "TEMP_DEFAULT=%TEMP%\gpo_default_%RANDOM%"
+set "GPO_DIFF=%SCRIPT_DIR%..\..\alchemys_app_defaulter\GpoDiff.py"
 
 :: Check for admin privileges
 net session >nul 2>&1
@@ -51,6 +52,7 @@ if not exist "%EXPORT_DIR%" mkdir "%EXPORT_DIR%"
 
 :: Export current Group Policy settings
 echo [1/5] Exporting current Group Policy settings...
+mkdir "%TEMP_CURRENT%" 2>nul
 secedit /export /cfg "%TEMP_CURRENT%\secedit.inf" >nul 2>&1
 gpresult /H "%TEMP_CURRENT%\gpresult.html" >nul 2>&1
 reg export "HKLM\SOFTWARE\Policies" "%TEMP_CURRENT%\policies_hklm.reg" /y >nul 2>&1
@@ -63,6 +65,16 @@ echo [2/5] Exporting Administrative Templates...
 reg export "HKLM\SOFTWARE\Policies\Microsoft" "%TEMP_CURRENT%\policies_ms_hklm.reg" /y >nul 2>&1
 reg export "HKCU\SOFTWARE\Policies\Microsoft" "%TEMP_CURRENT%\policies_ms_hkcu.reg" /y >nul 2>&1
 
+:: With Python, compare against the default security template and write only
+:: the settings that differ (GpoDiff.py writes the whole GPO_DIFF folder)
+where python >nul 2>&1
+if not errorlevel 1 if exist "%GPO_DIFF%" (
+    echo [3/5] Comparing with the default security template...
+    python "%GPO_DIFF%" "%TEMP_CURRENT%" --baseline "%WINDIR%\inf\defltbase.inf" --out "%EXPORT_DIR%"
+    if not errorlevel 1 goto export_written
+    echo Comparison failed; exporting the full settings instead.
+)
+
 :: Create a reference baseline (minimal default policy)
 echo [3/5] Creating default policy baseline...
 mkdir "%TEMP_DEFAULT%" 2>nul
@@ -159,6 +171,7 @@ echo - Domain GPOs will override local policies
 echo - Review gpresult.html for complete applied policy details
 ) > "%EXPORT_DIR%\README.txt"
 
+:export_written
 :: Cleanup temp directories
 rd /s /q "%TEMP_CURRENT%" 2>nul
 rd /s /q "%TEMP_DEFAULT%" 2>nul
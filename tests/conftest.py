@@ -0,0 +1,51 @@
+"""
+Shared fixtures.
+
+The tools are plain scripts in their folders, not packages, so both folders
+are put on sys.path. Registry code runs against memory_registry.MemoryRegistry.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+for folder in ("alchemys_app_defaulter", "alchemys_appx_uninstaller"):
+    if str(ROOT / folder) not in sys.path:
+        sys.path.insert(0, str(ROOT / folder))
+
+import AppDefaulter  # noqa: E402
+from memory_registry import MemoryRegistry  # noqa: E402
+
+
+@pytest.fixture
+def reg(monkeypatch, tmp_path):
+    """A MemoryRegistry installed as AppDefaulter's backend, with fresh run state."""
+    backend = MemoryRegistry()
+    monkeypatch.setattr(AppDefaulter, "registry", backend)
+    monkeypatch.setattr(AppDefaulter, "write_stats", AppDefaulter.WriteStats())
+    monkeypatch.setattr(AppDefaulter, "write_journal", None)
+    monkeypatch.setattr(AppDefaulter, "notify_shell_change", lambda: None)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+    AppDefaulter.progid_cache.clear()
+    AppDefaulter.executable_cache.clear()
+    yield backend
+    AppDefaulter.progid_cache.clear()
+    AppDefaulter.executable_cache.clear()
+
+
+def set_value(reg, root, path, name, data, value_type=None):
+    """Create a key (and its parents) and set one value."""
+    with reg.CreateKeyEx(root, path) as key:
+        reg.SetValueEx(key, name, 0, reg.REG_SZ if value_type is None else value_type, data)
+
+
+def get_value(reg, root, path, name=""):
+    """A value's data, or None if the key or value does not exist."""
+    try:
+        with reg.OpenKey(root, path) as key:
+            return reg.QueryValueEx(key, name)[0]
+    except OSError:
+        return None
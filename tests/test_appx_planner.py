@@ -0,0 +1,111 @@
+"""AppxPlanner: exact and wildcard matching, NonRemovable packages and inventory loading."""
+
+import json
+
+import pytest
+
+from AppxPlanner import (KIND_INSTALLED, KIND_PROVISIONED, Package, PackageIndex, load_inventory,
+                         plan_removals, read_list, render_script)
+
+XBOX_APP = "Microsoft.XboxApp_48.49.31001.0_x64__8wekyb3d8bbwe"
+XBOX_OVERLAY = "Microsoft.XboxGamingOverlay_5.721.10202.0_x64__8wekyb3d8bbwe"
+EDGE = "Microsoft.MicrosoftEdge.Stable_120.0.2210.91_neutral__8wekyb3d8bbwe"
+PACKAGES = [
+    Package(KIND_INSTALLED, "Microsoft.XboxApp", XBOX_APP),
+    Package(KIND_INSTALLED, "Microsoft.XboxGamingOverlay", XBOX_OVERLAY),
+    Package(KIND_INSTALLED, "Microsoft.MicrosoftEdge.Stable", EDGE, removable=False),
+    Package(KIND_INSTALLED, "Microsoft.WindowsCalculator",
+            "Microsoft.WindowsCalculator_11.2311.0.0_x64__8wekyb3d8bbwe"),
+    Package(KIND_PROVISIONED, "Microsoft.XboxApp",
+            "Microsoft.XboxApp_48.49.31001.0_neutral_~_8wekyb3d8bbwe"),
+]
+
+
+@pytest.fixture
+def index():
+    return PackageIndex(PACKAGES)
+
+
+def full_names(packages):
+    return [package.full_name for package in packages]
+
+
+def test_exact_match_is_case_insensitive_on_name_and_full_name(index):
+    assert full_names(index.find("microsoft.xboxapp")) == [
+        XBOX_APP, "Microsoft.XboxApp_48.49.31001.0_neutral_~_8wekyb3d8bbwe"]
+    assert full_names(index.find(XBOX_OVERLAY.upper())) == [XBOX_OVERLAY]
+    # No prefix matching without a wildcard
+    assert index.find("Microsoft.Xbox") == []
+
+
+def test_wildcards_use_like_semantics(index):
+    assert set(full_names(index.find("Microsoft.Xbox*"))) == {
+        XBOX_APP, XBOX_OVERLAY, "Microsoft.XboxApp_48.49.31001.0_neutral_~_8wekyb3d8bbwe"}
+    assert full_names(index.find("*Calculator")) == [
+        "Microsoft.WindowsCalculator_11.2311.0.0_x64__8wekyb3d8bbwe"]
+    assert full_names(index.find("Microsoft.XboxAp?")) == [
+        XBOX_APP, "Microsoft.XboxApp_48.49.31001.0_neutral_~_8wekyb3d8bbwe"]
+    assert index.find("Contoso.*") == []
+
+
+def test_plan_lists_each_package_once_in_list_order(index):
+    plan = plan_removals(["Microsoft.XboxGamingOverlay", "Microsoft.Xbox*", "Contoso.App"], index)
+
+    assert full_names(plan.installed) == [XBOX_OVERLAY, XBOX_APP]
+    assert full_names(plan.provisioned) == ["Microsoft.XboxApp_48.49.31001.0_neutral_~_8wekyb3d8bbwe"]
+    assert plan.not_found == ["Contoso.App"]
+    assert plan.non_removable == []
+
+
+def test_non_removable_packages_are_skipped(index):
+    plan = plan_removals(["Microsoft.MicrosoftEdge.Stable", "Microsoft.Microsoft*"], index)
+
+    assert plan.installed == []
+    assert [(entry, package.full_name) for entry, package in plan.non_removable] == [
+        ("Microsoft.MicrosoftEdge.Stable", EDGE)]
+    assert EDGE not in render_script(plan, include_provisioned=True, all_users=True)
+
+
+def test_render_script_quotes_and_respects_options(index):
+    plan = plan_removals(["Microsoft.XboxApp"], index)
+
+    script = render_script(plan, include_provisioned=False, all_users=True)
+    assert f"'{XBOX_APP}'" in script
+    assert "$provisioned = @()" in script
+    assert "Remove-AppxPackage -AllUsers" in script
+    script = render_script(plan, include_provisioned=True, all_users=False)
+    assert "'Microsoft.XboxApp_48.49.31001.0_neutral_~_8wekyb3d8bbwe'" in script
+
+
+def test_load_inventory_reads_powershell_exports(tmp_path):
+    installed = tmp_path / "appx_inventory.json"
+    installed.write_text(json.dumps([
+        {"Name": "Microsoft.XboxApp", "PackageFullName": XBOX_APP, "NonRemovable": False},
+        {"Name": "Microsoft.MicrosoftEdge.Stable", "PackageFullName": EDGE, "NonRemovable": True},
+    ]), encoding="utf-16")
+    provisioned = tmp_path / "appx_provisioned.json"
+    # A single package is exported as an object, not a list
+    provisioned.write_text(json.dumps({"DisplayName": "Microsoft.XboxApp",
+                                       "PackageName": "Microsoft.XboxApp_1_neutral_~_8w"}),
+                           encoding="utf-8-sig")
+
+    packages = load_inventory([str(installed), str(provisioned)])
+    assert packages == [
+        Package(KIND_INSTALLED, "Microsoft.XboxApp", XBOX_APP),
+        Package(KIND_INSTALLED, "Microsoft.MicrosoftEdge.Stable", EDGE, removable=False),
+        Package(KIND_PROVISIONED, "Microsoft.XboxApp", "Microsoft.XboxApp_1_neutral_~_8w"),
+    ]
+
+
+def test_load_inventory_rejects_unknown_records(tmp_path):
+    path = tmp_path / "other.json"
+    path.write_text(json.dumps([{"Id": 1}]), encoding="utf-8")
+    with pytest.raises(ValueError, match="unrecognized inventory record"):
+        load_inventory([str(path)])
+
+
+def test_read_list_skips_comments_blanks_and_duplicates(tmp_path):
+    path = tmp_path / "list.txt"
+    path.write_text("# header\nMicrosoft.XboxApp\n\n  Microsoft.Xbox*  \nMicrosoft.XboxApp\n",
+                    encoding="utf-8")
+    assert read_list(str(path)) == ["Microsoft.XboxApp", "Microsoft.Xbox*"]
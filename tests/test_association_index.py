@@ -0,0 +1,74 @@
+"""refresh_association_index: incremental refresh against a MemoryRegistry."""
+
+import AppDefaulter
+from AppDefaulter import FILE_EXTS_PATH, refresh_association_index
+from association_index import AssociationIndex
+
+from conftest import set_value
+
+FOO = f"{FILE_EXTS_PATH}\\.foo"
+
+
+def setup(reg, tmp_path):
+    set_value(reg, reg.HKEY_CLASSES_ROOT, ".foo", "", "FooFile")
+    set_value(reg, reg.HKEY_CLASSES_ROOT, "FooFile\\shell\\open\\command", "",
+              '"C:\\Foo\\foo.exe" "%1"')
+    set_value(reg, reg.HKEY_CLASSES_ROOT, "BarFile\\shell\\open\\command", "",
+              '"C:\\Bar\\bar.exe" "%1"')
+    set_value(reg, reg.HKEY_CURRENT_USER, f"{FOO}\\OpenWithList", "a", "foo.exe")
+    index = AssociationIndex(tmp_path / "index.sqlite3")
+    refresh_association_index(index)
+    return index
+
+
+def test_unchanged_refresh_reads_nothing(reg, tmp_path):
+    with setup(reg, tmp_path) as index:
+        stats = refresh_association_index(index)
+        assert stats["extensions"] == 1
+        assert stats["extensions_read"] == 0
+        assert stats["progids_read"] == 0
+
+
+def test_new_user_choice_under_existing_key_is_picked_up(reg, tmp_path):
+    with setup(reg, tmp_path) as index:
+        assert index.lookup(".foo")["progid"] == "FooFile"
+        file_exts_stamp = AppDefaulter._subkey_stamp(reg.OpenKey(reg.HKEY_CURRENT_USER, FILE_EXTS_PATH))
+
+        set_value(reg, reg.HKEY_CURRENT_USER, f"{FOO}\\UserChoice", "ProgId", "BarFile")
+        # Only .foo changed, not FileExts itself
+        assert AppDefaulter._subkey_stamp(
+            reg.OpenKey(reg.HKEY_CURRENT_USER, FILE_EXTS_PATH)) == file_exts_stamp
+
+        stats = refresh_association_index(index)
+        assert stats["extensions_read"] == 1
+        row = index.lookup(".foo")
+        assert (row["progid"], row["source"]) == ("BarFile", "UserChoice")
+        assert row["executable"] == "C:\\Bar\\bar.exe"
+
+
+def test_user_choice_value_change_and_removal(reg, tmp_path):
+    with setup(reg, tmp_path) as index:
+        set_value(reg, reg.HKEY_CURRENT_USER, f"{FOO}\\UserChoice", "ProgId", "BarFile")
+        refresh_association_index(index)
+
+        set_value(reg, reg.HKEY_CURRENT_USER, f"{FOO}\\UserChoice", "ProgId", "FooFile")
+        assert refresh_association_index(index)["extensions_read"] == 1
+        assert index.lookup(".foo")["source"] == "UserChoice"
+
+        reg.DeleteKey(reg.HKEY_CURRENT_USER, f"{FOO}\\UserChoice")
+        assert refresh_association_index(index)["extensions_read"] == 1
+        row = index.lookup(".foo")
+        assert (row["progid"], row["source"]) == ("FooFile", "HKCR")
+
+
+def test_file_exts_only_extension_is_not_listed(reg, tmp_path):
+    with setup(reg, tmp_path) as index:
+        set_value(reg, reg.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\.bar\\OpenWithList", "a", "bar.exe")
+        refresh_association_index(index)
+        assert index.lookup(".bar") is None
+        assert index.counts()["extensions"] == 1
+        assert refresh_association_index(index)["extensions_read"] == 0
+
+        set_value(reg, reg.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\.bar\\UserChoice", "ProgId", "BarFile")
+        refresh_association_index(index)
+        assert index.lookup(".bar")["progid"] == "BarFile"
@@ -0,0 +1,68 @@
+"""Extension groups and protected extensions: classify() and expand_config_groups()."""
+
+import pytest
+
+from AppDefaulter import AppConfig, expand_config_groups, open_extension_catalog
+from extension_catalog import classify
+
+from conftest import set_value
+
+EXE = "C:\\Apps\\Editor\\editor.exe"
+
+
+@pytest.mark.parametrize("row, expected", [
+    ((".txt", "text", "text/plain", "txtfile"), (["text"], None)),
+    ((".py", None, "text/x-python", "Python.File"), (["text", "source"], None)),
+    ((".exe", "application", None, "exefile"), (["application"], "executable")),
+    ((".nfo", "text", None, "nfofile", True), (["text"], "NoOpenWith")),
+    ((".sys2", "system", None, None), (["system"], "system type")),
+    ((".3dm", None, None, "AppX4ztfk9wxr86nxmzzq47px0nh0e58b8fw"), ([], "packaged app")),
+])
+def test_classify(row, expected):
+    assert classify(*row) == expected
+
+
+def catalog(reg):
+    hkcr = reg.HKEY_CLASSES_ROOT
+    for ext, progid in ((".txt", "txtfile"), (".log", "txtfile"), (".nfo", "nfofile"),
+                        (".appxt", "AppXabc")):
+        set_value(reg, hkcr, ext, "", progid)
+        set_value(reg, hkcr, ext, "PerceivedType", "text")
+    set_value(reg, hkcr, "nfofile", "NoOpenWith", "")
+    set_value(reg, hkcr, ".exe", "", "exefile")
+    return open_extension_catalog()
+
+
+def config():
+    return AppConfig("editor.apps", EXE, [".md", ".nfo", ".exe"],
+                     groups=[(3, "text"), (4, "nope")])
+
+
+def test_protected_extensions_listed_explicitly_are_dropped(reg):
+    configs = [config()]
+    with catalog(reg) as extensions:
+        expand_config_groups(configs, extensions)
+    result = configs[0]
+
+    assert result.extensions == [".md", ".log", ".txt"]
+    assert result.protected == [(".nfo", "NoOpenWith"), (".exe", "executable")]
+    # .nfo is listed explicitly, so only .appxt is left out of the group
+    assert result.protected_members == [(".appxt", "packaged app")]
+    assert result.malformed == [(4, "@nope", "unknown extension group")]
+
+
+def test_allow_protected_keeps_explicit_extensions_only(reg):
+    configs = [config()]
+    with catalog(reg) as extensions:
+        expand_config_groups(configs, extensions, allow_protected=True)
+    result = configs[0]
+
+    assert result.extensions == [".md", ".nfo", ".exe", ".log", ".txt"]
+    assert result.protected == []
+    assert result.protected_members == [(".appxt", "packaged app")]
+
+
+def test_config_left_without_extensions_is_an_error(reg):
+    configs = [AppConfig("editor.apps", EXE, [".exe"], groups=[(3, "nope")])]
+    with catalog(reg) as extensions, pytest.raises(ValueError, match="No extensions left"):
+        expand_config_groups(configs, extensions)
@@ -0,0 +1,71 @@
+"""GpoDiff.diff_reg_exports(): the operations that turn one policy export into another."""
+
+from GpoDiff import diff_reg_exports
+from regfile import (OP_CREATE_KEY, OP_DELETE_KEY, OP_DELETE_VALUE, OP_SET_VALUE, RegModel,
+                     parse_reg_text)
+
+POLICIES = "HKEY_LOCAL_MACHINE\\SOFTWARE\\Policies\\Microsoft\\Windows"
+
+BASELINE = f"""Windows Registry Editor Version 5.00
+
+[{POLICIES}\\DataCollection]
+"AllowTelemetry"=dword:00000001
+"DoNotShowFeedbackNotifications"=dword:00000001
+
+[{POLICIES}\\OneDrive]
+"DisableFileSyncNGSC"=dword:00000001
+
+[{POLICIES}\\OneDrive\\Sub]
+"Value"="x"
+
+[{POLICIES}\\Explorer]
+"NoUseStoreOpenWith"=dword:00000001
+"""
+
+CURRENT = f"""Windows Registry Editor Version 5.00
+
+[{POLICIES}\\DataCollection]
+"AllowTelemetry"=dword:00000000
+
+[{POLICIES}\\Explorer]
+"NoUseStoreOpenWith"=dword:00000001
+
+[{POLICIES}\\Empty]
+"""
+
+
+def model(text, source):
+    result = RegModel()
+    result.add_all(parse_reg_text(text, source))
+    return result
+
+
+def summary(delta):
+    return [(op.kind, op.path.rsplit("\\", 1)[-1], op.name) for op in delta.operations()]
+
+
+def test_deletions_and_changes():
+    delta = diff_reg_exports(model(BASELINE, "baseline.reg"), model(CURRENT, "current.reg"))
+    kinds = summary(delta)
+
+    # A removed key is deleted once, at its topmost level
+    assert [k for k in kinds if k[0] == OP_DELETE_KEY] == [(OP_DELETE_KEY, "OneDrive", None)]
+    # A value removed from a key that still exists is deleted on its own
+    assert (OP_DELETE_VALUE, "DataCollection", "DoNotShowFeedbackNotifications") in kinds
+    # Changed values are written; unchanged ones are left out
+    written = [op for op in delta.values.values() if op.kind == OP_SET_VALUE]
+    assert [(op.name, op.data) for op in written] == [("AllowTelemetry", 0)]
+    # Keys only the export has are created, even when empty
+    assert (OP_CREATE_KEY, "Empty", None) in kinds
+    assert not any(k[1] == "Explorer" for k in kinds if k[0] != OP_CREATE_KEY)
+
+
+def test_no_baseline_writes_everything_and_deletes_nothing():
+    delta = diff_reg_exports(None, model(CURRENT, "current.reg"))
+    assert not delta.deleted_keys
+    assert sorted(op.name for op in delta.values.values()) == ["AllowTelemetry", "NoUseStoreOpenWith"]
+
+
+def test_identical_exports_give_an_empty_delta():
+    delta = diff_reg_exports(model(CURRENT, "a.reg"), model(CURRENT, "b.reg"))
+    assert delta.operations() == []
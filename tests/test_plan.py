@@ -0,0 +1,69 @@
+"""plan/apply: apply_plan() re-plans entries whose keys changed since the plan."""
+
+import json
+import sys
+
+import pytest
+
+import AppDefaulter
+from AppDefaulter import (ACTION_OPEN_WITH, ACTION_SET_DEFAULT, FILE_EXTS_PATH, AppConfig,
+                          apply_plan, assign_extension_owners, build_plan, generate_progid)
+
+from conftest import get_value, set_value
+
+EXE = "C:\\Apps\\Editor\\editor.exe"
+
+
+def make_plan(reg):
+    set_value(reg, reg.HKEY_CLASSES_ROOT, ".txt", "", "txtfile")
+    set_value(reg, reg.HKEY_CLASSES_ROOT, "txtfile\\shell\\open\\command", "",
+              "C:\\Windows\\notepad.exe %1")
+    set_value(reg, reg.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\.txt\\UserChoice",
+              "ProgId", "txtfile")
+    configs = [AppConfig("editor.apps", EXE, [".txt", ".md"])]
+    return build_plan(configs, assign_extension_owners(configs), force=False)
+
+
+def actions(plan):
+    return {entry["extension"]: entry["action"] for entry in plan["entries"]}
+
+
+def test_untouched_plan_is_applied_as_written(reg, capsys):
+    plan = make_plan(reg)
+    assert actions(plan) == {".txt": ACTION_OPEN_WITH, ".md": ACTION_SET_DEFAULT}
+
+    counts = apply_plan(plan)
+    assert counts == {"set_default": 1, "open_with": 1, "failed": 0, "replanned": 0}
+    assert "changed since the plan" not in capsys.readouterr().out
+
+
+def test_stale_entry_is_replanned_not_applied(reg, capsys):
+    plan = make_plan(reg)
+    # Another app becomes the default for .md after the plan was written
+    set_value(reg, reg.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\.md\\UserChoice",
+              "ProgId", "txtfile")
+
+    counts = apply_plan(plan)
+    assert counts["replanned"] == 1
+    assert (counts["set_default"], counts["open_with"]) == (0, 2)
+    assert "[INFO] .md (editor) changed since the plan; re-planned: open_with (was set_default)" \
+        in capsys.readouterr().out
+    # The newer default is kept; the app is only offered in "Open with"
+    assert get_value(reg, reg.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\.md\\UserChoice",
+                     "ProgId") == "txtfile"
+    assert get_value(reg, reg.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\.md\\OpenWithProgids",
+                     generate_progid(EXE, ".md")) == b""
+
+
+def test_apply_refuses_a_plan_of_another_version(reg, tmp_path, monkeypatch, capsys):
+    plan = make_plan(reg)
+    plan["version"] = AppDefaulter.PLAN_VERSION - 1
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps(plan), encoding="utf-8")
+
+    monkeypatch.setattr(sys, "argv", ["AppDefaulter.py", "apply", str(path)])
+    with pytest.raises(SystemExit) as exit_info:
+        AppDefaulter.main()
+    assert exit_info.value.code == 1
+    assert "is not a plan file of this version" in capsys.readouterr().out
+    assert AppDefaulter.write_stats.written == 0
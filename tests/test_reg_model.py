@@ -0,0 +1,105 @@
+"""Parsing .reg files and merging them in RegModel."""
+
+import pytest
+
+from memory_registry import HKEY_CLASSES_ROOT, HKEY_CURRENT_USER, REG_DWORD, REG_MULTI_SZ, REG_SZ
+from regfile import (OP_CREATE_KEY, OP_DELETE_KEY, OP_DELETE_VALUE, OP_SET_VALUE, RegFileError,
+                     RegModel, parse_reg_text)
+
+HEADER = "Windows Registry Editor Version 5.00\r\n\r\n"
+
+
+def parse(body, source="a.reg"):
+    return parse_reg_text(HEADER + body, source)
+
+
+def test_parse_values_and_deletions():
+    ops = parse('[HKCU\\Software\\Test]\r\n'
+                '@="default"\r\n'
+                '"Count"=dword:0000002a\r\n'
+                '"List"=hex(7):6f,00,6e,00,65,00,00,00,\\\r\n'
+                '  74,00,77,00,6f,00,00,00,00,00\r\n'
+                '"Gone"=-\r\n'
+                '\r\n'
+                '[-HKEY_CLASSES_ROOT\\*\\shell\\pintohomefile]\r\n')
+
+    assert [op.kind for op in ops] == [OP_CREATE_KEY, OP_SET_VALUE, OP_SET_VALUE, OP_SET_VALUE,
+                                       OP_DELETE_VALUE, OP_DELETE_KEY]
+    assert ops[0].root == HKEY_CURRENT_USER and ops[0].path == "Software\\Test"
+    assert (ops[1].name, ops[1].data, ops[1].value_type) == ("", "default", REG_SZ)
+    assert (ops[2].data, ops[2].value_type) == (42, REG_DWORD)
+    assert (ops[3].data, ops[3].value_type, ops[3].line) == (["one", "two"], REG_MULTI_SZ, 6)
+    assert ops[5].root == HKEY_CLASSES_ROOT and ops[5].path == "*\\shell\\pintohomefile"
+
+
+@pytest.mark.parametrize("body, message", [
+    ('"Orphan"="x"\r\n', "outside of a key"),
+    ('[HKCU\\Software\\Test]\r\n"Count"=dword:xyz\r\n', "invalid dword"),
+    ('[HKCU\\Software\\Test]\r\n"Name"\r\n', "expected '='"),
+])
+def test_parse_errors_name_the_line(body, message):
+    with pytest.raises(RegFileError, match=message) as info:
+        parse(body)
+    assert info.value.source == "a.reg"
+    assert info.value.line >= 3
+
+
+def test_missing_header():
+    with pytest.raises(RegFileError, match="header"):
+        parse_reg_text('[HKCU\\Software\\Test]\r\n', "a.reg")
+
+
+def test_later_file_wins_and_disagreement_is_reported():
+    model = RegModel()
+    model.add_all(parse('[HKCU\\Software\\Test]\r\n"Mode"="fast"\r\n"Same"=dword:1\r\n', "a.reg"))
+    model.add_all(parse('[HKCU\\Software\\test]\r\n"mode"="slow"\r\n"Same"=dword:1\r\n', "b.reg"))
+
+    assert model.sources == ["a.reg", "b.reg"]
+    assert len(model.conflicts) == 1
+    conflict = model.conflicts[0]
+    assert (conflict.earlier.source, conflict.later.source) == ("a.reg", "b.reg")
+    assert "later file wins" in conflict.describe()
+    values = {op.name.lower(): op.data for op in model.values.values()}
+    assert values == {"mode": "slow", "same": 1}
+    assert model.value_count == 2
+
+
+def test_same_file_overwriting_itself_is_not_a_conflict():
+    model = RegModel()
+    model.add_all(parse('[HKCU\\Software\\Test]\r\n"Mode"="fast"\r\n"Mode"="slow"\r\n'))
+    assert model.conflicts == []
+    assert [op.data for op in model.values.values()] == ["slow"]
+
+
+def test_key_deletion_drops_earlier_values_and_conflicts():
+    model = RegModel()
+    model.add_all(parse('[HKCR\\*\\shell\\runas\\command]\r\n@="cmd.exe"\r\n', "a.reg"))
+    model.add_all(parse('[-HKCR\\*\\shell\\runas]\r\n', "b.reg"))
+
+    assert model.values == {}
+    assert model.keys == {}
+    assert len(model.conflicts) == 1
+    assert model.conflicts[0].later.kind == OP_DELETE_KEY
+
+
+def test_value_below_a_deleted_key_conflicts_and_is_kept():
+    model = RegModel()
+    model.add_all(parse('[-HKCR\\*\\shell\\TakeOwnership]\r\n', "a.reg"))
+    model.add_all(parse('[HKCR\\*\\shell\\TakeOwnership\\command]\r\n@="takeown"\r\n', "b.reg"))
+
+    assert len(model.conflicts) == 1
+    kinds = [op.kind for op in model.operations()]
+    # Deletions first, then the key and its value, like replaying both files
+    assert kinds == [OP_DELETE_KEY, OP_CREATE_KEY, OP_SET_VALUE]
+
+
+def test_render_parses_back_to_the_merged_model():
+    model = RegModel()
+    model.add_all(parse('[-HKCU\\Software\\Old]\r\n'
+                        '[HKCU\\Software\\Test]\r\n"Mode"="fast"\r\n"Gone"=-\r\n', "a.reg"))
+    model.add_all(parse('[HKCU\\Software\\Test]\r\n"Mode"="slow"\r\n', "b.reg"))
+
+    again = RegModel()
+    again.add_all(parse_reg_text(model.render(), "merged.reg"))
+    assert ([(op.kind, op.key_name, op.name, op.data) for op in again.operations()]
+            == [(op.kind, op.key_name, op.name, op.data) for op in model.operations()])
@@ -0,0 +1,168 @@
+"""regf_hive: reading and writing hive files, compared with MemoryRegistry."""
+
+import random
+import struct
+
+import pytest
+
+from memory_registry import MemoryRegistry
+from regf_hive import MAX_CELL_DATA, MAX_LEAF_ENTRIES, HiveError, HiveRegistry, RegfHive, _checksum
+
+VALUES = [
+    ("", "Text Document", MemoryRegistry.REG_SZ),
+    ("Icon", "%SystemRoot%\\system32\\imageres.dll,-102", MemoryRegistry.REG_EXPAND_SZ),
+    ("Count", 7, MemoryRegistry.REG_DWORD),
+    ("Big", 2 ** 40 + 3, MemoryRegistry.REG_QWORD),
+    ("List", ["a", "bb", "\u00e9"], MemoryRegistry.REG_MULTI_SZ),
+    # Empty binary data reads back as None, like winreg
+    ("Marker", None, MemoryRegistry.REG_NONE),
+    ("Small", b"\x01\x02\x03", MemoryRegistry.REG_BINARY),
+    ("Large", bytes(range(256)) * 63, MemoryRegistry.REG_BINARY),
+]
+
+
+@pytest.fixture
+def hive_files(tmp_path):
+    software, ntuser = tmp_path / "SOFTWARE", tmp_path / "NTUSER.DAT"
+    RegfHive.create(software).close()
+    RegfHive.create(ntuser).close()
+    return software, ntuser
+
+
+def dump(backend, root, path=""):
+    """Every key below root\\path with its values, by lower-case path."""
+    with backend.OpenKey(root, path) as key:
+        subkey_count, value_count, _ = backend.QueryInfoKey(key)
+        values = sorted((backend.EnumValue(key, i) for i in range(value_count)),
+                        key=lambda v: v[0].lower())
+        names = [backend.EnumKey(key, i) for i in range(subkey_count)]
+    # winreg (and the hive) return None for empty binary data, MemoryRegistry b""
+    tree = {path.lower(): [(name.lower(), data if data != b"" else None, value_type)
+                           for name, data, value_type in values]}
+    for name in names:
+        tree.update(dump(backend, root, f"{path}\\{name}" if path else name))
+    return tree
+
+
+def header(path):
+    data = path.read_bytes()[:4096]
+    return struct.unpack_from("<II", data, 4), _checksum(data), struct.unpack_from("<I", data, 508)[0]
+
+
+def test_values_round_trip_through_the_file(hive_files):
+    software, ntuser = hive_files
+    with HiveRegistry(software, ntuser) as reg:
+        with reg.CreateKeyEx(reg.HKEY_CLASSES_ROOT, ".txt\\ShellNew") as key:
+            for name, data, value_type in VALUES:
+                reg.SetValueEx(key, name, 0, value_type, data)
+        with reg.CreateKeyEx(reg.HKEY_CURRENT_USER, "Software\\Editor") as key:
+            reg.SetValueEx(key, "Theme", 0, reg.REG_SZ, "dark")
+
+    with HiveRegistry(software, ntuser, writable=False) as reg:
+        with reg.OpenKey(reg.HKEY_CLASSES_ROOT, ".TXT\\shellnew") as key:
+            for name, data, value_type in VALUES:
+                assert reg.QueryValueEx(key, name) == (data, value_type)
+        # HKEY_CLASSES_ROOT is the SOFTWARE hive's Classes key
+        with reg.OpenKey(reg.HKEY_LOCAL_MACHINE, "SOFTWARE\\Classes\\.txt\\ShellNew") as key:
+            assert reg.QueryValueEx(key, "Count") == (7, reg.REG_DWORD)
+        with reg.OpenKey(reg.HKEY_CURRENT_USER, "Software\\Editor") as key:
+            assert reg.QueryValueEx(key, "Theme") == ("dark", reg.REG_SZ)
+        with pytest.raises(OSError):
+            reg.OpenKey(reg.HKEY_CLASSES_ROOT, ".missing")
+
+
+def test_values_over_one_cell_are_refused(hive_files):
+    software, _ = hive_files
+    with HiveRegistry(software=software) as reg:
+        with reg.CreateKeyEx(reg.HKEY_CLASSES_ROOT, ".bin") as key:
+            with pytest.raises(HiveError, match="not supported"):
+                reg.SetValueEx(key, "Blob", 0, reg.REG_BINARY, bytes(MAX_CELL_DATA + 1))
+
+
+def test_random_edits_match_memory_registry(hive_files):
+    software, ntuser = hive_files
+    memory = MemoryRegistry()
+    with HiveRegistry(software, ntuser) as hive:
+        for backend in (hive, memory):
+            rng = random.Random(1)
+            for i in range(1500):
+                ext = f".e{rng.randrange(700)}_{'Ab'[i % 2]}"
+                root = rng.choice([backend.HKEY_CLASSES_ROOT, backend.HKEY_CURRENT_USER])
+                with backend.CreateKeyEx(root, f"{ext}\\OpenWithProgids") as key:
+                    backend.SetValueEx(key, f"prog{i % 7}", 0, backend.REG_NONE, b"")
+                with backend.CreateKeyEx(root, ext) as key:
+                    backend.SetValueEx(key, "", 0, backend.REG_SZ, f"file{i}" * (i % 5))
+                    backend.SetValueEx(key, "n", 0, backend.REG_DWORD, i)
+                    if i % 11 == 0:
+                        backend.DeleteValue(key, "n")
+                if i % 13 == 0:
+                    backend.DeleteKey(root, f"{ext}\\OpenWithProgids")
+
+    with HiveRegistry(software, ntuser, writable=False) as hive:
+        for root in (hive.HKEY_CLASSES_ROOT, hive.HKEY_CURRENT_USER):
+            assert dump(hive, root) == dump(memory, root)
+            # Subkeys are kept sorted by upper-case name, which lookups rely on
+            with hive.OpenKey(root, "") as key:
+                names = [hive.EnumKey(key, i) for i in range(hive.QueryInfoKey(key)[0])]
+            # Enough keys under one parent to need more than one subkey leaf list
+            assert len(names) > MAX_LEAF_ENTRIES
+            assert names == sorted(names, key=str.upper)
+            for name in names:
+                hive.OpenKey(root, name.swapcase()).Close()
+
+
+def test_flush_updates_sequence_numbers_and_checksum(hive_files):
+    software, _ = hive_files
+    (seq1, seq2), computed, stored = header(software)
+    assert seq1 == seq2 and computed == stored
+
+    with HiveRegistry(software=software) as reg:
+        with reg.CreateKeyEx(reg.HKEY_CLASSES_ROOT, ".md") as key:
+            reg.SetValueEx(key, "", 0, reg.REG_SZ, "markdown")
+
+    (new1, new2), computed, stored = header(software)
+    assert new1 == new2 and new1 > seq1
+    assert computed == stored
+
+
+def test_read_only_open_does_not_change_the_file(hive_files):
+    software, _ = hive_files
+    before = software.read_bytes()
+    with HiveRegistry(software=software, writable=False) as reg:
+        with pytest.raises(OSError):
+            reg.CreateKeyEx(reg.HKEY_CLASSES_ROOT, ".md")
+    assert software.read_bytes() == before
+
+
+def corrupt(path, offset, data, fix_checksum):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+        if fix_checksum:
+            f.seek(0)
+            block = f.read(4096)
+            f.seek(508)
+            f.write(struct.pack("<I", _checksum(block)))
+
+
+@pytest.mark.parametrize("offset, data, fix_checksum, message", [
+    (0, b"XXXX", True, "no regf signature"),
+    (4, struct.pack("<I", 99), False, "checksum mismatch"),
+    (4, struct.pack("<I", 99), True, "unapplied transaction log"),
+])
+def test_damaged_or_dirty_hives_are_refused(hive_files, offset, data, fix_checksum, message):
+    software, _ = hive_files
+    corrupt(software, offset, data, fix_checksum)
+    with pytest.raises(HiveError, match=message):
+        RegfHive(software)
+
+
+def test_empty_and_truncated_files_are_refused(tmp_path):
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    with pytest.raises(HiveError, match="empty file"):
+        RegfHive(empty)
+    short = tmp_path / "short"
+    short.write_bytes(b"regf" + bytes(100))
+    with pytest.raises(HiveError, match="too small"):
+        RegfHive(short)
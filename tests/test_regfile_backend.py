@@ -0,0 +1,86 @@
+"""RegFileBackend: writes are recorded, reads fall through, and the .reg file round-trips."""
+
+import AppDefaulter
+from memory_registry import MemoryRegistry
+from regfile import OP_SET_VALUE, RegFileBackend, RegModel, parse_reg_file
+from RegImporter import apply_reg_model
+
+from conftest import get_value, set_value
+
+VALUES = [
+    ("", "Sublime Text", MemoryRegistry.REG_SZ),
+    ("Path", "%ProgramFiles%\\Sublime Text", MemoryRegistry.REG_EXPAND_SZ),
+    ("Count", 0x2A, MemoryRegistry.REG_DWORD),
+    ("Big", 0x1_0000_0001, MemoryRegistry.REG_QWORD),
+    ("Blob", bytes(range(40)), MemoryRegistry.REG_BINARY),
+    ("List", ["one", "two words", "\u00e9t\u00e9"], MemoryRegistry.REG_MULTI_SZ),
+    ('Quote "and" back\\slash', 'C:\\a "b"', MemoryRegistry.REG_SZ),
+    ("Marker", b"", MemoryRegistry.REG_NONE),
+]
+
+
+def record(backend):
+    with backend.CreateKeyEx(backend.HKEY_CLASSES_ROOT, "Test.File\\shell\\open") as key:
+        for name, data, value_type in VALUES:
+            backend.SetValueEx(key, name, 0, value_type, data)
+
+
+def test_reads_fall_through_and_writes_stay_planned():
+    base = MemoryRegistry()
+    set_value(base, base.HKEY_CLASSES_ROOT, ".txt", "", "txtfile")
+    backend = RegFileBackend(base=base)
+
+    with backend.OpenKey(backend.HKEY_CLASSES_ROOT, ".txt") as key:
+        assert backend.QueryValueEx(key, "") == ("txtfile", backend.REG_SZ)
+    with backend.CreateKeyEx(backend.HKEY_CLASSES_ROOT, ".txt") as key:
+        backend.SetValueEx(key, "", 0, backend.REG_SZ, "sublimetext.txt")
+        assert backend.QueryValueEx(key, "")[0] == "sublimetext.txt"
+    with backend.CreateKeyEx(backend.HKEY_CLASSES_ROOT, ".txt\\OpenWithProgids") as key:
+        backend.SetValueEx(key, "sublimetext.txt", 0, backend.REG_NONE, b"")
+
+    assert get_value(base, base.HKEY_CLASSES_ROOT, ".txt") == "txtfile"
+    with backend.OpenKey(backend.HKEY_CLASSES_ROOT, ".txt") as key:
+        assert backend.EnumKey(key, 0) == "OpenWithProgids"
+    assert backend.value_count == 2
+
+
+def test_missing_key_raises_without_base():
+    backend = RegFileBackend()
+    try:
+        backend.OpenKey(backend.HKEY_CLASSES_ROOT, ".nothing")
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError("OpenKey should fail for a key that was never written")
+
+
+def test_written_file_parses_back_to_the_same_values(tmp_path):
+    backend = RegFileBackend()
+    record(backend)
+    path = tmp_path / "out.reg"
+    backend.write(str(path))
+
+    assert path.read_bytes()[:2] == b"\xff\xfe"
+    ops = [op for op in parse_reg_file(str(path)) if op.kind == OP_SET_VALUE]
+    assert [(op.name, op.data, op.value_type) for op in ops] == VALUES
+    assert {op.key_name for op in ops} == {"HKEY_CLASSES_ROOT\\Test.File\\shell\\open"}
+
+
+def test_written_file_imports_into_a_registry(reg, tmp_path):
+    backend = RegFileBackend()
+    record(backend)
+    path = tmp_path / "out.reg"
+    backend.write(str(path))
+
+    model = RegModel()
+    model.add_all(parse_reg_file(str(path)))
+    assert apply_reg_model(model) == (0, 0, 0)
+    assert AppDefaulter.write_stats.written == len(VALUES)
+
+    with reg.OpenKey(reg.HKEY_CLASSES_ROOT, "Test.File\\shell\\open") as key:
+        for name, data, value_type in VALUES:
+            assert reg.QueryValueEx(key, name) == (data, value_type)
+
+    # Importing the same file again changes nothing
+    assert apply_reg_model(model) == (0, 0, 0)
+    assert AppDefaulter.write_stats.skipped == len(VALUES)
@@ -0,0 +1,86 @@
+"""main()'s output modes: the summary and record schema in text, --quiet and --json runs."""
+
+import io
+import json
+import sys
+
+import pytest
+
+import AppDefaulter
+
+from conftest import set_value
+
+@pytest.fixture
+def config(reg, tmp_path):
+    set_value(reg, reg.HKEY_CLASSES_ROOT, ".txt", "", "txtfile")
+    set_value(reg, reg.HKEY_CLASSES_ROOT, "txtfile\\shell\\open\\command", "",
+              "C:\\Windows\\notepad.exe %1")
+    set_value(reg, reg.HKEY_CURRENT_USER, f"{AppDefaulter.FILE_EXTS_PATH}\\.txt\\UserChoice",
+              "ProgId", "txtfile")
+    exe = tmp_path / "editor.exe"
+    exe.touch()
+    path = tmp_path / "editor.apps"
+    path.write_text(f"{exe}\n.txt\n.md\n", encoding="utf-8")
+    return str(path)
+
+
+def run_main(monkeypatch, capsys, *argv):
+    monkeypatch.setattr(sys, "argv", ["AppDefaulter.py", *argv])
+    try:
+        AppDefaulter.main()
+    except SystemExit as e:
+        assert not e.code
+    return capsys.readouterr().out
+
+
+def records(out):
+    return [json.loads(line) for line in out.splitlines()]
+
+
+def test_dry_run_quiet_prints_the_summary(config, monkeypatch, capsys):
+    out = run_main(monkeypatch, capsys, config, "--no-cache", "--dry-run", "--quiet")
+    assert "Summary (dry run, nothing changed):" in out
+    assert "Would set as default:     1" in out
+    assert "Would add to 'Open with': 1" in out
+    assert "Checking existing associations" not in out
+
+
+def test_json_records_share_one_schema(config, monkeypatch, capsys):
+    run_main(monkeypatch, capsys, config, "--no-cache", "--json")
+    # Second run: both pairs are unchanged since the first
+    for dry_run in (True, False):
+        out = run_main(monkeypatch, capsys, config, "--no-cache", "--json",
+                       *(["--dry-run"] if dry_run else []))
+        extensions = [r for r in records(out) if r["type"] == "extension"]
+        summary = [r for r in records(out) if r["type"] == "summary"]
+
+        assert [(r["extension"], r["status"]) for r in extensions] == \
+            [(".txt", "unchanged"), (".md", "unchanged")]
+        assert {"previous_default", "previous_executable"} <= extensions[0].keys()
+        assert len(summary) == 1
+        assert summary[0]["dry_run"] is dry_run
+        assert summary[0]["unchanged"] == 2
+
+
+def test_dry_run_json_reports_planned_pairs(config, monkeypatch, capsys):
+    out = run_main(monkeypatch, capsys, config, "--no-cache", "--json", "--dry-run")
+    by_ext = {r["extension"]: r for r in records(out) if r["type"] == "extension"}
+    assert by_ext[".txt"]["previous_default"] == "txtfile"
+    assert by_ext[".txt"]["action"] == AppDefaulter.ACTION_OPEN_WITH
+    assert by_ext[".md"]["action"] == AppDefaulter.ACTION_SET_DEFAULT
+    summary = records(out)[-1]
+    assert summary["type"] == "summary"
+    assert (summary["set_as_default"], summary["added_to_open_with"]) == (1, 1)
+
+
+def test_text_mode_keeps_line_buffering(monkeypatch):
+    stream = io.TextIOWrapper(io.BytesIO(), line_buffering=True)
+    monkeypatch.setattr(sys, "stdout", stream)
+    reporter = AppDefaulter.Reporter(AppDefaulter.OUTPUT_TEXT)
+    assert sys.stdout is stream and stream.line_buffering
+    reporter.close()
+
+    reporter = AppDefaulter.Reporter(AppDefaulter.OUTPUT_QUIET)
+    assert not stream.line_buffering
+    reporter.close()
+    assert sys.stdout is stream
@@ -0,0 +1,69 @@
+"""RunJournal: an unchanged re-run skips the extensions it already applied."""
+
+import sys
+
+import pytest
+
+import AppDefaulter
+from AppDefaulter import FILE_EXTS_PATH, RunJournal
+
+from conftest import set_value
+
+
+@pytest.fixture
+def config(reg, tmp_path):
+    set_value(reg, reg.HKEY_CLASSES_ROOT, ".txt", "", "txtfile")
+    set_value(reg, reg.HKEY_CLASSES_ROOT, "txtfile\\shell\\open\\command", "",
+              "C:\\Windows\\notepad.exe %1")
+    set_value(reg, reg.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\.txt\\UserChoice",
+              "ProgId", "txtfile")
+    exe = tmp_path / "editor.exe"
+    exe.touch()
+    path = tmp_path / "editor.apps"
+    path.write_text(f"{exe}\n.txt\n.md\n", encoding="utf-8")
+    return str(path)
+
+
+def run_main(monkeypatch, capsys, *argv):
+    monkeypatch.setattr(sys, "argv", ["AppDefaulter.py", *argv])
+    try:
+        AppDefaulter.main()
+    except SystemExit as e:
+        assert not e.code
+    return capsys.readouterr().out
+
+
+def test_unchanged_rerun_is_skipped(config, monkeypatch, capsys):
+    run_main(monkeypatch, capsys, config, "--no-cache")
+    journal = RunJournal(AppDefaulter.get_state_dir() / "run_journal.json")
+    assert len(journal.entries) == 2
+    written = AppDefaulter.write_stats.written
+
+    out = run_main(monkeypatch, capsys, config, "--no-cache")
+    assert "Run journal: 2 of 2 extension(s) unchanged since the last run" in out
+    assert "Unchanged since last run: 2" in out
+    assert AppDefaulter.write_stats.written == written
+
+
+def test_changed_key_is_checked_again(config, reg, monkeypatch, capsys):
+    run_main(monkeypatch, capsys, config, "--no-cache")
+    # Something else takes .md over between runs
+    set_value(reg, reg.HKEY_CLASSES_ROOT, ".md", "", "txtfile")
+
+    out = run_main(monkeypatch, capsys, config, "--no-cache")
+    assert "Run journal: 1 of 2 extension(s) unchanged since the last run" in out
+    assert "Unchanged since last run: 1" in out
+
+
+def test_full_rechecks_everything(config, monkeypatch, capsys):
+    run_main(monkeypatch, capsys, config, "--no-cache")
+    out = run_main(monkeypatch, capsys, config, "--no-cache", "--full")
+    assert "Run journal:" not in out
+    assert "Unchanged since last run" not in out
+
+
+def test_changed_decision_inputs_are_not_skipped(config, monkeypatch, capsys):
+    run_main(monkeypatch, capsys, config, "--no-cache")
+    # --force changes the decision for .txt, so the journal entry does not apply
+    out = run_main(monkeypatch, capsys, config, "--no-cache", "--force")
+    assert "Unchanged since last run" not in out
@@ -0,0 +1,95 @@
+"""security_inf: value normalization, template diffs and rendering removals."""
+
+import pytest
+
+from security_inf import (PRIVILEGE_RIGHTS, REGISTRY_VALUES, diff_inf, normalize_inf_value,
+                          parse_inf_text, render_inf)
+
+BASELINE = """\
+[Unicode]
+Unicode=yes
+[System Access]
+MinimumPasswordAge = 1
+PasswordComplexity = 1
+[Privilege Rights]
+SeNetworkLogonRight = Everyone,*S-1-5-32-544,Users
+SeBackupPrivilege = *S-1-5-32-544
+SeDebugPrivilege = *S-1-5-32-544
+[Registry Values]
+MACHINE\\System\\CurrentControlSet\\Control\\Lsa\\LimitBlankPasswordUse=4,1
+[Version]
+signature="$CHICAGO$"
+Revision=1
+"""
+
+CURRENT = """\
+[Unicode]
+Unicode=yes
+[System Access]
+MinimumPasswordAge = 0
+PasswordComplexity = 01
+[Privilege Rights]
+SeNetworkLogonRight = *S-1-5-32-545,administrators,*s-1-1-0
+SeBackupPrivilege = *S-1-5-32-544,*S-1-5-32-551
+[Registry Values]
+MACHINE\\System\\CurrentControlSet\\Control\\Lsa\\LimitBlankPasswordUse=4,0001
+[Version]
+signature="$CHICAGO$"
+Revision=1
+"""
+
+
+@pytest.mark.parametrize("section, a, b", [
+    # Accounts by name or SID, in any order and case
+    (PRIVILEGE_RIGHTS, "Everyone,Administrators", "*S-1-5-32-544,*s-1-1-0"),
+    (PRIVILEGE_RIGHTS, "*S-1-5-32-545, ", "users"),
+    # Numbers with leading zeros, with or without quotes
+    ("System Access", "01", "1"),
+    ("System Access", '"5"', "5"),
+    (REGISTRY_VALUES, "4,0001", "4,1"),
+    (REGISTRY_VALUES, '1,"0"', "1,0"),
+    (REGISTRY_VALUES, "7,a,,b", "7,a,b"),
+])
+def test_equivalent_values(section, a, b):
+    assert normalize_inf_value(section, a) == normalize_inf_value(section, b)
+
+
+@pytest.mark.parametrize("section, a, b", [
+    (PRIVILEGE_RIGHTS, "Everyone", "Users"),
+    ("System Access", "1", "0"),
+    # REG_MULTI_SZ order matters
+    (REGISTRY_VALUES, "7,a,b", "7,b,a"),
+    (REGISTRY_VALUES, "4,1", "3,1"),
+])
+def test_different_values(section, a, b):
+    assert normalize_inf_value(section, a) != normalize_inf_value(section, b)
+
+
+def test_diff_reports_only_real_changes_then_removals():
+    changes = diff_inf(parse_inf_text(BASELINE), parse_inf_text(CURRENT))
+    assert [change.describe() for change in changes] == [
+        "[System Access] MinimumPasswordAge: 1 -> 0",
+        "[Privilege Rights] SeBackupPrivilege: *S-1-5-32-544 -> *S-1-5-32-544,*S-1-5-32-551",
+        "[Privilege Rights] SeDebugPrivilege: *S-1-5-32-544 -> (not set)",
+    ]
+
+
+def test_removed_privilege_is_rendered_with_no_accounts():
+    baseline = parse_inf_text(BASELINE)
+    changes = diff_inf(baseline, parse_inf_text(CURRENT))
+    # A setting only the baseline has, outside [Privilege Rights], cannot be unset
+    removed = parse_inf_text("[System Access]\nLockoutBadCount = 5\n")
+    changes += diff_inf(removed, parse_inf_text("[System Access]\n"))
+
+    text, skipped = render_inf(changes, baseline)
+    lines = text.split("\r\n")
+    assert lines[:2] == ["[Unicode]", "Unicode=yes"]
+    assert "SeDebugPrivilege =" in lines
+    assert "MinimumPasswordAge = 0" in lines
+    assert lines[-4:] == ["[Version]", 'signature="$CHICAGO$"', "Revision=1", ""]
+    assert [change.entry.key for change in skipped] == ["LockoutBadCount"]
+
+    # The rendered template parses back to an empty privilege list
+    reparsed = parse_inf_text(text)
+    assert normalize_inf_value(PRIVILEGE_RIGHTS,
+                               reparsed.get(PRIVILEGE_RIGHTS, "SeDebugPrivilege").value) == frozenset()
@@ -0,0 +1,200 @@
+"""task_scheduler: graph validation, ordering, conflicts, and ScriptScheduler's type phases."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import ScriptScheduler
+from task_scheduler import (STATUS_BLOCKED, STATUS_FAILED, STATUS_IN_PLACE, STATUS_NO_ADMIN,
+                            STATUS_OK, STATUS_TIMEOUT, Task, TaskGraphError, TaskResult,
+                            dependency_levels, order_tasks, run_task, run_tasks)
+
+
+class Recorder:
+    """A run_tasks() runner that records start/end events instead of running commands."""
+
+    def __init__(self, fail=(), seconds=0.02):
+        self.fail = set(fail)
+        self.seconds = seconds
+        self.events = []
+        self.running = set()
+        self.overlaps = []
+        self.lock = threading.Lock()
+
+    def __call__(self, task):
+        with self.lock:
+            self.events.append(("start", task.name))
+            self.overlaps.append((task.name, frozenset(self.running)))
+            self.running.add(task.name)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running.discard(task.name)
+            self.events.append(("end", task.name))
+        return TaskResult(task.name, STATUS_FAILED if task.name in self.fail else STATUS_OK)
+
+    def index(self, event, name):
+        return self.events.index((event, name))
+
+    def ran_with(self, name):
+        return next(others for task, others in self.overlaps if task == name)
+
+
+def test_order_keeps_given_order_among_ready_tasks():
+    tasks = [Task("c", "", depends=["b"]), Task("a", ""), Task("b", "", depends=["a"]),
+             Task("d", "")]
+    assert [t.name for t in order_tasks(tasks)] == ["a", "b", "c", "d"]
+    assert dependency_levels(tasks) == [["a", "d"], ["b"], ["c"]]
+
+
+@pytest.mark.parametrize("tasks, message", [
+    ([Task("a", ""), Task("a", "")], "Duplicate task: a"),
+    ([Task("a", "", depends=["x"])], "unknown task 'x'"),
+    ([Task("a", "", conflicts=["x"])], "unknown task 'x'"),
+    ([Task("a", "", after=["x"])], "unknown task 'x'"),
+    ([Task("a", "", depends=["b"]), Task("b", "", after=["a"])], "cycle: a -> b -> a"),
+])
+def test_invalid_graphs_are_rejected_before_running(tasks, message):
+    runner = Recorder()
+    with pytest.raises(TaskGraphError, match=message):
+        run_tasks(tasks, jobs=2, runner=runner)
+    assert runner.events == []
+
+
+def test_dependencies_run_first_and_failures_block_dependents():
+    runner = Recorder(fail={"a"})
+    tasks = [Task("a", ""), Task("b", "", depends=["a"]), Task("c", "", depends=["b"]),
+             Task("d", "", after=["a"]), Task("e", "")]
+    results = {r.name: r for r in run_tasks(tasks, jobs=4, runner=runner)}
+
+    assert results["a"].status == STATUS_FAILED
+    assert results["b"].status == STATUS_BLOCKED and "a did not succeed" in results["b"].detail
+    assert results["c"].status == STATUS_BLOCKED
+    # `after` only orders: d still runs once a has finished
+    assert results["d"].status == STATUS_OK
+    assert runner.index("end", "a") < runner.index("start", "d")
+    assert results["e"].status == STATUS_OK
+    assert ("start", "b") not in runner.events and ("start", "c") not in runner.events
+
+
+def test_conflicting_tasks_never_overlap():
+    runner = Recorder()
+    tasks = [Task("a", "", conflicts=["b"]), Task("b", ""), Task("c", ""), Task("d", "")]
+    run_tasks(tasks, jobs=4, runner=runner)
+
+    assert "b" not in runner.ran_with("a") and "a" not in runner.ran_with("b")
+    # Unrelated tasks still run alongside
+    assert runner.ran_with("d") & {"a", "c"}
+
+
+def test_jobs_bounds_concurrency():
+    runner = Recorder()
+    run_tasks([Task(str(i), "") for i in range(6)], jobs=2, runner=runner)
+    assert max(len(others) for _, others in runner.overlaps) <= 1
+
+
+def test_admin_tasks_are_skipped_when_not_elevated():
+    runner = Recorder()
+    tasks = [Task("a", "", needs_admin=True), Task("b", "", depends=["a"])]
+    results = run_tasks(tasks, jobs=2, admin=False, runner=runner)
+    assert [r.status for r in results] == [STATUS_NO_ADMIN, STATUS_BLOCKED]
+    assert runner.events == []
+
+
+def test_run_task_check_output_and_timeout():
+    python = [sys.executable, "-c"]
+    in_place = run_task(Task("a", python + ["raise SystemExit(1)"], check=lambda: True))
+    assert in_place.status == STATUS_IN_PLACE
+
+    done = run_task(Task("b", python + ["print('hello')"], check=lambda: False))
+    assert (done.status, done.returncode, done.output.strip()) == (STATUS_OK, 0, "hello")
+
+    failed = run_task(Task("c", python + ["raise SystemExit(3)"]))
+    assert (failed.status, failed.returncode) == (STATUS_FAILED, 3)
+
+    slow = run_task(Task("d", python + ["import time; time.sleep(5)"], timeout=0.2))
+    assert slow.status == STATUS_TIMEOUT and "0.2s" in slow.detail
+
+
+def test_scripts_keep_the_reg_bat_ps1_phases(tmp_path):
+    for name in ("b.reg", "a.reg", "setup.bat", "tweak.bat", "aliases.ps1"):
+        body = "Windows Registry Editor Version 5.00\r\n" if name.endswith(".reg") else ""
+        (tmp_path / name).write_text(body, encoding="utf-8")
+    (tmp_path / ScriptScheduler.MANIFEST_NAME).write_text(
+        "[tweak.bat]\ndepends = setup.bat\n"
+        "[stub]\ncommand = echo stub\n", encoding="utf-8")
+
+    tasks = ScriptScheduler.load_tasks(tmp_path, tmp_path / ScriptScheduler.MANIFEST_NAME,
+                                       timeout=60, check=False)
+    by_name = {task.name: task for task in tasks}
+    reg_task = ScriptScheduler.REG_TASK
+    assert by_name["setup.bat"].after == [reg_task]
+    assert by_name["aliases.ps1"].after == ["setup.bat", "tweak.bat"]
+    assert by_name["stub"].after == []
+    assert dependency_levels(tasks) == [[reg_task, "stub"], ["setup.bat"],
+                                        ["tweak.bat"], ["aliases.ps1"]]
+
+    # A failed import does not block the next phase, as with the old launcher
+    runner = Recorder(fail={reg_task})
+    results = {r.name: r.status for r in run_tasks(tasks, jobs=8, runner=runner)}
+    assert results["setup.bat"] == STATUS_OK
+    assert runner.index("end", reg_task) < runner.index("start", "setup.bat")
+    assert runner.index("end", "tweak.bat") < runner.index("start", "aliases.ps1")
+
+
+def test_reg_files_are_imported_as_one_task_in_name_order(tmp_path):
+    header = "Windows Registry Editor Version 5.00\r\n\r\n[HKEY_CURRENT_USER\\Software\\Test]\r\n"
+    (tmp_path / "b.reg").write_text(header + '"Mode"="b"\r\n', encoding="utf-8")
+    (tmp_path / "a.reg").write_text(header + '"Mode"="a"\r\n', encoding="utf-8")
+    (tmp_path / "c.reg").write_text(
+        "Windows Registry Editor Version 5.00\r\n\r\n[HKEY_LOCAL_MACHINE\\Software\\Test]\r\n"
+        '"Other"=dword:00000001\r\n', encoding="utf-8")
+    (tmp_path / "tweak.bat").write_text("", encoding="utf-8")
+    (tmp_path / ScriptScheduler.MANIFEST_NAME).write_text(
+        "[tweak.bat]\nconflicts = b.reg\n"
+        "[a.reg]\ndepends = tweak.bat\nconflicts = c.reg\n", encoding="utf-8")
+
+    with pytest.raises(TaskGraphError, match="cycle"):
+        # tweak.bat runs after the import phase, so the import cannot depend on it
+        dependency_levels(ScriptScheduler.load_tasks(
+            tmp_path, tmp_path / ScriptScheduler.MANIFEST_NAME, timeout=60, check=False))
+
+    (tmp_path / ScriptScheduler.MANIFEST_NAME).write_text(
+        "[tweak.bat]\nconflicts = b.reg\n[a.reg]\nconflicts = c.reg\n", encoding="utf-8")
+    tasks = ScriptScheduler.load_tasks(tmp_path, tmp_path / ScriptScheduler.MANIFEST_NAME,
+                                       timeout=60, check=False)
+    reg_task = tasks[0]
+    assert [task.name for task in tasks] == [ScriptScheduler.REG_TASK, "tweak.bat"]
+    assert [Path(arg).name for arg in reg_task.command[1:]] == \
+        ["RegImporter.py", "a.reg", "b.reg", "c.reg"]
+    assert reg_task.needs_admin        # c.reg writes HKEY_LOCAL_MACHINE
+    assert reg_task.conflicts == []    # a.reg and c.reg are merged, not run side by side
+    assert tasks[1].conflicts == [ScriptScheduler.REG_TASK]
+
+    # The merge reports the value both files set; the later file wins
+    model = ScriptScheduler.merge_reg_files(reg_task.command[2:])
+    assert len(model.conflicts) == 1
+    assert [op.data for op in model.values.values() if op.name == "Mode"] == ["b"]
+
+
+def test_reg_file_check_in_manifest_is_rejected(tmp_path):
+    (tmp_path / "a.reg").write_text("Windows Registry Editor Version 5.00\r\n", encoding="utf-8")
+    (tmp_path / ScriptScheduler.MANIFEST_NAME).write_text("[a.reg]\ncheck = exit /b 0\n",
+                                                          encoding="utf-8")
+    with pytest.raises(ScriptScheduler.ManifestError, match="checked against the registry"):
+        ScriptScheduler.load_tasks(tmp_path, tmp_path / ScriptScheduler.MANIFEST_NAME, timeout=60)
+
+
+def test_shipped_manifest_loads():
+    folder = ScriptScheduler.DEFAULT_FOLDER
+    tasks = ScriptScheduler.load_tasks(folder, folder / ScriptScheduler.MANIFEST_NAME,
+                                       timeout=60, check=False)
+    by_name = {task.name: task for task in tasks}
+    assert "remove_office_apps_new_file.bat" in by_name["add_text_file_to_new_context_menu.bat"].conflicts
+    assert by_name["disable_hibernation.bat"].conflicts == []
+    assert len(by_name[ScriptScheduler.REG_TASK].command) > 3
+    levels = dependency_levels(tasks)
+    assert [{Path(name).suffix.lower() for name in level} for level in levels] \
+        == [{".reg"}, {".bat"}, {".ps1"}]
@@ -0,0 +1,120 @@
+"""tweak_profiles: parse, diff, delta and render for each profile kind."""
+
+from tweak_profiles import (KIND_OOSU, KIND_VISUAL, KIND_WINAERO, delta_profile, diff_profile,
+                            parse_profile_text, render_profile, visual_effects_values)
+
+import memory_registry as mr
+
+OOSU_DESIRED = """\
+############################################################################
+# This file was created with O&O ShutUp10++ V1.9.1436
+############################################################################
+
+P001\t+\t# Disable sharing of handwriting data
+P002\t+\t# Disable inventory collector
+P026\t-\t# Disable advertisements via Bluetooth
+"""
+
+OOSU_CURRENT = "P001\t+\nP002\t-\n"
+
+WINAERO_DESIRED = """\
+[Format]
+Version=1
+[User]
+pageDisableAds=1
+pageExplorerTitle=1
+[pageDisableAds]
+DisableTips=1
+DisableSuggestions=1
+[pageExplorerTitle]
+Title=Explorer
+"""
+
+WINAERO_CURRENT = """\
+[User]
+pageDisableAds=1
+pageExplorerTitle=1
+[pageDisableAds]
+DisableTips=1
+DisableSuggestions=0
+[pageExplorerTitle]
+Title=Explorer
+"""
+
+VISUAL_DESIRED = """\
+[Desktop]
+UserPreferencesMask=144,18,3,128,16,0,0,0
+FontSmoothing=2
+DragFullWindows=0
+
+[Advanced]
+TaskbarAnimations=0
+"""
+
+VISUAL_CURRENT = """\
+Windows Registry Editor Version 5.00
+
+[HKEY_CURRENT_USER\\Control Panel\\Desktop]
+"UserPreferencesMask"=hex:90,12,03,80,10,00,00,00
+"FontSmoothing"="2"
+"DragFullWindows"="1"
+
+[HKEY_CURRENT_USER\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced]
+"TaskbarAnimations"=dword:00000000
+"""
+
+
+def keys(profile):
+    return [setting.label for setting in profile]
+
+
+def test_oosu_round_trip():
+    desired = parse_profile_text(OOSU_DESIRED, "ooshutup10.cfg")
+    assert desired.kind == KIND_OOSU
+    changes = diff_profile(desired, parse_profile_text(OOSU_CURRENT))
+    assert [(c.desired.name, c.current) for c in changes] == [("P002", "-"), ("P026", None)]
+
+    delta = delta_profile(desired, changes)
+    text = render_profile(delta)
+    assert text.startswith("####") and text.endswith("\r\n")
+    assert "P002\t+\t# Disable inventory collector\r\n" in text
+    reparsed = parse_profile_text(text)
+    assert keys(reparsed) == ["P002", "P026"]
+    # Applying the delta leaves nothing to do
+    assert diff_profile(delta, reparsed) == []
+
+
+def test_winaero_changed_option_keeps_its_whole_page():
+    desired = parse_profile_text(WINAERO_DESIRED, "Winaero Tweaker_export.ini")
+    assert desired.kind == KIND_WINAERO
+    changes = diff_profile(desired, parse_profile_text(WINAERO_CURRENT))
+    assert [c.desired.label for c in changes] == ["[pageDisableAds] DisableSuggestions"]
+
+    delta = delta_profile(desired, changes)
+    # The page's [User] entry and its unchanged option come along; other pages do not
+    assert keys(delta) == ["[User] pageDisableAds", "[pageDisableAds] DisableTips",
+                           "[pageDisableAds] DisableSuggestions"]
+    text = render_profile(delta)
+    assert text.startswith("[Format]\r\nVersion=1\r\n[User]\r\n")
+    assert keys(parse_profile_text(text)) == keys(delta)
+
+
+def test_visual_effects_against_a_reg_dump():
+    desired = parse_profile_text(VISUAL_DESIRED, "visual_effects.ini")
+    current = parse_profile_text(VISUAL_CURRENT, "current.reg")
+    assert desired.kind == current.kind == KIND_VISUAL
+
+    # Binary and DWORD values compare by number, not by their text
+    changes = diff_profile(desired, current)
+    assert [(c.desired.name, c.current) for c in changes] == [("DragFullWindows", "1")]
+
+    delta = delta_profile(desired, changes)
+    assert parse_profile_text(render_profile(delta)).kind == KIND_VISUAL
+    assert visual_effects_values(delta) == [
+        ("Control Panel\\Desktop", "DragFullWindows", mr.REG_SZ, "0")]
+    assert visual_effects_values(desired)[0][3] == bytes([144, 18, 3, 128, 16, 0, 0, 0])
+
+
+def test_unknown_current_state_applies_everything():
+    desired = parse_profile_text(OOSU_DESIRED)
+    assert len(delta_profile(desired, diff_profile(desired, None))) == len(desired)
@@ -0,0 +1,111 @@
+"""apply_user_hives(): per-user "Open with" entries for every loaded profile."""
+
+import pytest
+
+import AppDefaulter
+from AppDefaulter import (DEFAULT_PROFILE_MOUNT, FILE_EXTS_PATH, AppConfig, apply_user_hives,
+                          generate_progid, list_user_hives)
+
+from conftest import get_value, set_value
+
+ALICE = "S-1-5-21-1004336348-1177238915-682003330-1001"
+BOB = "S-1-5-21-1004336348-1177238915-682003330-1002"
+LOCKED = "S-1-5-21-1004336348-1177238915-682003330-1003"
+EXE = "C:\\Apps\\Editor\\editor.exe"
+CONFIGS = [AppConfig("editor.apps", EXE, [".txt", ".md"])]
+
+
+def file_exts(sid, ext, subkey):
+    return f"{sid}\\{FILE_EXTS_PATH}\\{ext}\\{subkey}"
+
+
+@pytest.fixture
+def hives(reg):
+    for sid in (ALICE, BOB, LOCKED, f"{ALICE}_Classes", "S-1-5-18", ".DEFAULT",
+                DEFAULT_PROFILE_MOUNT):
+        reg.CreateKeyEx(reg.HKEY_USERS, f"{sid}\\Software").Close()
+    # Bob already has another editor in his list
+    list_path = file_exts(BOB, ".txt", "OpenWithList")
+    set_value(reg, reg.HKEY_USERS, list_path, "a", "notepad.exe")
+    set_value(reg, reg.HKEY_USERS, list_path, "MRUList", "a")
+    return reg
+
+
+def test_list_user_hives_keeps_only_user_profiles(hives):
+    assert sorted(list_user_hives()) == sorted([ALICE, BOB, LOCKED, DEFAULT_PROFILE_MOUNT])
+
+
+def test_list_user_hives_leaves_out_the_running_user(hives, monkeypatch):
+    for sid, name in ((ALICE, "alice"), (BOB, "bob")):
+        set_value(hives, hives.HKEY_LOCAL_MACHINE, f"{AppDefaulter.PROFILE_LIST_PATH}\\{sid}",
+                  "ProfileImagePath", f"%SystemDrive%\\Users\\{name}", hives.REG_EXPAND_SZ)
+    monkeypatch.setenv("SystemDrive", "C:")
+    monkeypatch.setenv("USERPROFILE", "C:\\USERS\\Bob")
+
+    assert AppDefaulter.current_user_sid() == BOB
+    # Bob's hive is HKEY_CURRENT_USER; writing it again through HKEY_USERS would double-write
+    assert sorted(list_user_hives()) == sorted([ALICE, LOCKED, DEFAULT_PROFILE_MOUNT])
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_results_per_hive_in_order(hives, monkeypatch, jobs):
+    create = hives.CreateKeyEx
+
+    def create_key(key, sub_key, *args):
+        if key == hives.HKEY_USERS and sub_key.startswith(LOCKED):
+            raise PermissionError(5, "Access is denied")
+        return create(key, sub_key, *args)
+
+    monkeypatch.setattr(hives, "CreateKeyEx", create_key)
+    order = [ALICE, LOCKED, BOB, DEFAULT_PROFILE_MOUNT]
+    results = apply_user_hives(CONFIGS, order, jobs)
+
+    assert list(results) == order
+    assert results[ALICE] == {"open_with": 2, "failed": 0}
+    assert results[BOB] == {"open_with": 2, "failed": 0}
+    assert results[DEFAULT_PROFILE_MOUNT] == {"open_with": 2, "failed": 0}
+    # A hive that cannot be opened fails every association, not just one
+    assert results[LOCKED] == {"open_with": 0, "failed": 2}
+
+
+def test_open_with_entries_are_written_to_each_hive(hives):
+    apply_user_hives(CONFIGS, [ALICE, BOB], jobs=2)
+
+    for sid in (ALICE, BOB):
+        for ext in (".txt", ".md"):
+            progid = generate_progid(EXE, ext)
+            assert get_value(hives, hives.HKEY_USERS,
+                             file_exts(sid, ext, "OpenWithProgids"), progid) == b""
+    assert get_value(hives, hives.HKEY_USERS, file_exts(ALICE, ".txt", "OpenWithList"), "a") \
+        == "editor.exe"
+    # Bob's existing entry is kept and ours goes to the front of the MRU list
+    bob_list = file_exts(BOB, ".txt", "OpenWithList")
+    assert get_value(hives, hives.HKEY_USERS, bob_list, "a") == "notepad.exe"
+    assert get_value(hives, hives.HKEY_USERS, bob_list, "b") == "editor.exe"
+    assert get_value(hives, hives.HKEY_USERS, bob_list, "MRUList") == "ba"
+    # The current user's hive is not touched
+    assert get_value(hives, hives.HKEY_CURRENT_USER,
+                     f"{FILE_EXTS_PATH}\\.txt\\OpenWithProgids",
+                     generate_progid(EXE, ".txt")) is None
+
+
+def test_second_run_writes_nothing(hives):
+    apply_user_hives(CONFIGS, [ALICE, BOB], jobs=2)
+    written = AppDefaulter.write_stats.written
+
+    results = apply_user_hives(CONFIGS, [ALICE, BOB], jobs=2)
+    assert AppDefaulter.write_stats.written == written
+    assert results[ALICE] == {"open_with": 2, "failed": 0}
+
+
+def test_write_stats_add_up_across_hive_threads(reg):
+    sids = [f"S-1-5-21-1-2-3-{n}" for n in range(2000, 2016)]
+    for sid in sids:
+        reg.CreateKeyEx(reg.HKEY_USERS, f"{sid}\\Software").Close()
+    configs = [AppConfig("editor.apps", EXE, [f".e{n}" for n in range(20)])]
+
+    apply_user_hives(configs, sids, jobs=8)
+    # Per association: the OpenWithProgids value, the OpenWithList entry and its MRUList
+    assert AppDefaulter.write_stats.written == len(sids) * 20 * 3
+    apply_user_hives(configs, sids, jobs=8)
+    assert AppDefaulter.write_stats.skipped == len(sids) * 20 * 2
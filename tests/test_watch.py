@@ -0,0 +1,118 @@
+"""watch_associations(): the re-apply loop, driven through MemoryRegistryWatcher."""
+
+import AppDefaulter
+from AppDefaulter import (FILE_EXTS_PATH, AppConfig, RunJournal, WriteAheadJournal,
+                          apply_plan, assign_extension_owners, build_plan, generate_progid,
+                          get_existing_association, watch_associations)
+from registry_watch import MemoryRegistryWatcher
+
+from conftest import set_value
+
+EXE = "C:\\Apps\\Editor\\editor.exe"
+APPX_PROGID = "AppX4ztfk9wxr86nxmzzq47px0nh0e58b8fw"
+
+
+class ScriptedWatcher(MemoryRegistryWatcher):
+    """Runs one scripted external change each time the loop starts waiting for a burst."""
+
+    def __init__(self, registry, changes):
+        super().__init__(registry)
+        self.changes = list(changes)
+
+    def wait(self, timeout=None):
+        if timeout is None:
+            self.changes.pop(0)()
+        return super().wait(timeout)
+
+
+def setup(reg, wal=None):
+    """Apply the config once, journaled to `wal` like a normal run."""
+    set_value(reg, reg.HKEY_CLASSES_ROOT, ".txt", "", "txtfile")
+    config = AppConfig("editor.apps", EXE, [".txt", ".py", ".md"])
+    configs = [config]
+    owners = assign_extension_owners(configs)
+    if wal is not None:
+        wal.start(["editor.apps"])
+        AppDefaulter.write_journal = wal
+    apply_plan(build_plan(configs, owners, force=False))
+    if wal is not None:
+        wal.finish()
+        AppDefaulter.write_journal = None
+    return configs, owners
+
+
+def watch(reg, configs, owners, changes, **kwargs):
+    watcher = ScriptedWatcher(reg, changes)
+    watch_associations(configs, owners, False, watcher, debounce=0.01,
+                       max_bursts=len(changes), **kwargs)
+
+
+def test_reset_default_is_taken_back_and_journaled(reg, tmp_path, capsys):
+    wal = WriteAheadJournal(tmp_path / "write_journal.jsonl")
+    configs, owners = setup(reg, wal)
+    progid = generate_progid(EXE, ".py")
+    assert get_existing_association(".py").progid == progid
+    capsys.readouterr()
+    before = wal.read()
+    assert before[0]["op"] == "begin" and before[-1]["op"] == "end"
+    run_journal = RunJournal(tmp_path / "run_journal.json")
+
+    def installer_resets_py():
+        set_value(reg, reg.HKEY_CLASSES_ROOT, ".py", "", "Python.File")
+
+    def unrelated_change():
+        set_value(reg, reg.HKEY_CLASSES_ROOT, ".zzz", "", "zzzfile")
+
+    watch(reg, configs, owners, [installer_resets_py, unrelated_change],
+          run_journal=run_journal, wal=wal)
+    out = capsys.readouterr().out
+
+    assert get_existing_association(".py").progid == progid
+    assert out.count("Change detected") == 1
+    assert "[OK] Re-applied 1 association(s)" in out
+    # Bursts append to the run's journal instead of starting a new one
+    records = wal.read()
+    assert records[:len(before)] == before
+    burst = records[len(before):]
+    assert [r["op"] for r in burst if r["op"] != "value"] == ["done", "end"]
+    assert burst[0] == {"op": "value", "root": reg.HKEY_CLASSES_ROOT, "path": ".py", "name": "",
+                        "data": "Python.File", "type": reg.REG_SZ}
+    assert run_journal.is_current(EXE, ".py", progid, True, False)
+
+
+def test_user_choice_override_is_reported_not_counted(reg, tmp_path, capsys):
+    configs, owners = setup(reg)
+    progid = generate_progid(EXE, ".py")
+    capsys.readouterr()
+    run_journal = RunJournal(tmp_path / "run_journal.json")
+    run_journal.record(EXE, ".py", progid, True, False, ["stale"])
+
+    def settings_pick_another_app():
+        set_value(reg, reg.HKEY_CURRENT_USER, f"{FILE_EXTS_PATH}\\.py\\UserChoice", "ProgId",
+                  APPX_PROGID)
+
+    watch(reg, configs, owners, [settings_pick_another_app], run_journal=run_journal)
+    out = capsys.readouterr().out
+
+    assert f"[WARN] .py: the default was changed to {APPX_PROGID} through UserChoice" in out
+    assert "Default apps" in out
+    assert "Re-applied" not in out
+    assert "Set 'editor' as DEFAULT" not in out
+    assert get_existing_association(".py").progid == APPX_PROGID
+    # Not up to date any more, so the next run looks at it again
+    assert not run_journal.is_current(EXE, ".py", progid, True, False)
+
+
+def test_failed_reapply_is_not_counted(reg, monkeypatch, capsys):
+    configs, owners = setup(reg)
+    capsys.readouterr()
+    monkeypatch.setattr(AppDefaulter, "apply_extension", lambda *args: "failed")
+
+    def installer_resets_py():
+        set_value(reg, reg.HKEY_CLASSES_ROOT, ".py", "", "Python.File")
+
+    watch(reg, configs, owners, [installer_resets_py])
+    out = capsys.readouterr().out
+
+    assert "[OK] Re-applied 0 association(s)" in out
+    assert "[WARN] Could not re-apply 1 association(s): .py" in out
@@ -0,0 +1,84 @@
+"""WriteAheadJournal: rolling back an interrupted run restores the earlier values."""
+
+import sys
+
+import pytest
+
+import AppDefaulter
+from AppDefaulter import (RegistryWrite, WriteAheadJournal, apply_registry_writes,
+                          rollback_journal)
+
+from conftest import get_value, set_value
+
+KEY = "Software\\Alchemy\\Test"
+
+
+@pytest.fixture
+def interrupted(reg, tmp_path, monkeypatch):
+    """A run that changed one value, added another and a new key, then stopped."""
+    hkcu = reg.HKEY_CURRENT_USER
+    set_value(reg, hkcu, KEY, "Mode", "original")
+    set_value(reg, hkcu, KEY, "Count", 1, reg.REG_DWORD)
+    wal = WriteAheadJournal(tmp_path / "write_journal.jsonl")
+    wal.start(["editor.apps"])
+    monkeypatch.setattr(AppDefaulter, "write_journal", wal)
+    apply_registry_writes([
+        RegistryWrite(hkcu, KEY, "Mode", reg.REG_SZ, "changed"),
+        RegistryWrite(hkcu, KEY, "Added", reg.REG_SZ, "new"),
+        RegistryWrite(hkcu, f"{KEY}\\Child\\Grandchild", "", reg.REG_SZ, "x"),
+    ])
+    # The same value written twice: rollback must end with the first prior value
+    apply_registry_writes([RegistryWrite(hkcu, KEY, "Mode", reg.REG_SZ, "changed again")])
+    wal.close()     # no finish(): the run was interrupted
+    return wal
+
+
+def test_interrupted_journal_has_no_end_record(interrupted):
+    records = interrupted.read()
+    assert records[0] == {"op": "begin", "argv": ["editor.apps"]}
+    assert records[-1]["op"] != "end"
+
+
+def test_rollback_restores_earlier_values(reg, interrupted):
+    hkcu = reg.HKEY_CURRENT_USER
+    restored, failed = rollback_journal(interrupted.read())
+
+    assert failed == 0 and restored == 5
+    assert get_value(reg, hkcu, KEY, "Mode") == "original"
+    assert get_value(reg, hkcu, KEY, "Count") == 1
+    assert get_value(reg, hkcu, KEY, "Added") is None
+    # The key the run created is removed with its whole subtree
+    assert get_value(reg, hkcu, f"{KEY}\\Child\\Grandchild") is None
+    with pytest.raises(OSError):
+        reg.OpenKey(hkcu, f"{KEY}\\Child")
+
+
+def test_torn_last_record_is_ignored(reg, interrupted):
+    with open(interrupted.path, "a", encoding="utf-8") as f:
+        f.write('{"op": "value", "root": ')
+    records = interrupted.read()
+    assert records[-1]["op"] == "value"
+    rollback_journal(records)
+    assert get_value(reg, reg.HKEY_CURRENT_USER, KEY, "Mode") == "original"
+
+
+def test_main_refuses_new_run_then_rolls_back(reg, interrupted, tmp_path, monkeypatch, capsys):
+    state_journal = AppDefaulter.get_state_dir() / "write_journal.jsonl"
+    state_journal.parent.mkdir(parents=True, exist_ok=True)
+    state_journal.write_bytes(interrupted.path.read_bytes())
+    config = tmp_path / "editor.apps"
+    config.write_text(f"{sys.executable}\n.txt\n", encoding="utf-8")
+
+    monkeypatch.setattr(sys, "argv", ["AppDefaulter.py", str(config)])
+    with pytest.raises(SystemExit) as exit_info:
+        AppDefaulter.main()
+    assert exit_info.value.code == 1
+    assert "interrupted" in capsys.readouterr().out
+
+    monkeypatch.setattr(sys, "argv", ["AppDefaulter.py", "--rollback"])
+    with pytest.raises(SystemExit) as exit_info:
+        AppDefaulter.main()
+    assert exit_info.value.code == 0
+    assert "Rolling back interrupted run" in capsys.readouterr().out
+    assert get_value(reg, reg.HKEY_CURRENT_USER, KEY, "Mode") == "original"
+    assert not state_journal.exists()